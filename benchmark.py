@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 界面性能基准
+Offscreen Qt UI performance regression harness
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 无显示环境下运行，必须在导入 PyQt5 之前设置
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+from desire_core import CATEGORIES, DEFAULT_CURRENCY, FREQUENCIES, PRIORITIES, load_desire_file
+from filecodec import available_codecs, write_desire_file
+from main import DesireCalculator
+
+DEFAULT_SIZES = (200, 1000)
+
+# 心跳间隔（毫秒），两次心跳之间的间隔超出部分即为事件循环卡顿
+HEARTBEAT_INTERVAL = 5
+
+# 超过该时长（秒）的卡顿计入卡顿次数
+STALL_REPORT_MIN = 0.05
+
+# 单步等待异步操作完成的最长时间（秒）
+STEP_TIMEOUT = 120
+
+# 默认阈值：耗时(秒，1000 条需求时)、最长卡顿(秒)、Python内存峰值(MB，每 1000 条需求)
+# 卡顿即界面无响应的时长，不随数据量放宽；耗时按数据量的平方根放宽，内存按数据量线性放宽
+DEFAULT_THRESHOLDS = {
+    "load": {"wall": 2.0, "stall": 0.3, "memory": 10},
+    "filter_category": {"wall": 0.3, "stall": 0.2, "memory": 2},
+    "filter_priority": {"wall": 0.3, "stall": 0.2, "memory": 2},
+    "filter_reset": {"wall": 0.3, "stall": 0.2, "memory": 8},
+    "filter_return": {"wall": 0.1, "stall": 0.1, "memory": 2},
+    "toggle": {"wall": 0.1, "stall": 0.1, "memory": 2},
+    "delete": {"wall": 0.1, "stall": 0.1, "memory": 2},
+    "external_edit": {"wall": 1.0, "stall": 0.3, "memory": 4},
+    "export": {"wall": 1.0, "stall": 0.1, "memory": 2},
+}
+
+# 阈值随数据量放宽的方式：每种指标的放宽倍数为 (需求数 / 1000) 的幂（不低于 1）
+THRESHOLD_SCALING = {"wall": 0.5, "stall": 0.0, "memory": 1.0}
+
+_CURRENCIES = (DEFAULT_CURRENCY, DEFAULT_CURRENCY, DEFAULT_CURRENCY, "USD", "EUR")
+
+
+def synthetic_desires(count, seed=0):
+    """生成指定数量的随机需求"""
+    rng = random.Random(seed)
+    return {
+        f"desire_{i}": {
+            "name": f"需求{i}",
+            "frequency": rng.choice(FREQUENCIES),
+            "cost": round(rng.uniform(1, 3000), 2),
+            "priority": rng.choice(PRIORITIES),
+            "category": rng.choice(CATEGORIES),
+            "currency": rng.choice(_CURRENCIES),
+            "enabled": rng.random() > 0.1,
+        }
+        for i in range(count)
+    }
+
+
+class _ScriptedDialogs:
+    """用预设结果替换会阻塞的对话框，并记录错误提示"""
+
+    def __init__(self):
+        self.open_path = ""
+        self.save_path = ""
+        self.errors = []
+        self._saved = {}
+
+    def __enter__(self):
+        patches = {
+            (QFileDialog, "getOpenFileName"): lambda *a, **k: (self.open_path, ""),
+            (QFileDialog, "getSaveFileName"): lambda *a, **k: (self.save_path, ""),
+            (QMessageBox, "information"): lambda *a, **k: QMessageBox.Ok,
+            (QMessageBox, "warning"): lambda parent, title, text, *a: self._error(text),
+            (QMessageBox, "critical"): lambda parent, title, text, *a: self._error(text),
+            (QMessageBox, "question"): lambda *a, **k: QMessageBox.Yes,
+        }
+        for (owner, name), replacement in patches.items():
+            self._saved[(owner, name)] = owner.__dict__[name]
+            setattr(owner, name, staticmethod(replacement))
+        return self
+
+    def __exit__(self, *exc):
+        for (owner, name), original in self._saved.items():
+            setattr(owner, name, original)
+        self._saved.clear()
+
+    def _error(self, text):
+        self.errors.append(text)
+        return QMessageBox.Ok
+
+
+class StepTimer:
+    """
+    单步测量
+
+    在事件循环中执行操作，同时用定时器心跳检测卡顿；
+    操作为异步时等待 done() 返回真后结束。
+    """
+
+    def measure(self, action, done=None):
+        loop = QEventLoop()
+        gaps = []
+        last = [time.perf_counter()]
+        finished = [False]
+
+        def beat():
+            now = time.perf_counter()
+            gaps.append(now - last[0])
+            last[0] = now
+            if finished[0] and (done is None or done()):
+                loop.quit()
+
+        def run():
+            action()
+            finished[0] = True
+
+        heartbeat = QTimer()
+        heartbeat.setInterval(HEARTBEAT_INTERVAL)
+        heartbeat.timeout.connect(beat)
+        deadline = QTimer()
+        deadline.setSingleShot(True)
+        deadline.timeout.connect(loop.quit)
+
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = last[0] = time.perf_counter()
+        heartbeat.start()
+        deadline.start(STEP_TIMEOUT * 1000)
+        QTimer.singleShot(0, run)
+        loop.exec_()
+        end = time.perf_counter()
+        heartbeat.stop()
+        deadline.stop()
+        gaps.append(end - last[0])
+
+        stalls = [gap - HEARTBEAT_INTERVAL / 1000 for gap in gaps]
+        return {
+            "wall": end - start,
+            "stall": max(0.0, max(stalls)),
+            "stalls": sum(1 for stall in stalls if stall >= STALL_REPORT_MIN),
+            "memory": (tracemalloc.get_traced_memory()[1] - baseline) / 1024 / 1024,
+            "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "completed": finished[0] and (done is None or done()),
+        }
+
+
+def _steps(window, dialogs, folder, count):
+    """脚本化的操作序列: (名称, 操作, 完成条件)"""
+    data_path = os.path.join(folder, f"desires_{count}.json")
+    with open(data_path, "w", encoding="utf-8") as f:
+        json.dump(synthetic_desires(count), f, ensure_ascii=False)
+
+    def load():
+        dialogs.open_path = data_path
+        window.load_desires()
+
+    def first_id():
+        return next(iter(window.desires))
+
+    # 外部程序修改后的文件预先写好，测量的步骤中只替换文件并触发重新加载（不等待文件监视的延迟），
+    # 卡顿只反映界面合并修改的耗时，不包含模拟外部程序读写文件的时间
+    edited_path = data_path + ".edited"
+    desires = load_desire_file(data_path)
+    desire_id = next(iter(desires))
+    desires[desire_id] = dict(desires[desire_id], cost=desires[desire_id]['cost'] + 1)
+    write_desire_file(edited_path, desires)
+
+    def external_edit():
+        os.replace(edited_path, data_path)
+        window.reload_current_file()
+
+    def export():
+        dialogs.save_path = os.path.join(folder, f"report_{count}.txt")
+        window.export_report()
+
+    return [
+        ("load", load, lambda: window.loader is None),
+        ("filter_category", lambda: window.category_filter.setCurrentText("Housing"), None),
+        ("filter_priority", lambda: window.priority_filter.setCurrentText("High"), None),
+        ("filter_reset", lambda: (window.category_filter.setCurrentText("All"),
+                                  window.priority_filter.setCurrentText("All")), None),
+        # 回到用过的筛选条件，由筛选缓存命中
+        ("filter_return", lambda: window.category_filter.setCurrentText("Housing"), None),
+        ("toggle", lambda: window.toggle_desire(first_id(), False), None),
+        ("delete", lambda: window.delete_desire(first_id()), None),
+        ("external_edit", external_edit, lambda: window.reloader is None),
+        ("export", export, lambda: not window.tasks),
+    ]
+
+
+def check_result(result, limits, count):
+    """按阈值判断一步的结果是否通过，返回失败原因列表"""
+    failures = []
+    for metric, power in THRESHOLD_SCALING.items():
+        limit = limits.get(metric)
+        if limit is None:
+            continue
+        limit *= max(1.0, count / 1000) ** power
+        if result[metric] > limit:
+            failures.append(f"{metric} {result[metric]:.3f} > {limit:.3f}")
+    if not result["completed"]:
+        failures.append("未在限定时间内完成")
+    return failures
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, thresholds=None):
+    """运行基准，返回每个数据规模、每个步骤的结果列表"""
+    limits = dict(DEFAULT_THRESHOLDS)
+    limits.update(thresholds or {})
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    timer = StepTimer()
+    results = []
+
+    folder = tempfile.mkdtemp(prefix="desire_bench_")
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        with _ScriptedDialogs() as dialogs:
+            for count in sizes:
+                window = DesireCalculator()
+                window.show()
+                for name, action, done in _steps(window, dialogs, folder, count):
+                    del dialogs.errors[:]
+                    before = window.filter_cache.counters()
+                    result = timer.measure(action, done)
+                    after = window.filter_cache.counters()
+                    result.update(size=count, step=name, cache_hits=after['hits'] - before['hits'],
+                                  cache_misses=after['misses'] - before['misses'])
+                    result["failures"] = check_result(result, limits.get(name, {}), count)
+                    result["failures"].extend(f"错误提示: {text}" for text in dialogs.errors)
+                    result["passed"] = not result["failures"]
+                    results.append(result)
+                window.close()
+                window.deleteLater()
+                app.processEvents()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def run_codec_benchmark(count):
+    """各存储格式保存/加载同一份数据的文件大小与耗时"""
+    desires = synthetic_desires(count)
+    folder = tempfile.mkdtemp(prefix="desire_codec_")
+    results = []
+    try:
+        for codec in available_codecs():
+            path = os.path.join(folder, "desires.json")
+            start = time.perf_counter()
+            write_desire_file(path, desires, codec)
+            save = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = load_desire_file(path)
+            load = time.perf_counter() - start
+            results.append({
+                "codec": codec or "none",
+                "size": count,
+                "bytes": os.path.getsize(path),
+                "save": save,
+                "load": load,
+                "roundtrip": loaded == desires,
+            })
+            os.remove(path)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    plain = results[0]["bytes"]
+    for result in results:
+        result["ratio"] = result["bytes"] / plain
+    return results
+
+
+def format_codec_results(results):
+    """存储格式对比表格"""
+    lines = [f"{'格式':<8}{'规模':>7}{'大小(KB)':>11}{'比例':>8}{'保存(s)':>9}{'加载(s)':>9}"]
+    for result in results:
+        lines.append(f"{result['codec']:<8}{result['size']:>7}{result['bytes'] / 1024:>11.0f}"
+                     f"{result['ratio']:>8.1%}{result['save']:>9.3f}{result['load']:>9.3f}"
+                     + ("" if result["roundtrip"] else "  ❌ 读回内容不一致"))
+    return "\n".join(lines)
+
+
+def format_results(results):
+    """结果表格"""
+    lines = [f"{'规模':>7}  {'步骤':<16}{'耗时(s)':>9}{'最长卡顿(s)':>12}{'卡顿次数':>8}"
+             f"{'内存(MB)':>10}{'RSS峰值(MB)':>12}{'缓存命中/未命中':>10}  结果"]
+    for result in results:
+        status = "✅" if result["passed"] else "❌ " + "; ".join(result["failures"])
+        lines.append(f"{result['size']:>7}  {result['step']:<16}{result['wall']:>9.3f}"
+                     f"{result['stall']:>12.3f}{result['stalls']:>8}{result['memory']:>10.1f}"
+                     f"{result['rss']:>12.0f}{result['cache_hits']:>5}/{result['cache_misses']:<4}  {status}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器界面性能基准（无显示环境）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="合成数据的需求数量")
+    parser.add_argument("--thresholds", help="阈值JSON文件，格式同 DEFAULT_THRESHOLDS")
+    parser.add_argument("--codec-size", type=int, help="存储格式对比使用的需求数量（默认为最大规模）")
+    parser.add_argument("--json", dest="json_path", help="同时将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    thresholds = None
+    if args.thresholds:
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+
+    results = run_benchmark(args.sizes, thresholds)
+    print(format_results(results))
+    codecs = run_codec_benchmark(args.codec_size or max(args.sizes))
+    print("\n" + format_codec_results(codecs))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"steps": results, "codecs": codecs}, f, ensure_ascii=False, indent=2)
+
+    failed = sum(1 for result in results if not result["passed"])
+    failed += sum(1 for result in codecs if not result["roundtrip"])
+    print(f"\n{len(results) + len(codecs) - failed} 通过, {failed} 失败")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
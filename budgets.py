@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 分类预算监控
+Per-category / per-priority budgets with incremental threshold monitoring
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, budget_level, load_desire_file, normalize_category, normalize_priority
+
+BUDGETS_SUFFIX = ".budgets.json"
+
+# 预算范围：总预算 / 按类别 / 按优先级
+SCOPES = ("total", "category", "priority")
+
+LEVEL_NAMES = {"under": "正常", "warning": "警告", "over": "超支"}
+
+
+def budgets_path(path):
+    """数据文件对应的预算配置路径"""
+    return path + BUDGETS_SUFFIX
+
+
+def budget_label(scope, key):
+    """预算的显示名称"""
+    if scope == "total":
+        return "总预算"
+    if scope == "category":
+        return f"类别[{key}]"
+    return f"优先级[{key}]"
+
+
+def _budget_key(scope, key):
+    """预算对象映射到数据中的规范值（如 Housing -> 住房），无法识别时抛出 ValueError"""
+    if scope == "total":
+        return None
+    normalize = normalize_category if scope == "category" else normalize_priority
+    value = normalize(key) if key else None
+    if value is None:
+        raise ValueError(f"未知的{budget_label(scope, key)}")
+    return value
+
+
+def _contributions(desire):
+    """需求对各预算范围的贡献键"""
+    return (("total", None), ("category", desire['category']), ("priority", desire['priority']))
+
+
+class BudgetMonitor:
+    """
+    预算监控引擎
+
+    按范围维护启用需求的月度花销累计值（报告币种）。需求变化时只调整受影响的累计值，
+    并只重新评估这些范围上的预算，状态跨越阈值时产生事件。
+    预算金额连同设置时的币种保存，比较时换算为报告币种。
+
+    budgets 为 {(范围, 键): 金额 或 (金额, 币种)}，只给金额时为报告币种。
+    """
+
+    def __init__(self, budgets=None, converter=None):
+        self.converter = converter or CurrencyConverter()
+        self.limits = {}
+        self.totals = {}
+        self.levels = {}
+        self._listeners = []
+        for (scope, key), limit in (budgets or {}).items():
+            amount, currency = limit if isinstance(limit, tuple) else (limit, None)
+            self.set_budget(scope, key, amount, currency)
+
+    def subscribe(self, listener):
+        """注册事件回调，回调参数为事件列表"""
+        self._listeners.append(listener)
+
+    def _emit(self, events):
+        if events:
+            for listener in self._listeners:
+                listener(events)
+        return events
+
+    def limit(self, budget_key):
+        """预算金额（报告币种），未设置或缺少汇率时为 None"""
+        if budget_key not in self.limits:
+            return None
+        amount, currency = self.limits[budget_key]
+        return self.converter.convert(amount, currency)
+
+    def _evaluate(self, budget_key):
+        limit = self.limit(budget_key)
+        if limit is None:
+            return None
+        used = self.totals.get(budget_key, 0.0)
+        level = budget_level(used, limit)
+        previous = self.levels.get(budget_key, "under")
+        self.levels[budget_key] = level
+        if level == previous:
+            return None
+        scope, key = budget_key
+        return {
+            'scope': scope,
+            'key': key,
+            'previous': previous,
+            'level': level,
+            'used': used,
+            'limit': limit,
+            'currency': self.converter.reporting,
+        }
+
+    def set_budget(self, scope, key, limit, currency=None):
+        """设置预算（limit <= 0 表示移除，currency 默认为报告币种），返回产生的事件"""
+        if scope not in SCOPES:
+            raise ValueError(f"未知的预算范围: {scope}")
+        budget_key = (scope, None if scope == "total" else key)
+        if limit is None or limit <= 0:
+            self.limits.pop(budget_key, None)
+            self.levels.pop(budget_key, None)
+            return []
+        self.limits[budget_key] = (float(limit), currency or self.converter.reporting)
+        event = self._evaluate(budget_key)
+        return self._emit([event] if event else [])
+
+    def reset(self, desires, columns=None):
+        """全量重建累计值（仅在加载数据或切换币种时使用）"""
+        columns = columns or DesireColumns.from_desires(desires)
+        amounts = np.where(columns.enabled, self.converter.monthly_amounts(columns), 0.0)
+        self.totals = {("total", None): float(amounts.sum())}
+        for scope, codes, labels in (("category", columns.category, columns.categories),
+                                     ("priority", columns.priority, columns.priorities)):
+            sums = np.bincount(codes, weights=amounts, minlength=len(labels))
+            for code, label in enumerate(labels):
+                self.totals[(scope, label)] = float(sums[code])
+        events = [self._evaluate(budget_key) for budget_key in self.limits]
+        return self._emit([event for event in events if event])
+
+    def apply(self, changes):
+        """
+        增量应用需求变化
+
+        changes 为 (旧需求, 新需求) 序列，新增时旧需求为 None，删除时新需求为 None。
+        """
+        touched = set()
+        for old, new in changes:
+            for desire, sign in ((old, -1), (new, 1)):
+                if desire is None or not desire['enabled']:
+                    continue
+                cost = self.converter.monthly_cost(desire) * sign
+                for budget_key in _contributions(desire):
+                    self.totals[budget_key] = self.totals.get(budget_key, 0.0) + cost
+                    touched.add(budget_key)
+
+        events = [self._evaluate(budget_key) for budget_key in touched if budget_key in self.limits]
+        return self._emit([event for event in events if event])
+
+    def status(self, scope, key=None):
+        """单个预算的当前状态"""
+        budget_key = (scope, None if scope == "total" else key)
+        limit = self.limit(budget_key)
+        if limit is None:
+            return None
+        used = self.totals.get(budget_key, 0.0)
+        amount, currency = self.limits[budget_key]
+        return {
+            'scope': scope,
+            'key': budget_key[1],
+            'limit': limit,
+            'budget': amount,
+            'budget_currency': currency,
+            'used': used,
+            'percentage': used / limit * 100,
+            'level': self.levels.get(budget_key, "under"),
+            'currency': self.converter.reporting,
+        }
+
+    def statuses(self):
+        """所有预算的当前状态（缺少汇率无法换算的预算不列出）"""
+        statuses = (self.status(scope, key) for scope, key in self.limits)
+        return [status for status in statuses if status is not None]
+
+    def to_config(self):
+        """导出为可保存的配置（每个预算为 {"amount": 金额, "currency": 币种}）"""
+        config = {"total": None, "category": {}, "priority": {}}
+        for (scope, key), (amount, currency) in self.limits.items():
+            limit = {"amount": amount, "currency": currency}
+            if scope == "total":
+                config["total"] = limit
+            else:
+                config[scope][key] = limit
+        return config
+
+    @staticmethod
+    def parse_config(config):
+        """解析配置为 {(范围, 键): (金额, 币种)}（旧版本保存的纯数字按默认币种）"""
+        def parse(limit):
+            if isinstance(limit, dict):
+                if "amount" not in limit:
+                    raise ValueError(f"预算缺少金额: {limit}")
+                return float(limit["amount"]), str(limit.get("currency") or DEFAULT_CURRENCY)
+            return float(limit), DEFAULT_CURRENCY
+
+        budgets = {}
+        if config.get("total"):
+            budgets[("total", None)] = parse(config["total"])
+        for scope in ("category", "priority"):
+            for key, limit in (config.get(scope) or {}).items():
+                budgets[(scope, _budget_key(scope, key))] = parse(limit)
+        return budgets
+
+
+def load_budgets(path):
+    """读取预算配置文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return BudgetMonitor.parse_config(json.load(f))
+
+
+def save_budgets(path, monitor):
+    """保存预算配置文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(monitor.to_config(), f, ensure_ascii=False, indent=2)
+
+
+def format_event(event):
+    """事件的可读描述"""
+    symbol = currency_symbol(event['currency'])
+    return (f"{budget_label(event['scope'], event['key'])}: "
+            f"{LEVEL_NAMES[event['previous']]} → {LEVEL_NAMES[event['level']]} "
+            f"({symbol}{event['used']:.2f} / {symbol}{event['limit']:.2f})")
+
+
+def _parse_budget_arg(text):
+    """解析 --set 参数，如 total=5000、category:住房=3000、priority:高=2000"""
+    target, _, amount = text.partition("=")
+    scope, _, key = target.partition(":")
+    if scope not in SCOPES or not amount:
+        raise argparse.ArgumentTypeError(f"无效的预算: {text}")
+    # 类别与优先级预算必须指定对象，总预算不能指定
+    if (scope == "total") == bool(key):
+        raise argparse.ArgumentTypeError(
+            f"总预算不能指定对象: {text}" if key else f"{scope} 预算需要指定对象，如 {scope}:<名称>=金额: {text}")
+    try:
+        return scope, _budget_key(scope, key), float(amount)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"无效的预算: {text}（{e}）")
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("--budgets", help="预算配置文件（默认为 <文件>.budgets.json）")
+    parser.add_argument("--set", dest="overrides", action="append", default=[],
+                        type=_parse_budget_arg, metavar="SCOPE[:KEY]=AMOUNT",
+                        help="临时设置预算（金额为报告币种），如 category:住房=3000")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_check(args, out=sys.stdout):
+    """无界面预算检查，存在超支时返回 1"""
+    try:
+        budgets = load_budgets(args.budgets or budgets_path(args.file))
+    except FileNotFoundError:
+        if args.budgets:
+            raise
+        budgets = {}
+
+    monitor = BudgetMonitor(budgets, CurrencyConverter(RateTable.load(), args.currency))
+    for scope, key, limit in args.overrides:
+        monitor.set_budget(scope, key, limit)
+
+    def print_events(events):
+        for event in events:
+            print(format_event(event), file=out)
+
+    monitor.subscribe(print_events)
+    monitor.reset(load_desire_file(args.file))
+
+    for status in monitor.statuses():
+        symbol = currency_symbol(status['currency'])
+        print(f"{budget_label(status['scope'], status['key'])}: "
+              f"{symbol}{status['used']:.2f} / {symbol}{status['limit']:.2f} "
+              f"({status['percentage']:.0f}%, {LEVEL_NAMES[status['level']]})", file=out)
+    return 1 if any(status['level'] == "over" for status in monitor.statuses()) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器预算检查")
+    add_arguments(parser)
+    sys.exit(run_check(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 列式数据
+Columnar view of the desires used by the vectorized calculations
+"""
+
+import numpy as np
+
+from desire_core import CATEGORIES, DEFAULT_CURRENCY, FREQUENCIES, PRIORITIES
+from frequencies import factor_table
+
+
+def _encode(values, vocabulary):
+    """将文本列编码为整数，词汇表外的值追加到末尾"""
+    labels = list(vocabulary)
+    index = {label: code for code, label in enumerate(labels)}
+    codes = np.empty(len(values), dtype=np.int32)
+    for row, value in enumerate(values):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(labels)
+            labels.append(value)
+        codes[row] = code
+    return codes, labels
+
+
+def _code(value, labels):
+    """单个值的编码，词汇表外的值追加到末尾"""
+    try:
+        return labels.index(value)
+    except ValueError:
+        labels.append(value)
+        return len(labels) - 1
+
+
+def _field_value(desire, field):
+    """编码列对应的字段值（缺少币种时为基准币种）"""
+    if field == 'currency':
+        return desire.get('currency', DEFAULT_CURRENCY)
+    return desire[field]
+
+
+# 编码列 -> 对应的词汇表属性
+CODED_FIELDS = {
+    'frequency': 'frequencies',
+    'category': 'categories',
+    'priority': 'priorities',
+    'currency': 'currencies',
+}
+
+
+class DesireColumns:
+    """
+    需求数据的列式表示
+
+    从需求字典构建一次后，所有汇总都在这些数组上完成。
+    version 用于标识数据版本，便于上层按版本缓存计算结果。
+    """
+
+    def __init__(self, ids, cost, enabled, frequency, frequencies, category, categories,
+                 priority, priorities, currency, currencies, version=None):
+        self.ids = ids
+        self.cost = cost
+        self.enabled = enabled
+        self.frequency = frequency
+        self.frequencies = frequencies
+        self.category = category
+        self.categories = categories
+        self.priority = priority
+        self.priorities = priorities
+        self.currency = currency
+        self.currencies = currencies
+        self.version = version
+        self._rows = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_desires(cls, desires, version=None):
+        """从需求字典构建列"""
+        ids = list(desires)
+        records = list(desires.values())
+        count = len(records)
+
+        cost = np.fromiter((desire['cost'] for desire in records), dtype=np.float64, count=count)
+        enabled = np.fromiter((bool(desire['enabled']) for desire in records), dtype=bool, count=count)
+        frequency, frequencies = _encode([desire['frequency'] for desire in records], FREQUENCIES)
+        category, categories = _encode([desire['category'] for desire in records], CATEGORIES)
+        priority, priorities = _encode([desire['priority'] for desire in records], PRIORITIES)
+        currency, currencies = _encode(
+            [desire.get('currency', DEFAULT_CURRENCY) for desire in records], [DEFAULT_CURRENCY]
+        )
+        return cls(ids, cost, enabled, frequency, frequencies, category, categories,
+                   priority, priorities, currency, currencies, version)
+
+    def row_index(self):
+        """需求ID -> 行号（按需构建并缓存）"""
+        if self._rows is None:
+            self._rows = {desire_id: row for row, desire_id in enumerate(self.ids)}
+        return self._rows
+
+    def apply_changes(self, changes, version=None):
+        """
+        应用增量变化 [(需求ID, 旧需求, 新需求)]，返回新的列（当前对象不变）
+
+        只读取变化的需求：修改的行原位更新，新增的追加到末尾，删除的行被移除。
+        行顺序因此可能与需求字典不同，需要逐行对应时请按 ids 对齐。
+        """
+        rows = self.row_index()
+        cost = self.cost.copy()
+        enabled = self.enabled.copy()
+        coded = {
+            field: (getattr(self, field).copy(), list(getattr(self, labels)))
+            for field, labels in CODED_FIELDS.items()
+        }
+        removed = []
+        added = []
+        for desire_id, _, desire in changes:
+            row = rows.get(desire_id)
+            if row is None:
+                if desire is not None:
+                    added.append((desire_id, desire))
+            elif desire is None:
+                removed.append(row)
+            else:
+                cost[row] = desire['cost']
+                enabled[row] = bool(desire['enabled'])
+                for field, (codes, labels) in coded.items():
+                    codes[row] = _code(_field_value(desire, field), labels)
+
+        ids = self.ids
+        if removed:
+            keep = np.ones(len(ids), dtype=bool)
+            keep[removed] = False
+            ids = [desire_id for desire_id, kept in zip(ids, keep.tolist()) if kept]
+            cost = cost[keep]
+            enabled = enabled[keep]
+            for field, (codes, labels) in coded.items():
+                coded[field] = (codes[keep], labels)
+        if added:
+            ids = ids + [desire_id for desire_id, _ in added]
+            records = [desire for _, desire in added]
+            cost = np.concatenate([cost, [desire['cost'] for desire in records]])
+            enabled = np.concatenate([enabled, [bool(desire['enabled']) for desire in records]])
+            for field, (codes, labels) in coded.items():
+                extra = [_code(_field_value(desire, field), labels) for desire in records]
+                coded[field] = (np.concatenate([codes, np.array(extra, dtype=np.int32)]), labels)
+
+        columns = DesireColumns(
+            ids, cost, enabled, *coded['frequency'], *coded['category'], *coded['priority'],
+            *coded['currency'], version
+        )
+        if not removed:
+            # 没有删除时已有行号不变，沿用已有索引（索引只读，可以共享）
+            if added:
+                rows = dict(rows)
+                rows.update((desire_id, row) for row, (desire_id, _) in enumerate(added, len(self.ids)))
+            columns._rows = rows
+        return columns
+
+    def select(self, rows):
+        """只包含指定行（行号数组）的列，不带版本"""
+        ids = [self.ids[row] for row in rows.tolist()]
+        return DesireColumns(
+            ids, self.cost[rows], self.enabled[rows], self.frequency[rows], self.frequencies,
+            self.category[rows], self.categories, self.priority[rows], self.priorities,
+            self.currency[rows], self.currencies
+        )
+
+    def frequency_factors(self):
+        """各频率编码对应的月度系数（未知频率抛出 ValueError）"""
+        return factor_table(self.frequencies)
+
+    def monthly_costs(self):
+        """每个需求的月度花销（原币种）"""
+        return self.cost * self.frequency_factors()[self.frequency]
+
+    def aggregate(self, amounts):
+        """
+        按启用状态汇总月度金额
+
+        返回与 desire_core.calculate_statistics 相同结构的统计结果。
+        """
+        enabled = self.enabled
+        weights = np.where(enabled, amounts, 0.0)
+        monthly_total = float(weights.sum())
+
+        category_sums = np.bincount(self.category, weights=weights, minlength=len(self.categories))
+        category_counts = np.bincount(self.category[enabled], minlength=len(self.categories))
+        priority_counts = np.bincount(self.priority[enabled], minlength=len(self.priorities))
+
+        return {
+            'monthly_total': monthly_total,
+            'yearly_total': monthly_total * 12,
+            'category_totals': {
+                label: float(category_sums[code])
+                for code, label in enumerate(self.categories) if category_counts[code]
+            },
+            'priority_counts': {
+                label: int(priority_counts[code]) for code, label in enumerate(PRIORITIES)
+            },
+            'count': len(self),
+            'enabled_count': int(enabled.sum()),
+        }
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 多币种换算
+Multi-currency conversion with an offline, versioned rate table
+"""
+
+import json
+import os
+
+import numpy as np
+
+from columns import DesireColumns
+from desire_core import DEFAULT_CURRENCY
+from frequencies import frequency_factor
+
+# 随程序提供的离线汇率表
+RATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rates.json")
+
+CURRENCY_SYMBOLS = {
+    "CNY": "¥",
+    "USD": "$",
+    "EUR": "€",
+    "GBP": "£",
+    "JPY": "JP¥",
+    "HKD": "HK$",
+}
+
+
+def currency_symbol(code):
+    """币种的显示符号"""
+    return CURRENCY_SYMBOLS.get(code, f"{code} ")
+
+
+class RateTable:
+    """汇率表：1 单位币种 = rate 单位基准币种，version 随汇率更新递增"""
+
+    def __init__(self, rates, base=DEFAULT_CURRENCY, version=0, updated=None):
+        self.rates = {code.upper(): float(rate) for code, rate in rates.items()}
+        self.rates.setdefault(base, 1.0)
+        self.base = base
+        self.version = version
+        self.updated = updated
+
+    @classmethod
+    def load(cls, path=RATES_PATH):
+        """读取汇率表文件，文件不存在时只支持基准币种"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            return cls({})
+        return cls(config.get('rates', {}), config.get('base', DEFAULT_CURRENCY),
+                   config.get('version', 0), config.get('updated'))
+
+    def save(self, path=RATES_PATH):
+        """保存汇率表文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'base': self.base, 'updated': self.updated,
+                       'rates': self.rates}, f, ensure_ascii=False, indent=2)
+
+    @property
+    def currencies(self):
+        return sorted(self.rates)
+
+    def factor(self, source, target):
+        """source 到 target 的换算系数，缺少汇率时返回 None"""
+        if source == target:
+            return 1.0
+        if source not in self.rates or target not in self.rates:
+            return None
+        return self.rates[source] / self.rates[target]
+
+
+class CurrencyConverter:
+    """
+    将需求花销换算为报告币种
+
+    批量换算按币种分组：每个币种只查一次汇率，再用一次数组索引完成所有行的换算。
+    结果按 (列对象, 数据版本, 汇率版本, 报告币种) 缓存。
+    """
+
+    def __init__(self, rates=None, reporting=DEFAULT_CURRENCY):
+        self.rates = rates if rates is not None else RateTable({})
+        self.reporting = reporting
+        self._cache_key = None
+        self._cache = None
+
+    def set_rates(self, rates):
+        self.rates = rates
+        self._cache_key = None
+
+    def set_reporting(self, reporting):
+        self.reporting = reporting
+        self._cache_key = None
+
+    def currency_factors(self, currencies):
+        """各币种到报告币种的系数数组，以及缺少汇率的币种"""
+        factors = np.zeros(len(currencies), dtype=np.float64)
+        missing = []
+        for code, currency in enumerate(currencies):
+            factor = self.rates.factor(currency, self.reporting)
+            if factor is None:
+                missing.append(currency)
+            else:
+                factors[code] = factor
+        return factors, missing
+
+    def convert(self, amount, currency):
+        """金额从 currency 换算为报告币种，缺少汇率时返回 None"""
+        factor = self.rates.factor(currency, self.reporting)
+        return None if factor is None else amount * factor
+
+    def monthly_cost(self, desire):
+        """单个需求的月度花销（报告币种），缺少汇率时按0计"""
+        factor = self.rates.factor(desire.get('currency', DEFAULT_CURRENCY), self.reporting)
+        return desire['cost'] * frequency_factor(desire['frequency']) * (factor or 0)
+
+    def _compute(self, columns):
+        key = (columns.version, self.rates.version, self.reporting)
+        if columns.version is not None and key == self._cache_key and self._cache[0] is columns:
+            return self._cache
+
+        factors, missing = self.currency_factors(columns.currencies)
+        amounts = columns.monthly_costs() * factors[columns.currency]
+        stats = columns.aggregate(amounts)
+        stats['currency'] = self.reporting
+        stats['rates_version'] = self.rates.version
+        stats['missing_rates'] = missing
+        result = (columns, amounts, stats)
+
+        if columns.version is not None:
+            self._cache_key, self._cache = key, result
+        return result
+
+    def monthly_amounts(self, columns):
+        """每个需求的月度花销（报告币种）"""
+        return self._compute(columns)[1]
+
+    def statistics(self, columns):
+        """报告币种下的统计结果"""
+        return self._compute(columns)[2]
+
+    def change_statistics(self, changes):
+        """
+        增量变化 [(需求ID, 旧需求, 新需求)] 对统计的影响（报告币种）
+
+        只为变化前后的需求各构建一次列，与全部数据的规模无关。
+        返回月度总额、各类别金额、启用数与需求数的变化量。
+        """
+        before = DesireColumns.from_desires({desire_id: old for desire_id, old, _ in changes if old is not None})
+        after = DesireColumns.from_desires({desire_id: new for desire_id, _, new in changes if new is not None})
+        old_stats, new_stats = self.statistics(before), self.statistics(after)
+
+        by_category = dict(new_stats['category_totals'])
+        for category, value in old_stats['category_totals'].items():
+            by_category[category] = by_category.get(category, 0) - value
+        return {
+            'monthly_delta': new_stats['monthly_total'] - old_stats['monthly_total'],
+            'category_deltas': by_category,
+            'enabled_delta': new_stats['enabled_count'] - old_stats['enabled_count'],
+            'count_delta': new_stats['count'] - old_stats['count'],
+        }
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 核心词汇表与计算
+Desire Calculator core vocabularies and calculations
+"""
+
+import json
+
+from filecodec import read_desire_text
+from frequencies import (
+    FREQUENCIES, FREQUENCY_LABELS, frequency_factor, parse_frequency,
+)
+
+# 存储使用的规范值（与 desires.json 及统计逻辑一致）；频率见 frequencies.py
+PRIORITIES = ["低", "中", "高", "必需"]
+CATEGORIES = ["住房", "交通", "餐饮", "娱乐", "购物", "健康", "教育", "投资", "其他"]
+
+DEFAULT_PRIORITY = "中"
+DEFAULT_CATEGORY = "其他"
+
+# 未标注币种的需求按人民币计算
+DEFAULT_CURRENCY = "CNY"
+
+# 界面英文标签 -> 规范值
+PRIORITY_LABELS = {
+    "Low": "低",
+    "Medium": "中",
+    "High": "高",
+    "Essential": "必需",
+}
+CATEGORY_LABELS = {
+    "Housing": "住房",
+    "Transport": "交通",
+    "Food": "餐饮",
+    "Entertainment": "娱乐",
+    "Shopping": "购物",
+    "Health": "健康",
+    "Education": "教育",
+    "Investment": "投资",
+    "Other": "其他",
+}
+
+
+def _build_aliases(values, labels, extra):
+    """构建 别名 -> 规范值 查找表（键统一小写）"""
+    aliases = {}
+    for value in values:
+        aliases[value] = value
+    for label, value in labels.items():
+        aliases[label.lower()] = value
+    for alias, value in extra.items():
+        aliases[alias.lower()] = value
+    return aliases
+
+
+_PRIORITY_ALIASES = _build_aliases(PRIORITIES, PRIORITY_LABELS, {
+    "低优先级": "低", "中等": "中", "普通": "中", "normal": "中",
+    "高优先级": "高", "必须": "必需", "必要": "必需",
+})
+_CATEGORY_ALIASES = _build_aliases(CATEGORIES, CATEGORY_LABELS, {
+    "房租": "住房", "居住": "住房", "rent": "住房",
+    "出行": "交通", "travel": "交通",
+    "吃饭": "餐饮", "饮食": "餐饮", "dining": "餐饮",
+    "休闲": "娱乐", "fun": "娱乐",
+    "医疗": "健康", "medical": "健康",
+    "学习": "教育",
+    "理财": "投资",
+    "其它": "其他", "misc": "其他",
+})
+
+
+def _normalize(text, aliases):
+    if text is None:
+        return None
+    text = str(text).strip()
+    if not text:
+        return None
+    return aliases.get(text) or aliases.get(text.lower())
+
+
+def normalize_frequency(text):
+    """将频率文本映射到规范值（支持任意间隔，如"每3周"），无法识别时返回 None"""
+    return parse_frequency(text)
+
+
+def normalize_priority(text):
+    """将优先级文本映射到规范值，无法识别时返回 None"""
+    return _normalize(text, _PRIORITY_ALIASES)
+
+
+def normalize_category(text):
+    """将类别文本映射到规范值，无法识别时返回 None"""
+    return _normalize(text, _CATEGORY_ALIASES)
+
+
+def monthly_cost(desire):
+    """计算单个需求的月度花销（原币种）"""
+    return desire['cost'] * frequency_factor(desire['frequency'])
+
+
+def calculate_statistics(desires):
+    """计算月度/年度总花销、类别统计与优先级分布（仅统计启用的需求）"""
+    monthly_total = 0
+    category_totals = {}
+    priority_counts = {priority: 0 for priority in PRIORITIES}
+    enabled_count = 0
+
+    for desire in desires.values():
+        if not desire['enabled']:
+            continue
+        enabled_count += 1
+
+        cost = monthly_cost(desire)
+        monthly_total += cost
+
+        category = desire['category']
+        category_totals[category] = category_totals.get(category, 0) + cost
+
+        priority = desire['priority']
+        if priority in priority_counts:
+            priority_counts[priority] += 1
+
+    return {
+        'monthly_total': monthly_total,
+        'yearly_total': monthly_total * 12,
+        'category_totals': category_totals,
+        'priority_counts': priority_counts,
+        'count': len(desires),
+        'enabled_count': enabled_count,
+    }
+
+
+# 预算使用率达到该比例时进入警告状态
+BUDGET_WARNING_RATIO = 0.8
+
+
+def budget_level(used, limit):
+    """预算状态：under(<=80%) / warning(<=100%) / over(>100%)"""
+    if used <= limit * BUDGET_WARNING_RATIO:
+        return "under"
+    elif used <= limit:
+        return "warning"
+    return "over"
+
+
+def budget_status(monthly_total, budget_goal):
+    """计算预算使用情况"""
+    if budget_goal <= 0:
+        return None
+    return {
+        'goal': budget_goal,
+        'used': monthly_total,
+        'remaining': budget_goal - monthly_total,
+        'percentage': monthly_total / budget_goal * 100,
+        'level': budget_level(monthly_total, budget_goal),
+    }
+
+
+def iter_filtered(desires, category=None, priority=None, enabled=None):
+    """按类别/优先级/启用状态筛选，None 表示不限"""
+    for desire_id, desire in desires.items():
+        if category is not None and desire['category'] != category:
+            continue
+        if priority is not None and desire['priority'] != priority:
+            continue
+        if enabled is not None and desire['enabled'] != enabled:
+            continue
+        yield desire_id, desire
+
+
+def repair_desires(data):
+    """
+    校验数据并修复可以安全修复的问题（原地修改并返回）
+
+    缺失的字段补为默认值，频率、类别与优先级的别名（如旧版本保存的 "Monthly"）转换为规范值；
+    无法修复的问题（如无法识别的频率、无效的花销）抛出 validation.ValidationError（ValueError 的子类），
+    不再按月度花销0计入。详见 validation.validate_desires。
+    """
+    # validation 依赖本模块的词汇表，调用时才导入
+    from validation import check_report, validate_desires
+    desires, report = validate_desires(data)
+    check_report(report)
+    return desires
+
+
+def load_desire_file(path):
+    """读取需求JSON文件（可为压缩文件）并补齐字段"""
+    return repair_desires(json.loads(read_desire_text(path)))
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def _skip_whitespace(text, index):
+    while index < len(text) and text[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+def iter_json_items(text):
+    """
+    逐条解析顶层JSON对象，产出 (键, 值)
+
+    每次只解码一个条目，后台线程解析大文件时可以让出GIL，避免界面卡顿。
+    """
+    index = _skip_whitespace(text, 0)
+    if index >= len(text) or text[index] != "{":
+        raise ValueError("需求文件必须是JSON对象")
+    index = _skip_whitespace(text, index + 1)
+    if index < len(text) and text[index] == "}":
+        return
+
+    while True:
+        key, index = _DECODER.raw_decode(text, index)
+        if not isinstance(key, str):
+            raise ValueError(f"无效的键: {key!r}")
+        index = _skip_whitespace(text, index)
+        if index >= len(text) or text[index] != ":":
+            raise ValueError(f"第{index}个字符处缺少':'")
+        index = _skip_whitespace(text, index + 1)
+        value, index = _DECODER.raw_decode(text, index)
+        yield key, value
+
+        index = _skip_whitespace(text, index)
+        if index < len(text) and text[index] == ",":
+            index = _skip_whitespace(text, index + 1)
+            continue
+        if index < len(text) and text[index] == "}":
+            return
+        raise ValueError(f"第{index}个字符处JSON格式错误")
+
+
+def parse_desire_text(text):
+    """逐条解析需求JSON文本并校验修复（同时检查ID是否重复）"""
+    from validation import check_report, validate_items
+    desires, report = validate_items(iter_json_items(text))
+    check_report(report)
+    return desires
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 重复需求检测
+Exact and near-duplicate detection with blocking and batched merge
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import unicodedata
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file
+from filecodec import write_desire_file
+
+# 名称相似度（SequenceMatcher.ratio，按规范化后的名称计算）达到该值视为近似重复
+NAME_SIMILARITY = 0.75
+
+# 花销相差在该比例以内视为近似重复
+COST_TOLERANCE = 0.25
+
+# 排序邻域：每条需求只与排序后其后的这么多条需求比较
+WINDOW = 8
+
+
+# 名称中忽略的字符：空白、标点与符号
+_IGNORED = re.compile(r"[\W_]+")
+
+# 名称中的数字
+_DIGITS = re.compile(r"\d+")
+
+
+def record_hash(desire):
+    """
+    需求记录的内容哈希（与字段顺序无关）
+
+    只用于把可能相同的记录分到一起：哈希相同不代表记录相同（哈希可能碰撞，
+    True、1 与 1.0 的哈希也相同），判断是否相同需逐条比较记录。
+    """
+    try:
+        return hash(frozenset(desire.items()))
+    except TypeError:
+        # 字段值不可哈希（列表等）时按规范化JSON计算
+        return hash(json.dumps(desire, sort_keys=True, ensure_ascii=False))
+
+
+def record_hashes(desires):
+    """每个需求的内容哈希"""
+    try:
+        return dict(zip(desires, map(hash, map(frozenset, map(dict.items, desires.values())))))
+    except TypeError:
+        return {desire_id: record_hash(desire) for desire_id, desire in desires.items()}
+
+
+def normalize_name(name):
+    """规范化名称：全角转半角、忽略大小写，去掉空白、标点与符号"""
+    return _IGNORED.sub("", unicodedata.normalize("NFKC", str(name)).casefold())
+
+
+def _block_key(desire, name):
+    """
+    分块键：只在类别、频率、币种与名称中的数字都相同的需求之间比较
+
+    名称中的数字不同（如"第1期"与"第2期"）时不是重复。
+    """
+    digits = " ".join(_DIGITS.findall(name))
+    return desire['category'], desire['frequency'], desire.get('currency', DEFAULT_CURRENCY), digits
+
+
+def _signature(name):
+    """名称的字符多重集（第 n 次出现的字符记为 (字符, n)），两个签名交集的大小即共同字符数"""
+    seen = {}
+    items = []
+    for char in name:
+        count = seen.get(char, 0)
+        seen[char] = count + 1
+        items.append((char, count))
+    return frozenset(items)
+
+
+def _similar(name, signature, other, other_signature, threshold):
+    """规范化名称的相似度是否达到阈值（signature 为名称的字符多重集）"""
+    if name == other:
+        return True
+    total = len(name) + len(other)
+    # 长度与共同字符数给出相似度的上界，达不到阈值时不必逐字比较
+    if 2 * min(len(name), len(other)) < threshold * total:
+        return False
+    if 2 * len(signature & other_signature) < threshold * total:
+        return False
+    return SequenceMatcher(None, name, other, autojunk=False).ratio() >= threshold
+
+
+class _Groups:
+    """并查集：把两两配对合并为分组"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = item
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent.get(item, item)
+        return root
+
+    def union(self, first, second):
+        self.parent.setdefault(first, first)
+        self.parent.setdefault(second, second)
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[second] = first
+
+
+def exact_pairs(desires):
+    """内容完全相同（忽略ID）的需求，按内容哈希分组后逐条确认"""
+    buckets = {}
+    for desire_id, digest in record_hashes(desires).items():
+        buckets.setdefault(digest, []).append(desire_id)
+    pairs = []
+    for ids in buckets.values():
+        if len(ids) < 2:
+            continue
+        first = desires[ids[0]]
+        pairs.extend((ids[0], other) for other in ids[1:] if desires[other] == first)
+    return pairs
+
+
+def near_pairs(desires, threshold=NAME_SIMILARITY, tolerance=COST_TOLERANCE, window=WINDOW):
+    """
+    近似重复的需求对
+
+    按 (类别, 频率, 币种, 名称中的数字) 分块，块内分别按花销与规范化名称排序，每条需求只与
+    排序后相邻的 window 条比较（排序邻域）：名称相似且花销相近时配对。比较次数与需求数成线性关系。
+    """
+    blocks = {}
+    for desire_id, desire in desires.items():
+        name = normalize_name(desire['name'])
+        blocks.setdefault(_block_key(desire, name), []).append((abs(desire['cost']), name, desire_id))
+    pairs = []
+    for rows in blocks.values():
+        if len(rows) < 2:
+            continue
+        rows = [(cost, name, desire_id, _signature(name)) for cost, name, desire_id in rows]
+        # 按花销排序时，超出花销范围后其后的需求花销更远，不必继续比较
+        rows.sort(key=lambda row: row[0])
+        for index, (cost, name, desire_id, signature) in enumerate(rows):
+            for other_cost, other, other_id, other_signature in rows[index + 1:index + 1 + window]:
+                if other_cost - cost > tolerance * other_cost:
+                    break
+                if _similar(name, signature, other, other_signature, threshold):
+                    pairs.append((desire_id, other_id))
+        rows.sort(key=lambda row: row[1])
+        for index, (cost, name, desire_id, signature) in enumerate(rows):
+            for other_cost, other, other_id, other_signature in rows[index + 1:index + 1 + window]:
+                if abs(cost - other_cost) <= tolerance * max(cost, other_cost) \
+                        and _similar(name, signature, other, other_signature, threshold):
+                    pairs.append((desire_id, other_id))
+    return pairs
+
+
+def find_duplicates(desires, converter, threshold=NAME_SIMILARITY, tolerance=COST_TOLERANCE, exact_only=False):
+    """
+    重复需求分组，按合并后月度花销的减少从大到小排列
+
+    每组保留在数据中最先出现的需求，其余为重复项；impact 为删除重复项后
+    启用需求的月度花销减少（报告币种）。kind 为 "exact"（内容完全相同）或 "near"。
+    """
+    exact = exact_pairs(desires)
+    groups = _Groups()
+    for first, second in exact:
+        groups.union(first, second)
+    exact_count = len(groups.parent) - len({groups.find(desire_id) for desire_id in groups.parent})
+    if not exact_only:
+        for first, second in near_pairs(desires, threshold, tolerance):
+            groups.union(first, second)
+
+    members = {}
+    for desire_id in groups.parent:
+        members.setdefault(groups.find(desire_id), set()).add(desire_id)
+    order = {desire_id: index for index, desire_id in enumerate(desires)} if members else {}
+    groups = [sorted(ids, key=order.__getitem__) for ids in members.values()]
+    # 所有重复项一次构建列并换算，再按组累加
+    columns = DesireColumns.from_desires({desire_id: desires[desire_id] for ids in groups for desire_id in ids[1:]})
+    amounts = np.where(columns.enabled, converter.monthly_amounts(columns), 0.0).tolist()
+    result = []
+    row = 0
+    for ids in groups:
+        keep, duplicates = ids[0], ids[1:]
+        kind = "exact" if all(desires[desire_id] == desires[keep] for desire_id in duplicates) else "near"
+        impact = sum(amounts[row:row + len(duplicates)])
+        row += len(duplicates)
+        result.append({'keep': keep, 'duplicates': duplicates, 'kind': kind, 'impact': impact})
+    result.sort(key=lambda group: (-group['impact'], order[group['keep']]))
+    return {
+        'groups': result,
+        'impact': sum(group['impact'] for group in result),
+        'duplicates': sum(len(group['duplicates']) for group in result),
+        'exact': exact_count,
+        'currency': converter.reporting,
+    }
+
+
+def merge_changes(desires, groups):
+    """合并分组：删除每组的重复项，返回变化 [(需求ID, 旧需求, None)]"""
+    return [(desire_id, desires[desire_id], None)
+            for group in groups for desire_id in group['duplicates'] if desire_id in desires]
+
+
+def format_duplicates(desires, result, limit=None):
+    """重复分组的文字描述"""
+    symbol = currency_symbol(result['currency'])
+    groups = result['groups'] if limit is None else result['groups'][:limit]
+    lines = [f"{len(result['groups'])} 组重复，{result['duplicates']} 个重复项"
+             f"（其中 {result['exact']} 个内容完全相同），合并后月度花销减少 {symbol}{result['impact']:.2f}"]
+    for group in groups:
+        kind = "完全相同" if group['kind'] == "exact" else "近似"
+        lines.append(f"[{kind}] -{symbol}{group['impact']:.2f}/月")
+        for marker, desire_id in [("保留", group['keep'])] + [("删除", key) for key in group['duplicates']]:
+            desire = desires[desire_id]
+            state = "" if desire['enabled'] else "（禁用）"
+            lines.append(f"  {marker} {desire_id} {desire['name']} {desire['frequency']} "
+                         f"{currency_symbol(desire.get('currency', DEFAULT_CURRENCY))}{desire['cost']:.2f}{state}")
+    if len(groups) < len(result['groups']):
+        lines.append(f"... 另有 {len(result['groups']) - len(groups)} 组")
+    return "\n".join(lines)
+
+
+def write_csv(desires, result, out):
+    """每个需求一行：分组序号、类型、保留/删除、需求字段与该组的月度影响"""
+    writer = csv.writer(out)
+    writer.writerow(["group", "kind", "action", "id", "name", "frequency", "cost", "currency", "impact"])
+    for number, group in enumerate(result['groups'], 1):
+        for action, desire_id in [("keep", group['keep'])] + [("remove", key) for key in group['duplicates']]:
+            desire = desires[desire_id]
+            writer.writerow([number, group['kind'], action, desire_id, desire['name'], desire['frequency'],
+                             desire['cost'], desire.get('currency', DEFAULT_CURRENCY), round(group['impact'], 2)])
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("--similarity", type=float, default=NAME_SIMILARITY,
+                        help=f"名称相似度阈值 0-1（默认 {NAME_SIMILARITY}）")
+    parser.add_argument("--tolerance", type=float, default=COST_TOLERANCE,
+                        help=f"花销相差比例（默认 {COST_TOLERANCE}）")
+    parser.add_argument("--exact", action="store_true", help="只查找内容完全相同的需求")
+    parser.add_argument("--limit", type=int, default=20, help="最多列出的分组数")
+    parser.add_argument("--csv", action="store_true", help="输出CSV")
+    parser.add_argument("-o", "--output", help="合并全部分组（删除重复项）后写入的文件")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_duplicates(args, out=sys.stdout):
+    """无界面查找重复需求，存在重复时返回 1（指定 --output 时合并后返回 0）"""
+    desires = load_desire_file(args.file)
+    converter = CurrencyConverter(RateTable.load(), args.currency)
+    result = find_duplicates(desires, converter, args.similarity, args.tolerance, args.exact)
+    if args.csv:
+        write_csv(desires, result, out)
+    else:
+        print(format_duplicates(desires, result, args.limit), file=out)
+    if args.output:
+        merged = dict(desires)
+        for desire_id, _, _ in merge_changes(desires, result['groups']):
+            del merged[desire_id]
+        write_desire_file(args.output, merged)
+        if not args.csv:
+            print(f"已删除 {len(desires) - len(merged)} 个重复项并写入 {args.output}", file=out)
+        return 0
+    return 1 if result['groups'] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器重复需求检测")
+    add_arguments(parser)
+    sys.exit(run_duplicates(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 压缩存储
+Streaming compressed save/load of desire files with magic-byte detection
+"""
+
+import gzip
+import io
+import json
+import lzma
+
+# zstandard 包的 open() 不接受 level，压缩级别通过 ZstdCompressor 传入
+_ZSTANDARD = False
+try:
+    # Python 3.14+ 标准库
+    from compression import zstd as _zstd
+except ImportError:
+    try:
+        import zstandard as _zstd
+        _ZSTANDARD = True
+    except ImportError:
+        _zstd = None
+
+# 文件开头的魔数，加载时据此识别压缩格式（与文件扩展名无关）
+MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "lzma": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# 保存时按扩展名选择压缩格式
+SUFFIXES = {
+    ".gz": "gzip",
+    ".xz": "lzma",
+    ".zst": "zstd",
+}
+
+# 压缩级别：兼顾速度与体积（lzma 默认级别比级别1慢约20倍，体积只小约15%）
+LEVELS = {
+    "gzip": 6,
+    "lzma": 1,
+    "zstd": 3,
+}
+
+FILE_FILTER = "JSON Files (*.json *.json.gz *.json.xz *.json.zst)"
+
+
+def available_codecs():
+    """可用的存储格式（None 表示不压缩）"""
+    codecs = [None, "gzip", "lzma"]
+    if _zstd is not None:
+        codecs.append("zstd")
+    return codecs
+
+
+def codec_for_path(path):
+    """按扩展名选择保存格式"""
+    for suffix, codec in SUFFIXES.items():
+        if path.lower().endswith(suffix):
+            return codec
+    return None
+
+
+def detect_codec(path):
+    """按文件开头的魔数识别压缩格式，未压缩时返回 None"""
+    with open(path, 'rb') as f:
+        head = f.read(max(len(magic) for magic in MAGIC.values()))
+    for codec, magic in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def open_binary(path, mode, codec):
+    """以流方式打开（压缩）文件，读写时边处理边压缩/解压"""
+    if codec is None:
+        return open(path, mode)
+    if codec == "gzip":
+        return gzip.open(path, mode, compresslevel=LEVELS["gzip"])
+    if codec == "lzma":
+        return lzma.open(path, mode, preset=LEVELS["lzma"] if "w" in mode else None)
+    if codec == "zstd":
+        if _zstd is None:
+            raise ValueError("读写 zstd 文件需要 Python 3.14+ 或安装 zstandard")
+        if _ZSTANDARD:
+            if "w" in mode:
+                return _zstd.open(path, mode, cctx=_zstd.ZstdCompressor(level=LEVELS["zstd"]))
+            return _zstd.open(path, mode, dctx=_zstd.ZstdDecompressor())
+        if "w" in mode:
+            return _zstd.open(path, mode, level=LEVELS["zstd"])
+        return _zstd.open(path, mode)
+    raise ValueError(f"未知的压缩格式: {codec}")
+
+
+def write_desire_file(path, desires, codec=None):
+    """
+    流式写入需求数据
+
+    json.dump 分块写入压缩流，不在内存中生成完整的JSON文本或压缩结果。
+    codec 为 None 时按扩展名选择格式。
+    """
+    codec = codec or codec_for_path(path)
+    with open_binary(path, 'wb', codec) as raw:
+        with io.TextIOWrapper(raw, encoding='utf-8') as f:
+            json.dump(desires, f, ensure_ascii=False, indent=2)
+
+
+def read_desire_text(path):
+    """读取需求文件文本，压缩文件按魔数识别并流式解压"""
+    with open_binary(path, 'rb', detect_codec(path)) as raw:
+        with io.TextIOWrapper(raw, encoding='utf-8') as f:
+            return f.read()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 筛选结果缓存
+LRU cache of filtered id lists and their statistics keyed by filter and data version
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+# 默认缓存的筛选组合数
+FILTER_CACHE_SIZE = 32
+
+
+def matches(desire, category=None, priority=None):
+    """需求是否符合筛选条件，None 表示不限"""
+    return ((category is None or desire['category'] == category)
+            and (priority is None or desire['priority'] == priority))
+
+
+def filter_rows(columns, category=None, priority=None):
+    """符合筛选条件的行号数组（按列的行顺序）"""
+    mask = np.ones(len(columns), dtype=bool)
+    for codes, labels, value in ((columns.category, columns.categories, category),
+                                 (columns.priority, columns.priorities, priority)):
+        if value is None:
+            continue
+        if value not in labels:
+            return np.empty(0, dtype=np.intp)
+        mask &= codes == labels.index(value)
+    return np.flatnonzero(mask)
+
+
+class FilterCache:
+    """
+    筛选结果的 LRU 缓存
+
+    以 (类别, 优先级, 数据版本) 为键，保存符合条件的需求ID列表及其统计（报告币种）。
+    汇率或报告币种变化时整体清空。advance() 在增量修改后把未受影响的结果
+    转到新版本：修改前后都不符合某个筛选条件的需求不会改变该条件的结果。
+    """
+
+    def __init__(self, size=FILTER_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._context = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, columns, converter, category=None, priority=None):
+        """筛选结果 {'ids': [...], 'stats': {...}}，命中时不重新计算"""
+        context = (converter.rates, converter.rates.version, converter.reporting)
+        if context != self._context:
+            self._context = context
+            self._entries.clear()
+
+        key = (category, priority, columns.version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        rows = filter_rows(columns, category, priority)
+        stats = converter.statistics(columns)
+        filtered = dict(columns.select(rows).aggregate(converter.monthly_amounts(columns)[rows]))
+        filtered['currency'] = stats['currency']
+        filtered['missing_rates'] = stats['missing_rates']
+        entry = {'ids': [columns.ids[row] for row in rows.tolist()], 'stats': filtered}
+        if columns.version is not None:
+            self._entries[key] = entry
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def advance(self, changes, version):
+        """
+        数据从 version - 1 增量修改为 version 后调用
+
+        修改前后都不符合筛选条件的结果保留并转到新版本，其余结果失效。
+        """
+        entries = OrderedDict()
+        for (category, priority, old_version), entry in self._entries.items():
+            if old_version != version - 1:
+                continue
+            if any(desire is not None and matches(desire, category, priority)
+                   for _, old, new in changes for desire in (old, new)):
+                continue
+            entries[(category, priority, version)] = entry
+        self._entries = entries
+
+    def clear(self):
+        self._entries.clear()
+
+    def counters(self):
+        """命中/未命中次数与当前缓存的条目数"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 现金流预测
+Vectorized multi-year cash-flow and balance forecasting
+"""
+
+import argparse
+import sys
+from datetime import date
+
+import numpy as np
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file, normalize_category
+from frequencies import frequency_interval
+from payments import add_months
+
+DEFAULT_YEARS = 10
+
+# 报告中列出的最差月份数
+WORST_MONTHS = 5
+
+# 一个月最多31天，按月付款以"每月第几天"分组
+_MAX_DAY = 31
+
+
+def _date_column(desires, ids, key):
+    """按 ids 的顺序读取日期字段为 datetime64[D] 数组，缺失或无效时为 NaT"""
+    values = [desires[desire_id].get(key) or "NaT" for desire_id in ids]
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        column = np.empty(len(values), dtype="datetime64[D]")
+        for row, value in enumerate(values):
+            try:
+                column[row] = np.datetime64(value, "D")
+            except ValueError:
+                column[row] = np.datetime64("NaT")
+        return column
+
+
+def _series_from_steps(index, weights, shape):
+    """按 (类别, 相位, 序号) 累加差分并沿序号求前缀和"""
+    diff = np.bincount(index, weights=weights, minlength=int(np.prod(shape)))
+    return np.cumsum(diff.reshape(shape), axis=-1)
+
+
+def _add_day_series(daily, category, cost, first, last, step):
+    """按天/按周付款：第 first 天起每 step 天一次，直到第 last 天"""
+    categories, days = daily.shape
+    offset = np.maximum(0, -(first // step))
+    first = first + offset * step
+    last = np.minimum(last, days - 1)
+    last = first + (last - first) // step * step
+    ok = last >= first
+    category, cost, first, last = category[ok], cost[ok], first[ok], last[ok]
+
+    periods = days // step + 2
+    base = (category * step + first % step) * periods
+    index = np.concatenate([base + first // step, base + last // step + 1])
+    series = _series_from_steps(index, np.concatenate([cost, -cost]), (categories, step, periods))
+    # (类别, 相位, 序号) → (类别, 序号 * step + 相位)
+    daily += series.transpose(0, 2, 1).reshape(categories, periods * step)[:, :days]
+
+
+def _add_month_series(daily, category, cost, first_month, anchor, last_month, last_day,
+                      step, month_offsets, month_days, start_day):
+    """
+    按月/季度/年付款
+
+    first_month 为第一次付款所在月份（相对预测起始月），anchor 为每月第几天，
+    短月份落在当月最后一天。
+    """
+    categories, days = daily.shape
+    months = len(month_days)
+
+    def day_in(month):
+        return np.minimum(anchor, month_days[np.clip(month, 0, months - 1)])
+
+    # 第一次不早于预测起始日的付款
+    begin = first_month + np.maximum(0, -(first_month // step)) * step
+    begin = np.where((begin == 0) & (day_in(begin) < start_day), begin + step, begin)
+    # 最后一次不晚于结束日的付款
+    end = first_month + (last_month - first_month) // step * step
+    end = np.where((end == last_month) & (day_in(end) > last_day), end - step, end)
+    ok = (end >= begin) & (begin < months)
+    category, cost, begin, end, anchor = category[ok], cost[ok], begin[ok], end[ok], anchor[ok]
+
+    periods = months // step + 2
+    base = ((category * _MAX_DAY + anchor - 1) * step + begin % step) * periods
+    index = np.concatenate([base + begin // step, base + end // step + 1])
+    series = _series_from_steps(index, np.concatenate([cost, -cost]),
+                                (categories, _MAX_DAY, step, periods))
+    # (类别, 日, 相位, 序号) → (类别, 月份, 日)
+    amounts = series.transpose(0, 3, 2, 1).reshape(categories, periods * step, _MAX_DAY)[:, :months]
+
+    # 每个 (月份, 日) 对应的预测日序号
+    day_of = month_offsets[:, None] + np.minimum(np.arange(1, _MAX_DAY + 1), month_days[:, None]) - 1
+    valid = (day_of >= 0) & (day_of < days)
+    index = (np.arange(categories)[:, None] * days + day_of[valid][None, :]).ravel()
+    daily += np.bincount(index, weights=amounts[:, valid].ravel(),
+                         minlength=categories * days).reshape(categories, days)
+
+
+def _month_table(start, months):
+    """各月相对起始日的第一天序号及天数"""
+    first = np.datetime64(start, "M")
+    bounds = np.arange(first, first + months + 1).astype("datetime64[D]")
+    offsets = (bounds[:-1] - np.datetime64(start, "D")).astype(np.int64)
+    return offsets, np.diff(bounds).astype(np.int64)
+
+
+def _runs(mask):
+    """布尔序列中连续为真的区间 [(开始, 结束)]，结束为 None 表示持续到最后"""
+    change = np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8))
+    starts = np.flatnonzero(change == 1)
+    ends = np.flatnonzero(change == -1)
+    return [(int(s), int(e) if e < len(mask) else None) for s, e in zip(starts, ends)]
+
+
+def forecast(desires, years=DEFAULT_YEARS, start=None, balance=0.0, income=0.0,
+             inflation=0.0, category_inflation=None, converter=None, columns=None,
+             income_day=1, worst=WORST_MONTHS):
+    """
+    逐日预测现金流与余额
+
+    启用的需求从 start_date（缺省为预测起始日）开始按频率付款，到 end_date（可选）为止；
+    花销按类别的年通胀率逐日复利增长。income 为每月 income_day 日到账的收入。
+    所有金额换算为 converter 的报告币种。
+    """
+    start = start or date.today()
+    end = add_months(start, 12 * years)
+    days = (end - start).days
+    columns = columns if columns is not None else DesireColumns.from_desires(desires)
+    converter = converter or CurrencyConverter(RateTable.load())
+
+    factors, missing = converter.currency_factors(columns.currencies)
+    cost = columns.cost * factors[columns.currency]
+    active = columns.enabled & (cost > 0)
+
+    start64 = np.datetime64(start, "D")
+    first = _date_column(desires, columns.ids, 'start_date')
+    first = np.where(np.isnat(first), start64, first)
+    last = _date_column(desires, columns.ids, 'end_date')
+    last = np.where(np.isnat(last), np.datetime64(end, "D") - 1, last)
+    first_day = (first - start64).astype(np.int64)
+    last_day = np.minimum((last - start64).astype(np.int64), days - 1)
+
+    months = 12 * years + 1
+    month_offsets, month_days = _month_table(start, months)
+    start_month = np.datetime64(start, "M").astype(np.int64)
+    first_months = first.astype("datetime64[M]")
+    first_month = first_months.astype(np.int64) - start_month
+    anchor = (first - first_months.astype("datetime64[D]")).astype(np.int64) + 1
+    last_dates = start64 + last_day
+    last_months = last_dates.astype("datetime64[M]")
+    last_month = last_months.astype(np.int64) - start_month
+    last_dom = (last_dates - last_months.astype("datetime64[D]")).astype(np.int64) + 1
+
+    daily = np.zeros((len(columns.categories), days))
+    for code, label in enumerate(columns.frequencies):
+        rows = active & (columns.frequency == code)
+        if not rows.any():
+            continue
+        interval = frequency_interval(label)
+        if interval is None:
+            raise ValueError(f"未知频率: {label!r}")
+        unit, step = interval
+        if unit == "day":
+            _add_day_series(daily, columns.category[rows], cost[rows], first_day[rows],
+                            last_day[rows], step)
+        else:
+            _add_month_series(daily, columns.category[rows], cost[rows], first_month[rows],
+                              anchor[rows], last_month[rows], last_dom[rows], step,
+                              month_offsets, month_days, start.day)
+
+    # 按类别通胀
+    rates = np.full(len(columns.categories), float(inflation))
+    for category, rate in (category_inflation or {}).items():
+        if category in columns.categories:
+            rates[columns.categories.index(category)] = rate
+    growth = (1 + rates)[:, None] ** (np.arange(days) / 365.25)[None, :]
+    by_category = daily * growth
+    outflow = by_category.sum(axis=0)
+
+    inflow = np.zeros(days)
+    if income:
+        income_at = month_offsets + np.minimum(income_day, month_days) - 1
+        income_at = income_at[(income_at >= 0) & (income_at < days)]
+        inflow[income_at] = income
+    balances = balance + np.cumsum(inflow - outflow)
+
+    # 按月汇总
+    month_starts = np.clip(month_offsets, 0, days)
+    month_starts = month_starts[month_starts < days]
+    month_outflow = np.add.reduceat(outflow, month_starts)
+    month_inflow = np.add.reduceat(inflow, month_starts)
+    month_ends = np.append(month_starts[1:], days) - 1
+    labels = (start64 + month_starts).astype("datetime64[M]").astype(str)
+    month_rows = [
+        {'month': label, 'outflow': float(out), 'income': float(inc),
+         'net': float(inc - out), 'end_balance': float(balances[last_index])}
+        for label, out, inc, last_index in zip(labels, month_outflow, month_inflow, month_ends)
+    ]
+
+    dates = start64 + np.arange(days)
+    lowest = int(np.argmin(balances)) if days else 0
+    shortfalls = [
+        {'start': dates[s].item(), 'end': None if e is None else dates[e].item()}
+        for s, e in _runs(balances < 0)
+    ]
+    return {
+        'start': start,
+        'end': end,
+        'currency': converter.reporting,
+        'missing_rates': missing,
+        'dates': dates,
+        'outflow': outflow,
+        'inflow': inflow,
+        'balance': balances,
+        'category_outflow': {
+            label: float(total) for label, total in zip(columns.categories, by_category.sum(axis=1))
+            if total
+        },
+        'total_outflow': float(outflow.sum()),
+        'total_income': float(inflow.sum()),
+        'end_balance': float(balances[-1]) if days else float(balance),
+        'min_balance': float(balances[lowest]) if days else float(balance),
+        'min_balance_date': dates[lowest].item() if days else start,
+        'shortfall_date': shortfalls[0]['start'] if shortfalls else None,
+        'shortfalls': shortfalls,
+        'months': month_rows,
+        'worst_months': sorted(month_rows, key=lambda row: row['net'])[:worst],
+    }
+
+
+def format_forecast(result):
+    """预测结果的文字摘要"""
+    symbol = currency_symbol(result['currency'])
+    lines = [
+        f"预测区间: {result['start'].isoformat()} ~ {result['end'].isoformat()} ({result['currency']})",
+        f"总支出: {symbol}{result['total_outflow']:.2f}，总收入: {symbol}{result['total_income']:.2f}",
+        f"期末余额: {symbol}{result['end_balance']:.2f}",
+        f"最低余额: {symbol}{result['min_balance']:.2f} ({result['min_balance_date'].isoformat()})",
+    ]
+    if result['shortfall_date'] is None:
+        lines.append("预测期内余额不会低于0")
+    else:
+        lines.append(f"余额首次不足: {result['shortfall_date'].isoformat()}"
+                     f"（共 {len(result['shortfalls'])} 次低于0）")
+    if result['missing_rates']:
+        lines.append(f"缺少汇率未计入: {', '.join(result['missing_rates'])}")
+    lines.append("净流出最多的月份:")
+    for row in result['worst_months']:
+        lines.append(f"  {row['month']}: 支出 {symbol}{row['outflow']:.2f}，"
+                     f"收入 {symbol}{row['income']:.2f}，净额 {symbol}{row['net']:.2f}")
+    return "\n".join(lines)
+
+
+def parse_category_rate(text):
+    """解析类别通胀率，如 住房=0.05 或 Housing=0.05，返回 (类别, 比率)"""
+    category, _, rate = text.partition("=")
+    canonical = normalize_category(category)
+    try:
+        value = float(rate)
+    except ValueError:
+        value = None
+    if canonical is None or value is None:
+        raise ValueError(f"无效的类别通胀率: {text}")
+    return canonical, value
+
+
+def _parse_inflation_arg(text):
+    try:
+        return parse_category_rate(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS, help="预测年数（默认10）")
+    parser.add_argument("--balance", type=float, default=0.0, help="起始余额")
+    parser.add_argument("--income", type=float, default=0.0, help="每月收入")
+    parser.add_argument("--inflation", type=float, default=0.0, help="年通胀率，如 0.03")
+    parser.add_argument("--category-inflation", dest="category_inflation", action="append",
+                        default=[], type=_parse_inflation_arg, metavar="CATEGORY=RATE",
+                        help="按类别的年通胀率，如 住房=0.05")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="起始日期（默认今天）")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_forecast(args, out=sys.stdout):
+    """无界面预测，余额会不足时返回 1"""
+    result = forecast(load_desire_file(args.file), args.years, args.start, args.balance,
+                      args.income, args.inflation, dict(args.category_inflation),
+                      CurrencyConverter(RateTable.load(), args.currency))
+    print(format_forecast(result), file=out)
+    return 1 if result['shortfall_date'] is not None else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器现金流预测")
+    add_arguments(parser)
+    sys.exit(run_forecast(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 频率模型
+Extensible frequency registry compiled to a monthly factor table
+"""
+
+import re
+
+import numpy as np
+
+# 间隔单位 -> 每月次数（每月按30天、4.33周计算）
+UNIT_FACTORS = {
+    "day": 30,
+    "week": 4.33,  # 52/12
+    "month": 1,
+}
+
+# 内置频率（存储使用的规范值）
+FREQUENCIES = ["每天", "每周", "每月", "每季度", "每年"]
+
+# 界面英文标签 -> 规范值
+FREQUENCY_LABELS = {
+    "Daily": "每天",
+    "Weekly": "每周",
+    "Biweekly": "每2周",
+    "Monthly": "每月",
+    "Quarterly": "每季度",
+    "Semiannually": "每6个月",
+    "Yearly": "每年",
+}
+
+# 编译后的系数表：规范值 -> 月度花销系数，注册频率时更新
+FREQUENCY_FACTORS = {}
+
+# 规范值 -> (日程单位, 步长)，日程单位为 "day" 或 "month"
+_INTERVALS = {}
+# (单位, 间隔) -> 规范值，同一间隔只对应一个规范值
+_BY_INTERVAL = {}
+# 别名（小写） -> 规范值
+_ALIASES = {}
+
+_NUMERALS = {"一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+_UNIT_WORDS = {
+    "天": "day", "日": "day", "day": "day",
+    "周": "week", "星期": "week", "week": "week",
+    "月": "month", "个月": "month", "month": "month",
+    "年": "year", "year": "year",
+}
+_PATTERNS = (
+    re.compile(r"^每?\s*(\d+|[一二两三四五六七八九十])\s*(天|日|周|星期|个月|月|年)$"),
+    re.compile(r"^every\s+(\d+|other)\s+(day|week|month|year)s?$", re.IGNORECASE),
+)
+
+
+def _interval(unit, count):
+    """把 年 换算为 12个月，返回 (单位, 间隔)"""
+    if unit == "year":
+        return "month", count * 12
+    if unit not in UNIT_FACTORS:
+        raise ValueError(f"未知的频率单位: {unit}")
+    return unit, count
+
+
+def _interval_name(unit, count):
+    """间隔对应的规范值，如 每3周、每6个月、每2年"""
+    if unit == "day":
+        return f"每{count}天"
+    if unit == "week":
+        return f"每{count}周"
+    if count % 12 == 0:
+        return f"每{count // 12}年"
+    return f"每{count}个月"
+
+
+def register_frequency(unit, count, aliases=(), name=None):
+    """
+    注册频率：每 count 个 unit（day/week/month/year）一次，aliases 为可识别的其他写法
+
+    返回规范值；规范值默认由间隔生成（如 每15天），该间隔已注册时沿用已有的规范值。
+    """
+    if not isinstance(count, int) or count < 1:
+        raise ValueError(f"频率间隔必须是正整数: {count!r}")
+    unit, count = _interval(unit, count)
+    name = _BY_INTERVAL.setdefault((unit, count), name or _interval_name(unit, count))
+    if name not in FREQUENCY_FACTORS:
+        FREQUENCY_FACTORS[name] = UNIT_FACTORS[unit] / count
+        step = count * 7 if unit == "week" else count
+        _INTERVALS[name] = ("month" if unit == "month" else "day", step)
+    for alias in (name, *aliases):
+        _ALIASES[alias.lower()] = name
+    return name
+
+
+def parse_frequency(text):
+    """
+    将频率文本映射到规范值，无法识别时返回 None
+
+    除内置频率及其别名外，支持任意间隔，如 "每3周"、"每两个月"、"every 10 days"，
+    首次出现时自动注册。
+    """
+    if text is None:
+        return None
+    text = str(text).strip()
+    if not text:
+        return None
+    name = _ALIASES.get(text) or _ALIASES.get(text.lower())
+    if name is not None:
+        return name
+
+    for pattern in _PATTERNS:
+        match = pattern.match(text)
+        if match is None:
+            continue
+        number, word = match.groups()
+        if number == "other":
+            count = 2
+        else:
+            count = int(number) if number.isdigit() else _NUMERALS[number]
+        if count < 1:
+            return None
+        return register_frequency(_UNIT_WORDS[word.lower()], count)
+    return None
+
+
+def frequency_factor(frequency):
+    """频率的月度花销系数，无法识别的频率抛出 ValueError（不按0计）"""
+    factor = FREQUENCY_FACTORS.get(frequency)
+    if factor is None:
+        name = parse_frequency(frequency)
+        if name is None:
+            raise ValueError(f"未知频率: {frequency!r}")
+        factor = FREQUENCY_FACTORS[name]
+    return factor
+
+
+def frequency_interval(frequency):
+    """频率的日程步长 (单位, 步长)，单位为 "day" 或 "month"；无法识别时返回 None"""
+    interval = _INTERVALS.get(frequency)
+    if interval is None:
+        name = parse_frequency(frequency)
+        interval = _INTERVALS.get(name)
+    return interval
+
+
+def factor_table(labels):
+    """频率标签列表 -> 月度系数数组，与编码后的频率列配合做一次向量化查找"""
+    return np.array([frequency_factor(label) for label in labels], dtype=np.float64)
+
+
+register_frequency("day", 1, ("天", "日", "每日", "day"), name="每天")
+register_frequency("week", 1, ("周", "每星期", "week"), name="每周")
+register_frequency("week", 2, ("fortnightly", "隔周", "双周"))
+register_frequency("month", 1, ("月", "每个月", "月度", "month"), name="每月")
+register_frequency("month", 3, ("季度", "每季", "quarter"), name="每季度")
+register_frequency("month", 6, ("semiannual", "每半年", "半年"))
+register_frequency("year", 1, ("年", "每年度", "年度", "year", "annual", "annually"), name="每年")
+for _label, _name in FREQUENCY_LABELS.items():
+    _ALIASES[_label.lower()] = _name
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 花销历史记录
+Append-only spending history with daily/monthly rollups
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from desire_core import CATEGORIES, DEFAULT_CATEGORY
+
+HISTORY_SUFFIX = ".history"
+
+_MAGIC = b"DCHIST1\0"
+_HEADER_LENGTH = struct.Struct("<H")
+
+# 原始记录: 时间戳, 月度总花销, 各类别月度花销
+_RAW_PREFIX = "<qd"
+# 汇总记录: 桶起始时间, 记录数, 总和, 最小值, 最大值, 最后值, 最后一次的各类别花销
+_ROLLUP_PREFIX = "<qIdddd"
+
+
+class _RecordFile:
+    """带表头的定长记录文件，第一次追加记录时才创建，不存在时视为没有记录"""
+
+    def __init__(self, path, record_format, categories):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    raise ValueError(f"不是有效的历史文件: {path}")
+                (length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+                self.categories = json.loads(f.read(length).decode('utf-8'))
+        else:
+            self.categories = list(categories)
+
+        self.header = json.dumps(self.categories, ensure_ascii=False).encode('utf-8')
+        self.offset = len(_MAGIC) + _HEADER_LENGTH.size + len(self.header)
+        self.record = struct.Struct(record_format + "f" * len(self.categories))
+
+    def __len__(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        return max(size - self.offset, 0) // self.record.size
+
+    def append(self, values):
+        with open(self.path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(_MAGIC + _HEADER_LENGTH.pack(len(self.header)) + self.header)
+            f.write(self.record.pack(*values))
+
+    def replace_last(self, values):
+        with open(self.path, 'r+b') as f:
+            f.seek(self.offset + (len(self) - 1) * self.record.size)
+            f.write(self.record.pack(*values))
+
+    def last(self):
+        count = len(self)
+        if count == 0:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset + (count - 1) * self.record.size)
+            return self.record.unpack(f.read(self.record.size))
+
+    def read_range(self, start, end):
+        """读取时间戳在 [start, end] 内的记录（二分查找定位）"""
+        count = len(self)
+        if count == 0:
+            return []
+        with open(self.path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            def timestamp(index):
+                return struct.unpack_from("<q", view, self.offset + index * self.record.size)[0]
+
+            lo = 0 if start is None else bisect_left(range(count), start, key=timestamp)
+            hi = count if end is None else bisect_right(range(count), end, key=timestamp)
+            return [
+                self.record.unpack_from(view, self.offset + index * self.record.size)
+                for index in range(lo, hi)
+            ]
+
+
+def history_path(path):
+    """数据文件对应的历史文件路径"""
+    return path + HISTORY_SUFFIX
+
+
+def _day_start(timestamp):
+    moment = datetime.fromtimestamp(timestamp)
+    return int(moment.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+
+def _month_start(timestamp):
+    moment = datetime.fromtimestamp(timestamp)
+    return int(moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+
+class HistoryStore:
+    """
+    花销历史存储
+
+    每次保存追加一条快照（与上一条相同时跳过），同时增量维护按天、按月的汇总，
+    查询时按时间二分定位，不需要读取整个文件。
+    """
+
+    RESOLUTIONS = ("raw", "daily", "monthly")
+
+    def __init__(self, path, categories=CATEGORIES):
+        self.path = path
+        self._raw = _RecordFile(path, _RAW_PREFIX, categories)
+        self.categories = self._raw.categories
+        self._rollups = {
+            "daily": (_RecordFile(path + ".daily", _ROLLUP_PREFIX, self.categories), _day_start),
+            "monthly": (_RecordFile(path + ".monthly", _ROLLUP_PREFIX, self.categories), _month_start),
+        }
+
+    def __len__(self):
+        return len(self._raw)
+
+    def _category_values(self, category_totals):
+        values = dict.fromkeys(self.categories, 0.0)
+        for category, total in category_totals.items():
+            if category not in values:
+                category = DEFAULT_CATEGORY if DEFAULT_CATEGORY in values else self.categories[-1]
+            values[category] += total
+        return [values[category] for category in self.categories]
+
+    def record(self, stats, timestamp=None):
+        """记录一次统计快照，返回是否写入了新记录"""
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        total = float(stats['monthly_total'])
+        categories = self._category_values(stats['category_totals'])
+
+        last = self._raw.last()
+        if last is not None:
+            if timestamp < last[0]:
+                raise ValueError("历史记录必须按时间顺序追加")
+            packed = struct.pack("f" * len(categories), *categories)
+            if last[1] == total and struct.pack("f" * len(categories), *last[2:]) == packed:
+                return False
+
+        self._raw.append([timestamp, total] + categories)
+        for records, bucket_of in self._rollups.values():
+            self._update_rollup(records, bucket_of(timestamp), total, categories)
+        return True
+
+    @staticmethod
+    def _update_rollup(records, bucket, total, categories):
+        last = records.last()
+        if last is not None and last[0] == bucket:
+            _, count, total_sum, low, high, _ = last[:6]
+            records.replace_last([bucket, count + 1, total_sum + total,
+                                  min(low, total), max(high, total), total] + categories)
+        else:
+            records.append([bucket, 1, total, total, total, total] + categories)
+
+    def query(self, start=None, end=None, resolution="raw"):
+        """
+        查询时间范围内的历史
+
+        resolution 为 raw 时返回每次快照；daily/monthly 返回对应的汇总，
+        包含 count/min/max/mean 以及桶内最后一次的值。
+        """
+        if resolution not in self.RESOLUTIONS:
+            raise ValueError(f"未知的精度: {resolution}")
+        start = None if start is None else int(start)
+        end = None if end is None else int(end)
+
+        points = []
+        if resolution == "raw":
+            for row in self._raw.read_range(start, end):
+                points.append({
+                    'timestamp': row[0],
+                    'monthly_total': row[1],
+                    'category_totals': dict(zip(self.categories, row[2:])),
+                })
+            return points
+
+        records, bucket_of = self._rollups[resolution]
+        # 起点所在的桶也应包含在结果中
+        bucket_start = None if start is None else bucket_of(start)
+        for row in records.read_range(bucket_start, end):
+            bucket, count, total_sum, low, high, last = row[:6]
+            points.append({
+                'timestamp': bucket,
+                'count': count,
+                'mean': total_sum / count,
+                'min': low,
+                'max': high,
+                'monthly_total': last,
+                'category_totals': dict(zip(self.categories, row[6:])),
+            })
+        return points
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 批量导入
+Bulk CSV / bank statement importer
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from desire_core import (
+    DEFAULT_CATEGORY, DEFAULT_PRIORITY,
+    normalize_category, normalize_frequency, normalize_priority,
+)
+
+# 每个工作进程一次处理的行数
+CHUNK_SIZE = 2000
+
+# 报告中最多保留的错误条数
+MAX_REPORTED_ERRORS = 50
+
+# 预置列映射：字段 -> 候选表头（按顺序匹配，忽略大小写）
+MAPPING_PRESETS = {
+    "desires": {
+        "columns": {
+            "name": ["name", "名称", "需求名称"],
+            "frequency": ["frequency", "频率"],
+            "cost": ["cost", "花销", "金额"],
+            "priority": ["priority", "优先级"],
+            "category": ["category", "类别", "分类"],
+            "enabled": ["enabled", "启用", "状态"],
+        },
+        "defaults": {},
+    },
+    "bank": {
+        "columns": {
+            "name": ["交易摘要", "摘要", "交易描述", "描述", "商户名称", "对方户名",
+                     "description", "payee", "memo"],
+            "cost": ["交易金额", "金额", "amount"],
+            "debit": ["支出金额", "借方金额", "debit"],
+            "category": ["类别", "分类", "category"],
+        },
+        "defaults": {"frequency": "每月"},
+        "debits_only": True,
+    },
+}
+
+_TRUE_TEXTS = {"1", "true", "yes", "y", "是", "启用", "开启"}
+_FALSE_TEXTS = {"0", "false", "no", "n", "否", "禁用", "关闭"}
+_CURRENCY_MARKS = ("¥", "￥", "元", "CNY", "RMB", ",", " ")
+
+
+class ColumnMapping:
+    """CSV列映射配置"""
+
+    def __init__(self, columns, defaults=None, debits_only=False,
+                 delimiter=",", encoding="utf-8-sig", absolute_cost=None):
+        """
+        debits_only 用于银行流水：只导入支出。有支出列（debit）时该列为空或为0的行是收入；
+        否则金额为负数的行是支出（按绝对值导入），正数的行是收入。收入行跳过并计数。
+        absolute_cost 为旧版本映射文件中的同义键，等同于 debits_only。
+        """
+        self.columns = {
+            field: [candidates] if isinstance(candidates, str) else list(candidates)
+            for field, candidates in columns.items()
+        }
+        self.defaults = dict(defaults or {})
+        self.debits_only = bool(debits_only or absolute_cost)
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    @classmethod
+    def preset(cls, name):
+        """根据预置名称创建映射"""
+        if name not in MAPPING_PRESETS:
+            raise ValueError(f"未知的映射预置: {name}")
+        return cls(**MAPPING_PRESETS[name])
+
+    @classmethod
+    def from_file(cls, path):
+        """从JSON文件加载自定义映射"""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(**config)
+
+    def resolve(self, header):
+        """将表头解析为 字段 -> 列下标"""
+        lookup = {title.strip().lower(): index for index, title in enumerate(header)}
+        indexes = {}
+        for field, candidates in self.columns.items():
+            for candidate in candidates:
+                index = lookup.get(candidate.strip().lower())
+                if index is not None:
+                    indexes[field] = index
+                    break
+
+        missing = [field for field in ("name", "cost")
+                   if field not in indexes and not (field == "cost" and "debit" in indexes)]
+        if missing:
+            raise ValueError(f"CSV缺少必需的列: {', '.join(missing)}")
+        if "frequency" not in indexes and "frequency" not in self.defaults:
+            raise ValueError("CSV缺少频率列，且映射未提供默认频率")
+        return indexes
+
+
+class ImportReport:
+    """导入结果汇总"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.credits = 0
+        self.invalid = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def add_errors(self, errors):
+        self.invalid += len(errors)
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def summary(self):
+        """生成可读的汇总文本"""
+        lines = [
+            f"读取行数: {self.total_rows}",
+            f"成功导入: {self.imported}",
+            f"重复跳过: {self.duplicates}",
+            f"收入跳过: {self.credits}",
+            f"无效行数: {self.invalid}",
+            f"耗时: {self.elapsed:.2f}秒",
+        ]
+        if self.errors:
+            lines.append("")
+            lines.append("部分错误:")
+            for line_no, reason in self.errors[:10]:
+                lines.append(f"  第{line_no}行: {reason}")
+        return "\n".join(lines)
+
+
+def desire_key(desire):
+    """用于去重的需求键（名称 + 频率 + 金额）"""
+    return (
+        str(desire.get('name', '')).strip().lower(),
+        desire.get('frequency'),
+        round(float(desire.get('cost', 0) or 0), 2),
+    )
+
+
+def _parse_cost(text):
+    text = str(text).strip()
+    for mark in _CURRENCY_MARKS:
+        text = text.replace(mark, "")
+    if text.startswith("(") and text.endswith(")"):
+        text = "-" + text[1:-1]
+    return float(text)
+
+
+def _parse_enabled(text):
+    text = str(text).strip().lower()
+    if text in _TRUE_TEXTS or not text:
+        return True
+    if text in _FALSE_TEXTS:
+        return False
+    raise ValueError(f"无法识别的启用状态: {text}")
+
+
+def _parse_rows(rows, indexes, defaults, debits_only, first_line):
+    """解析并验证一批CSV行（在工作进程中执行），返回 (需求列表, 错误列表, 跳过的收入行数)"""
+    parsed = []
+    errors = []
+    credits = 0
+    amount = "debit" if debits_only and "debit" in indexes else "cost"
+
+    def cell(row, field):
+        index = indexes.get(field)
+        if index is None or index >= len(row):
+            return defaults.get(field, "")
+        value = row[index].strip()
+        return value if value else defaults.get(field, "")
+
+    for offset, row in enumerate(rows):
+        line_no = first_line + offset
+        if not any(value.strip() for value in row):
+            continue
+        try:
+            name = cell(row, "name")
+            if not name:
+                raise ValueError("名称为空")
+
+            text = cell(row, amount)
+            if amount == "debit" and not text:
+                credits += 1
+                continue
+            try:
+                cost = _parse_cost(text)
+            except ValueError:
+                raise ValueError(f"无效金额: {text}")
+            if debits_only:
+                # 支出列为0、或带符号金额为正数的行都是收入
+                income = cost == 0 if amount == "debit" else cost > 0
+                if income:
+                    credits += 1
+                    continue
+                cost = abs(cost)
+            if cost <= 0:
+                raise ValueError("花销必须大于0")
+
+            frequency = normalize_frequency(cell(row, "frequency"))
+            if frequency is None:
+                raise ValueError(f"未知频率: {cell(row, 'frequency')}")
+
+            parsed.append({
+                'name': name,
+                'frequency': frequency,
+                'cost': cost,
+                'priority': normalize_priority(cell(row, "priority")) or DEFAULT_PRIORITY,
+                'category': normalize_category(cell(row, "category")) or DEFAULT_CATEGORY,
+                'enabled': _parse_enabled(cell(row, "enabled")),
+            })
+        except ValueError as e:
+            errors.append((line_no, str(e)))
+
+    return parsed, errors, credits
+
+
+def _iter_chunks(reader, size):
+    while True:
+        chunk = list(islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_stream(chunks, indexes, mapping, workers):
+    """按顺序产出每批解析结果；多于一批时交给进程池并行处理"""
+    args = (indexes, mapping.defaults, mapping.debits_only)
+    first = next(chunks, None)
+    if first is None:
+        return
+    second = next(chunks, None)
+
+    # 数据只有一批时，直接在当前进程解析，避免启动进程池的开销
+    if second is None or workers <= 1:
+        line = 2
+        for chunk in (first, second):
+            if chunk is None:
+                continue
+            yield _parse_rows(chunk, *args, line)
+            line += len(chunk)
+        for chunk in chunks:
+            yield _parse_rows(chunk, *args, line)
+            line += len(chunk)
+        return
+
+    # 界面进程是多线程的，fork 出的子进程可能继承被其他线程持有的锁，因此用 spawn 启动工作进程
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = []
+        line = 2
+
+        def submit(chunk):
+            nonlocal line
+            pending.append(pool.submit(_parse_rows, chunk, *args, line))
+            line += len(chunk)
+
+        submit(first)
+        submit(second)
+        # 限制在途批次数量，保证流式读取不会把整个文件读入内存
+        for chunk in chunks:
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+            submit(chunk)
+        for future in pending:
+            yield future.result()
+
+
+def _counting(reader, report):
+    for row in reader:
+        report.total_rows += 1
+        yield row
+
+
+def _new_ids(existing, count):
+    """生成不与现有需求冲突的ID"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    index = len(existing)
+    ids = []
+    while len(ids) < count:
+        desire_id = f"desire_{index}_{timestamp}"
+        if desire_id not in existing:
+            ids.append(desire_id)
+        index += 1
+    return ids
+
+
+def import_csv(path, existing, mapping=None, workers=None):
+    """
+    流式导入CSV文件
+
+    返回 (新需求字典, ImportReport)。新需求已去重（包括与现有需求及文件内部），
+    调用方应一次性合并并刷新界面。
+    """
+    mapping = mapping or ColumnMapping.preset("desires")
+    workers = workers or os.cpu_count() or 1
+    report = ImportReport()
+    start = time.perf_counter()
+
+    seen = {desire_key(desire) for desire in existing.values() if isinstance(desire, dict)}
+    accepted = []
+
+    with open(path, 'r', encoding=mapping.encoding, newline='') as f:
+        reader = csv.reader(f, delimiter=mapping.delimiter)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("CSV文件为空")
+        indexes = mapping.resolve(header)
+
+        counted = _counting(reader, report)
+        for parsed, errors, credits in _parse_stream(_iter_chunks(counted, CHUNK_SIZE),
+                                                     indexes, mapping, workers):
+            report.add_errors(errors)
+            report.credits += credits
+            for desire in parsed:
+                key = desire_key(desire)
+                if key in seen:
+                    report.duplicates += 1
+                    continue
+                seen.add(key)
+                accepted.append(desire)
+
+    new_desires = dict(zip(_new_ids(existing, len(accepted)), accepted))
+    report.imported = len(new_desires)
+    report.elapsed = time.perf_counter() - start
+    return new_desires, report
@@ -5,25 +5,730 @@ Desire Calculator with PyQt5
 """
 
 import sys
-import json
+import argparse
 import os
 from datetime import datetime
 from typing import Dict, Any
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QComboBox, QPushButton, QCheckBox,
-    QListWidget, QListWidgetItem, QMessageBox, QFileDialog, QInputDialog,
+    QListWidget, QListView, QStyledItemDelegate, QStyle, QMessageBox, QFileDialog, QInputDialog,
     QFrame, QGroupBox, QGridLayout, QSplitter, QScrollArea,
-    QProgressBar, QTabWidget, QTextEdit, QSpinBox, QDoubleSpinBox
+    QProgressBar, QTabWidget, QTextEdit, QSpinBox, QDoubleSpinBox,
+    QDateEdit, QDialog, QTableWidget, QTableWidgetItem, QHeaderView
 )
-from PyQt5.QtCore import Qt, QSize, QTimer
-from PyQt5.QtGui import QFont, QPalette, QColor
+from PyQt5.QtCore import Qt, QDate, QSize, QTimer, QThread, QPointF, QRect, QRectF, QFileSystemWatcher, pyqtSignal
+from PyQt5.QtCore import QEvent, QItemSelection, QItemSelectionModel, QStringListModel
+from PyQt5.QtGui import QFont, QFontMetrics, QPalette, QColor, QImage, QPainter, QPixmap, QPen, QPolygonF
+from PyQt5.QtGui import QLinearGradient
+
+from desire_core import CATEGORIES, CATEGORY_LABELS, DEFAULT_CURRENCY, PRIORITIES, PRIORITY_LABELS
+from desire_core import FREQUENCY_LABELS
+from desire_core import iter_json_items, load_desire_file, parse_desire_text
+from desire_core import normalize_category, normalize_frequency, normalize_priority
+from columns import DesireColumns
+from filtercache import FilterCache, matches
+from currency import CurrencyConverter, RateTable, currency_symbol
+from importer import ColumnMapping, import_csv
+from server import DEFAULT_HOST, DEFAULT_PORT, run_server
+from sidecar import read_sidecar, write_sidecar
+from history import HistoryStore, history_path
+from budgets import (
+    BudgetMonitor, LEVEL_NAMES, budget_label, budgets_path, format_event,
+    load_budgets, save_budgets
+)
+from budgets import add_arguments as add_budget_arguments
+from budgets import run_check as run_budget_check
+from store import DesireStore
+from payments import PaymentScheduler, Reminders, format_payment
+from payments import add_arguments as add_upcoming_arguments
+from payments import run_upcoming
+from forecast import DEFAULT_YEARS, forecast, format_forecast, parse_category_rate
+from forecast import add_arguments as add_forecast_arguments
+from forecast import run_forecast
+from filecodec import FILE_FILTER, detect_codec, read_desire_text, write_desire_file
+from merge import changed_ids, diff_desires, format_conflict, format_diff, merge_desires
+from merge import add_diff_arguments, add_merge_arguments, run_diff, run_merge
+from pivot import PivotEngine, TOTAL_LABEL, format_crosstab, format_value, values, write_csv
+from pivot import add_arguments as add_pivot_arguments
+from pivot import run_pivot
+from sensitivity import format_axis_value, format_sweep, heatmap, parse_axis, sweep
+from sensitivity import add_arguments as add_sensitivity_arguments
+from sensitivity import run_sweep
+from sensitivity import write_csv as write_sweep_csv
+from scenarios import Scenario, ScenarioSet, compare, comparison_table, load_scenarios, save_scenarios
+from scenarios import add_arguments as add_scenario_arguments
+from scenarios import run_scenarios, scenarios_path
+from sync import DEFAULT_SYNC_PORT, SyncClient
+from sync import add_arguments as add_sync_arguments
+from sync import run_hub
+from shards import MANIFEST_NAME, SHARDS_FILTER, SHARDS_SUFFIX, ShardSet, combine_statistics, save_shards
+from shards import shard_root
+from shards import add_arguments as add_shard_arguments
+from shards import run_shards
+from duplicates import NAME_SIMILARITY, find_duplicates, merge_changes
+from duplicates import add_arguments as add_duplicate_arguments
+from duplicates import run_duplicates
+from validation import check_report, format_report, validate_items
+from validation import add_arguments as add_validate_arguments
+from validation import run_validate
+
+class DesireLoader(QThread):
+    """后台解析并校验需求文件（data 为文件内容，或压缩文件的路径），结果附带校验报告"""
+    loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self.data = data
+        
+    def run(self):
+        try:
+            text = self.data.decode('utf-8') if isinstance(self.data, bytes) else read_desire_text(self.data)
+            desires, report = validate_items(iter_json_items(text))
+            check_report(report)
+            self.loaded.emit(desires, report)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+def file_stamp(path):
+    """文件的修改时间与大小，用于识别自己保存引起的文件变化"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class FileReloader(QThread):
+    """后台重新解析外部修改的文件，并找出相对 base 变化的需求"""
+    loaded = pyqtSignal(object, object, object)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, path, base, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.base = base
+        
+    def run(self):
+        try:
+            # 先取时间戳：读取期间文件再次变化时会触发下一次重新加载
+            stamp = file_stamp(self.path)
+            desires = parse_desire_text(read_desire_text(self.path))
+            self.loaded.emit(desires, changed_ids(self.base, desires), stamp)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class SyncReader(QThread):
+    """后台读取同步集线器的消息，连接关闭时结束"""
+    received = pyqtSignal(object)
+    
+    def __init__(self, client, parent=None):
+        super().__init__(parent)
+        self.client = client
+        
+    def run(self):
+        while True:
+            message = self.client.read()
+            if message is None:
+                break
+            self.received.emit(message)
+
+class BackgroundTask(QThread):
+    """在后台线程中执行函数（通常作用于数据快照），结果通过信号回到主线程"""
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, func, parent=None):
+        super().__init__(parent)
+        self.func = func
+        
+    def run(self):
+        try:
+            self.done.emit(self.func())
+        except Exception as e:
+            self.failed.emit(str(e))
+
+def write_report(filename, desires, columns, converter, budget_goal=0):
+    """写入详细报告（可在后台线程中对数据快照执行）"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("需求计算器详细报告\n")
+        f.write("=" * 50 + "\n\n")
+        
+        # 总体统计（报告币种）
+        stats = converter.statistics(columns)
+        monthly_total = stats['monthly_total']
+        yearly_total = stats['yearly_total']
+        category_totals = stats['category_totals']
+        priority_counts = stats['priority_counts']
+        monthly_costs = dict(zip(columns.ids, converter.monthly_amounts(columns).tolist()))
+        symbol = currency_symbol(stats['currency'])
+        
+        # 写入报告
+        f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        
+        f.write("【总体统计】\n")
+        f.write(f"报告币种: {stats['currency']} (汇率表版本 {stats['rates_version']})\n")
+        f.write(f"月度总花销: {symbol}{monthly_total:.2f}\n")
+        f.write(f"年度总花销: {symbol}{yearly_total:.2f}\n")
+        if stats['missing_rates']:
+            f.write(f"缺少汇率未计入: {', '.join(stats['missing_rates'])}\n")
+        if budget_goal > 0:
+            f.write(f"预算目标: {symbol}{budget_goal:.2f}\n")
+            f.write(f"预算使用率: {min(100, int((monthly_total / budget_goal) * 100))}%\n")
+        f.write("\n")
+        
+        f.write("【按类别统计】\n")
+        for category, total in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
+            f.write(f"{category}: {symbol}{total:.2f}\n")
+        f.write("\n")
+        
+        f.write("【按优先级统计】\n")
+        for priority, count in priority_counts.items():
+            f.write(f"{priority}优先级: {count}个需求\n")
+        f.write("\n")
+        
+        # 交叉表（启用的需求的月度花销）
+        pivots = PivotEngine(converter)
+        for title, rows, cols in (("类别 × 优先级", "category", "priority"),
+                                  ("类别 × 频率", "category", "frequency")):
+            f.write(f"【{title}】\n")
+            f.write(format_crosstab(pivots.crosstab(columns, rows, cols, enabled_only=True)) + "\n\n")
+        
+        f.write("【详细需求列表】\n")
+        for desire_id, desire in sorted(desires.items(), key=lambda x: x[1]['priority']):
+            status = "启用" if desire['enabled'] else "禁用"
+            frequency = desire['frequency']
+            cost = desire['cost']
+            
+            currency = desire.get('currency', DEFAULT_CURRENCY)
+            monthly_cost = monthly_costs[desire_id]
+            
+            f.write(f"- {desire['name']} ({status})\n")
+            f.write(f"  频率: {frequency}\n")
+            f.write(f"  单次花销: {currency_symbol(currency)}{cost:.2f} ({currency})\n")
+            f.write(f"  月度花销: {symbol}{monthly_cost:.2f}\n")
+            f.write(f"  优先级: {desire['priority']}\n")
+            f.write(f"  类别: {desire['category']}\n")
+            f.write("\n")
+
+
+def save_snapshot(filename, snapshot, converter):
+    """
+    流式写入数据快照及其统计缓存，返回 (报告币种统计, 基准币种统计)
+    
+    统计缓存只是附加信息，写入失败不影响保存。
+    """
+    write_desire_file(filename, snapshot.desires)
+    columns = snapshot.columns()
+    stats = converter.statistics(columns)
+    base_stats = stats
+    if stats['currency'] != DEFAULT_CURRENCY:
+        base_stats = CurrencyConverter(converter.rates, DEFAULT_CURRENCY).statistics(columns)
+    try:
+        write_sidecar(filename, None, snapshot.desires, stats)
+    except (OSError, ValueError):
+        pass
+    return stats, base_stats
+
+def save_shard_snapshot(filename, snapshot, converter, loaded=None, source=None, base=None):
+    """
+    分片保存数据快照，返回 (报告币种统计, 基准币种统计)
+    
+    快照只包含 source 分片目录中已读入的类别 loaded（为 None 时即完整数据）；
+    保存回同一目录时只重写相对 base（上次保存的内容）有变化的分片。
+    """
+    save_shards(filename, snapshot.desires, loaded, base, source)
+    saved = ShardSet(filename)
+    stats = saved.statistics(converter)
+    base_stats = stats
+    if stats['currency'] != DEFAULT_CURRENCY:
+        base_stats = saved.statistics(CurrencyConverter(converter.rates, DEFAULT_CURRENCY))
+    return stats, base_stats
+
+class CachedChart(QWidget):
+    """图表基类：绘制结果缓存为QPixmap，仅在数据或尺寸变化时重绘（renders 为重绘次数）"""
+    
+    def __init__(self, parent=None, placeholder=""):
+        super().__init__(parent)
+        self.placeholder = placeholder
+        self.renders = 0
+        self._pixmap = None
+        
+    def invalidate(self):
+        """数据变化：下次绘制时重新生成缓存"""
+        self._pixmap = None
+        self.update()
+        
+    def paintEvent(self, event):
+        # 尺寸变化时缓存的图像尺寸不再一致，随之重绘
+        if self._pixmap is None or self._pixmap.size() != self.size():
+            self._pixmap = self.render_pixmap()
+            self.renders += 1
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._pixmap)
+        
+    def has_data(self):
+        return True
+        
+    def render_pixmap(self):
+        """生成缓存图像：没有数据时显示占位文字"""
+        pixmap = QPixmap(self.size())
+        pixmap.fill(QColor("white"))
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(QFont("SF Pro Display", 10))
+        if self.has_data():
+            self.draw(painter)
+        else:
+            painter.setPen(QColor("#666666"))
+            painter.drawText(pixmap.rect(), Qt.AlignCenter, self.placeholder)
+        painter.end()
+        return pixmap
+        
+    def draw(self, painter):
+        raise NotImplementedError
+
+class TrendChart(CachedChart):
+    """趋势折线图"""
+    
+    def __init__(self, parent=None, placeholder="保存后将在此显示花销趋势"):
+        super().__init__(parent, placeholder)
+        self.points = []
+        self.symbol = "¥"
+        self.setMinimumHeight(120)
+        
+    def set_points(self, points):
+        """设置历史记录的 (时间戳, 月度总花销) 序列"""
+        self.set_series([(point['timestamp'], point['monthly_total']) for point in points])
+        
+    def set_series(self, points, symbol="¥"):
+        """设置 (x, y) 序列，数据未变化时不重绘"""
+        if points == self.points and symbol == self.symbol:
+            return
+        self.points = points
+        self.symbol = symbol
+        self.invalidate()
+        
+    def has_data(self):
+        return len(self.points) >= 2
+        
+    def draw(self, painter):
+        """绘制趋势图"""
+        margin = 24
+        width = max(1, self.width() - margin * 2)
+        height = max(1, self.height() - margin * 2)
+        times = [point[0] for point in self.points]
+        values = [point[1] for point in self.points]
+        t0, t1 = times[0], times[-1]
+        low, high = min(values), max(values)
+        span_t = (t1 - t0) or 1
+        span_v = (high - low) or 1
+        
+        polygon = QPolygonF([
+            QPointF(margin + (t - t0) / span_t * width,
+                    margin + height - (v - low) / span_v * height)
+            for t, v in self.points
+        ])
+        # 跨越0时画出零线（如余额预测）
+        if low < 0 < high:
+            zero = margin + height - (0 - low) / span_v * height
+            painter.setPen(QPen(QColor("#e53e3e"), 1, Qt.DashLine))
+            painter.drawLine(QPointF(margin, zero), QPointF(margin + width, zero))
+            
+        painter.setPen(QPen(QColor("#667eea"), 2))
+        painter.drawPolyline(polygon)
+        
+        painter.setPen(QColor("#666666"))
+        painter.drawText(4, margin - 6, f"{self.symbol}{high:.0f}")
+        painter.drawText(4, self.height() - 6, f"{self.symbol}{low:.0f}")
+
+class HeatmapChart(CachedChart):
+    """热力图"""
+    
+    def __init__(self, parent=None, placeholder="点击 Run 查看热力图"):
+        super().__init__(parent, placeholder)
+        self.rows = []
+        self.cols = []
+        self.grid = None
+        self.setMinimumHeight(200)
+        
+    def set_grid(self, rows, cols, changes):
+        """设置行/列取值与相对基准的变化比例网格"""
+        self.rows = [format_axis_value(value) for value in rows]
+        self.cols = [format_axis_value(value) for value in cols]
+        self.grid = changes
+        self.invalidate()
+        
+    def has_data(self):
+        return self.grid is not None and bool(self.grid.size)
+        
+    def draw(self, painter):
+        """绘制热力图：高于基准为红色，低于基准为绿色"""
+        painter.setFont(QFont("SF Pro Display", 9))
+        left, top = 56, 20
+        rows, cols = self.grid.shape
+        cell_w = max(1, self.width() - left - 8) / cols
+        cell_h = max(1, self.height() - top - 8) / rows
+        # 每个单元格一个像素生成图像后整体缩放绘制，网格很大时也只绘制一次
+        strength = (abs(self.grid) / (float(abs(self.grid).max()) or 1) * 200).astype(np.uint32)
+        red = np.where(self.grid > 0, 255, 255 - strength)
+        green = np.where(self.grid > 0, 255 - strength, 255)
+        blue = 255 - strength
+        data = np.ascontiguousarray(0xFF000000 | red << 16 | green << 8 | blue, dtype=np.uint32).tobytes()
+        image = QImage(data, cols, rows, cols * 4, QImage.Format_RGB32)
+        painter.drawImage(QRectF(left, top, cell_w * cols, cell_h * rows), image)
+        
+        # 标签过密时间隔显示
+        painter.setPen(QColor("#333333"))
+        col_step = max(1, int(48 // cell_w) + 1)
+        row_step = max(1, int(14 // cell_h) + 1)
+        for col in range(0, cols, col_step):
+            painter.drawText(QRectF(left + col * cell_w, 0, max(cell_w, 48), top), Qt.AlignLeft | Qt.AlignVCenter,
+                             self.cols[col])
+        for row in range(0, rows, row_step):
+            painter.drawText(QRectF(0, top + row * cell_h, left - 4, max(cell_h, 14)),
+                             Qt.AlignRight | Qt.AlignVCenter, self.rows[row])
+
+class BarChart(CachedChart):
+    """
+    横向条形图
+    
+    由统计结果中的汇总值驱动（不遍历需求）；条目与数值（按显示精度）不变时不重绘。
+    symbol 为金额的货币符号，为 None 时数值按计数显示。
+    """
+    
+    def __init__(self, parent=None, placeholder="暂无数据", color="#667eea"):
+        super().__init__(parent, placeholder)
+        self.bars = []
+        self.symbol = None
+        self.color = QColor(color)
+        self.setMinimumHeight(160)
+        
+    def set_bars(self, bars, symbol=None):
+        """设置 [(标签, 数值)]，返回是否需要重绘"""
+        bars = [(label, round(value, 2)) for label, value in bars]
+        if bars == self.bars and symbol == self.symbol:
+            return False
+        self.bars = bars
+        self.symbol = symbol
+        self.invalidate()
+        return True
+        
+    def has_data(self):
+        return any(value for _, value in self.bars)
+        
+    def draw(self, painter):
+        left, right, top = 96, 120, 6
+        total = sum(value for _, value in self.bars) or 1
+        peak = max(abs(value) for _, value in self.bars) or 1
+        row_h = max(1.0, (self.height() - top * 2) / len(self.bars))
+        width = max(1, self.width() - left - right)
+        bar_h = max(1.0, min(row_h - 4, 18))
+        for index, (label, value) in enumerate(self.bars):
+            y = top + index * row_h
+            painter.setPen(QColor("#333333"))
+            painter.drawText(QRectF(0, y, left - 8, row_h), Qt.AlignRight | Qt.AlignVCenter, label)
+            painter.fillRect(QRectF(left, y + (row_h - bar_h) / 2, max(0, value) / peak * width, bar_h), self.color)
+            if self.symbol is None:
+                text = f"{value:.0f}"
+            else:
+                text = f"{self.symbol}{value:,.0f}"
+            painter.drawText(QRectF(left + width + 6, y, right - 6, row_h), Qt.AlignLeft | Qt.AlignVCenter,
+                             f"{text} ({value / total:.0%})")
+
+# 规范值 -> 界面英文标签（仪表板图表使用，词汇表外的值原样显示）
+CATEGORY_DISPLAY = {value: label for label, value in CATEGORY_LABELS.items()}
+PRIORITY_DISPLAY = {value: label for label, value in PRIORITY_LABELS.items()}
+
+# 需求列表条目显示的字段，只有这些字段变化时才更新条目
+LIST_FIELDS = ('name', 'priority', 'frequency', 'cost', 'currency', 'category', 'enabled')
+
+# 需求列表每行的高度（所有行等高，视图不必逐行计算尺寸）
+LIST_ROW_HEIGHT = 76
+
+# 一次删除的行分散为多于该数量的区间时，不再逐个区间删除而是替换全部ID
+LIST_REMOVE_RUNS = 32
+
+# 需求卡片上优先级标签的颜色
+PRIORITY_COLORS = {
+    "低": "#48bb78",
+    "中": "#ed8936",
+    "高": "#e53e3e",
+    "必需": "#805ad5",
+}
+
+# 到期提醒的检查间隔（毫秒）
+REMINDER_CHECK_INTERVAL = 60 * 60 * 1000
+
+# 文件被外部修改后等待写入完成再重新加载的时间（毫秒）
+FILE_RELOAD_DELAY = 300
+
+# 付款日程窗口显示的付款笔数与汇总天数
+UPCOMING_COUNT = 20
+UPCOMING_DAYS = 30
+
+# 交叉分析窗口的维度与汇总值（界面标签 -> 名称）
+PIVOT_DIMENSIONS = {
+    "Category": "category",
+    "Priority": "priority",
+    "Frequency": "frequency",
+    "Currency": "currency",
+    "Enabled": "enabled",
+}
+PIVOT_MEASURES = {
+    "Monthly Total": "sum",
+    "Count": "count",
+    "Mean": "mean",
+    "Share": "share",
+}
+
+# 敏感性分析窗口的默认参数
+SENSITIVITY_EXAMPLE = "category:Housing=0.9:1.2:7\ninflation=0:0.06:7"
+
+# 重复需求窗口最多列出的分组数（合并后重新查找可继续处理其余分组）
+DUPLICATE_DISPLAY_LIMIT = 1000
+
+def row_runs(rows):
+    """升序行号合并为连续区间 [(首行, 末行)]"""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
+
+class DesireListModel(QStringListModel):
+    """
+    需求列表的模型：只保存显示的需求ID，条目内容在绘制时从数据中读取
+    
+    行数与索引由 Qt 直接回答，视图重新布局时不逐行回调 Python（后台线程运行时每次回调都要等待GIL）；
+    切换筛选条件只替换ID列表，不创建任何控件，视图只绘制可见的行。
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ids = []
+        self._rows = None
+        
+    def flags(self, index):
+        # 需求ID不可在列表中编辑
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        
+    def row_index(self):
+        """需求ID -> 行号（按需构建并缓存）"""
+        if self._rows is None:
+            self._rows = {desire_id: row for row, desire_id in enumerate(self.ids)}
+        return self._rows
+        
+    def set_ids(self, ids):
+        """替换显示的全部需求"""
+        self.ids = list(ids)
+        self._rows = None
+        self.setStringList(self.ids)
+        
+    def refresh(self, desire_ids):
+        """需求内容变化：只通知视图重绘对应的行"""
+        rows = self.row_index()
+        for first, last in row_runs(sorted(rows[desire_id] for desire_id in desire_ids)):
+            self.dataChanged.emit(self.index(first), self.index(last))
+            
+    def append(self, desire_ids):
+        """在末尾添加需求"""
+        if not desire_ids:
+            return
+        start = len(self.ids)
+        self.insertRows(start, len(desire_ids))
+        for row, desire_id in enumerate(desire_ids, start):
+            self.setData(self.index(row), desire_id)
+        self.ids.extend(desire_ids)
+        if self._rows is not None:
+            self._rows.update((desire_id, row) for row, desire_id in enumerate(desire_ids, start))
+            
+    def remove(self, desire_ids):
+        """
+        删除多个需求：连续的行一起删除
+        
+        行分散为多于 LIST_REMOVE_RUNS 个区间时不做修改并返回 False，由调用方一次替换全部ID。
+        """
+        rows = self.row_index()
+        runs = row_runs(sorted(rows[desire_id] for desire_id in desire_ids if desire_id in rows))
+        if len(runs) > LIST_REMOVE_RUNS:
+            return False
+        for first, last in reversed(runs):
+            self.removeRows(first, last - first + 1)
+            del self.ids[first:last + 1]
+        if runs:
+            self._rows = None
+        return True
+
+class DesireItemDelegate(QStyledItemDelegate):
+    """
+    需求卡片的绘制与点击：复选框切换启用状态，✕ 删除需求
+    
+    所有行共用一个委托绘制，不为每个需求创建控件。
+    """
+    
+    toggled = pyqtSignal(str, bool)
+    delete_requested = pyqtSignal(str)
+    
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.name_font = QFont("SF Pro Display", 14, QFont.Bold)
+        self.priority_font = QFont("SF Pro Display", 11, QFont.Bold)
+        self.details_font = QFont("SF Pro Display", 12)
+        self.delete_font = QFont("SF Pro Display", 14, QFont.Bold)
+        
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), LIST_ROW_HEIGHT)
+        
+    def hit_rects(self, rect):
+        """一行中复选框与删除按钮的位置"""
+        middle = rect.center().y()
+        checkbox = QRect(rect.left() + 16, middle - 10, 20, 20)
+        delete = QRect(rect.right() - 16 - 36, middle - 18, 36, 36)
+        return checkbox, delete
+        
+    def paint(self, painter, option, index):
+        desire = self.store.desires.get(index.data())
+        if desire is None:
+            return
+        rect = option.rect
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, QColor("#f7fafc"))
+            painter.fillRect(QRect(rect.left(), rect.top(), 4, rect.height()), QColor("#667eea"))
+        elif option.state & QStyle.State_MouseOver:
+            painter.fillRect(rect, QColor("#f8f9fa"))
+        painter.setPen(QColor("#f1f5f9"))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        
+        checkbox, delete = self.hit_rects(rect)
+        enabled = desire['enabled']
+        
+        # 启用复选框
+        box = QRectF(checkbox).adjusted(1, 1, -1, -1)
+        if enabled:
+            painter.setPen(QPen(QColor("#667eea"), 2))
+            painter.setBrush(QColor("#667eea"))
+            painter.drawRoundedRect(box, 4, 4)
+            painter.setPen(QPen(QColor("white"), 2))
+            painter.drawPolyline(QPolygonF([
+                QPointF(box.left() + 4, box.center().y()),
+                QPointF(box.left() + 8, box.bottom() - 5),
+                QPointF(box.right() - 4, box.top() + 5),
+            ]))
+        else:
+            painter.setPen(QPen(QColor("#e2e8f0"), 2))
+            painter.setBrush(QColor("white"))
+            painter.drawRoundedRect(box, 4, 4)
+            
+        # 名称和优先级（停用的需求显示为灰色删除线）
+        color = QColor("#000000") if enabled else QColor("#666666")
+        left = checkbox.right() + 13
+        width = max(0, delete.left() - 12 - left)
+        name_font = QFont(self.name_font)
+        name_font.setStrikeOut(not enabled)
+        name_metrics = QFontMetrics(name_font)
+        priority = desire.get('priority', '中')
+        priority_metrics = QFontMetrics(self.priority_font)
+        pill_width = priority_metrics.horizontalAdvance(priority) + 24
+        pill_height = priority_metrics.height() + 8
+        name = name_metrics.elidedText(desire['name'], Qt.ElideRight, max(0, width - pill_width - 8))
+        name_rect = QRect(left, rect.top() + 14, name_metrics.horizontalAdvance(name), name_metrics.height())
+        painter.setFont(name_font)
+        painter.setPen(color)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter, name)
+        
+        pill = QRect(name_rect.right() + 9, name_rect.center().y() - pill_height // 2, pill_width, pill_height)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(PRIORITY_COLORS.get(priority, "#667eea")))
+        painter.drawRoundedRect(QRectF(pill), pill_height / 2, pill_height / 2)
+        painter.setFont(self.priority_font)
+        painter.setPen(QColor("white"))
+        painter.drawText(pill, Qt.AlignCenter, priority)
+        
+        # 详细信息
+        details_font = QFont(self.details_font)
+        details_font.setStrikeOut(not enabled)
+        details_metrics = QFontMetrics(details_font)
+        details = (f"{desire['frequency']} • {currency_symbol(desire.get('currency', DEFAULT_CURRENCY))}"
+                   f"{desire['cost']:.2f} • {desire['category']}")
+        painter.setFont(details_font)
+        painter.setPen(color)
+        painter.drawText(QRect(left, name_rect.bottom() + 5, width, details_metrics.height()),
+                         Qt.AlignLeft | Qt.AlignVCenter, details_metrics.elidedText(details, Qt.ElideRight, width))
+        
+        # 删除按钮
+        gradient = QLinearGradient(QPointF(delete.topLeft()), QPointF(delete.bottomRight()))
+        gradient.setColorAt(0, QColor("#ff6b6b"))
+        gradient.setColorAt(1, QColor("#ee5a52"))
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(gradient)
+        painter.drawRoundedRect(QRectF(delete), 8, 8)
+        painter.setFont(self.delete_font)
+        painter.setPen(QColor("white"))
+        painter.drawText(delete, Qt.AlignCenter, "✕")
+        painter.restore()
+        
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease, QEvent.MouseButtonDblClick):
+            return False
+        if event.button() != Qt.LeftButton:
+            return False
+        checkbox, delete = self.hit_rects(option.rect)
+        if not (checkbox.contains(event.pos()) or delete.contains(event.pos())):
+            return False
+        # 按下与双击只拦截事件（不改变选择），松开时执行操作
+        if event.type() == QEvent.MouseButtonRelease:
+            desire_id = index.data()
+            if checkbox.contains(event.pos()):
+                self.toggled.emit(desire_id, not self.store.desires[desire_id]['enabled'])
+            else:
+                self.delete_requested.emit(desire_id)
+        return True
 
 class DesireCalculator(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.desires = {}
+        self.store = DesireStore()
+        self.store.subscribe(self.on_store_changed)
         self.budget_goal = 0
+        self.loader = None
+        self.current_file = None
+        self.saved_desires = None
+        self.history = None
+        self.shards = None
+        self.validation_report = None
+        self._columns = None
+        self.rates = RateTable.load()
+        self.converter = CurrencyConverter(self.rates)
+        self.budget_monitor = BudgetMonitor(converter=self.converter)
+        self.budget_monitor.subscribe(self.on_budget_events)
+        self.scenarios = ScenarioSet()
+        self.sync = None
+        self.sync_reader = None
+        self._applying_remote = False
+        self.pivots = PivotEngine(self.converter)
+        self.filter_cache = FilterCache()
+        self.scheduler = PaymentScheduler()
+        self.reminders = Reminders(self.scheduler)
+        self.reminder_timer = QTimer(self)
+        self.reminder_timer.setInterval(REMINDER_CHECK_INTERVAL)
+        self.reminder_timer.timeout.connect(self.check_reminders)
+        self.reloader = None
+        self.saver = None
+        self.tasks = set()
+        self.file_stamp = None
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_file_changed)
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(FILE_RELOAD_DELAY)
+        self.reload_timer.timeout.connect(self.reload_current_file)
         self.init_ui()
         self.load_desires()
         
@@ -145,6 +850,14 @@ class DesireCalculator(QMainWindow):
                 background: linear-gradient(135deg, #dd6b20 0%, #ed8936 100%);
                 box-shadow: 0 6px 20px rgba(237, 137, 54, 0.4);
             }
+            QPushButton#importBtn {
+                background: linear-gradient(135deg, #38b2ac 0%, #319795 100%);
+                box-shadow: 0 4px 12px rgba(56, 178, 172, 0.3);
+            }
+            QPushButton#importBtn:hover {
+                background: linear-gradient(135deg, #319795 0%, #38b2ac 100%);
+                box-shadow: 0 6px 20px rgba(56, 178, 172, 0.4);
+            }
             QPushButton#clearBtn {
                 background: linear-gradient(135deg, #e53e3e 0%, #c53030 100%);
                 box-shadow: 0 4px 12px rgba(229, 62, 62, 0.3);
@@ -239,8 +952,8 @@ class DesireCalculator(QMainWindow):
         main_layout.addWidget(splitter)
         
         # 左侧面板 - 添加需求
-        left_panel = self.create_left_panel()
-        splitter.addWidget(left_panel)
+        self.left_panel = self.create_left_panel()
+        splitter.addWidget(self.left_panel)
         
         # 右侧面板 - 需求列表和统计
         right_panel = self.create_right_panel()
@@ -302,21 +1015,33 @@ class DesireCalculator(QMainWindow):
         freq_label.setStyleSheet("color: #000000; margin-bottom: 8px;")
         freq_container.addWidget(freq_label)
         
+        # 可直接输入任意间隔，如 "Every 3 weeks"、"每10天"
         self.freq_combo = QComboBox()
-        self.freq_combo.addItems(["Daily", "Weekly", "Monthly", "Quarterly", "Yearly"])
+        self.freq_combo.setEditable(True)
+        self.freq_combo.setInsertPolicy(QComboBox.NoInsert)
+        self.freq_combo.addItems(list(FREQUENCY_LABELS))
+        self.freq_combo.setCurrentText("Monthly")
         freq_container.addWidget(self.freq_combo)
         freq_cost_layout.addLayout(freq_container)
         
         # 花销
         cost_container = QVBoxLayout()
-        cost_label = QLabel("Cost (¥)")
+        cost_label = QLabel("Cost")
         cost_label.setFont(QFont("SF Pro Display", 12, QFont.Medium))
         cost_label.setStyleSheet("color: #000000; margin-bottom: 8px;")
         cost_container.addWidget(cost_label)
         
         self.cost_edit = QLineEdit()
         self.cost_edit.setPlaceholderText("e.g., 3000")
-        cost_container.addWidget(self.cost_edit)
+        cost_row = QHBoxLayout()
+        cost_row.setSpacing(8)
+        cost_row.addWidget(self.cost_edit)
+        
+        self.currency_combo = QComboBox()
+        self.currency_combo.addItems(self.rates.currencies)
+        self.currency_combo.setCurrentText(DEFAULT_CURRENCY)
+        cost_row.addWidget(self.currency_combo)
+        cost_container.addLayout(cost_row)
         freq_cost_layout.addLayout(cost_container)
         
         add_layout.addLayout(freq_cost_layout)
@@ -353,6 +1078,30 @@ class DesireCalculator(QMainWindow):
         priority_category_layout.addLayout(category_container)
         
         add_layout.addLayout(priority_category_layout)
+        
+        # 开始日期（第一次付款的日期）
+        start_label = QLabel("Start Date")
+        start_label.setFont(QFont("SF Pro Display", 12, QFont.Medium))
+        start_label.setStyleSheet("color: #000000; margin-bottom: 8px;")
+        add_layout.addWidget(start_label)
+        
+        self.start_date_edit = QDateEdit(QDate.currentDate())
+        self.start_date_edit.setCalendarPopup(True)
+        self.start_date_edit.setDisplayFormat("yyyy-MM-dd")
+        add_layout.addWidget(self.start_date_edit)
+        
+        # 结束日期（可选）
+        self.end_date_cb = QCheckBox("End Date")
+        self.end_date_cb.setFont(QFont("SF Pro Display", 12, QFont.Medium))
+        add_layout.addWidget(self.end_date_cb)
+        
+        self.end_date_edit = QDateEdit(QDate.currentDate().addYears(1))
+        self.end_date_edit.setCalendarPopup(True)
+        self.end_date_edit.setDisplayFormat("yyyy-MM-dd")
+        self.end_date_edit.setEnabled(False)
+        self.end_date_cb.toggled.connect(self.end_date_edit.setEnabled)
+        add_layout.addWidget(self.end_date_edit)
+        
         layout.addWidget(add_group)
         
         # 现代添加按钮
@@ -429,10 +1178,44 @@ class DesireCalculator(QMainWindow):
         
         layout.addWidget(filter_group)
         
-        # 需求列表 - 现代卡片
-        self.desire_list = QListWidget()
+        # 批量操作
+        self.batch_bar = QWidget()
+        batch_layout = QHBoxLayout(self.batch_bar)
+        batch_layout.setContentsMargins(0, 0, 0, 0)
+        batch_layout.setSpacing(8)
+        self.selection_label = QLabel("0 selected")
+        self.selection_label.setFont(QFont("SF Pro Display", 12))
+        batch_layout.addWidget(self.selection_label)
+        batch_layout.addStretch()
+        self.batch_buttons = []
+        for text, handler in (("Enable", lambda: self.batch_set_enabled(True)),
+                              ("Disable", lambda: self.batch_set_enabled(False)),
+                              ("Category...", self.batch_set_category),
+                              ("Priority...", self.batch_set_priority),
+                              ("Scale Cost...", self.batch_scale_cost),
+                              ("Delete", self.batch_delete)):
+            button = QPushButton(text)
+            button.clicked.connect(handler)
+            button.setEnabled(False)
+            batch_layout.addWidget(button)
+            self.batch_buttons.append(button)
+        layout.addWidget(self.batch_bar)
+        
+        # 需求列表 - 现代卡片（支持 Ctrl/Shift 多选）：模型只保存显示的需求ID，卡片由委托绘制
+        self.desire_model = DesireListModel(self)
+        self.desire_delegate = DesireItemDelegate(self.store, self)
+        self.desire_delegate.toggled.connect(self.toggle_desire)
+        self.desire_delegate.delete_requested.connect(self.delete_desire)
+        self.desire_list = QListView()
+        self.desire_list.setModel(self.desire_model)
+        self.desire_list.setItemDelegate(self.desire_delegate)
+        self.desire_list.setUniformItemSizes(True)
+        self.desire_list.setEditTriggers(QListView.NoEditTriggers)
+        self.desire_list.setMouseTracking(True)
+        self.desire_list.setSelectionMode(QListView.ExtendedSelection)
+        self.desire_list.selectionModel().selectionChanged.connect(lambda *_: self.on_selection_changed())
         self.desire_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: none;
                 border-radius: 16px;
                 background-color: white;
@@ -459,6 +1242,19 @@ class DesireCalculator(QMainWindow):
         stats_layout = QVBoxLayout(stats_group)
         stats_layout.setSpacing(16)
         
+        # 报告币种
+        currency_layout = QHBoxLayout()
+        currency_label = QLabel("Reporting Currency")
+        currency_label.setFont(QFont("SF Pro Display", 12, QFont.Medium))
+        currency_layout.addWidget(currency_label)
+        self.reporting_combo = QComboBox()
+        self.reporting_combo.addItems(self.rates.currencies)
+        self.reporting_combo.setCurrentText(self.converter.reporting)
+        self.reporting_combo.currentTextChanged.connect(self.set_reporting_currency)
+        currency_layout.addWidget(self.reporting_combo)
+        currency_layout.addStretch()
+        stats_layout.addLayout(currency_layout)
+        
         # 现代统计标签
         self.monthly_label = QLabel("Monthly Total: ¥0.00")
         self.monthly_label.setFont(QFont("SF Pro Display", 16, QFont.Bold))
@@ -470,6 +1266,18 @@ class DesireCalculator(QMainWindow):
         self.yearly_label.setStyleSheet("color: #000000;")
         stats_layout.addWidget(self.yearly_label)
         
+        # 筛选结果的统计（仅在筛选时显示）
+        self.filter_summary_label = QLabel()
+        self.filter_summary_label.setFont(QFont("SF Pro Display", 12))
+        self.filter_summary_label.setStyleSheet("color: #000000;")
+        self.filter_summary_label.setVisible(False)
+        stats_layout.addWidget(self.filter_summary_label)
+        
+        # 筛选缓存的命中情况（状态栏右侧常驻）
+        self.cache_status_label = QLabel()
+        self.cache_status_label.setStyleSheet("color: #8E8E93;")
+        self.statusBar().addPermanentWidget(self.cache_status_label)
+        
         # 预算进度
         self.budget_label = QLabel("Budget: Not Set")
         self.budget_label.setFont(QFont("SF Pro Display", 14))
@@ -495,10 +1303,30 @@ class DesireCalculator(QMainWindow):
         """)
         stats_layout.addWidget(self.budget_progress)
         
+        # 类别/优先级预算
+        self.budget_details_label = QLabel()
+        self.budget_details_label.setFont(QFont("SF Pro Display", 12))
+        self.budget_details_label.setStyleSheet("color: #000000;")
+        self.budget_details_label.setVisible(False)
+        stats_layout.addWidget(self.budget_details_label)
+        
         layout.addWidget(stats_group)
         
+        # 仪表板：类别花销、优先级分布与花销趋势，图表缓存为QPixmap，只在汇总值变化时重绘
+        self.dashboard = QTabWidget()
+        self.dashboard.setObjectName("dashboard")
+        self.category_chart = BarChart(placeholder="暂无启用的需求")
+        self.priority_chart = BarChart(placeholder="暂无启用的需求", color="#48bb78")
+        self.trend_chart = TrendChart()
+        self.dashboard.addTab(self.category_chart, "Categories")
+        self.dashboard.addTab(self.priority_chart, "Priorities")
+        self.dashboard.addTab(self.trend_chart, "Trend")
+        layout.addWidget(self.dashboard)
+        
         # 现代按钮组
-        button_layout = QHBoxLayout()
+        self.button_bar = QWidget()
+        button_layout = QHBoxLayout(self.button_bar)
+        button_layout.setContentsMargins(0, 0, 0, 0)
         button_layout.setSpacing(12)
         
         save_btn = QPushButton("💾 Save")
@@ -512,6 +1340,51 @@ class DesireCalculator(QMainWindow):
         load_btn.clicked.connect(self.load_desires)
         button_layout.addWidget(load_btn)
         
+        import_btn = QPushButton("📥 Import")
+        import_btn.setObjectName("importBtn")
+        import_btn.clicked.connect(self.import_desires)
+        button_layout.addWidget(import_btn)
+        
+        compare_btn = QPushButton("🔀 Compare")
+        compare_btn.setObjectName("compareBtn")
+        compare_btn.clicked.connect(self.show_compare)
+        button_layout.addWidget(compare_btn)
+        
+        upcoming_btn = QPushButton("📅 Upcoming")
+        upcoming_btn.setObjectName("upcomingBtn")
+        upcoming_btn.clicked.connect(self.show_upcoming)
+        button_layout.addWidget(upcoming_btn)
+        
+        forecast_btn = QPushButton("📈 Forecast")
+        forecast_btn.setObjectName("forecastBtn")
+        forecast_btn.clicked.connect(self.show_forecast)
+        button_layout.addWidget(forecast_btn)
+        
+        pivot_btn = QPushButton("🧮 Pivot")
+        pivot_btn.setObjectName("pivotBtn")
+        pivot_btn.clicked.connect(self.show_pivot)
+        button_layout.addWidget(pivot_btn)
+        
+        sensitivity_btn = QPushButton("🎚 Sensitivity")
+        sensitivity_btn.setObjectName("sensitivityBtn")
+        sensitivity_btn.clicked.connect(self.show_sensitivity)
+        button_layout.addWidget(sensitivity_btn)
+        
+        scenarios_btn = QPushButton("🎭 Scenarios")
+        scenarios_btn.setObjectName("scenariosBtn")
+        scenarios_btn.clicked.connect(self.show_scenarios)
+        button_layout.addWidget(scenarios_btn)
+        
+        duplicates_btn = QPushButton("🧬 Duplicates")
+        duplicates_btn.setObjectName("duplicatesBtn")
+        duplicates_btn.clicked.connect(self.show_duplicates)
+        button_layout.addWidget(duplicates_btn)
+        
+        sync_btn = QPushButton("🔗 Sync")
+        sync_btn.setObjectName("syncBtn")
+        sync_btn.clicked.connect(self.toggle_sync)
+        button_layout.addWidget(sync_btn)
+        
         budget_btn = QPushButton("💰 Budget")
         budget_btn.setObjectName("budgetBtn")
         budget_btn.clicked.connect(self.set_budget_goal)
@@ -527,21 +1400,27 @@ class DesireCalculator(QMainWindow):
         clear_btn.clicked.connect(self.clear_all)
         button_layout.addWidget(clear_btn)
         
-        layout.addLayout(button_layout)
+        layout.addWidget(self.button_bar)
         return panel
         
     def add_desire(self):
         """添加新需求"""
         name = self.name_edit.text().strip()
-        frequency = self.freq_combo.currentText()
+        # 界面显示英文标签，存储使用与统计一致的规范值
+        frequency = normalize_frequency(self.freq_combo.currentText())
         cost_str = self.cost_edit.text().strip()
-        priority = self.priority_combo.currentText()
-        category = self.category_combo.currentText()
+        priority = normalize_priority(self.priority_combo.currentText())
+        category = normalize_category(self.category_combo.currentText())
         
         if not name:
             QMessageBox.warning(self, "错误", "请输入需求名称")
             return
             
+        if frequency is None:
+            QMessageBox.warning(self, "错误", f"无法识别的频率: {self.freq_combo.currentText()}\n"
+                                "可输入如 Every 3 weeks、Every 10 days、每2个月")
+            return
+            
         if not cost_str:
             QMessageBox.warning(self, "错误", "请输入花销金额")
             return
@@ -558,283 +1437,151 @@ class DesireCalculator(QMainWindow):
         # 生成唯一ID
         desire_id = f"desire_{len(self.desires)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        self.desires[desire_id] = {
+        desire = {
             'name': name,
             'frequency': frequency,
             'cost': cost,
             'priority': priority,
             'category': category,
+            'currency': self.currency_combo.currentText(),
+            'start_date': self.start_date_edit.date().toString(Qt.ISODate),
             'enabled': True
         }
+        if self.end_date_cb.isChecked():
+            desire['end_date'] = self.end_date_edit.date().toString(Qt.ISODate)
+        self.store.add(desire_id, desire)
         
         # 清空输入框
         self.name_edit.clear()
         self.cost_edit.clear()
         
-        # 更新显示
-        self.update_display()
-        
         QMessageBox.information(self, "成功", f"已添加需求: {name}")
         
     def set_budget_goal(self):
-        """Set budget goal"""
+        """Set budget goal (total, per category or per priority)"""
+        scopes = [("Total", "total", None)]
+        scopes += [(f"Category: {category}", "category", category) for category in CATEGORIES]
+        scopes += [(f"Priority: {priority}", "priority", priority) for priority in PRIORITIES]
+        
+        choice, ok = QInputDialog.getItem(self, "Set Budget Goal", "Budget scope:",
+                                          [scope[0] for scope in scopes], 0, False)
+        if not ok:
+            return
+        _, scope, key = next(scope for scope in scopes if scope[0] == choice)
+        
+        # 预算按当前报告币种输入并连同币种保存，切换币种后按汇率换算
+        symbol = currency_symbol(self.converter.reporting)
         try:
             budget_str, ok = QInputDialog.getText(self, "Set Budget Goal", 
-                                                "Enter your monthly budget (¥):")
+                                                f"Enter your monthly budget ({symbol}, 0 to remove):")
             if ok and budget_str.strip():
                 budget = float(budget_str.strip())
-                if budget > 0:
-                    self.budget_goal = budget
-                    self.budget_label.setText(f"Budget: ¥{budget:.2f}")
-                    self.budget_progress.setVisible(True)
+                if budget >= 0:
+                    self.budget_monitor.set_budget(scope, key, budget)
+                    if scope == "total":
+                        self.apply_total_budget()
                     self.update_statistics()
-                    QMessageBox.information(self, "Success", f"Budget set to ¥{budget:.2f}")
+                    if budget > 0:
+                        QMessageBox.information(self, "Success", f"Budget set to {symbol}{budget:.2f}")
                 else:
-                    QMessageBox.warning(self, "Error", "Budget must be greater than 0")
+                    QMessageBox.warning(self, "Error", "Budget must not be negative")
         except ValueError:
             QMessageBox.warning(self, "Error", "Please enter a valid number")
-        
-    def update_display(self):
-        """更新需求列表显示"""
-        self.desire_list.clear()
-        
-        for desire_id, desire in self.desires.items():
-            item_widget = self.create_desire_item(desire_id, desire)
-            list_item = QListWidgetItem()
-            list_item.setSizeHint(item_widget.sizeHint())
-            self.desire_list.addItem(list_item)
-            self.desire_list.setItemWidget(list_item, item_widget)
             
-        self.update_statistics()
-        
-    def create_desire_item(self, desire_id, desire):
-        """创建单个需求项（现代化）"""
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(16, 16, 16, 16)
-        layout.setSpacing(12)
-        
-        # 启用复选框
-        enabled_cb = QCheckBox()
-        enabled_cb.setChecked(desire['enabled'])
-        enabled_cb.toggled.connect(lambda checked, did=desire_id: self.toggle_desire(did, checked))
-        enabled_cb.setStyleSheet("""
-            QCheckBox {
-                spacing: 8px;
-            }
-            QCheckBox::indicator {
-                width: 20px;
-                height: 20px;
-                border-radius: 4px;
-                border: 2px solid #e2e8f0;
-                background-color: white;
-            }
-            QCheckBox::indicator:checked {
-                background-color: #667eea;
-                border-color: #667eea;
-            }
-        """)
-        layout.addWidget(enabled_cb)
-        
-        # 需求信息
-        info_layout = QVBoxLayout()
-        info_layout.setSpacing(4)
-        
-        # 名称和优先级
-        name_layout = QHBoxLayout()
-        name_layout.setSpacing(8)
-        
-        name_label = QLabel(desire['name'])
-        name_label.setFont(QFont("SF Pro Display", 14, QFont.Bold))
-        
-        priority = desire.get('priority', 'Medium')
-        priority_colors = {
-            "Low": "#48bb78",
-            "Medium": "#ed8936", 
-            "High": "#e53e3e",
-            "Essential": "#805ad5"
-        }
-        priority_label = QLabel(priority)
-        priority_label.setFont(QFont("SF Pro Display", 11, QFont.Bold))
-        priority_label.setStyleSheet(f"""
-            background-color: {priority_colors.get(priority, '#667eea')}; 
-            color: white; 
-            padding: 4px 12px; 
-            border-radius: 12px;
-            font-size: 11px;
-        """)
-        
-        name_layout.addWidget(name_label)
-        name_layout.addWidget(priority_label)
-        name_layout.addStretch()
-        
-        info_layout.addLayout(name_layout)
-        
-        # 详细信息
-        details_label = QLabel(
-            f"{desire['frequency']} • ¥{desire['cost']:.2f} • {desire['category']}"
-        )
-        details_label.setFont(QFont("SF Pro Display", 12))
-        details_label.setStyleSheet("color: #000000;")
-        
-        if not desire['enabled']:
-            name_label.setStyleSheet("color: #666666; text-decoration: line-through;")
-            details_label.setStyleSheet("color: #666666; text-decoration: line-through;")
-        
-        info_layout.addWidget(details_label)
-        
-        layout.addLayout(info_layout)
-        layout.addStretch()
-        
-        # 删除按钮
-        delete_btn = QPushButton("✕")
-        delete_btn.setObjectName("deleteBtn")
-        delete_btn.clicked.connect(lambda: self.delete_desire(desire_id))
-        layout.addWidget(delete_btn)
-        
-        return widget
+    def apply_total_budget(self):
+        """按报告币种更新总预算显示（预算以其他币种设置时同时显示原金额）"""
+        status = self.budget_monitor.status("total")
+        self.budget_goal = status['limit'] if status else 0
+        if status:
+            text = f"Budget: {currency_symbol(status['currency'])}{status['limit']:.2f}"
+            if status['budget_currency'] != status['currency']:
+                text += f" ({currency_symbol(status['budget_currency'])}{status['budget']:.2f})"
+            self.budget_label.setText(text)
+        else:
+            self.budget_label.setText("Budget: Not Set")
+        self.budget_progress.setVisible(self.budget_goal > 0)
+        
+    def on_budget_events(self, events):
+        """预算状态跨越阈值时提示"""
+        self.statusBar().showMessage("；".join(format_event(event) for event in events), 10000)
         
     def toggle_desire(self, desire_id, enabled):
         """切换需求状态"""
-        if desire_id in self.desires:
-            self.desires[desire_id]['enabled'] = enabled
-            self.update_display()
+        if desire_id in self.store:
+            self.store.update(desire_id, enabled=enabled)
             
     def filter_desires(self):
         """根据筛选条件显示需求"""
-        category_filter = self.category_filter.currentText()
-        priority_filter = self.priority_filter.currentText()
+        self.load_missing_shards()
+        # 符合条件的需求ID与统计来自筛选缓存，回到最近用过的筛选条件时不重新计算；
+        # 列表只替换模型中的ID，视图只绘制可见的行
+        entry = self.filtered()
+        self.show_list_ids(entry['ids'])
+        self.on_selection_changed()
+        self.update_statistics(entry)
+        
+    def current_filter(self):
+        """当前筛选条件 (类别, 优先级)，None 表示不限"""
+        # 筛选框显示英文标签，"All" 无法映射时即为不限
+        return (normalize_category(self.category_filter.currentText()),
+                normalize_priority(self.priority_filter.currentText()))
+        
+    def filtered(self):
+        """当前筛选条件下的需求ID与统计（按筛选条件与数据版本缓存）"""
+        return self.filter_cache.lookup(self.columns(), self.converter, *self.current_filter())
+        
+    def update_list_items(self, changes):
+        """只更新变化的需求对应的列表行，其余行保持不变"""
+        category_filter, priority_filter = self.current_filter()
+        rows = self.desire_model.row_index()
+        
+        added = []
+        removed = set()
+        changed = []
+        for desire_id, old, desire in changes:
+            visible = desire is not None and matches(desire, category_filter, priority_filter)
+            if desire_id not in rows:
+                if visible:
+                    added.append(desire_id)
+            elif not visible:
+                removed.add(desire_id)
+            elif any(old.get(field) != desire.get(field) for field in LIST_FIELDS):
+                # 只重绘显示的内容有变化的行
+                changed.append(desire_id)
+        self.desire_model.refresh(changed)
+        if not self.desire_model.remove(removed):
+            self.show_list_ids([desire_id for desire_id in self.desire_model.ids if desire_id not in removed])
+        self.desire_model.append(added)
+        self.on_selection_changed()
+        
+    def show_list_ids(self, ids):
+        """替换列表中的全部需求，仍在列表中的需求保持选中"""
+        selected = self.selected_ids()
+        self.desire_model.set_ids(ids)
+        if selected:
+            self.select_ids(selected)
         
-        self.desire_list.clear()
-        
-        for desire_id, desire in self.desires.items():
-            # 应用筛选条件
-            if category_filter != "全部" and desire['category'] != category_filter:
-                continue
-            if priority_filter != "全部" and desire['priority'] != priority_filter:
-                continue
-                
-            item_widget = self.create_desire_item(desire_id, desire)
-            list_item = QListWidgetItem()
-            list_item.setSizeHint(item_widget.sizeHint())
-            self.desire_list.addItem(list_item)
-            self.desire_list.setItemWidget(list_item, item_widget)
+    def export_report(self):
+        """导出详细报告（在后台线程中对当前数据的快照生成，期间可以继续编辑）"""
+        if not self.desires:
+            QMessageBox.warning(self, "警告", "没有可导出的数据")
+            return
             
-        self.update_statistics()
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "导出报告", f"desire_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt", 
+            "Text Files (*.txt)"
+        )
         
-    def export_report(self):
-        """导出详细报告"""
-        try:
-            if not self.desires:
-                QMessageBox.warning(self, "警告", "没有可导出的数据")
-                return
-                
-            filename, _ = QFileDialog.getSaveFileName(
-                self, "导出报告", f"desire_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt", 
-                "Text Files (*.txt)"
+        if filename:
+            snapshot = self.snapshot()
+            converter = CurrencyConverter(self.rates, self.converter.reporting)
+            budget_goal = self.budget_goal
+            self.run_task(
+                lambda: write_report(filename, snapshot.desires, snapshot.columns(), converter, budget_goal),
+                lambda _: QMessageBox.information(self, "成功", f"报告已导出到: {filename}"),
+                lambda message: QMessageBox.critical(self, "错误", f"导出失败: {message}"),
             )
             
-            if filename:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("需求计算器详细报告\n")
-                    f.write("=" * 50 + "\n\n")
-                    
-                    # 总体统计
-                    monthly_total = 0
-                    yearly_total = 0
-                    category_totals = {}
-                    priority_counts = {"低": 0, "中": 0, "高": 0, "必需": 0}
-                    
-                    # 计算统计
-                    for desire in self.desires.values():
-                        if not desire['enabled']:
-                            continue
-                            
-                        cost = desire['cost']
-                        frequency = desire['frequency']
-                        category = desire['category']
-                        priority = desire['priority']
-                        
-                        # 计算月度花销
-                        if frequency == "每天":
-                            monthly_cost = cost * 30
-                        elif frequency == "每周":
-                            monthly_cost = cost * 4.33
-                        elif frequency == "每月":
-                            monthly_cost = cost
-                        elif frequency == "每季度":
-                            monthly_cost = cost / 3
-                        elif frequency == "每年":
-                            monthly_cost = cost / 12
-                        else:
-                            monthly_cost = 0
-                            
-                        monthly_total += monthly_cost
-                        
-                        if category not in category_totals:
-                            category_totals[category] = 0
-                        category_totals[category] += monthly_cost
-                        
-                        if priority in priority_counts:
-                            priority_counts[priority] += 1
-                    
-                    yearly_total = monthly_total * 12
-                    
-                    # 写入报告
-                    f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                    
-                    f.write("【总体统计】\n")
-                    f.write(f"月度总花销: ¥{monthly_total:.2f}\n")
-                    f.write(f"年度总花销: ¥{yearly_total:.2f}\n")
-                    if self.budget_goal > 0:
-                        f.write(f"预算目标: ¥{self.budget_goal:.2f}\n")
-                        f.write(f"预算使用率: {min(100, int((monthly_total / self.budget_goal) * 100))}%\n")
-                    f.write("\n")
-                    
-                    f.write("【按类别统计】\n")
-                    for category, total in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
-                        f.write(f"{category}: ¥{total:.2f}\n")
-                    f.write("\n")
-                    
-                    f.write("【按优先级统计】\n")
-                    for priority, count in priority_counts.items():
-                        f.write(f"{priority}优先级: {count}个需求\n")
-                    f.write("\n")
-                    
-                    f.write("【详细需求列表】\n")
-                    for desire_id, desire in sorted(self.desires.items(), 
-                                                   key=lambda x: x[1]['priority']):
-                        status = "启用" if desire['enabled'] else "禁用"
-                        frequency = desire['frequency']
-                        cost = desire['cost']
-                        
-                        # 计算月度花销
-                        if frequency == "每天":
-                            monthly_cost = cost * 30
-                        elif frequency == "每周":
-                            monthly_cost = cost * 4.33
-                        elif frequency == "每月":
-                            monthly_cost = cost
-                        elif frequency == "每季度":
-                            monthly_cost = cost / 3
-                        elif frequency == "每年":
-                            monthly_cost = cost / 12
-                        else:
-                            monthly_cost = 0
-                            
-                        f.write(f"- {desire['name']} ({status})\n")
-                        f.write(f"  频率: {frequency}\n")
-                        f.write(f"  单次花销: ¥{cost:.2f}\n")
-                        f.write(f"  月度花销: ¥{monthly_cost:.2f}\n")
-                        f.write(f"  优先级: {desire['priority']}\n")
-                        f.write(f"  类别: {desire['category']}\n")
-                        f.write("\n")
-                
-                QMessageBox.information(self, "成功", f"报告已导出到: {filename}")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
-        
     def update_display(self):
         """更新需求列表显示"""
         self.filter_desires()
@@ -850,62 +1597,696 @@ class DesireCalculator(QMainWindow):
             )
             
             if reply == QMessageBox.Yes:
-                del self.desires[desire_id]
-                self.update_display()
+                self.store.remove(desire_id)
                 
-    def update_statistics(self):
-        """更新统计信息"""
-        monthly_total = 0
-        
-        # 按类别统计
-        category_totals = {}
-        priority_counts = {"低": 0, "中": 0, "高": 0, "必需": 0}
+    def update_statistics(self, filtered=None):
+        """更新统计信息（filtered 为已查询的当前筛选结果）"""
+        stats = self.converter.statistics(self.columns())
+        if self.shards is not None and self.shards.unloaded():
+            # 未读入的类别的统计来自分片清单
+            stats = combine_statistics(stats, self.shards.statistics(self.converter, self.shards.unloaded()))
+        self.show_statistics(stats)
+        if self.current_filter() == (None, None):
+            self.filter_summary_label.setVisible(False)
+        else:
+            stats = (filtered or self.filtered())['stats']
+            symbol = currency_symbol(stats['currency'])
+            self.filter_summary_label.setText(
+                f"筛选结果: {stats['count']} 个需求（{stats['enabled_count']} 个启用），"
+                f"月度 {symbol}{stats['monthly_total']:.2f}"
+            )
+            self.filter_summary_label.setVisible(True)
+        self.show_cache_counters()
+        
+    def show_cache_counters(self):
+        """在状态栏显示筛选缓存的命中/未命中次数"""
+        counters = self.filter_cache.counters()
+        self.cache_status_label.setText(
+            f"筛选缓存: 命中 {counters['hits']} / 未命中 {counters['misses']}（{counters['entries']} 条）"
+        )
         
-        for desire in self.desires.values():
-            if not desire['enabled']:
-                continue
-                
-            cost = desire['cost']
-            frequency = desire['frequency']
-            category = desire['category']
-            priority = desire['priority']
-            
-            # 计算月度花销
-            if frequency == "每天":
-                monthly_cost = cost * 30
-            elif frequency == "每周":
-                monthly_cost = cost * 4.33  # 52/12
-            elif frequency == "每月":
-                monthly_cost = cost
-            elif frequency == "每季度":
-                monthly_cost = cost / 3
-            elif frequency == "每年":
-                monthly_cost = cost / 12
-            else:
-                monthly_cost = 0
+    @property
+    def desires(self):
+        """当前需求（只读视图，修改请通过 self.store）"""
+        return self.store.desires
+        
+    def on_store_changed(self, changes):
+        """数据变化（一次事务只调用一次）：更新预算并刷新一次界面"""
+        if self.sync is not None and not self._applying_remote:
+            self.publish_changes(changes)
+        if changes is None:
+            self.filter_cache.clear()
+            self.budget_monitor.reset(self.desires, self.columns())
+            self.scheduler.reset(self.desires)
+            self.update_display()
+        else:
+            self.budget_monitor.apply([(old, new) for _, old, new in changes])
+            self.scheduler.apply(changes)
+            # 只更新变化的条目与列，不重建整个列表
+            if self._columns is not None and self._columns.version == self.store.version - 1:
+                self._columns = self._columns.apply_changes(changes, self.store.version)
+            self.filter_cache.advance(changes, self.store.version)
+            self.update_list_items(changes)
+            self.update_statistics()
+        if self.reminder_timer.isActive():
+            self.check_reminders()
+        
+    def columns(self):
+        """当前数据的列式表示（按数据版本缓存）"""
+        if self._columns is None or self._columns.version != self.store.version:
+            self._columns = DesireColumns.from_desires(self.desires, self.store.version)
+        return self._columns
+        
+    def show_upcoming(self):
+        """显示即将到来的付款"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Upcoming Payments")
+        dialog.resize(520, 480)
+        layout = QVBoxLayout(dialog)
+        
+        payment_list = QListWidget()
+        for payment in self.scheduler.upcoming(UPCOMING_COUNT):
+            payment_list.addItem(format_payment(payment))
+        layout.addWidget(payment_list)
+        
+        # 未来一段时间内按币种汇总
+        totals = {}
+        for payment in self.scheduler.within(UPCOMING_DAYS):
+            totals[payment['currency']] = totals.get(payment['currency'], 0) + payment['cost']
+        summary = "，".join(f"{currency_symbol(currency)}{total:.2f}" for currency, total in totals.items())
+        summary_label = QLabel(f"未来{UPCOMING_DAYS}天需支付: {summary or '无'}")
+        layout.addWidget(summary_label)
+        if self.scheduler.unscheduled:
+            layout.addWidget(QLabel(f"{len(self.scheduler.unscheduled)} 个启用的需求未设置开始日期"))
+            
+        remind_cb = QCheckBox(f"提醒{self.reminders.days}天内到期的付款")
+        remind_cb.setChecked(self.reminder_timer.isActive())
+        remind_cb.toggled.connect(self.set_reminders_enabled)
+        layout.addWidget(remind_cb)
+        
+        dialog.exec_()
+        
+    def show_forecast(self):
+        """现金流与余额预测"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Cash-flow Forecast")
+        dialog.resize(640, 560)
+        layout = QVBoxLayout(dialog)
+        
+        form = QGridLayout()
+        balance_spin = QDoubleSpinBox()
+        balance_spin.setRange(-1e12, 1e12)
+        balance_spin.setDecimals(2)
+        income_spin = QDoubleSpinBox()
+        income_spin.setRange(0, 1e12)
+        income_spin.setDecimals(2)
+        years_spin = QSpinBox()
+        years_spin.setRange(1, 50)
+        years_spin.setValue(DEFAULT_YEARS)
+        inflation_spin = QDoubleSpinBox()
+        inflation_spin.setRange(-50, 100)
+        inflation_spin.setSuffix(" %")
+        category_edit = QLineEdit()
+        category_edit.setPlaceholderText("e.g., Housing=5, Food=3")
+        for row, (text, field) in enumerate((("Starting Balance", balance_spin),
+                                             ("Monthly Income", income_spin),
+                                             ("Years", years_spin),
+                                             ("Annual Inflation", inflation_spin),
+                                             ("Category Inflation (%)", category_edit))):
+            form.addWidget(QLabel(text), row, 0)
+            form.addWidget(field, row, 1)
+        layout.addLayout(form)
+        
+        run_btn = QPushButton("Run Forecast")
+        layout.addWidget(run_btn)
+        chart = TrendChart(placeholder="点击 Run Forecast 查看余额曲线")
+        chart.setMinimumHeight(180)
+        layout.addWidget(chart)
+        summary = QTextEdit()
+        summary.setReadOnly(True)
+        layout.addWidget(summary)
+        
+        def run():
+            try:
+                category_inflation = dict(
+                    parse_category_rate(part.strip()) for part in category_edit.text().split(",")
+                    if part.strip()
+                )
+            except ValueError as e:
+                QMessageBox.warning(dialog, "错误", str(e))
+                return
+            # 在后台线程对当前数据的快照计算，计算期间可以继续编辑
+            snapshot = self.snapshot()
+            converter = CurrencyConverter(self.rates, self.converter.reporting)
+            options = dict(
+                balance=balance_spin.value(), income=income_spin.value(),
+                inflation=inflation_spin.value() / 100,
+                category_inflation={key: rate / 100 for key, rate in category_inflation.items()},
+            )
+            years = years_spin.value()
+            run_btn.setEnabled(False)
+            self.run_task(
+                lambda: forecast(snapshot.desires, years, converter=converter, columns=snapshot.columns(),
+                                 **options),
+                show, failed,
+            )
+            
+        def show(result):
+            run_btn.setEnabled(True)
+            # 按月末余额绘制
+            chart.set_series([(index, row['end_balance']) for index, row in enumerate(result['months'])],
+                             currency_symbol(result['currency']))
+            summary.setPlainText(format_forecast(result))
+            
+        def failed(message):
+            run_btn.setEnabled(True)
+            QMessageBox.warning(dialog, "错误", f"预测失败: {message}")
+            
+        run_btn.clicked.connect(run)
+        dialog.exec_()
+        
+    def show_pivot(self):
+        """交叉分析：按任意两个维度汇总月度花销、数量、均值与占比"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Pivot")
+        dialog.resize(760, 480)
+        layout = QVBoxLayout(dialog)
+        
+        controls = QHBoxLayout()
+        rows_combo = QComboBox()
+        cols_combo = QComboBox()
+        cols_combo.addItem("(None)", None)
+        for label, name in PIVOT_DIMENSIONS.items():
+            rows_combo.addItem(label, name)
+            cols_combo.addItem(label, name)
+        cols_combo.setCurrentText("Priority")
+        measure_combo = QComboBox()
+        for label, name in PIVOT_MEASURES.items():
+            measure_combo.addItem(label, name)
+        enabled_cb = QCheckBox("Enabled only")
+        enabled_cb.setChecked(True)
+        for text, widget in (("Rows", rows_combo), ("Columns", cols_combo), ("Value", measure_combo)):
+            controls.addWidget(QLabel(text))
+            controls.addWidget(widget)
+        controls.addWidget(enabled_cb)
+        controls.addStretch()
+        export_btn = QPushButton("Export CSV")
+        controls.addWidget(export_btn)
+        layout.addLayout(controls)
+        
+        table_widget = QTableWidget()
+        table_widget.setEditTriggers(QTableWidget.NoEditTriggers)
+        table_widget.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(table_widget)
+        
+        def current():
+            # 结果按数据版本缓存，切换维度或重复打开时不重新计算
+            return self.pivots.crosstab(self.columns(), rows_combo.currentData(), cols_combo.currentData(),
+                                        enabled_cb.isChecked())
+            
+        def refresh():
+            table = current()
+            measure = measure_combo.currentData()
+            grid = values(table, measure)
+            symbol = currency_symbol(table['currency'])
+            table_widget.clear()
+            table_widget.setRowCount(len(table['row_labels']))
+            table_widget.setColumnCount(len(table['column_labels']))
+            table_widget.setHorizontalHeaderLabels(table['column_labels'])
+            table_widget.setVerticalHeaderLabels(table['row_labels'])
+            bold = QFont()
+            bold.setBold(True)
+            for row, line in enumerate(grid):
+                for column, value in enumerate(line):
+                    cell = QTableWidgetItem(format_value(value, measure, symbol))
+                    cell.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    if (table['row_labels'][row] == TOTAL_LABEL
+                            or table['column_labels'][column] == TOTAL_LABEL):
+                        cell.setFont(bold)
+                    table_widget.setItem(row, column, cell)
+            missing = table['missing_rates']
+            dialog.setWindowTitle(f"Pivot（缺少汇率未计入: {', '.join(missing)}）" if missing else "Pivot")
                 
-            monthly_total += monthly_cost
+        def export():
+            filename, _ = QFileDialog.getSaveFileName(dialog, "导出交叉表", "pivot.csv", "CSV Files (*.csv)")
+            if not filename:
+                return
+            try:
+                with open(filename, 'w', encoding='utf-8', newline='') as f:
+                    write_csv(current(), measure_combo.currentData(), f)
+            except OSError as e:
+                QMessageBox.critical(dialog, "错误", f"导出失败: {str(e)}")
+                return
+            QMessageBox.information(dialog, "成功", f"交叉表已导出到: {filename}")
+            
+        for combo in (rows_combo, cols_combo, measure_combo):
+            combo.currentIndexChanged.connect(refresh)
+        enabled_cb.toggled.connect(refresh)
+        export_btn.clicked.connect(export)
+        refresh()
+        dialog.exec_()
+        
+    def show_sensitivity(self):
+        """敏感性分析：在参数网格上计算月度花销并以热力图显示"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Sensitivity Analysis")
+        dialog.resize(720, 640)
+        layout = QVBoxLayout(dialog)
+        
+        layout.addWidget(QLabel("Parameters (one per line)"))
+        axes_edit = QTextEdit()
+        axes_edit.setAcceptRichText(False)
+        axes_edit.setPlainText(SENSITIVITY_EXAMPLE)
+        axes_edit.setMaximumHeight(90)
+        layout.addWidget(axes_edit)
+        
+        controls = QHBoxLayout()
+        years_spin = QSpinBox()
+        years_spin.setRange(1, 50)
+        controls.addWidget(QLabel("Years"))
+        controls.addWidget(years_spin)
+        controls.addStretch()
+        run_btn = QPushButton("Run")
+        controls.addWidget(run_btn)
+        export_btn = QPushButton("Export CSV")
+        export_btn.setEnabled(False)
+        controls.addWidget(export_btn)
+        layout.addLayout(controls)
+        
+        chart = HeatmapChart()
+        layout.addWidget(chart)
+        summary = QTextEdit()
+        summary.setReadOnly(True)
+        layout.addWidget(summary)
+        results = {}
+        
+        def run():
+            try:
+                axes = [parse_axis(line.strip()) for line in axes_edit.toPlainText().splitlines()
+                        if line.strip()]
+            except ValueError as e:
+                QMessageBox.warning(dialog, "错误", str(e))
+                return
+            if not axes:
+                QMessageBox.warning(dialog, "错误", "请至少输入一个参数")
+                return
+            # 在后台线程对当前数据的快照计算，计算期间可以继续编辑
+            snapshot = self.snapshot()
+            converter = CurrencyConverter(self.rates, self.converter.reporting)
+            years = years_spin.value()
+            run_btn.setEnabled(False)
+            self.run_task(lambda: sweep(snapshot.columns(), axes, converter, years), show, failed)
+            
+        def show(result):
+            run_btn.setEnabled(True)
+            export_btn.setEnabled(True)
+            results['last'] = result
+            chart.set_grid(*heatmap(result, relative=True))
+            summary.setPlainText(format_sweep(result))
+            
+        def failed(message):
+            run_btn.setEnabled(True)
+            QMessageBox.warning(dialog, "错误", f"敏感性分析失败: {message}")
+            
+        def export():
+            filename, _ = QFileDialog.getSaveFileName(dialog, "导出敏感性分析", "sensitivity.csv",
+                                                      "CSV Files (*.csv)")
+            if not filename:
+                return
+            try:
+                with open(filename, 'w', encoding='utf-8', newline='') as f:
+                    write_sweep_csv(results['last'], f)
+            except OSError as e:
+                QMessageBox.critical(dialog, "错误", f"导出失败: {str(e)}")
+                return
+            QMessageBox.information(dialog, "成功", f"敏感性分析已导出到: {filename}")
+            
+        run_btn.clicked.connect(run)
+        export_btn.clicked.connect(export)
+        dialog.exec_()
+        
+    def show_duplicates(self):
+        """查找完全相同与近似重复的需求，勾选的分组一键合并"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Duplicates")
+        dialog.resize(820, 560)
+        layout = QVBoxLayout(dialog)
+        
+        controls = QHBoxLayout()
+        similarity_spin = QDoubleSpinBox()
+        similarity_spin.setRange(0.5, 1.0)
+        similarity_spin.setSingleStep(0.05)
+        similarity_spin.setValue(NAME_SIMILARITY)
+        exact_cb = QCheckBox("Exact only")
+        find_btn = QPushButton("Find")
+        merge_btn = QPushButton("Merge Selected")
+        merge_btn.setEnabled(False)
+        controls.addWidget(QLabel("Name Similarity"))
+        controls.addWidget(similarity_spin)
+        controls.addWidget(exact_cb)
+        controls.addStretch()
+        controls.addWidget(find_btn)
+        controls.addWidget(merge_btn)
+        layout.addLayout(controls)
+        
+        summary_label = QLabel("")
+        layout.addWidget(summary_label)
+        table = QTableWidget()
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setColumnCount(6)
+        table.setHorizontalHeaderLabels(["Merge", "Action", "Name", "Frequency", "Cost", "Monthly Impact"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(table)
+        found = {}
+        
+        def find():
+            # 在后台线程对当前数据的快照查找，查找期间可以继续编辑
+            snapshot = self.snapshot()
+            converter = CurrencyConverter(self.rates, self.converter.reporting)
+            similarity, exact = similarity_spin.value(), exact_cb.isChecked()
+            find_btn.setEnabled(False)
+            merge_btn.setEnabled(False)
+            summary_label.setText("正在查找...")
+            self.run_task(
+                lambda: find_duplicates(snapshot.desires, converter, similarity, exact_only=exact),
+                lambda result: show(snapshot.desires, result),
+                failed,
+            )
+            
+        def show(desires, result):
+            find_btn.setEnabled(True)
+            groups = result['groups'][:DUPLICATE_DISPLAY_LIMIT]
+            rows = []
+            found.update(desires=desires, groups=groups, rows=rows)
+            symbol = currency_symbol(result['currency'])
+            text = (f"{len(result['groups'])} 组重复，{result['duplicates']} 个重复项"
+                    f"（{result['exact']} 个完全相同），全部合并后月度花销减少 {symbol}{result['impact']:.2f}")
+            if len(groups) < len(result['groups']):
+                text += f"；列出影响最大的 {len(groups)} 组"
+            summary_label.setText(text)
+            table.setRowCount(sum(1 + len(group['duplicates']) for group in groups))
+            row = 0
+            for group in groups:
+                for index, desire_id in enumerate([group['keep']] + group['duplicates']):
+                    desire = desires[desire_id]
+                    cells = ["" if index else ("完全相同" if group['kind'] == "exact" else "近似"),
+                             "Remove" if index else "Keep", desire['name'],
+                             desire['frequency'],
+                             f"{currency_symbol(desire.get('currency', DEFAULT_CURRENCY))}{desire['cost']:.2f}",
+                             "" if index else f"-{symbol}{group['impact']:.2f}"]
+                    for column, cell in enumerate(cells):
+                        table.setItem(row, column, QTableWidgetItem(cell))
+                    if not index:
+                        # 每组第一行的勾选框决定是否合并该组
+                        table.item(row, 0).setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+                        table.item(row, 0).setCheckState(Qt.Checked)
+                        rows.append(row)
+                    row += 1
+            merge_btn.setEnabled(bool(groups))
+            
+        def failed(message):
+            find_btn.setEnabled(True)
+            summary_label.setText("")
+            QMessageBox.warning(dialog, "错误", f"查找重复需求失败: {message}")
             
-            # 按类别累计
-            if category not in category_totals:
-                category_totals[category] = 0
-            category_totals[category] += monthly_cost
+        def merge():
+            selected = [group for group, row in zip(found['groups'], found['rows'])
+                        if table.item(row, 0).checkState() == Qt.Checked]
+            removed = self.merge_duplicates(found['desires'], selected)
+            self.statusBar().showMessage(f"已合并 {len(selected)} 组重复需求，删除 {removed} 个", 10000)
+            find()
             
-            # 按优先级计数
-            if priority in priority_counts:
-                priority_counts[priority] += 1
+        find_btn.clicked.connect(find)
+        merge_btn.clicked.connect(merge)
+        find()
+        dialog.exec_()
+        
+    def merge_duplicates(self, desires, groups):
+        """
+        合并重复分组：在一次事务中删除各组的重复项，返回删除的数量
+        
+        desires 为查找时的数据；之后被修改或删除的需求保持不变。
+        """
+        removed = 0
+        with self.store.transaction():
+            for desire_id, desire, _ in merge_changes(desires, groups):
+                if self.desires.get(desire_id) == desire:
+                    self.store.remove(desire_id)
+                    removed += 1
+        return removed
+        
+    def show_scenarios(self):
+        """情景：把未保存的修改存为命名情景，并排比较各情景的统计"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Scenarios")
+        dialog.resize(760, 480)
+        layout = QVBoxLayout(dialog)
+        
+        controls = QHBoxLayout()
+        capture_btn = QPushButton("Save Changes as Scenario")
+        scenario_combo = QComboBox()
+        apply_btn = QPushButton("Apply")
+        delete_btn = QPushButton("Delete")
+        controls.addWidget(capture_btn)
+        controls.addStretch()
+        controls.addWidget(QLabel("Scenario"))
+        controls.addWidget(scenario_combo)
+        controls.addWidget(apply_btn)
+        controls.addWidget(delete_btn)
+        layout.addLayout(controls)
+        
+        table_widget = QTableWidget()
+        table_widget.setEditTriggers(QTableWidget.NoEditTriggers)
+        table_widget.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(table_widget)
+        
+        def refresh():
+            # 情景的统计为基准统计加上覆盖部分的变化，只计算有覆盖的需求
+            stats = self.converter.statistics(self.columns())
+            rows = compare(self.scenarios, self.desires, stats, self.converter)
+            table = comparison_table(rows, currency_symbol(stats['currency']))
+            table_widget.clear()
+            table_widget.setRowCount(len(table) - 1)
+            table_widget.setColumnCount(len(rows))
+            table_widget.setHorizontalHeaderLabels(table[0][1:])
+            table_widget.setVerticalHeaderLabels([line[0] for line in table[1:]])
+            for row, line in enumerate(table[1:]):
+                for column, text in enumerate(line[1:]):
+                    cell = QTableWidgetItem(text)
+                    cell.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    table_widget.setItem(row, column, cell)
+            current = scenario_combo.currentText()
+            scenario_combo.clear()
+            scenario_combo.addItems([scenario.name for scenario in self.scenarios])
+            scenario_combo.setCurrentText(current)
+            apply_btn.setEnabled(len(self.scenarios) > 0)
+            delete_btn.setEnabled(len(self.scenarios) > 0)
+            
+        def capture():
+            if self.saved_desires is None:
+                QMessageBox.warning(dialog, "警告", "请先保存或加载数据文件，情景保存相对文件内容的修改")
+                return
+            scenario = Scenario.from_diff("", self.saved_desires, self.desires)
+            if not len(scenario):
+                QMessageBox.information(dialog, "提示", "没有未保存的修改")
+                return
+            name, ok = QInputDialog.getText(dialog, "保存情景", "情景名称:",
+                                            text=scenario_combo.currentText())
+            name = name.strip()
+            if not ok or not name:
+                return
+            scenario.name = name
+            self.scenarios.add(scenario)
+            # 修改移入情景后恢复为文件中的内容
+            with self.store.transaction():
+                for desire_id in scenario.touched():
+                    desire = self.saved_desires.get(desire_id)
+                    if desire is None:
+                        self.store.remove(desire_id)
+                    else:
+                        self.store.add(desire_id, desire)
+            self.save_scenario_config()
+            scenario_combo.setCurrentText(name)
+            refresh()
+            
+        def apply():
+            scenario = self.scenarios.get(scenario_combo.currentText())
+            # 应用后情景的内容成为未保存的修改，可以继续编辑后再次存为情景
+            with self.store.transaction():
+                for desire_id, _, new in scenario.changes(self.desires):
+                    if new is None:
+                        self.store.remove(desire_id)
+                    else:
+                        self.store.add(desire_id, new)
+            refresh()
+            
+        def delete():
+            self.scenarios.remove(scenario_combo.currentText())
+            self.save_scenario_config()
+            refresh()
+            
+        capture_btn.clicked.connect(capture)
+        apply_btn.clicked.connect(apply)
+        delete_btn.clicked.connect(delete)
+        refresh()
+        dialog.exec_()
+        
+    def show_compare(self):
+        """与另一个需求文件比较，并可合并到当前数据"""
+        filename, _ = QFileDialog.getOpenFileName(self, "比较文件", "", FILE_FILTER)
+        if not filename:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            other = load_desire_file(filename)
+            diff = diff_desires(self.desires, other, self.converter,
+                                self.converter.statistics(self.columns()))
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"比较失败: {str(e)}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+            
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Compare with {os.path.basename(filename)}")
+        dialog.resize(640, 520)
+        layout = QVBoxLayout(dialog)
+        details = QTextEdit()
+        details.setReadOnly(True)
+        details.setPlainText(format_diff(diff, self.desires, other))
+        layout.addWidget(details)
+        
+        # 以上次加载/保存的内容为共同基准做三方合并，没有基准时为双方合并
+        merge_bar = QHBoxLayout()
+        prefer_combo = QComboBox()
+        prefer_combo.addItem("On conflict: keep mine", "ours")
+        prefer_combo.addItem("On conflict: take theirs", "theirs")
+        merge_bar.addWidget(prefer_combo)
+        merge_btn = QPushButton("Merge into Current")
+        merge_btn.setEnabled(bool(diff['added'] or diff['removed'] or diff['changed']))
+        merge_bar.addWidget(merge_btn)
+        layout.addLayout(merge_bar)
+        
+        def merge():
+            result = merge_desires(self.desires, other, self.saved_desires, prefer_combo.currentData())
+            # 只应用变化的需求，一次事务只刷新一次
+            with self.store.transaction():
+                for desire_id, _, new in result['changes']:
+                    if new is None:
+                        self.store.remove(desire_id)
+                    else:
+                        self.store.add(desire_id, new)
+            message = f"已合并 {len(result['changes'])} 个需求的变化"
+            if result['conflicts']:
+                message += f"，{len(result['conflicts'])} 个冲突:\n" + "\n".join(
+                    format_conflict(conflict) for conflict in result['conflicts'][:20])
+            QMessageBox.information(dialog, "合并完成", message)
+            dialog.accept()
+            
+        merge_btn.clicked.connect(merge)
+        dialog.exec_()
+        
+    def set_reminders_enabled(self, enabled):
+        """开启/关闭到期提醒"""
+        if enabled:
+            self.reminder_timer.start()
+            self.check_reminders()
+        else:
+            self.reminder_timer.stop()
+            
+    def check_reminders(self):
+        """在状态栏提示新进入提醒范围的付款"""
+        due = self.reminders.check()
+        if due:
+            self.statusBar().showMessage("即将付款: " + "；".join(format_payment(p) for p in due[:5])
+                                         + (f" 等{len(due)}笔" if len(due) > 5 else ""), 30000)
+            
+    def selected_ids(self):
+        """列表中选中的需求ID（按列表顺序）"""
+        ids = self.desire_model.ids
+        return [ids[row] for row in sorted(index.row() for index in self.desire_list.selectionModel().selectedRows())]
+        
+    def select_ids(self, desire_ids):
+        """选中列表中的指定需求（连续的行合并为一个选择区间）"""
+        rows = self.desire_model.row_index()
+        selection = QItemSelection()
+        for first, last in row_runs(sorted(rows[desire_id] for desire_id in desire_ids if desire_id in rows)):
+            selection.select(self.desire_model.index(first), self.desire_model.index(last))
+        self.desire_list.selectionModel().select(selection, QItemSelectionModel.Select)
+        
+    def on_selection_changed(self):
+        count = len(self.desire_list.selectionModel().selectedRows())
+        self.selection_label.setText(f"{count} selected")
+        for button in self.batch_buttons:
+            button.setEnabled(count > 0)
+            
+    def batch_set_enabled(self, enabled):
+        """批量启用/禁用选中需求"""
+        self.store.update_many(self.selected_ids(), enabled=enabled)
+        
+    def batch_set_category(self):
+        """批量修改选中需求的类别"""
+        labels = list(CATEGORY_LABELS)
+        choice, ok = QInputDialog.getItem(self, "Batch Edit", "Category:", labels, 0, False)
+        if ok:
+            self.store.update_many(self.selected_ids(), category=CATEGORY_LABELS[choice])
+            
+    def batch_set_priority(self):
+        """批量修改选中需求的优先级"""
+        labels = list(PRIORITY_LABELS)
+        choice, ok = QInputDialog.getItem(self, "Batch Edit", "Priority:", labels, 0, False)
+        if ok:
+            self.store.update_many(self.selected_ids(), priority=PRIORITY_LABELS[choice])
+            
+    def batch_scale_cost(self):
+        """按比例调整选中需求的花销"""
+        factor, ok = QInputDialog.getDouble(self, "Batch Edit", "Scale cost by:", 1.0, 0.01, 100.0, 2)
+        if ok:
+            try:
+                self.store.scale_cost(self.selected_ids(), factor)
+            except ValueError as e:
+                QMessageBox.warning(self, "错误", str(e))
+                
+    def batch_delete(self):
+        """批量删除选中需求（只确认一次）"""
+        ids = self.selected_ids()
+        if not ids:
+            return
+        reply = QMessageBox.question(
+            self, "确认删除",
+            f"确定要删除选中的 {len(ids)} 个需求吗？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.store.remove_many(ids)
+        
+    def set_reporting_currency(self, currency):
+        """切换报告币种，统计和预算都按新币种重新计算"""
+        self.converter.set_reporting(currency)
+        self.budget_monitor.reset(self.desires, self.columns())
+        self.apply_total_budget()
+        self.update_statistics()
         
-        yearly_total = monthly_total * 12
+    def show_statistics(self, stats):
+        """显示统计结果（可来自实时计算或统计缓存）"""
+        monthly_total = stats['monthly_total']
+        yearly_total = stats['yearly_total']
+        symbol = currency_symbol(stats.get('currency', DEFAULT_CURRENCY))
         
         # 更新显示
-        self.monthly_label.setText(f"月度总花销: ¥{monthly_total:.2f}")
-        self.yearly_label.setText(f"年度总花销: ¥{yearly_total:.2f}")
+        self.monthly_label.setText(f"月度总花销: {symbol}{monthly_total:.2f}")
+        self.yearly_label.setText(f"年度总花销: {symbol}{yearly_total:.2f}")
+        self.update_dashboard(stats)
+        if stats.get('missing_rates'):
+            self.statusBar().showMessage(
+                f"缺少汇率，以下币种未计入统计: {', '.join(stats['missing_rates'])}", 10000
+            )
         
         # 更新预算进度
         if self.budget_goal > 0:
             budget_percentage = min(100, int((monthly_total / self.budget_goal) * 100))
             self.budget_progress.setValue(budget_percentage)
-            self.budget_progress.setFormat(f"{budget_percentage}% ({monthly_total:.0f}/¥{self.budget_goal:.0f})")
+            self.budget_progress.setFormat(f"{budget_percentage}% ({monthly_total:.0f}/{symbol}{self.budget_goal:.0f})")
             
             # 根据进度设置颜色
             if budget_percentage <= 80:
@@ -914,47 +2295,509 @@ class DesireCalculator(QMainWindow):
                 self.budget_progress.setStyleSheet("QProgressBar::chunk { background-color: #f39c12; }")
             else:
                 self.budget_progress.setStyleSheet("QProgressBar::chunk { background-color: #e74c3c; }")
+                
+        # 类别/优先级预算使用增量维护的累计值，不需要重新遍历需求
+        details = [
+            f"{budget_label(status['scope'], status['key'])}: "
+            f"{symbol}{status['used']:.0f}/{symbol}{status['limit']:.0f} ({LEVEL_NAMES[status['level']]})"
+            for status in self.budget_monitor.statuses() if status['scope'] != "total"
+        ]
+        self.budget_details_label.setText("\n".join(details))
+        self.budget_details_label.setVisible(bool(details))
+        
+    def update_dashboard(self, stats):
+        """由统计结果更新仪表板，汇总值未变化的图表不重绘"""
+        symbol = currency_symbol(stats.get('currency', DEFAULT_CURRENCY))
+        totals = sorted(stats['category_totals'].items(), key=lambda item: -item[1])
+        self.category_chart.set_bars([(CATEGORY_DISPLAY.get(category, category), value)
+                                      for category, value in totals], symbol)
+        self.priority_chart.set_bars([(PRIORITY_DISPLAY.get(priority, priority), count)
+                                      for priority, count in stats['priority_counts'].items()])
         
     def save_desires(self):
         """保存需求数据"""
         try:
             filename, _ = QFileDialog.getSaveFileName(
-                self, "保存数据", "desires.json", "JSON Files (*.json)"
+                self, "保存数据", "desires.json",
+                "JSON Files (*.json);;Compressed JSON (*.json.gz *.json.xz *.json.zst);;"
+                f"Sharded Directory (*{SHARDS_SUFFIX})"
             )
             if filename:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(self.desires, f, ensure_ascii=False, indent=2)
-                QMessageBox.information(self, "成功", f"数据已保存到 {filename}")
+                if self.saver is not None:
+                    QMessageBox.warning(self, "警告", "上一次保存尚未完成")
+                    return
+                sharded = filename.endswith(SHARDS_SUFFIX)
+                if not sharded and self.shards is not None and self.shards.unloaded():
+                    QMessageBox.warning(self, "警告", "保存为单个文件前请先加载全部类别（类别筛选选择 All）")
+                    return
+                if sharded and self.shards is not None:
+                    if self.loader is not None:
+                        QMessageBox.warning(self, "警告", "分片尚未读取完成，请稍后保存")
+                        return
+                    self.load_moved_shards()
+                # 在后台线程按扩展名选择压缩格式流式写入当前版本的快照，保存期间可以继续编辑
+                snapshot = self.snapshot()
+                converter = CurrencyConverter(self.rates, self.converter.reporting)
+                if sharded:
+                    # 保存期间可能继续按需读取分片，已读入的类别取保存时的状态
+                    loaded = None if self.shards is None else set(self.shards.loaded)
+                    source = None if self.shards is None else self.shards.path
+                    base = None if self.shards is None else self.saved_desires
+                    save = lambda: save_shard_snapshot(filename, snapshot, converter, loaded, source, base)
+                else:
+                    save = lambda: save_snapshot(filename, snapshot, converter)
+                self.saver = self.run_task(
+                    save,
+                    lambda result: self.on_desires_saved(filename, snapshot, result[1]),
+                    self.on_save_failed,
+                )
         except Exception as e:
             QMessageBox.critical(self, "错误", f"保存失败: {str(e)}")
             
+    def on_desires_saved(self, filename, snapshot, base_stats):
+        """后台保存完成"""
+        self.saver = None
+        # 保存的是快照的内容，之后的修改仍是未保存的修改
+        self.saved_desires = snapshot.desires
+        if filename.endswith(SHARDS_SUFFIX):
+            # 之后继续按分片读写；已读入的类别不变（原来不是分片数据时即为全部类别）
+            shards = ShardSet(filename)
+            shards.loaded = set(shards.categories()) if self.shards is None else set(self.shards.loaded)
+            self.shards = shards
+            self.unwatch_file()
+        else:
+            self.shards = None
+            self.watch_file(filename)
+        
+        # 预算与历史只是附加信息，写入失败不影响保存
+        try:
+            if self.budget_monitor.limits:
+                save_budgets(budgets_path(filename), self.budget_monitor)
+            if len(self.scenarios):
+                save_scenarios(scenarios_path(filename), self.scenarios)
+            self.open_history(filename)
+            if self.history is not None:
+                # 历史始终以基准币种记录，切换报告币种不影响趋势
+                self.history.record(base_stats)
+                self.refresh_trend()
+        except (OSError, ValueError):
+            pass
+        QMessageBox.information(self, "成功", f"数据已保存到 {filename}")
+        
+    def on_save_failed(self, message):
+        """后台保存失败"""
+        self.saver = None
+        QMessageBox.critical(self, "错误", f"保存失败: {message}")
+        
+    def snapshot(self):
+        """当前数据的只读快照，供后台线程使用"""
+        return self.store.snapshot(self._columns)
+        
+    def run_task(self, func, on_done, on_failed):
+        """在后台线程中执行 func，完成后在主线程调用 on_done(结果) 或 on_failed(错误信息)"""
+        task = BackgroundTask(func, self)
+        task.done.connect(on_done)
+        task.failed.connect(on_failed)
+        task.finished.connect(lambda: self.finish_task(task))
+        self.tasks.add(task)
+        task.start()
+        return task
+        
+    def finish_task(self, task):
+        """后台任务结束后释放线程对象"""
+        self.tasks.discard(task)
+        task.deleteLater()
+        
+    def toggle_sync(self):
+        """连接或断开同步集线器"""
+        if self.sync is not None:
+            self.stop_sync()
+            self.statusBar().showMessage("已断开同步", 5000)
+            return
+        address, ok = QInputDialog.getText(self, "同步", "集线器地址（host:port 或 unix:路径）:",
+                                           text=f"{DEFAULT_HOST}:{DEFAULT_SYNC_PORT}")
+        if ok and address.strip():
+            self.start_sync(address.strip())
+            
+    def start_sync(self, address):
+        """连接同步集线器：先接收集线器中的数据，之后双向交换修改"""
+        try:
+            client = SyncClient(address)
+            client.hello()
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"无法连接同步集线器: {e}")
+            return False
+        self.sync = client
+        self.sync_reader = SyncReader(client, self)
+        self.sync_reader.received.connect(self.on_sync_message)
+        self.sync_reader.finished.connect(self.on_sync_closed)
+        self.sync_reader.start()
+        self.statusBar().showMessage(f"已连接同步集线器 {address}")
+        return True
+        
+    def stop_sync(self):
+        """断开同步"""
+        client, self.sync = self.sync, None
+        if client is not None:
+            client.close()
+            self.sync_reader.wait()
+            
+    def on_sync_message(self, message):
+        """合并集线器转发的修改，只应用时间戳更新的需求"""
+        if self.sync is None:
+            return
+        remote = self.sync.receive(message)
+        if remote:
+            self._applying_remote = True
+            try:
+                with self.store.transaction():
+                    for desire_id, desire in remote:
+                        if desire is None:
+                            if desire_id in self.store:
+                                self.store.remove(desire_id)
+                        elif self.desires.get(desire_id) != desire:
+                            self.store.add(desire_id, desire)
+            finally:
+                self._applying_remote = False
+        if message['type'] == "ready":
+            # 集线器中没有的本地需求作为新增发送（第一个加入的实例提供初始数据）
+            self.publish_changes(self.sync.local_only(self.desires))
+            
+    def publish_changes(self, changes):
+        """发送本地修改；整体替换数据（changes 为 None）时发送相对已同步内容的变化"""
+        try:
+            self.sync.publish(self.sync.state.diff(self.desires) if changes is None else changes)
+        except OSError:
+            self.stop_sync()
+            self.statusBar().showMessage("同步连接已断开", 10000)
+            
+    def on_sync_closed(self):
+        """集线器关闭了连接"""
+        if self.sync is not None:
+            self.sync.close()
+            self.sync = None
+            self.statusBar().showMessage("同步连接已断开", 10000)
+            
+    def closeEvent(self, event):
+        """等待后台任务（保存、导出等）完成后再关闭"""
+        self.stop_sync()
+        for task in list(self.tasks):
+            task.wait()
+        super().closeEvent(event)
+            
     def load_desires(self):
         """加载需求数据"""
         try:
             filename, _ = QFileDialog.getOpenFileName(
-                self, "加载数据", "", "JSON Files (*.json)"
+                self, "加载数据", "", f"{FILE_FILTER};;{SHARDS_FILTER}"
             )
-            if filename:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    loaded_data = json.load(f)
+            if filename and (os.path.basename(filename) == MANIFEST_NAME or os.path.isdir(filename)):
+                self.open_shards(shard_root(filename))
+            elif filename:
+                # 压缩文件按魔数识别，在后台流式解压；未压缩文件直接读入
+                if detect_codec(filename) is None:
+                    with open(filename, 'rb') as f:
+                        data = f.read()
+                    aggregates = read_sidecar(filename, data)
+                else:
+                    data = filename
+                    aggregates = read_sidecar(filename)
                     
-                # 验证并修复数据结构
-                for desire_id, desire in loaded_data.items():
-                    if isinstance(desire, dict):
-                        # 确保所有必需的键都存在
-                        if 'priority' not in desire:
-                            desire['priority'] = '中'
-                        if 'enabled' not in desire:
-                            desire['enabled'] = True
-                        if 'category' not in desire:
-                            desire['category'] = '其他'
-                
-                self.desires = loaded_data
-                self.update_display()
-                QMessageBox.information(self, "成功", f"数据已从 {filename} 加载")
+                # 缓存与文件内容一致时先显示统计，完整解析在后台进行
+                if aggregates is not None and self.sidecar_matches(aggregates['stats']):
+                    self.show_statistics(aggregates['stats'])
+                    
+                self.set_editing_enabled(False)
+                self.loader = DesireLoader(data, self)
+                self.loader.loaded.connect(
+                    lambda desires, report: self.on_desires_loaded(filename, desires, report)
+                )
+                self.loader.failed.connect(self.on_load_failed)
+                self.loader.start()
         except Exception as e:
             QMessageBox.critical(self, "错误", f"加载失败: {str(e)}")
             
+    def open_shards(self, path):
+        """打开分片目录：先由清单显示总计，只在后台读取当前类别筛选需要的分片"""
+        shards = ShardSet(path)
+        category = self.current_filter()[0]
+        categories = shards.needed(category if category in shards.manifest['shards'] else None)
+        self.show_statistics(shards.statistics(self.converter))
+        self.set_editing_enabled(False)
+        self.loader = self.run_task(
+            lambda: shards.read(categories),
+            lambda desires: self.on_shards_opened(shards, categories, desires),
+            self.on_load_failed,
+        )
+        
+    def on_shards_opened(self, shards, categories, desires):
+        """分片目录中需要的分片读取完成"""
+        self.loader = None
+        self.set_editing_enabled(True)
+        self.load_budget_config(shards.path)
+        self.load_scenario_config(shards.path)
+        shards.loaded = set(categories)
+        self.shards = shards
+        self.store.replace(desires)
+        self.saved_desires = dict(desires)
+        self.unwatch_file()
+        self.open_history(shards.path)
+        self.refresh_trend()
+        QMessageBox.information(
+            self, "成功",
+            f"数据已从 {shards.path} 加载（{len(categories)}/{len(shards.manifest['shards'])} 个类别）"
+        )
+        
+    def load_missing_shards(self):
+        """当前类别筛选需要尚未读入的分片时在后台读取，完成后作为新增的需求加入"""
+        if self.shards is None or self.loader is not None:
+            return
+        categories = self.shards.needed(self.current_filter()[0])
+        if not categories:
+            return
+        shards = self.shards
+        self.set_editing_enabled(False)
+        self.loader = self.run_task(
+            lambda: shards.read(categories),
+            lambda desires: self.on_shards_added(shards, categories, desires),
+            self.on_load_failed,
+        )
+        
+    def on_shards_added(self, shards, categories, desires):
+        """按需读取的分片读取完成"""
+        self.loader = None
+        self.set_editing_enabled(True)
+        if shards is not self.shards:
+            return
+        self.add_shard_desires(categories, desires)
+        self.statusBar().showMessage(f"已加载类别: {', '.join(categories)}", 5000)
+        # 读取期间筛选条件可能又变了
+        self.load_missing_shards()
+        
+    def add_shard_desires(self, categories, desires):
+        """读入的分片作为新增的需求加入（内存中已有的需求保持不变）"""
+        self.shards.loaded.update(categories)
+        self.saved_desires = dict(self.saved_desires, **desires)
+        with self.store.transaction():
+            for desire_id, desire in desires.items():
+                if desire_id not in self.desires:
+                    self.store.add(desire_id, desire)
+        
+    def load_moved_shards(self):
+        """
+        保存分片前读入有需求移入、但尚未读入的类别
+        
+        已读入的类别在内存中必须完整：否则保存后该类别的清单统计与内存中的需求重复计算。
+        只读取这些类别的分片，在界面线程中同步完成。
+        """
+        present = {desire['category'] for desire in self.desires.values()}
+        categories = [category for category in self.shards.unloaded() if category in present]
+        if categories:
+            self.add_shard_desires(categories, self.shards.read(categories))
+        
+    def sidecar_matches(self, stats):
+        """缓存的统计是否与当前报告币种和汇率表一致"""
+        return (stats.get('currency', DEFAULT_CURRENCY) == self.converter.reporting
+                and stats.get('rates_version', self.rates.version) == self.rates.version)
+        
+    def on_desires_loaded(self, filename, desires, report=None):
+        """后台解析完成（report 为校验报告，有自动修复或警告时一并提示）"""
+        self.loader = None
+        self.set_editing_enabled(True)
+        self.load_budget_config(filename)
+        self.load_scenario_config(filename)
+        self.shards = None
+        self.store.replace(desires)
+        self.saved_desires = dict(desires)
+        self.watch_file(filename)
+        self.open_history(filename)
+        self.refresh_trend()
+        self.validation_report = report
+        message = f"数据已从 {filename} 加载"
+        if report is not None and report['issues']:
+            message += "\n\n" + format_report(report, limit=5)
+        QMessageBox.information(self, "成功", message)
+        
+    def load_budget_config(self, filename):
+        """加载数据文件对应的预算配置（累计值在数据替换时重建）"""
+        try:
+            budgets = load_budgets(budgets_path(filename))
+        except (OSError, ValueError):
+            budgets = None
+            
+        if budgets is not None:
+            self.budget_monitor = BudgetMonitor(budgets, self.converter)
+            self.budget_monitor.subscribe(self.on_budget_events)
+            self.apply_total_budget()
+        
+    def load_scenario_config(self, filename):
+        """加载数据文件对应的情景"""
+        try:
+            self.scenarios = load_scenarios(scenarios_path(filename))
+        except (OSError, ValueError, KeyError):
+            self.scenarios = ScenarioSet()
+            
+    def save_scenario_config(self):
+        """情景变化后写入当前文件对应的情景文件（尚未保存过的数据在保存时一并写入）"""
+        if self.current_file is None:
+            return
+        try:
+            save_scenarios(scenarios_path(self.current_file), self.scenarios)
+        except OSError as e:
+            self.statusBar().showMessage(f"情景保存失败: {e}", 10000)
+            
+    def on_load_failed(self, message):
+        """后台解析失败"""
+        self.loader = None
+        self.set_editing_enabled(True)
+        self.update_statistics()
+        QMessageBox.critical(self, "错误", f"加载失败: {message}")
+        
+    def watch_file(self, filename):
+        """监视当前数据文件，记录自己读写后的文件状态"""
+        watched = self.file_watcher.files()
+        if watched and watched != [filename]:
+            self.file_watcher.removePaths(watched)
+        if filename not in self.file_watcher.files():
+            self.file_watcher.addPath(filename)
+        self.file_stamp = file_stamp(filename)
+        
+    def unwatch_file(self):
+        """停止监视数据文件（分片目录不监视外部修改）"""
+        watched = self.file_watcher.files()
+        if watched:
+            self.file_watcher.removePaths(watched)
+        self.file_stamp = None
+        
+    def on_file_changed(self, path):
+        """文件变化：合并短时间内的多次通知后再重新加载"""
+        # 编辑器以替换文件的方式保存时监视会失效，需要重新添加
+        if path not in self.file_watcher.files() and os.path.exists(path):
+            self.file_watcher.addPath(path)
+        self.reload_timer.start()
+        
+    def reload_current_file(self):
+        """在后台重新解析被外部修改的数据文件"""
+        watched = self.file_watcher.files()
+        if not watched or self.saved_desires is None:
+            return
+        path = watched[0]
+        if self.loader is not None or self.reloader is not None or self.saver is not None:
+            # 正在加载或保存时稍后再检查
+            self.reload_timer.start()
+            return
+        if file_stamp(path) in (None, self.file_stamp):
+            # 文件已删除或是自己保存的内容
+            return
+        self.reloader = FileReloader(path, self.saved_desires, self)
+        self.reloader.loaded.connect(self.on_file_reloaded)
+        self.reloader.failed.connect(self.on_reload_failed)
+        self.reloader.start()
+        
+    def on_file_reloaded(self, desires, ids, stamp):
+        """
+        把外部修改合并到当前数据
+        
+        只对文件中变化的需求做三方合并（基准为上次加载或保存的内容），
+        未保存的本地修改得以保留，同一需求两边都改时保留本地的值。
+        """
+        reloader, self.reloader = self.reloader, None
+        if reloader.base is not self.saved_desires:
+            # 解析期间保存或重新加载过，基准已变，按新基准重新比较
+            self.reload_timer.start()
+            return
+        base = self.saved_desires
+        result = merge_desires(
+            {desire_id: self.desires[desire_id] for desire_id in ids if desire_id in self.desires},
+            {desire_id: desires[desire_id] for desire_id in ids if desire_id in desires},
+            {desire_id: base[desire_id] for desire_id in ids if desire_id in base},
+        )
+        with self.store.transaction():
+            for desire_id, _, desire in result['changes']:
+                if desire is None:
+                    self.store.remove(desire_id)
+                else:
+                    self.store.add(desire_id, desire)
+        self.saved_desires = desires
+        self.file_stamp = stamp
+        if not result['changes'] and not result['conflicts']:
+            return
+            
+        message = f"文件已被外部修改，更新了 {len(result['changes'])} 个需求"
+        if result['conflicts']:
+            message += f"，{len(result['conflicts'])} 个需求与未保存的修改冲突，保留了本地的值"
+        self.statusBar().showMessage(message, 10000)
+        
+    def on_reload_failed(self, message):
+        """外部修改的文件无法解析（可能仍在写入），保留当前数据"""
+        self.reloader = None
+        self.statusBar().showMessage(f"重新加载失败: {message}", 10000)
+        
+    def open_history(self, filename):
+        """打开数据文件对应的历史记录"""
+        if filename == self.current_file and self.history is not None:
+            return
+        self.current_file = filename
+        try:
+            self.history = HistoryStore(history_path(filename))
+        except (OSError, ValueError):
+            self.history = None
+            
+    def refresh_trend(self):
+        """用最近一年的每日汇总刷新趋势图"""
+        if self.history is None:
+            self.trend_chart.set_points([])
+            return
+        start = datetime.now().timestamp() - 365 * 24 * 3600
+        self.trend_chart.set_points(self.history.query(start, resolution="daily"))
+        
+    def set_editing_enabled(self, enabled):
+        """加载期间禁止编辑，避免修改被加载结果覆盖"""
+        self.left_panel.setEnabled(enabled)
+        self.desire_list.setEnabled(enabled)
+        self.button_bar.setEnabled(enabled)
+        
+    def import_desires(self):
+        """从CSV/银行流水批量导入需求"""
+        try:
+            filename, _ = QFileDialog.getOpenFileName(
+                self, "导入CSV", "", "CSV Files (*.csv);;All Files (*)"
+            )
+            if not filename:
+                return
+                
+            presets = {"标准格式 (desires)": "desires", "银行流水 (bank)": "bank",
+                       "自定义映射文件...": None}
+            choice, ok = QInputDialog.getItem(
+                self, "列映射", "请选择CSV列映射:", list(presets), 0, False
+            )
+            if not ok:
+                return
+                
+            if presets[choice] is None:
+                mapping_file, _ = QFileDialog.getOpenFileName(
+                    self, "选择映射文件", "", "JSON Files (*.json)"
+                )
+                if not mapping_file:
+                    return
+                mapping = ColumnMapping.from_file(mapping_file)
+            else:
+                mapping = ColumnMapping.preset(presets[choice])
+                
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                new_desires, report = import_csv(filename, self.desires, mapping)
+            finally:
+                QApplication.restoreOverrideCursor()
+                
+            # 一次性合并并刷新
+            if new_desires:
+                self.store.add_many(new_desires)
+                
+            QMessageBox.information(self, "导入完成", report.summary())
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导入失败: {str(e)}")
+            
     def clear_all(self):
         """清空所有需求"""
         reply = QMessageBox.question(
@@ -964,10 +2807,88 @@ class DesireCalculator(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            self.desires = {}
-            self.update_display()
+            self.store.replace({})
+
+def parse_args(argv=None):
+    """解析命令行参数（无子命令时启动图形界面）"""
+    parser = argparse.ArgumentParser(description="需求计算器")
+    parser.add_argument("--sync", metavar="ADDRESS", help="启动后连接同步集线器（host:port 或 unix:路径）")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    serve_parser = subparsers.add_parser("serve", help="以本地HTTP接口提供计算服务")
+    serve_parser.add_argument("files", nargs="+", help="需求JSON文件")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    
+    budgets_parser = subparsers.add_parser("budgets", help="检查预算状态（无界面）")
+    add_budget_arguments(budgets_parser)
+    
+    upcoming_parser = subparsers.add_parser("upcoming", help="列出即将到来的付款（无界面）")
+    add_upcoming_arguments(upcoming_parser)
+    
+    forecast_parser = subparsers.add_parser("forecast", help="预测现金流与余额（无界面）")
+    add_forecast_arguments(forecast_parser)
+    
+    diff_parser = subparsers.add_parser("diff", help="比较两个需求文件（无界面）")
+    add_diff_arguments(diff_parser)
+    
+    merge_parser = subparsers.add_parser("merge", help="合并需求文件（无界面）")
+    add_merge_arguments(merge_parser)
+    
+    pivot_parser = subparsers.add_parser("pivot", help="按维度交叉汇总（无界面）")
+    add_pivot_arguments(pivot_parser)
+    
+    sensitivity_parser = subparsers.add_parser("sensitivity", help="参数网格敏感性分析（无界面）")
+    add_sensitivity_arguments(sensitivity_parser)
+    
+    scenarios_parser = subparsers.add_parser("scenarios", help="并排比较情景（无界面）")
+    add_scenario_arguments(scenarios_parser)
+    
+    hub_parser = subparsers.add_parser("sync-hub", help="运行多实例同步集线器")
+    add_sync_arguments(hub_parser)
+    
+    validate_parser = subparsers.add_parser("validate", help="校验并修复需求文件（无界面）")
+    add_validate_arguments(validate_parser)
+    
+    duplicates_parser = subparsers.add_parser("duplicates", help="查找并合并重复需求（无界面）")
+    add_duplicate_arguments(duplicates_parser)
+    
+    shards_parser = subparsers.add_parser("shards", help="分片目录与单个文件之间转换、查看分片统计（无界面）")
+    add_shard_arguments(shards_parser)
+    
+    args, _ = parser.parse_known_args(argv)
+    return args
 
 def main():
+    args = parse_args()
+    if args.command == "serve":
+        run_server(args.files, args.host, args.port)
+        return
+    if args.command == "budgets":
+        sys.exit(run_budget_check(args))
+    if args.command == "upcoming":
+        sys.exit(run_upcoming(args))
+    if args.command == "forecast":
+        sys.exit(run_forecast(args))
+    if args.command == "diff":
+        sys.exit(run_diff(args))
+    if args.command == "merge":
+        sys.exit(run_merge(args))
+    if args.command == "pivot":
+        sys.exit(run_pivot(args))
+    if args.command == "sensitivity":
+        sys.exit(run_sweep(args))
+    if args.command == "scenarios":
+        sys.exit(run_scenarios(args))
+    if args.command == "sync-hub":
+        sys.exit(run_hub(args))
+    if args.command == "shards":
+        sys.exit(run_shards(args))
+    if args.command == "duplicates":
+        sys.exit(run_duplicates(args))
+    if args.command == "validate":
+        sys.exit(run_validate(args))
+    
     app = QApplication(sys.argv)
     
     # 设置应用信息
@@ -978,6 +2899,8 @@ def main():
     # 创建主窗口
     window = DesireCalculator()
     window.show()
+    if args.sync:
+        window.start_sync(args.sync)
     
     # 运行应用
     sys.exit(app.exec_())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 需求文件比较与合并
+Structural diff and two/three-way merge of desire files
+"""
+
+import argparse
+import sys
+from itertools import chain
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file
+from filecodec import write_desire_file
+
+# 冲突时默认保留的一方
+PREFER_CHOICES = ("ours", "theirs")
+
+# 输出中每类变化最多列出的需求数
+DEFAULT_LIST_LIMIT = 20
+
+
+def same_value(a, b):
+    """两个字段值是否相同（True、1 与 1.0 彼此相等，但视为不同的值）"""
+    return a == b and type(a) is type(b)
+
+
+def same_record(a, b):
+    """两条记录（可以为 None）是否相同：字段与取值相同且取值类型一致，与字段顺序无关"""
+    if a is b:
+        return True
+    if a is None or b is None or a != b:
+        return False
+    if list(a) == list(b):
+        # 字段顺序相同时（绝大多数情况）整体比较取值类型
+        return list(map(type, a.values())) == list(map(type, b.values()))
+    return all(type(value) is type(b[key]) for key, value in a.items())
+
+
+def changed_ids(old, new):
+    """新增、删除或内容不同的需求ID（与 diff_desires 一样用 same_record 逐条比较，不计算哈希）"""
+    ids = [desire_id for desire_id, desire in new.items() if not same_record(old.get(desire_id), desire)]
+    ids.extend(desire_id for desire_id in old if desire_id not in new)
+    return ids
+
+
+def changed_fields(old, new):
+    """两条记录中取值不同的字段"""
+    return sorted(key for key in old.keys() | new.keys() if not same_value(old.get(key), new.get(key)))
+
+
+def _impact(old, new, changes, converter, stats):
+    """变化对月度/年度总花销的影响，只计算变化的需求"""
+    if stats is None:
+        stats = converter.statistics(DesireColumns.from_desires(old))
+    impact = converter.change_statistics(
+        [(desire_id, old.get(desire_id), new.get(desire_id)) for desire_id in changes]
+    )
+    delta = impact['monthly_delta']
+    by_category = impact['category_deltas']
+    return {
+        'currency': converter.reporting,
+        'monthly_before': stats['monthly_total'],
+        'monthly_after': stats['monthly_total'] + delta,
+        'monthly_delta': delta,
+        'yearly_delta': delta * 12,
+        'by_category': {category: value for category, value in by_category.items() if abs(value) > 1e-9},
+    }
+
+
+def diff_desires(old, new, converter=None, stats=None):
+    """
+    比较两份需求数据
+
+    按需求ID对齐逐条比较记录（same_record），只对不同的记录列出变化字段；
+    整体为线性时间。stats 为旧数据的统计（已有时传入以免重新计算）。
+    """
+    converter = converter or CurrencyConverter(RateTable.load())
+
+    added = [desire_id for desire_id in new if desire_id not in old]
+    removed = [desire_id for desire_id in old if desire_id not in new]
+    changed = [desire_id for desire_id, desire in new.items()
+               if desire_id in old and not same_record(old[desire_id], desire)]
+
+    return {
+        'added': added,
+        'removed': removed,
+        'changed': {desire_id: changed_fields(old[desire_id], new[desire_id]) for desire_id in changed},
+        'unchanged': len(new) - len(added) - len(changed),
+        'impact': _impact(old, new, added + removed + changed, converter, stats),
+    }
+
+
+def _merge_fields(base, ours, theirs):
+    """逐字段三方合并，返回 (合并结果, 冲突字段)"""
+    merged = dict(ours)
+    conflicts = []
+    for key in {**base, **ours, **theirs}:
+        b, o, t = base.get(key), ours.get(key), theirs.get(key)
+        if same_value(o, t) or same_value(t, b):
+            continue
+        if same_value(o, b):
+            if key in theirs:
+                merged[key] = t
+            else:
+                merged.pop(key, None)
+        else:
+            conflicts.append(key)
+    return merged, sorted(conflicts)
+
+
+def merge_desires(ours, theirs, base=None, prefer="ours"):
+    """
+    合并两份需求数据（提供 base 时为三方合并）
+
+    只有一方修改的需求取修改后的值；双方修改同一需求的不同字段时逐字段合并；
+    双方修改同一字段（或一方修改、一方删除）为冲突，按 prefer 保留一方并记录。
+    没有 base 时无法识别删除：只在一方存在的需求视为新增，双方内容不同视为冲突。
+
+    返回合并结果、冲突列表与相对 ours 的变化 [(需求ID, 旧值, 新值)]。
+    """
+    if prefer not in PREFER_CHOICES:
+        raise ValueError(f"prefer 必须是 {'/'.join(PREFER_CHOICES)}")
+    base = base or {}
+
+    merged = dict(ours)
+    changes = []
+    conflicts = []
+    field_merged = []
+
+    def take(desire_id, value):
+        old = merged.get(desire_id)
+        if value is None:
+            merged.pop(desire_id, None)
+        else:
+            merged[desire_id] = value
+        if old is not value:
+            changes.append((desire_id, old, value))
+
+    # 只在 base 中存在的需求双方都已删除，无需处理
+    for desire_id in chain(ours, (key for key in theirs if key not in ours)):
+        ours_value, theirs_value, base_value = ours.get(desire_id), theirs.get(desire_id), base.get(desire_id)
+        if same_record(ours_value, theirs_value) or same_record(theirs_value, base_value):
+            continue
+        if same_record(ours_value, base_value):
+            take(desire_id, theirs_value)
+            continue
+
+        if ours_value is not None and theirs_value is not None and base_value is not None:
+            value, fields = _merge_fields(base_value, ours_value, theirs_value)
+            if not fields:
+                take(desire_id, value)
+                field_merged.append(desire_id)
+                continue
+        elif ours_value is not None and theirs_value is not None:
+            # 双方各自新增了同一ID
+            fields = changed_fields(ours_value, theirs_value)
+        else:
+            # 一方修改、一方删除
+            fields = None
+
+        conflicts.append({
+            'desire_id': desire_id,
+            'fields': fields,
+            'base': base_value,
+            'ours': ours_value,
+            'theirs': theirs_value,
+        })
+        if prefer == "theirs":
+            take(desire_id, theirs_value)
+
+    return {
+        'desires': merged,
+        'changes': changes,
+        'conflicts': conflicts,
+        'field_merged': field_merged,
+    }
+
+
+def _name(desires, desire_id):
+    desire = desires.get(desire_id)
+    return desire.get('name', desire_id) if isinstance(desire, dict) else desire_id
+
+
+def format_impact(impact):
+    """总花销变化的文字描述"""
+    symbol = currency_symbol(impact['currency'])
+    lines = [
+        f"月度总花销: {symbol}{impact['monthly_before']:.2f} → {symbol}{impact['monthly_after']:.2f} "
+        f"({impact['monthly_delta']:+.2f})",
+        f"年度总花销变化: {impact['yearly_delta']:+.2f}",
+    ]
+    for category, value in sorted(impact['by_category'].items(), key=lambda item: -abs(item[1])):
+        lines.append(f"  {category}: {value:+.2f}/月")
+    return lines
+
+
+def format_summary(diff):
+    """各类变化的数量"""
+    return (f"新增 {len(diff['added'])}，删除 {len(diff['removed'])}，"
+            f"修改 {len(diff['changed'])}，未变 {diff['unchanged']}")
+
+
+def format_diff(diff, old, new, limit=DEFAULT_LIST_LIMIT):
+    """比较结果的文字描述"""
+    lines = [format_summary(diff)]
+    for marker, ids, desires in (("+", diff['added'], new), ("-", diff['removed'], old)):
+        for desire_id in ids[:limit]:
+            lines.append(f"{marker} {desire_id} {_name(desires, desire_id)}")
+        if len(ids) > limit:
+            lines.append(f"{marker} ... 另有 {len(ids) - limit} 个")
+    for desire_id, fields in list(diff['changed'].items())[:limit]:
+        lines.append(f"~ {desire_id} {_name(new, desire_id)}: " + ", ".join(
+            f"{key} {old[desire_id].get(key)!r} → {new[desire_id].get(key)!r}" for key in fields))
+    if len(diff['changed']) > limit:
+        lines.append(f"~ ... 另有 {len(diff['changed']) - limit} 个")
+    lines.extend(format_impact(diff['impact']))
+    return "\n".join(lines)
+
+
+def format_conflict(conflict):
+    """冲突的文字描述"""
+    desire_id = conflict['desire_id']
+    if conflict['fields'] is None:
+        ours = "删除" if conflict['ours'] is None else "修改"
+        theirs = "删除" if conflict['theirs'] is None else "修改"
+        return f"! {desire_id}: 本方{ours}，对方{theirs}"
+    return f"! {desire_id}: " + ", ".join(
+        f"{key} 本方 {conflict['ours'].get(key)!r} / 对方 {conflict['theirs'].get(key)!r}"
+        for key in conflict['fields'])
+
+
+def add_diff_arguments(parser):
+    parser.add_argument("old", help="旧需求JSON文件")
+    parser.add_argument("new", help="新需求JSON文件")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIST_LIMIT, help="每类变化最多列出的需求数")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_diff(args, out=sys.stdout):
+    """无界面比较两个文件，存在差异时返回 1"""
+    old = load_desire_file(args.old)
+    new = load_desire_file(args.new)
+    diff = diff_desires(old, new, CurrencyConverter(RateTable.load(), args.currency))
+    print(format_diff(diff, old, new, args.limit), file=out)
+    return 1 if diff['added'] or diff['removed'] or diff['changed'] else 0
+
+
+def add_merge_arguments(parser):
+    parser.add_argument("ours", help="本方需求JSON文件")
+    parser.add_argument("theirs", help="对方需求JSON文件")
+    parser.add_argument("--base", help="共同的原始文件（提供时为三方合并）")
+    parser.add_argument("-o", "--output", required=True, help="合并结果输出文件")
+    parser.add_argument("--prefer", choices=PREFER_CHOICES, default="ours", help="冲突时保留的一方")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_merge(args, out=sys.stdout):
+    """无界面合并文件并写出结果，存在冲突时返回 1"""
+    ours = load_desire_file(args.ours)
+    theirs = load_desire_file(args.theirs)
+    base = load_desire_file(args.base) if args.base else None
+    result = merge_desires(ours, theirs, base, args.prefer)
+
+    write_desire_file(args.output, result['desires'])
+
+    merged = result['desires']
+    diff = diff_desires(ours, merged, CurrencyConverter(RateTable.load(), args.currency))
+    print(f"合并写入 {args.output}，相对本方: {format_summary(diff)}", file=out)
+    print("\n".join(format_impact(diff['impact'])), file=out)
+    if result['field_merged']:
+        print(f"逐字段合并 {len(result['field_merged'])} 个需求", file=out)
+    for conflict in result['conflicts']:
+        print(format_conflict(conflict), file=out)
+    if result['conflicts']:
+        side = "本方" if args.prefer == "ours" else "对方"
+        print(f"{len(result['conflicts'])} 个冲突，已保留{side}的值", file=out)
+    return 1 if result['conflicts'] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器文件比较与合并")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_diff_arguments(subparsers.add_parser("diff", help="比较两个文件"))
+    add_merge_arguments(subparsers.add_parser("merge", help="合并文件"))
+    args = parser.parse_args(argv)
+    sys.exit(run_diff(args) if args.command == "diff" else run_merge(args))
+
+
+if __name__ == "__main__":
+    main()
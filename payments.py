@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 付款日程
+Upcoming-payments scheduler backed by a heap of next occurrences
+"""
+
+import argparse
+import heapq
+import sys
+from calendar import monthrange
+from datetime import date, timedelta
+
+from currency import currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file
+from frequencies import frequency_interval
+
+# 默认提前提醒的天数
+REMINDER_DAYS = 3
+
+# 失效条目超过有效条目的倍数时重建堆
+_COMPACT_RATIO = 2
+
+
+def parse_date(value):
+    """解析 start_date/end_date 字段（YYYY-MM-DD），无效时返回 None"""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def add_months(start, months):
+    """start 之后第 months 个月的同一天（短月份取月末）"""
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    # 月末开始的需求在短月份中落在当月最后一天
+    day = min(start.day, monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+def occurrence(start, frequency, index):
+    """第 index 次付款日期（从0开始），未知频率返回 None"""
+    interval = frequency_interval(frequency)
+    if interval is None:
+        return None
+    unit, step = interval
+    if unit == "day":
+        return start + timedelta(days=step * index)
+    return add_months(start, step * index)
+
+
+def next_index(start, frequency, day):
+    """不早于 day 的第一次付款序号，未知频率返回 None"""
+    interval = frequency_interval(frequency)
+    if interval is None:
+        return None
+    if day <= start:
+        return 0
+    unit, step = interval
+    if unit == "day":
+        return -(-(day - start).days // step)
+    index = ((day.year - start.year) * 12 + day.month - start.month) // step
+    if occurrence(start, frequency, index) < day:
+        index += 1
+    return index
+
+
+class PaymentScheduler:
+    """
+    付款日程
+
+    堆中保存每个启用需求不早于 today 的下一次付款。编辑需求时只推入新条目，
+    旧条目通过代数（generation）标记失效，取出时跳过；查询在堆的副本上
+    依次弹出并推入同一需求的后续付款，不展开完整日程。超过 end_date 的付款不再入堆。
+    """
+
+    def __init__(self, desires=None, today=None):
+        self.today = today or date.today()
+        self._heap = []
+        self._schedules = {}
+        self._generation = 0
+        self.unscheduled = set()
+        if desires:
+            self.reset(desires)
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def _schedule(self, desire_id, desire):
+        self._schedules.pop(desire_id, None)
+        self.unscheduled.discard(desire_id)
+        if desire is None or not desire.get('enabled', True):
+            return
+        start = parse_date(desire.get('start_date'))
+        index = None if start is None else next_index(start, desire['frequency'], self.today)
+        if index is None:
+            self.unscheduled.add(desire_id)
+            return
+
+        self._generation += 1
+        end = parse_date(desire.get('end_date')) or date.max
+        self._schedules[desire_id] = (start, desire['frequency'], self._generation, desire, end)
+        self._push(self._heap, desire_id, index)
+
+    def _push(self, heap, desire_id, index):
+        """推入第 index 次付款（已超过结束日期时不推入）"""
+        start, frequency, generation, _, end = self._schedules[desire_id]
+        when = occurrence(start, frequency, index)
+        if when <= end:
+            heapq.heappush(heap, (when, desire_id, generation, index))
+
+    def reset(self, desires):
+        """全量重建（加载文件时使用）"""
+        self._heap = []
+        self._schedules = {}
+        self.unscheduled = set()
+        for desire_id, desire in desires.items():
+            self._schedule(desire_id, desire)
+
+    def apply(self, changes):
+        """增量应用 DesireStore 的变化 [(需求ID, 旧需求, 新需求)]"""
+        for desire_id, _, new in changes:
+            self._schedule(desire_id, new)
+        if len(self._heap) > _COMPACT_RATIO * len(self._schedules) + 64:
+            self._compact()
+
+    def _valid(self, desire_id, generation):
+        schedule = self._schedules.get(desire_id)
+        return schedule is not None and schedule[2] == generation
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._valid(entry[1], entry[2])]
+        heapq.heapify(self._heap)
+
+    def advance(self, today):
+        """把日程推进到 today：过期的条目换成下一次付款"""
+        if today < self.today:
+            # 回到更早的日期时按新日期重建堆
+            self.today = today
+            self._heap = []
+            for desire_id, (start, frequency, *_) in self._schedules.items():
+                self._push(self._heap, desire_id, next_index(start, frequency, today))
+            return
+        self.today = today
+        heap = self._heap
+        while heap and heap[0][0] < today:
+            when, desire_id, generation, index = heapq.heappop(heap)
+            if not self._valid(desire_id, generation):
+                continue
+            start, frequency = self._schedules[desire_id][:2]
+            self._push(heap, desire_id, next_index(start, frequency, today))
+
+    def _iterate(self, today):
+        self.advance(today or date.today())
+        heap = list(self._heap)
+        while heap:
+            when, desire_id, generation, index = heapq.heappop(heap)
+            if not self._valid(desire_id, generation):
+                continue
+            desire = self._schedules[desire_id][3]
+            yield {
+                'date': when,
+                'desire_id': desire_id,
+                'name': desire['name'],
+                'cost': desire['cost'],
+                'currency': desire.get('currency', DEFAULT_CURRENCY),
+            }
+            self._push(heap, desire_id, index + 1)
+
+    def upcoming(self, count, today=None):
+        """接下来的 count 笔付款"""
+        payments = []
+        if count <= 0:
+            return payments
+        for payment in self._iterate(today):
+            payments.append(payment)
+            if len(payments) >= count:
+                break
+        return payments
+
+    def within(self, days, today=None, limit=None):
+        """从 today 起 days 天内（不含第 days 天）的付款，最多 limit 笔"""
+        today = today or date.today()
+        end = today + timedelta(days=days)
+        payments = []
+        for payment in self._iterate(today):
+            if payment['date'] >= end or (limit is not None and len(payments) >= limit):
+                break
+            payments.append(payment)
+        return payments
+
+
+class Reminders:
+    """到期提醒：每笔付款只提醒一次"""
+
+    def __init__(self, scheduler, days=REMINDER_DAYS):
+        self.scheduler = scheduler
+        self.days = days
+        self._sent = set()
+
+    def check(self, today=None):
+        """返回新进入提醒范围的付款"""
+        today = today or date.today()
+        self._sent = {key for key in self._sent if key[1] >= today}
+        due = []
+        for payment in self.scheduler.within(self.days + 1, today):
+            key = (payment['desire_id'], payment['date'])
+            if key not in self._sent:
+                self._sent.add(key)
+                due.append(payment)
+        return due
+
+
+def format_payment(payment, today=None):
+    """付款的可读描述"""
+    today = today or date.today()
+    days = (payment['date'] - today).days
+    when = "今天" if days == 0 else "明天" if days == 1 else f"{days}天后"
+    return (f"{payment['date'].isoformat()} ({when}) {payment['name']} "
+            f"{currency_symbol(payment['currency'])}{payment['cost']:.2f}")
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--count", type=int, default=10, help="显示接下来的N笔付款（默认10）")
+    group.add_argument("--days", type=int, help="显示接下来K天内的付款")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="起始日期（默认今天）")
+
+
+def run_upcoming(args, out=sys.stdout):
+    """无界面列出即将到来的付款"""
+    today = args.start or date.today()
+    scheduler = PaymentScheduler(load_desire_file(args.file), today)
+    if args.days is not None:
+        payments = scheduler.within(args.days, today)
+    else:
+        payments = scheduler.upcoming(args.count, today)
+    for payment in payments:
+        print(format_payment(payment, today), file=out)
+    if scheduler.unscheduled:
+        print(f"{len(scheduler.unscheduled)} 个启用的需求未设置开始日期", file=out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器付款日程")
+    add_arguments(parser)
+    sys.exit(run_upcoming(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 交叉分析
+Pivot / cross-tab engine over the coded desire columns
+"""
+
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from columns import CODED_FIELDS, DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file
+
+# 可用于分组的维度
+DIMENSIONS = ("category", "priority", "frequency", "currency", "enabled")
+
+# 启用状态维度的标签（编码0为启用）
+ENABLED_LABELS = ["启用", "禁用"]
+
+# 汇总值：月度花销合计、需求数、平均月度花销、占总花销的比例
+MEASURES = ("sum", "count", "mean", "share")
+
+# 合计行/列的标签
+TOTAL_LABEL = "合计"
+
+
+def dimension(columns, name):
+    """维度的编码数组与标签列表"""
+    if name == "enabled":
+        return (~columns.enabled).astype(np.int64), list(ENABLED_LABELS)
+    if name not in CODED_FIELDS:
+        raise ValueError(f"未知的分组维度: {name}（可选 {'/'.join(DIMENSIONS)}）")
+    return getattr(columns, name), list(getattr(columns, CODED_FIELDS[name]))
+
+
+def crosstab(columns, amounts, rows, cols=None, mask=None):
+    """
+    按两个维度交叉汇总月度花销
+
+    两个维度的编码合成一个组号，用两次 np.bincount 完成分组求和与计数，
+    不逐条遍历需求。cols 为 None 时只按 rows 分组；mask 为参与汇总的行。
+    没有需求的行/列不出现在结果中。
+
+    返回的 sum 与 count 为 (行数+1)×(列数+1) 的数组，末行末列为合计。
+    """
+    row_codes, row_labels = dimension(columns, rows)
+    if cols is None:
+        col_codes, col_labels = np.zeros(len(columns), dtype=np.int64), [TOTAL_LABEL]
+    else:
+        col_codes, col_labels = dimension(columns, cols)
+
+    width = len(col_labels)
+    groups = row_codes.astype(np.int64) * width + col_codes
+    weights = amounts
+    if mask is not None:
+        groups = groups[mask]
+        weights = weights[mask]
+    size = len(row_labels) * width
+    sums = np.bincount(groups, weights=weights, minlength=size).reshape(-1, width)
+    counts = np.bincount(groups, minlength=size).reshape(-1, width)
+
+    row_keep = np.flatnonzero(counts.sum(axis=1))
+    col_keep = np.flatnonzero(counts.sum(axis=0))
+    sums = sums[np.ix_(row_keep, col_keep)]
+    counts = counts[np.ix_(row_keep, col_keep)]
+    sums, counts = _with_totals(sums), _with_totals(counts)
+    if cols is None:
+        # 只按一个维度分组时合计列与唯一的列相同，不再重复
+        sums, counts = sums[:, :-1], counts[:, :-1]
+
+    return {
+        'rows': rows,
+        'columns': cols,
+        'row_labels': [row_labels[code] for code in row_keep] + [TOTAL_LABEL],
+        'column_labels': [col_labels[code] for code in col_keep] + ([] if cols is None else [TOTAL_LABEL]),
+        'sum': sums,
+        'count': counts,
+    }
+
+
+def _with_totals(values):
+    """在末尾追加合计行与合计列"""
+    grid = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=values.dtype)
+    grid[:-1, :-1] = values
+    grid[:-1, -1] = values.sum(axis=1)
+    grid[-1, :-1] = values.sum(axis=0)
+    grid[-1, -1] = values.sum()
+    return grid
+
+
+def values(table, measure):
+    """交叉表某个汇总值的二维数组（含合计行/列）"""
+    if measure == "sum":
+        return table['sum']
+    if measure == "count":
+        return table['count']
+    if measure == "mean":
+        return np.divide(table['sum'], table['count'], out=np.zeros(table['sum'].shape),
+                         where=table['count'] > 0)
+    if measure == "share":
+        total = table['sum'][-1, -1]
+        return table['sum'] / total if total else np.zeros(table['sum'].shape)
+    raise ValueError(f"未知的汇总值: {measure}（可选 {'/'.join(MEASURES)}）")
+
+
+def format_value(value, measure, symbol="¥"):
+    """单元格文本"""
+    if measure == "count":
+        return str(int(value))
+    if measure == "share":
+        return f"{value:.1%}"
+    return f"{symbol}{value:.2f}"
+
+
+class PivotEngine:
+    """
+    交叉分析引擎
+
+    月度花销换算为报告币种后做分组汇总；结果按 (列对象, 数据版本, 汇率版本, 报告币种) 缓存，
+    数据变化后自动失效，同一版本下的不同分组组合各缓存一份。
+    """
+
+    def __init__(self, converter=None):
+        self.converter = converter or CurrencyConverter(RateTable.load())
+        self._key = None
+        self._columns = None
+        self._tables = {}
+
+    def crosstab(self, columns, rows, cols=None, enabled_only=False):
+        """交叉表（enabled_only 时只汇总启用的需求）"""
+        key = (columns.version, self.converter.rates.version, self.converter.reporting)
+        if columns.version is None or key != self._key or columns is not self._columns:
+            self._key, self._columns, self._tables = key, columns, {}
+
+        query = (rows, cols, enabled_only)
+        table = self._tables.get(query)
+        if table is None:
+            stats = self.converter.statistics(columns)
+            table = crosstab(columns, self.converter.monthly_amounts(columns), rows, cols,
+                             columns.enabled if enabled_only else None)
+            table['currency'] = stats['currency']
+            table['missing_rates'] = stats['missing_rates']
+            if columns.version is not None:
+                self._tables[query] = table
+        return table
+
+
+def text_width(text):
+    """文本的显示宽度（中文按两个字符宽度计）"""
+    return sum(2 if ord(char) > 0x2E7F else 1 for char in text)
+
+
+def format_crosstab(table, measure="sum"):
+    """交叉表的文字表格"""
+    grid = values(table, measure)
+    symbol = currency_symbol(table.get('currency', DEFAULT_CURRENCY))
+    header = [f"{table['rows']} × {table['columns']}" if table['columns'] else table['rows']]
+    rows = [header + table['column_labels']]
+    for label, line in zip(table['row_labels'], grid):
+        rows.append([label] + [format_value(value, measure, symbol) for value in line])
+
+    widths = [max(text_width(row[index]) for row in rows) for index in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = [row[0] + " " * (widths[0] - text_width(row[0]))]
+        cells += [" " * (size - text_width(cell)) + cell for cell, size in zip(row[1:], widths[1:])]
+        lines.append("  ".join(cells))
+    if table.get('missing_rates'):
+        lines.append(f"缺少汇率未计入: {', '.join(table['missing_rates'])}")
+    return "\n".join(lines)
+
+
+def write_csv(table, measure, f):
+    """交叉表写为CSV（数值不带货币符号）"""
+    writer = csv.writer(f)
+    writer.writerow([table['rows']] + table['column_labels'])
+    grid = values(table, measure)
+    for label, line in zip(table['row_labels'], grid):
+        writer.writerow([label] + [int(value) if measure == "count" else round(float(value), 6)
+                                   for value in line])
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("--rows", choices=DIMENSIONS, default="category", help="行维度（默认类别）")
+    parser.add_argument("--cols", choices=DIMENSIONS, help="列维度（默认不分列）")
+    parser.add_argument("--measure", choices=MEASURES, default="sum", help="汇总值（默认月度花销合计）")
+    parser.add_argument("--all", dest="enabled_only", action="store_false",
+                        help="同时汇总禁用的需求")
+    parser.add_argument("--csv", action="store_true", help="输出CSV")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_pivot(args, out=sys.stdout):
+    """无界面交叉分析"""
+    engine = PivotEngine(CurrencyConverter(RateTable.load(), args.currency))
+    columns = DesireColumns.from_desires(load_desire_file(args.file))
+    table = engine.crosstab(columns, args.rows, args.cols, args.enabled_only)
+    if args.csv:
+        write_csv(table, args.measure, out)
+    else:
+        print(format_crosstab(table, args.measure), file=out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器交叉分析")
+    add_arguments(parser)
+    sys.exit(run_pivot(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 情景
+Named scenarios stored as copy-on-write overlays over the base desires
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file
+from filecodec import write_desire_file
+from merge import changed_fields, changed_ids
+from pivot import text_width
+
+SCENARIOS_SUFFIX = ".scenarios.json"
+
+# 比较结果中基准数据的名称
+BASE_NAME = "基准"
+
+
+def scenarios_path(path):
+    """数据文件对应的情景文件路径"""
+    return path + SCENARIOS_SUFFIX
+
+
+class Scenario:
+    """
+    命名情景
+
+    只保存相对基准数据的覆盖：修改的字段、新增的需求与删除的需求ID。
+    覆盖按字段记录，基准数据之后的修改（其他字段）在情景中同样可见；
+    基准中已不存在的需求的字段覆盖被忽略。
+    """
+
+    def __init__(self, name, overrides=None, added=None, removed=None):
+        self.name = name
+        self.overrides = overrides or {}
+        self.added = added or {}
+        self.removed = set(removed or ())
+
+    @classmethod
+    def from_diff(cls, name, base, edited):
+        """以 edited 相对 base 的变化创建情景"""
+        scenario = cls(name)
+        for desire_id in changed_ids(base, edited):
+            old, new = base.get(desire_id), edited.get(desire_id)
+            if new is None:
+                scenario.removed.add(desire_id)
+            elif old is None:
+                scenario.added[desire_id] = new
+            else:
+                scenario.overrides[desire_id] = {field: new.get(field) for field in changed_fields(old, new)}
+        return scenario
+
+    def __len__(self):
+        return len(self.touched())
+
+    def touched(self):
+        """情景中有覆盖的需求ID"""
+        return self.overrides.keys() | self.added.keys() | self.removed
+
+    def set(self, desire_id, **fields):
+        """覆盖基准需求的字段（新增的需求直接修改）"""
+        if desire_id in self.added:
+            self.added[desire_id] = dict(self.added[desire_id], **fields)
+        else:
+            self.overrides[desire_id] = dict(self.overrides.get(desire_id, {}), **fields)
+            self.removed.discard(desire_id)
+
+    def add(self, desire_id, desire):
+        """情景中新增需求"""
+        self.added[desire_id] = desire
+        self.removed.discard(desire_id)
+
+    def remove(self, desire_id):
+        """情景中删除需求"""
+        if self.added.pop(desire_id, None) is None:
+            self.removed.add(desire_id)
+        self.overrides.pop(desire_id, None)
+
+    def get(self, base, desire_id):
+        """情景中的需求（不存在时为 None）"""
+        if desire_id in self.removed:
+            return None
+        if desire_id in self.added:
+            return self.added[desire_id]
+        desire = base.get(desire_id)
+        fields = self.overrides.get(desire_id)
+        if desire is None or not fields:
+            return desire
+        return dict(desire, **fields)
+
+    def changes(self, base):
+        """相对基准的变化 [(需求ID, 基准需求, 情景需求)]，只遍历有覆盖的需求"""
+        changes = []
+        for desire_id in self.touched():
+            old, new = base.get(desire_id), self.get(base, desire_id)
+            if old != new:
+                changes.append((desire_id, old, new))
+        return changes
+
+    def resolve(self, base):
+        """情景的完整数据（未覆盖的需求与基准共享同一记录）"""
+        desires = dict(base)
+        for desire_id, _, new in self.changes(base):
+            if new is None:
+                del desires[desire_id]
+            else:
+                desires[desire_id] = new
+        return desires
+
+    def to_config(self):
+        return {
+            "name": self.name,
+            "overrides": self.overrides,
+            "added": self.added,
+            "removed": sorted(self.removed),
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["name"], config.get("overrides"), config.get("added"), config.get("removed"))
+
+
+class ScenarioSet:
+    """按名称保存的情景集合（保持创建顺序）"""
+
+    def __init__(self, scenarios=()):
+        self.scenarios = {scenario.name: scenario for scenario in scenarios}
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    def __iter__(self):
+        return iter(self.scenarios.values())
+
+    def __contains__(self, name):
+        return name in self.scenarios
+
+    def get(self, name):
+        return self.scenarios.get(name)
+
+    def add(self, scenario):
+        """添加情景（同名时替换）"""
+        self.scenarios[scenario.name] = scenario
+
+    def remove(self, name):
+        return self.scenarios.pop(name)
+
+    def to_config(self):
+        return {"scenarios": [scenario.to_config() for scenario in self]}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(Scenario.from_config(item) for item in config.get("scenarios", []))
+
+
+def load_scenarios(path):
+    """读取情景文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return ScenarioSet.from_config(json.load(f))
+
+
+def save_scenarios(path, scenarios):
+    """保存情景文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(scenarios.to_config(), f, ensure_ascii=False, indent=2)
+
+
+def totals(scenario, base, stats, converter):
+    """
+    情景的统计：基准统计加上覆盖部分的变化
+
+    只对有覆盖的需求计算月度花销，与基准数据的规模无关。
+    stats 为基准数据在同一报告币种下的统计。
+    """
+    changes = scenario.changes(base)
+    impact = converter.change_statistics(changes)
+    delta = impact['monthly_delta']
+
+    category_totals = dict(stats['category_totals'])
+    for category, value in impact['category_deltas'].items():
+        category_totals[category] = category_totals.get(category, 0) + value
+    monthly = stats['monthly_total'] + delta
+    return {
+        'name': scenario.name,
+        'monthly_total': monthly,
+        'yearly_total': monthly * 12,
+        'monthly_delta': delta,
+        'category_totals': category_totals,
+        'enabled_count': stats['enabled_count'] + impact['enabled_delta'],
+        'count': stats['count'] + impact['count_delta'],
+        'changes': len(changes),
+    }
+
+
+def compare(scenarios, base, stats, converter):
+    """基准与各情景的统计，第一行为基准"""
+    rows = [{
+        'name': BASE_NAME,
+        'monthly_total': stats['monthly_total'],
+        'yearly_total': stats['yearly_total'],
+        'monthly_delta': 0.0,
+        'category_totals': dict(stats['category_totals']),
+        'enabled_count': stats['enabled_count'],
+        'count': stats['count'],
+        'changes': 0,
+    }]
+    rows.extend(totals(scenario, base, stats, converter) for scenario in scenarios)
+    return rows
+
+
+def comparison_table(rows, symbol="¥"):
+    """并排比较的表格：每个情景一列，行为总计与各类别的月度花销"""
+    categories = []
+    for row in rows:
+        for category, value in row['category_totals'].items():
+            if category not in categories and abs(value) > 1e-9:
+                categories.append(category)
+    table = [[""] + [row['name'] for row in rows]]
+    table.append(["月度总花销"] + [f"{symbol}{row['monthly_total']:.2f}" for row in rows])
+    table.append(["年度总花销"] + [f"{symbol}{row['yearly_total']:.2f}" for row in rows])
+    table.append(["相对基准"] + [f"{row['monthly_delta']:+.2f}" for row in rows])
+    table.append(["启用/总数"] + [f"{row['enabled_count']}/{row['count']}" for row in rows])
+    table.append(["覆盖的需求"] + [str(row['changes']) for row in rows])
+    for category in categories:
+        table.append([category] + [f"{symbol}{row['category_totals'].get(category, 0):.2f}" for row in rows])
+    return table
+
+
+def format_comparison(rows, currency=DEFAULT_CURRENCY):
+    """并排比较的文字表格"""
+    table = comparison_table(rows, currency_symbol(currency))
+    widths = [max(text_width(line[index]) for line in table) for index in range(len(table[0]))]
+    lines = []
+    for line in table:
+        cells = [line[0] + " " * (widths[0] - text_width(line[0]))]
+        cells += [" " * (size - text_width(cell)) + cell for cell, size in zip(line[1:], widths[1:])]
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("--scenarios", help="情景文件（默认为 FILE.scenarios.json）")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="只比较指定的情景")
+    parser.add_argument("--apply", metavar="NAME", help="把情景应用到数据并写入 --output")
+    parser.add_argument("-o", "--output", help="应用情景后的输出文件")
+    parser.add_argument("--csv", action="store_true", help="输出CSV")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_scenarios(args, out=sys.stdout):
+    """无界面情景比较"""
+    desires = load_desire_file(args.file)
+    scenarios = load_scenarios(args.scenarios or scenarios_path(args.file))
+    names = args.only or ([args.apply] if args.apply else [scenario.name for scenario in scenarios])
+    missing = [name for name in names if name not in scenarios]
+    if missing:
+        print(f"未找到情景: {', '.join(missing)}", file=out)
+        return 2
+
+    if args.apply:
+        if not args.output:
+            print("--apply 需要 --output", file=out)
+            return 2
+        write_desire_file(args.output, scenarios.get(args.apply).resolve(desires))
+        print(f"情景 {args.apply} 已写入 {args.output}", file=out)
+        return 0
+
+    converter = CurrencyConverter(RateTable.load(), args.currency)
+    stats = converter.statistics(DesireColumns.from_desires(desires))
+    rows = compare([scenarios.get(name) for name in names], desires, stats, converter)
+    if args.csv:
+        csv.writer(out).writerows(comparison_table(rows, ""))
+    else:
+        print(format_comparison(rows, args.currency), file=out)
+        if stats['missing_rates']:
+            print(f"缺少汇率未计入: {', '.join(stats['missing_rates'])}", file=out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器情景比较")
+    add_arguments(parser)
+    sys.exit(run_scenarios(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
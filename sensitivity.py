@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 敏感性分析
+Parameter sweeps over category multipliers, inflation and frequency changes
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import DEFAULT_CURRENCY, load_desire_file, normalize_category
+from frequencies import factor_table, parse_frequency
+from pivot import text_width
+
+# 参数轴类型：类别花销倍数、年通胀率、频率替换
+AXIS_KINDS = ("category", "inflation", "frequency")
+
+# 每批计算的网格点数；网格点多于一批时才交给进程池
+POINTS_PER_CHUNK = 50000
+
+# 网格点数上限
+MAX_POINTS = 5_000_000
+
+# 摘要中列出的最高/最低网格点数
+DEFAULT_LIST_LIMIT = 5
+
+# 文字热力表每个方向最多显示的取值数（均匀抽取）
+TEXT_HEATMAP_SIZE = 11
+
+
+def parse_axis(text):
+    """
+    解析参数轴
+
+    格式为 "类型[:对象]=取值"，取值为逗号分隔的列表或 起点:终点:个数：
+      category:住房=1,1.08,1.16   住房类花销的倍数（类别可用英文标签）
+      inflation=0:0.05:6          年通胀率，按 years 年复利
+      frequency:每天=每天,每2天    原为每天的需求改为其他频率
+    """
+    name, sep, spec = text.partition("=")
+    kind, _, target = name.strip().partition(":")
+    kind = kind.strip().lower()
+    if not sep or kind not in AXIS_KINDS:
+        raise ValueError(f"无效的参数轴: {text}（类型可选 {'/'.join(AXIS_KINDS)}）")
+
+    if kind == "category":
+        target = normalize_category(target.strip())
+    elif kind == "frequency":
+        target = parse_frequency(target)
+    else:
+        target = None
+    if kind != "inflation" and target is None:
+        raise ValueError(f"无法识别的{kind}: {text}")
+
+    if kind == "frequency":
+        values = [parse_frequency(value) for value in spec.split(",")]
+        if None in values:
+            raise ValueError(f"无法识别的频率: {spec}")
+    else:
+        try:
+            if spec.count(":") == 2:
+                start, stop, count = spec.split(":")
+                values = np.linspace(float(start), float(stop), int(count)).tolist()
+            else:
+                values = [float(value) for value in spec.split(",")]
+        except ValueError:
+            raise ValueError(f"无效的取值: {spec}") from None
+    if not values:
+        raise ValueError(f"参数轴没有取值: {text}")
+    return {'label': name.strip(), 'kind': kind, 'target': target, 'values': values}
+
+
+def reduce_columns(columns, converter):
+    """
+    启用的需求按 (类别, 频率) 汇总单次花销（报告币种）
+
+    所有参数都作用在类别或频率上，每个网格点只需在这张小表上计算，
+    计算量与需求数量无关。
+    """
+    factors, missing = converter.currency_factors(columns.currencies)
+    cost = np.where(columns.enabled, columns.cost * factors[columns.currency], 0.0)
+    width = len(columns.frequencies)
+    groups = columns.category.astype(np.int64) * width + columns.frequency
+    base = np.bincount(groups, weights=cost, minlength=len(columns.categories) * width)
+    return base.reshape(-1, width), missing
+
+
+def evaluate(base, categories, frequencies, axes, points, years):
+    """
+    一批网格点的月度总花销
+
+    points 为 (网格点数, 参数轴数) 的取值下标；类别倍数与频率系数按网格点展开为矩阵，
+    用一次 einsum 完成所有网格点的计算。
+    """
+    count = len(points)
+    multipliers = np.ones((count, len(categories)))
+    factors = np.tile(factor_table(frequencies), (count, 1))
+    growth = np.ones(count)
+    for index, axis in enumerate(axes):
+        chosen = points[:, index]
+        if axis['kind'] == "inflation":
+            growth *= (1 + np.asarray(axis['values'])[chosen]) ** years
+        elif axis['kind'] == "category":
+            if axis['target'] in categories:
+                multipliers[:, categories.index(axis['target'])] *= np.asarray(axis['values'])[chosen]
+        elif axis['target'] in frequencies:
+            factors[:, frequencies.index(axis['target'])] = factor_table(axis['values'])[chosen]
+    return np.einsum("pc,cf,pf->p", multipliers, base, factors) * growth
+
+
+def _evaluate_chunk(args):
+    return evaluate(*args)
+
+
+def grid_points(axes):
+    """所有网格点的取值下标，形状为 (网格点数, 参数轴数)"""
+    sizes = [len(axis['values']) for axis in axes]
+    total = int(np.prod(sizes))
+    if total > MAX_POINTS:
+        raise ValueError(f"网格点过多: {total}（上限 {MAX_POINTS}）")
+    return np.indices(sizes).reshape(len(axes), -1).T
+
+
+def sweep(columns, axes, converter=None, years=1, workers=None):
+    """
+    在参数网格上计算月度总花销
+
+    网格点分批计算；多于一批时交给进程池并行（每批只传递汇总表与下标，不传递需求数据）。
+    返回基准月度花销与每个网格点的月度花销。
+    """
+    converter = converter or CurrencyConverter(RateTable.load())
+    workers = workers or os.cpu_count() or 1
+    base, missing = reduce_columns(columns, converter)
+    categories, frequencies = list(columns.categories), list(columns.frequencies)
+    points = grid_points(axes)
+    baseline = float((base * factor_table(frequencies)).sum())
+
+    chunks = [points[start:start + POINTS_PER_CHUNK] for start in range(0, len(points), POINTS_PER_CHUNK)]
+    jobs = [(base, categories, frequencies, axes, chunk, years) for chunk in chunks]
+    # 只有一批时直接在当前进程计算，避免启动进程池的开销
+    if len(jobs) <= 1 or workers <= 1:
+        monthly = [_evaluate_chunk(job) for job in jobs]
+    else:
+        # 界面在后台线程中调用，fork 出的子进程可能继承被其他线程持有的锁，因此用 spawn 启动工作进程
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            monthly = list(pool.map(_evaluate_chunk, jobs))
+
+    # 没有启用的需求属于该类别/频率时参数不起作用
+    present = {
+        "category": {label for label, total in zip(categories, base.sum(axis=1)) if total},
+        "frequency": {label for label, total in zip(frequencies, base.sum(axis=0)) if total},
+    }
+    return {
+        'axes': axes,
+        'unmatched': [axis['label'] for axis in axes
+                      if axis['kind'] in present and axis['target'] not in present[axis['kind']]],
+        'years': years,
+        'points': points,
+        'monthly': np.concatenate(monthly) if monthly else np.zeros(0),
+        'baseline': baseline,
+        'currency': converter.reporting,
+        'missing_rates': missing,
+    }
+
+
+def describe_point(result, row):
+    """网格点的参数描述，如 category:住房=1.08, inflation=0.03"""
+    return ", ".join(f"{axis['label']}={format_axis_value(axis['values'][index])}"
+                     for axis, index in zip(result['axes'], result['points'][row]))
+
+
+def heatmap(result, relative=False):
+    """
+    前两个参数轴的月度花销网格 (行取值, 列取值, 二维数组)
+
+    只有一个参数轴时为单列；其余参数轴取最坏情况（最高的月度花销）。
+    relative 时网格为相对基准的变化比例。
+    """
+    axes = result['axes']
+    sizes = [len(axis['values']) for axis in axes]
+    grid = result['monthly'].reshape(sizes)
+    if len(axes) == 1:
+        grid = grid[:, None]
+        cols = [""]
+    else:
+        cols = axes[1]['values']
+    if len(axes) > 2:
+        grid = grid.max(axis=tuple(range(2, len(axes))))
+    if relative:
+        grid = grid / result['baseline'] - 1 if result['baseline'] else np.zeros(grid.shape)
+    return axes[0]['values'], cols, grid
+
+
+def format_axis_value(value):
+    """参数取值的显示文本"""
+    return value if isinstance(value, str) else f"{value:.4g}"
+
+
+def format_sweep(result, limit=DEFAULT_LIST_LIMIT):
+    """敏感性分析的文字摘要与热力表（单元格为相对基准的变化比例）"""
+    symbol = currency_symbol(result['currency'])
+    baseline = result['baseline']
+    monthly = result['monthly']
+    lines = [
+        f"基准月度花销: {symbol}{baseline:.2f} ({result['currency']})，网格点 {len(monthly)} 个"
+        + (f"，通胀按 {result['years']} 年复利" if any(a['kind'] == "inflation" for a in result['axes']) else ""),
+    ]
+    if result['missing_rates']:
+        lines.append(f"缺少汇率未计入: {', '.join(result['missing_rates'])}")
+    if result['unmatched']:
+        lines.append(f"数据中没有对应的需求: {', '.join(result['unmatched'])}")
+    if not len(monthly):
+        return "\n".join(lines)
+
+    def change(value):
+        return f"{(value / baseline - 1):+.1%}" if baseline else "-"
+
+    order = np.argsort(monthly)
+    lines.append("月度花销最高:")
+    for row in order[::-1][:limit]:
+        lines.append(f"  {symbol}{monthly[row]:.2f} ({change(monthly[row])})  {describe_point(result, row)}")
+    lines.append("月度花销最低:")
+    for row in order[:limit]:
+        lines.append(f"  {symbol}{monthly[row]:.2f} ({change(monthly[row])})  {describe_point(result, row)}")
+
+    rows, cols, grid = heatmap(result, relative=True)
+    axes = result['axes']
+    title = axes[0]['label'] + (f" × {axes[1]['label']}" if len(axes) > 1 else "")
+    lines.append(f"相对基准的变化（{title}" + ("，其余参数取最高" if len(axes) > 2 else "") + "）:")
+    row_keep, col_keep = _sample(len(rows)), _sample(len(cols))
+    cells = [[title] + [format_axis_value(cols[index]) for index in col_keep]]
+    cells += [[format_axis_value(rows[row])] + [f"{grid[row, col]:+.1%}" if baseline else "-" for col in col_keep] for row in row_keep]
+    widths = [max(text_width(line[index]) for line in cells) for index in range(len(cells[0]))]
+    for line in cells:
+        lines.append("  " + "  ".join(" " * (width - text_width(cell)) + cell
+                                      for cell, width in zip(line, widths)))
+    return "\n".join(lines)
+
+
+def _sample(size, limit=TEXT_HEATMAP_SIZE):
+    """均匀抽取至多 limit 个下标（含首尾）"""
+    if size <= limit:
+        return list(range(size))
+    return sorted(set(np.linspace(0, size - 1, limit).round().astype(int).tolist()))
+
+
+def write_csv(result, f):
+    """每个网格点一行：各参数取值、月度/年度花销与相对基准的变化"""
+    writer = csv.writer(f)
+    axes = result['axes']
+    writer.writerow([axis['label'] for axis in axes] + ["monthly", "yearly", "change"])
+    baseline = result['baseline']
+    for point, monthly in zip(result['points'].tolist(), result['monthly'].tolist()):
+        writer.writerow([axis['values'][index] for axis, index in zip(axes, point)]
+                        + [round(monthly, 6), round(monthly * 12, 6),
+                           round(monthly / baseline - 1, 6) if baseline else ""])
+
+
+def _parse_axis_arg(text):
+    try:
+        return parse_axis(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("axes", nargs="+", type=_parse_axis_arg, metavar="AXIS",
+                        help="参数轴，如 category:住房=1:1.2:5、inflation=0,0.03、frequency:每天=每天,每2天")
+    parser.add_argument("--years", type=int, default=1, help="通胀复利年数（默认1）")
+    parser.add_argument("--workers", type=int, help="并行进程数（默认CPU核数）")
+    parser.add_argument("--csv", action="store_true", help="输出每个网格点的CSV")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_sweep(args, out=sys.stdout):
+    """无界面敏感性分析"""
+    columns = DesireColumns.from_desires(load_desire_file(args.file))
+    result = sweep(columns, args.axes, CurrencyConverter(RateTable.load(), args.currency),
+                   args.years, args.workers)
+    if args.csv:
+        write_csv(result, out)
+    else:
+        print(format_sweep(result), file=out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器敏感性分析")
+    add_arguments(parser)
+    sys.exit(run_sweep(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
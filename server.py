@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 本地JSON接口服务
+Local asyncio JSON API server for the desire calculation engine
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from payments import PaymentScheduler
+from desire_core import (
+    DEFAULT_CURRENCY, budget_status, iter_filtered, load_desire_file,
+    normalize_category, normalize_priority,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 两次检查文件是否变化的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 0.5
+
+# 响应缓存最多保留的条目数
+CACHE_SIZE = 1024
+
+# 请求头的最大字节数（超过时返回 431）
+MAX_HEADER_BYTES = 16 * 1024
+
+# 请求体的最大字节数（接口只接受GET，请求体读取后丢弃；超过时返回 413）
+MAX_BODY_BYTES = 64 * 1024
+
+# /upcoming 的 days 参数上限
+MAX_UPCOMING_DAYS = 100 * 366
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ApiError(Exception):
+    """带HTTP状态码的接口错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class DesireFile:
+    """被服务的需求文件，文件变化后自动重载并递增数据版本"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.version = 0
+        self.desires = {}
+        self._columns = None
+        self._scheduler = None
+        self._signature = None
+        self._checked_at = None
+        self._lock = asyncio.Lock()
+        self.reload()
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self):
+        """同步加载文件"""
+        signature = self._stat_signature()
+        self.desires = load_desire_file(self.path)
+        self._signature = signature
+        self.version += 1
+
+    async def refresh(self, loop):
+        """文件有变化时在后台线程重载，不阻塞其他连接"""
+        now = loop.time()
+        if self._checked_at is not None and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        async with self._lock:
+            try:
+                signature = self._stat_signature()
+            except OSError:
+                return
+            if signature == self._signature:
+                return
+            desires = await asyncio.to_thread(load_desire_file, self.path)
+            self.desires = desires
+            self._signature = signature
+            self.version += 1
+
+    def columns(self):
+        """当前版本数据的列式视图（按版本缓存）"""
+        if self._columns is None or self._columns.version != self.version:
+            self._columns = DesireColumns.from_desires(self.desires, self.version)
+        return self._columns
+
+    def scheduler(self):
+        """当前版本数据的付款日程（按版本缓存）"""
+        if self._scheduler is None or self._scheduler[0] != self.version:
+            self._scheduler = (self.version, PaymentScheduler(self.desires))
+        return self._scheduler[1]
+
+
+class DesireServer:
+    """基于 asyncio 的 HTTP/1.1 接口服务（支持 keep-alive）"""
+
+    def __init__(self, paths, cache_size=CACHE_SIZE, rates=None):
+        if not paths:
+            raise ValueError("至少需要一个需求文件")
+        self.files = OrderedDict()
+        for path in paths:
+            desire_file = DesireFile(path)
+            if desire_file.name in self.files:
+                raise ValueError(f"文件名重复: {desire_file.name}")
+            self.files[desire_file.name] = desire_file
+        self.rates = rates if rates is not None else RateTable.load()
+        self._converters = {}
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._routes = {
+            "/files": self._files,
+            "/totals": self._totals,
+            "/desires": self._desires,
+            "/budget": self._budget,
+            "/upcoming": self._upcoming,
+        }
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """启动监听，返回 asyncio.Server"""
+        return await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    writer.write(self._response(431, {"error": "请求头过大"}, False))
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                try:
+                    method, target, keep_alive, body_length = self._parse_head(head)
+                except ApiError as e:
+                    writer.write(self._response(e.status, {"error": str(e)}, False))
+                    break
+                if body_length:
+                    await reader.readexactly(body_length)
+
+                writer.write(await self._dispatch(method, target, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            return None, None, False, 0
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip().lower()
+
+        connection = headers.get("connection", "")
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+        try:
+            body_length = int(headers.get("content-length", 0))
+        except ValueError:
+            body_length = -1
+        if body_length < 0:
+            raise ApiError(400, "无效的 Content-Length")
+        if body_length > MAX_BODY_BYTES:
+            raise ApiError(413, "请求体过大")
+        return method, target, keep_alive, body_length
+
+    async def _dispatch(self, method, target, keep_alive):
+        if method is None:
+            return self._response(400, {"error": "无效的请求行"}, False)
+        if method != "GET":
+            return self._response(405, {"error": "仅支持GET请求"}, keep_alive)
+
+        url = urlsplit(target)
+        handler = self._routes.get(url.path.rstrip("/") or "/")
+        if handler is None:
+            return self._response(404, {"error": f"未知路径: {url.path}"}, keep_alive)
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            desire_file = await self._resolve_file(params.get("file"))
+            versions = tuple(f.version for f in self.files.values())
+            # 付款日程依赖当天日期，缓存按天失效
+            key = (target, versions, keep_alive, date.today())
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                return cached
+
+            self.cache_misses += 1
+            response = self._response(200, handler(desire_file, params), keep_alive)
+            self._cache[key] = response
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return response
+        except ApiError as e:
+            return self._response(e.status, {"error": str(e)}, keep_alive)
+        except Exception as e:
+            return self._response(500, {"error": str(e)}, keep_alive)
+
+    async def _resolve_file(self, name):
+        loop = asyncio.get_running_loop()
+        if name is None:
+            for desire_file in self.files.values():
+                await desire_file.refresh(loop)
+            return next(iter(self.files.values()))
+        desire_file = self.files.get(name)
+        if desire_file is None:
+            raise ApiError(404, f"未知文件: {name}")
+        await desire_file.refresh(loop)
+        return desire_file
+
+    @staticmethod
+    def _response(status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    # 接口实现
+
+    def _files(self, desire_file, params):
+        return {
+            "files": [
+                {"name": f.name, "path": f.path, "version": f.version, "count": len(f.desires)}
+                for f in self.files.values()
+            ]
+        }
+
+    def _statistics(self, desire_file, params):
+        """按 currency 参数（默认CNY）换算后的统计"""
+        currency = params.get("currency", DEFAULT_CURRENCY).upper()
+        if currency != self.rates.base and currency not in self.rates.rates:
+            raise ApiError(400, f"未知的币种: {currency}")
+        converter = self._converters.get(currency)
+        if converter is None:
+            converter = self._converters[currency] = CurrencyConverter(self.rates, currency)
+        return dict(converter.statistics(desire_file.columns()))
+
+    def _totals(self, desire_file, params):
+        stats = self._statistics(desire_file, params)
+        stats["file"] = desire_file.name
+        stats["version"] = desire_file.version
+        return stats
+
+    def _desires(self, desire_file, params):
+        category = _vocab_param(params, "category", normalize_category)
+        priority = _vocab_param(params, "priority", normalize_priority)
+        enabled = params.get("enabled")
+        if enabled is not None:
+            if enabled not in ("true", "false", "1", "0"):
+                raise ApiError(400, f"无效的enabled参数: {enabled}")
+            enabled = enabled in ("true", "1")
+
+        desires = dict(iter_filtered(desire_file.desires, category, priority, enabled))
+        return {
+            "file": desire_file.name,
+            "version": desire_file.version,
+            "count": len(desires),
+            "desires": desires,
+        }
+
+    def _budget(self, desire_file, params):
+        try:
+            goal = float(params["goal"])
+        except KeyError:
+            raise ApiError(400, "缺少goal参数")
+        except ValueError:
+            raise ApiError(400, f"无效的goal参数: {params['goal']}")
+        if goal <= 0:
+            raise ApiError(400, "预算必须大于0")
+
+        stats = self._statistics(desire_file, params)
+        status = budget_status(stats['monthly_total'], goal)
+        status["currency"] = stats["currency"]
+        status["file"] = desire_file.name
+        status["version"] = desire_file.version
+        return status
+
+    def _upcoming(self, desire_file, params):
+        try:
+            today = date.fromisoformat(params["from"]) if "from" in params else date.today()
+        except ValueError:
+            raise ApiError(400, f"无效的from参数: {params['from']}")
+        scheduler = desire_file.scheduler()
+        days = _int_param(params, "days", maximum=MAX_UPCOMING_DAYS)
+        try:
+            if days is not None:
+                payments = scheduler.within(days, today, limit=_int_param(params, "limit"))
+            else:
+                payments = scheduler.upcoming(_int_param(params, "count", 10), today)
+        except OverflowError:
+            raise ApiError(400, "日期超出范围")
+        return {
+            "file": desire_file.name,
+            "version": desire_file.version,
+            "from": today.isoformat(),
+            "unscheduled": len(scheduler.unscheduled),
+            "payments": [dict(payment, date=payment['date'].isoformat()) for payment in payments],
+        }
+
+
+def _int_param(params, key, default=None, maximum=None):
+    text = params.get(key)
+    if text is None:
+        return default
+    try:
+        value = int(text)
+    except ValueError:
+        raise ApiError(400, f"无效的{key}参数: {text}")
+    if value < 0:
+        raise ApiError(400, f"{key}参数不能为负数")
+    if maximum is not None and value > maximum:
+        raise ApiError(400, f"{key}参数不能大于{maximum}")
+    return value
+
+
+def _vocab_param(params, key, normalize):
+    text = params.get(key)
+    if text is None or text.lower() == "all" or text == "全部":
+        return None
+    value = normalize(text)
+    if value is None:
+        raise ApiError(400, f"无效的{key}参数: {text}")
+    return value
+
+
+async def serve(paths, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """启动服务并一直运行"""
+    server = DesireServer(paths)
+    listener = await server.start(host, port)
+    names = ", ".join(server.files)
+    print(f"需求计算器接口已启动: http://{host}:{port} ({names})")
+    async with listener:
+        await listener.serve_forever()
+
+
+def run_server(paths, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """阻塞运行服务，Ctrl+C 退出"""
+    try:
+        asyncio.run(serve(paths, host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器本地接口服务")
+    parser.add_argument("files", nargs="+", help="需求JSON文件")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    run_server(args.files, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
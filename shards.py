@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 分片存储
+Directory layout sharded by category with a manifest of per-shard totals
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable, currency_symbol
+from desire_core import CATEGORIES, DEFAULT_CURRENCY, PRIORITIES, load_desire_file
+from filecodec import write_desire_file
+from merge import changed_ids
+from pivot import text_width
+
+# 分片目录的扩展名，如 desires.shards
+SHARDS_SUFFIX = ".shards"
+
+MANIFEST_NAME = "manifest.json"
+
+# 清单格式版本，结构变化时递增
+MANIFEST_VERSION = 1
+
+SHARDS_FILTER = "Sharded Data (manifest.json)"
+
+
+def is_sharded(path):
+    """path 是否为分片目录"""
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def shard_root(path):
+    """分片目录路径（path 可为目录或其中的清单文件）"""
+    if os.path.basename(path) == MANIFEST_NAME:
+        return os.path.dirname(path)
+    return path
+
+
+def shard_file(category):
+    """类别对应的分片文件名（与类别文本中的字符无关）"""
+    return "shard-" + hashlib.sha1(category.encode("utf-8")).hexdigest()[:12] + ".json"
+
+
+def summarize(desires):
+    """
+    一个分片的汇总：需求数、启用数、按原币种的启用月度花销与启用需求的优先级分布
+
+    月度花销按原币种分别累计，显示总计时可按任意报告币种与汇率换算，不必读取分片。
+    """
+    columns = DesireColumns.from_desires(desires)
+    enabled = columns.enabled
+    sums = np.bincount(columns.currency[enabled], weights=columns.monthly_costs()[enabled],
+                       minlength=len(columns.currencies))
+    currency_counts = np.bincount(columns.currency[enabled], minlength=len(columns.currencies))
+    priorities = np.bincount(columns.priority[enabled], minlength=len(columns.priorities))
+    monthly = {
+        currency: float(sums[code]) for code, currency in enumerate(columns.currencies) if currency_counts[code]
+    }
+    priority_counts = {
+        priority: int(priorities[code]) for code, priority in enumerate(columns.priorities) if priorities[code]
+    }
+    enabled = int(enabled.sum())
+    return {'count': len(desires), 'enabled': enabled, 'monthly': monthly, 'priority_counts': priority_counts}
+
+
+def group_by_category(desires):
+    """需求按类别分组 {类别: {需求ID: 需求}}"""
+    groups = {}
+    for desire_id, desire in desires.items():
+        groups.setdefault(desire['category'], {})[desire_id] = desire
+    return groups
+
+
+def read_manifest(path):
+    """读取分片目录的清单"""
+    with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"不支持的分片清单: {path}")
+    return manifest
+
+
+def _write_manifest(path, manifest):
+    target = os.path.join(path, MANIFEST_NAME)
+    temp = target + ".tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp, target)
+
+
+def _copy(source, target):
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dst.write(chunk)
+
+
+def manifest_statistics(manifest, converter, categories=None):
+    """
+    由清单计算统计（与 CurrencyConverter.statistics 的结构相同），不读取分片
+
+    categories 为要计入的类别，None 表示全部。
+    """
+    monthly_total = 0.0
+    category_totals = {}
+    priority_counts = {priority: 0 for priority in PRIORITIES}
+    count = enabled = 0
+    missing = []
+    for category, entry in manifest['shards'].items():
+        if categories is not None and category not in categories:
+            continue
+        count += entry['count']
+        enabled += entry['enabled']
+        total = 0.0
+        for currency, amount in entry['monthly'].items():
+            factor = converter.rates.factor(currency, converter.reporting)
+            if factor is None:
+                if currency not in missing:
+                    missing.append(currency)
+            else:
+                total += amount * factor
+        monthly_total += total
+        if entry['enabled']:
+            category_totals[category] = total
+        for priority, value in entry['priority_counts'].items():
+            priority_counts[priority] = priority_counts.get(priority, 0) + value
+    return {
+        'monthly_total': monthly_total,
+        'yearly_total': monthly_total * 12,
+        'category_totals': category_totals,
+        'priority_counts': priority_counts,
+        'count': count,
+        'enabled_count': enabled,
+        'currency': converter.reporting,
+        'rates_version': converter.rates.version,
+        'missing_rates': missing,
+    }
+
+
+def combine_statistics(first, second):
+    """合并两部分需求的统计（两者的需求不重叠、报告币种相同）"""
+    category_totals = dict(first['category_totals'])
+    for category, value in second['category_totals'].items():
+        category_totals[category] = category_totals.get(category, 0) + value
+    priority_counts = dict(first['priority_counts'])
+    for priority, value in second['priority_counts'].items():
+        priority_counts[priority] = priority_counts.get(priority, 0) + value
+    monthly_total = first['monthly_total'] + second['monthly_total']
+    return dict(
+        first,
+        monthly_total=monthly_total,
+        yearly_total=monthly_total * 12,
+        category_totals=category_totals,
+        priority_counts=priority_counts,
+        count=first['count'] + second['count'],
+        enabled_count=first['enabled_count'] + second['enabled_count'],
+        missing_rates=first['missing_rates'] + [
+            currency for currency in second['missing_rates'] if currency not in first['missing_rates']
+        ],
+    )
+
+
+class ShardSet:
+    """
+    打开的分片目录
+
+    manifest 为清单，loaded 为已读入内存的类别。分片按需读取，
+    未读入的类别的统计直接来自清单。
+    """
+
+    def __init__(self, path, loaded=()):
+        self.path = shard_root(path)
+        self.manifest = read_manifest(self.path)
+        self.loaded = set(loaded)
+
+    def categories(self):
+        """清单中的类别（按词汇表顺序，词汇表外的类别在后）"""
+        order = {category: index for index, category in enumerate(CATEGORIES)}
+        return sorted(self.manifest['shards'], key=lambda category: (order.get(category, len(order)), category))
+
+    def unloaded(self):
+        return [category for category in self.categories() if category not in self.loaded]
+
+    def needed(self, category=None):
+        """显示某个类别（None 表示全部）需要但尚未读入的类别"""
+        wanted = self.categories() if category is None else [category]
+        return [category for category in wanted
+                if category in self.manifest['shards'] and category not in self.loaded]
+
+    def read(self, categories):
+        """读取指定类别的分片（可在后台线程中调用，不修改 loaded）"""
+        desires = {}
+        for category in categories:
+            desires.update(load_desire_file(os.path.join(self.path, self.manifest['shards'][category]['file'])))
+        return desires
+
+    def statistics(self, converter, categories=None):
+        """指定类别（None 表示全部）的统计，来自清单"""
+        return manifest_statistics(self.manifest, converter, categories)
+
+
+def save_shards(path, desires, loaded=None, base=None, source=None):
+    """
+    按类别分片保存，返回重写的类别
+
+    desires 为 loaded 中各类别的全部需求（loaded 为 None 时 desires 即完整数据）。
+    base 为这些类别上次保存的内容，只重写相对 base 有变化的分片；为 None 时全部重写。
+    loaded 之外的类别沿用 source 目录（默认即 path）中的分片与清单条目；
+    需求移入或新增到 loaded 之外的已有类别时，该类别的分片先与原分片合并再写入。
+    每个分片先写临时文件再替换，清单最后写入。
+    """
+    source = shard_root(source) if source else path
+    same = os.path.abspath(source) == os.path.abspath(path)
+    os.makedirs(path, exist_ok=True)
+    try:
+        previous = read_manifest(source)['shards']
+    except (OSError, ValueError):
+        previous = {}
+    try:
+        current = read_manifest(path)['shards'] if not same else previous
+    except (OSError, ValueError):
+        current = {}
+
+    groups = group_by_category(desires)
+    if loaded is None:
+        # 完整数据：清单中已没有需求的类别随之删除
+        categories = set(groups) | set(previous)
+    else:
+        categories = set(loaded) | set(groups)
+        # 未读入但有需求移入的类别：原分片中其他需求不在 desires 中，合并后再写入
+        tracked = set(desires) | set(base or ())
+        for category in set(groups) - set(loaded):
+            if category in previous:
+                existing = load_desire_file(os.path.join(source, previous[category]['file']))
+                merged = {key: desire for key, desire in existing.items() if key not in tracked}
+                merged.update(groups[category])
+                groups[category] = merged
+    if base is None or not same:
+        dirty = categories
+    else:
+        dirty = set()
+        for desire_id in changed_ids(base, desires):
+            for desire in (base.get(desire_id), desires.get(desire_id)):
+                if desire is not None:
+                    dirty.add(desire['category'])
+
+    shards = {}
+    for category, entry in previous.items():
+        if category in categories:
+            continue
+        if not same:
+            _copy(os.path.join(source, entry['file']), os.path.join(path, entry['file']))
+        shards[category] = entry
+
+    written = []
+    for category in sorted(categories, key=str):
+        group = groups.get(category)
+        if not group:
+            # 类别中已没有需求：删除分片
+            continue
+        entry = current.get(category)
+        if category not in dirty and entry is not None and os.path.exists(os.path.join(path, entry['file'])):
+            shards[category] = entry
+            continue
+        target = os.path.join(path, shard_file(category))
+        write_desire_file(target + ".tmp", group)
+        os.replace(target + ".tmp", target)
+        shards[category] = dict(summarize(group), file=shard_file(category))
+        written.append(category)
+
+    _write_manifest(path, {'version': MANIFEST_VERSION, 'shards': shards})
+    for category, entry in current.items():
+        if category not in shards:
+            try:
+                os.remove(os.path.join(path, entry['file']))
+            except OSError:
+                pass
+    return written
+
+
+def format_manifest(shards, converter):
+    """各分片的需求数、启用数与月度花销（来自清单）"""
+    symbol = currency_symbol(converter.reporting)
+    rows = [("类别", "需求数", "启用", "月度花销")]
+    for category in shards.categories():
+        stats = shards.statistics(converter, [category])
+        rows.append((category, str(stats['count']), str(stats['enabled_count']),
+                     f"{symbol}{stats['monthly_total']:.2f}"))
+    total = shards.statistics(converter)
+    rows.append(("合计", str(total['count']), str(total['enabled_count']), f"{symbol}{total['monthly_total']:.2f}"))
+    widths = [max(text_width(row[index]) for row in rows) for index in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = [row[0] + " " * (widths[0] - text_width(row[0]))]
+        cells += [" " * (width - text_width(cell)) + cell for cell, width in zip(row[1:], widths[1:])]
+        lines.append("  ".join(cells))
+    if total['missing_rates']:
+        lines.append(f"缺少汇率未计入: {', '.join(total['missing_rates'])}")
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("source", help="需求JSON文件或分片目录")
+    parser.add_argument("-o", "--output", help=f"输出：以 {SHARDS_SUFFIX} 结尾时写为分片目录，否则写为单个文件")
+    parser.add_argument("--only", nargs="+", metavar="CATEGORY", help="只读取指定类别的分片")
+    parser.add_argument("--currency", default=DEFAULT_CURRENCY, help="报告币种（默认CNY）")
+
+
+def run_shards(args, out=sys.stdout):
+    """分片目录与单个文件之间转换；只给出分片目录时显示清单中的统计"""
+    source = shard_root(args.source)
+    sharded = is_sharded(source)
+    if not args.output:
+        if not sharded:
+            print(f"不是分片目录: {args.source}（转换请指定 --output）", file=out)
+            return 2
+        print(format_manifest(ShardSet(source), CurrencyConverter(RateTable.load(), args.currency)), file=out)
+        return 0
+
+    if sharded:
+        shards = ShardSet(source)
+        unknown = [category for category in args.only or () if category not in shards.manifest['shards']]
+        if unknown:
+            print(f"分片目录中没有类别: {', '.join(unknown)}", file=out)
+            return 2
+        desires = shards.read(args.only or shards.categories())
+    else:
+        desires = load_desire_file(args.source)
+        if args.only:
+            desires = {key: desire for key, desire in desires.items() if desire['category'] in args.only}
+
+    if args.output.endswith(SHARDS_SUFFIX) or is_sharded(args.output):
+        written = save_shards(args.output, desires)
+        print(f"已写入 {len(written)} 个分片到 {args.output}", file=out)
+    else:
+        write_desire_file(args.output, desires)
+        print(f"已写入 {len(desires)} 个需求到 {args.output}", file=out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器分片存储")
+    add_arguments(parser)
+    sys.exit(run_shards(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
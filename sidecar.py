@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 统计缓存文件
+Persistent aggregate sidecar for instant totals at startup
+"""
+
+import hashlib
+import json
+import os
+
+from columns import DesireColumns
+
+# 缓存文件格式版本，结构变化时递增
+SIDECAR_VERSION = 1
+
+SIDECAR_SUFFIX = ".stats"
+
+
+def sidecar_path(path):
+    """数据文件对应的缓存文件路径"""
+    return path + SIDECAR_SUFFIX
+
+
+def content_hash(data):
+    """数据文件内容的哈希"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_fingerprint(path, data=None):
+    """数据文件的 (大小, 哈希)；未提供内容时流式读取文件（压缩文件按磁盘上的字节计算）"""
+    if data is not None:
+        return len(data), content_hash(data)
+    with open(path, 'rb') as f:
+        digest = hashlib.file_digest(f, 'sha256')
+    return os.path.getsize(path), digest.hexdigest()
+
+
+def build_aggregates(desires, stats=None):
+    """计算缓存中保存的统计信息（stats 为调用方已算好的统计，可省略）"""
+    if stats is None:
+        columns = DesireColumns.from_desires(desires)
+        stats = columns.aggregate(columns.monthly_costs())
+    return {'stats': stats}
+
+
+def write_sidecar(path, data, desires, stats=None):
+    """保存数据文件后写入缓存（data 为刚写入的文件内容，为 None 时读取文件）"""
+    size, digest = file_fingerprint(path, data)
+    payload = {
+        'version': SIDECAR_VERSION,
+        'hash': digest,
+        'size': size,
+        'aggregates': build_aggregates(desires, stats),
+    }
+    target = sidecar_path(path)
+    temp = target + ".tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(temp, target)
+
+
+def read_sidecar(path, data=None):
+    """
+    读取与数据文件内容匹配的缓存
+
+    缓存不存在、损坏或哈希不一致时返回 None，调用方应重新计算。
+    data 为 None 时流式读取文件计算哈希。
+    """
+    try:
+        with open(sidecar_path(path), 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(payload, dict) or payload.get('version') != SIDECAR_VERSION:
+        return None
+    try:
+        # 先比较大小，不一致时无需计算哈希
+        size = len(data) if data is not None else os.path.getsize(path)
+        if payload.get('size') != size or payload.get('hash') != file_fingerprint(path, data)[1]:
+            return None
+    except OSError:
+        return None
+    return payload.get('aggregates')
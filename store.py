@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 需求数据存储
+Thread-safe desire store with snapshot reads, transactional batch edits and coalesced change notifications
+"""
+
+import threading
+from contextlib import contextmanager
+
+from columns import DesireColumns
+
+
+class DesireSnapshot:
+    """
+    某一版本的只读数据快照
+
+    之后的修改不会影响快照，可以在后台线程中使用；desires 不应被修改。
+    """
+
+    def __init__(self, version, desires, columns=None):
+        self.version = version
+        self.desires = desires
+        self._columns = columns
+        self._columns_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.desires)
+
+    def columns(self):
+        """快照的列式表示（首次使用时构建）"""
+        with self._columns_lock:
+            if self._columns is None:
+                self._columns = DesireColumns.from_desires(self.desires, self.version)
+            return self._columns
+
+
+class DesireStore:
+    """
+    需求数据存储
+
+    所有修改都通过存储进行，每条修改替换为新的需求字典（旧字典保持不变），
+    以便监听者拿到修改前后的值。事务内的修改合并为一次通知，
+    同一需求的多次修改只保留最初的旧值和最终的新值；事务出错时回滚。
+
+    监听者参数为 [(需求ID, 旧需求, 新需求)]，新增时旧需求为 None，删除时新需求为 None；
+    参数为 None 表示数据被整体替换。
+
+    写入（含整个事务与变化通知）由锁串行化，监听者在写入的线程中被调用。
+    其他线程通过 snapshot() 读取：快照与存储共享同一个字典，
+    之后的第一次写入先复制字典（写时复制），快照因此保持不变。
+    """
+
+    def __init__(self, desires=None):
+        self.desires = dict(desires or {})
+        self.version = 0
+        self._listeners = []
+        self._depth = 0
+        self._pending = []
+        self._lock = threading.RLock()
+        self._shared = False
+
+    def __len__(self):
+        return len(self.desires)
+
+    def __contains__(self, desire_id):
+        return desire_id in self.desires
+
+    def __getitem__(self, desire_id):
+        return self.desires[desire_id]
+
+    def snapshot(self, columns=None):
+        """
+        当前版本的只读快照（不复制数据）
+
+        其他线程的事务进行中时等待其完成；columns 为调用方已有的同版本列式数据。
+        """
+        with self._lock:
+            self._shared = True
+            if columns is not None and columns.version != self.version:
+                columns = None
+            return DesireSnapshot(self.version, self.desires, columns)
+
+    def _writable(self):
+        """返回可修改的字典：已被快照共享时先复制"""
+        if self._shared:
+            self.desires = dict(self.desires)
+            self._shared = False
+        return self.desires
+
+    def subscribe(self, listener):
+        """注册变化回调"""
+        self._listeners.append(listener)
+
+    def _notify(self, changes):
+        self.version += 1
+        for listener in self._listeners:
+            listener(changes)
+
+    def _record(self, desire_id, old, new):
+        self._pending.append((desire_id, old, new))
+        if self._depth == 0:
+            self._flush()
+
+    def _flush(self):
+        merged = {}
+        for desire_id, old, new in self._pending:
+            if desire_id in merged:
+                old = merged[desire_id][0]
+            merged[desire_id] = (old, new)
+        self._pending = []
+        changes = [(desire_id, old, new) for desire_id, (old, new) in merged.items()
+                   if old is not None or new is not None]
+        if changes:
+            self._notify(changes)
+
+    @contextmanager
+    def transaction(self):
+        """批量修改，结束时只通知一次；出错时撤销本事务内的修改"""
+        with self._lock:
+            savepoint = len(self._pending)
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                desires = self._writable()
+                for desire_id, old, _ in reversed(self._pending[savepoint:]):
+                    if old is None:
+                        desires.pop(desire_id, None)
+                    else:
+                        desires[desire_id] = old
+                del self._pending[savepoint:]
+                raise
+            finally:
+                self._depth -= 1
+            if self._depth == 0:
+                self._flush()
+
+    def add(self, desire_id, desire):
+        """新增或覆盖需求"""
+        with self._lock:
+            desires = self._writable()
+            old = desires.get(desire_id)
+            desires[desire_id] = desire
+            self._record(desire_id, old, desire)
+
+    def update(self, desire_id, **fields):
+        """修改需求字段，返回新需求"""
+        with self._lock:
+            desires = self._writable()
+            old = desires[desire_id]
+            new = dict(old, **fields)
+            desires[desire_id] = new
+            self._record(desire_id, old, new)
+            return new
+
+    def remove(self, desire_id):
+        """删除需求，返回被删除的需求"""
+        with self._lock:
+            old = self._writable().pop(desire_id)
+            self._record(desire_id, old, None)
+            return old
+
+    def replace(self, desires):
+        """整体替换所有需求（加载文件、清空时使用）"""
+        with self._lock:
+            if self._depth:
+                raise RuntimeError("事务中不能整体替换数据")
+            self.desires = dict(desires)
+            self._shared = False
+            self._notify(None)
+
+    # 批量操作：每个操作为一个事务，只产生一次通知
+
+    def add_many(self, desires):
+        with self.transaction():
+            for desire_id, desire in desires.items():
+                self.add(desire_id, desire)
+
+    def remove_many(self, ids):
+        with self.transaction():
+            for desire_id in ids:
+                self.remove(desire_id)
+
+    def update_many(self, ids, **fields):
+        with self.transaction():
+            for desire_id in ids:
+                if any(self.desires[desire_id].get(key) != value for key, value in fields.items()):
+                    self.update(desire_id, **fields)
+
+    def scale_cost(self, ids, factor):
+        """按比例调整花销"""
+        if factor <= 0:
+            raise ValueError("调整比例必须大于0")
+        with self.transaction():
+            for desire_id in ids:
+                self.update(desire_id, cost=round(self.desires[desire_id]['cost'] * factor, 2))
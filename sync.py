@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 多实例同步
+Delta replication between app instances through a local hub
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import sys
+import threading
+import uuid
+
+from desire_core import load_desire_file
+from merge import changed_ids
+from server import DEFAULT_HOST
+
+DEFAULT_SYNC_PORT = 8766
+
+# Unix 套接字地址的前缀，如 unix:/tmp/desires.sock
+UNIX_PREFIX = "unix:"
+
+# 加入时补发的修改每条消息最多包含的需求数
+CATCH_UP_BATCH = 5000
+
+# 单条消息的最大字节数
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+# 广播时等待实例接收的最长秒数，超时的实例视为停滞并断开
+DRAIN_TIMEOUT = 5
+
+# 未知需求的时间戳，低于任何已知的时间戳
+_NO_STAMP = (-1, "")
+
+# 集线器初始数据的时间戳，低于任何实例的修改
+_SEED_STAMP = (0, "")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_address(address):
+    """同步地址："host:port"、"port" 或 "unix:路径" -> (地址族, 地址)"""
+    if address.startswith(UNIX_PREFIX):
+        return socket.AF_UNIX, address[len(UNIX_PREFIX):]
+    host, _, port = address.rpartition(":")
+    try:
+        return socket.AF_INET, (host or DEFAULT_HOST, int(port))
+    except ValueError:
+        raise ValueError(f"无效的同步地址: {address}（应为 host:port 或 unix:路径）") from None
+
+
+def encode_message(message):
+    """一条消息编码为一行JSON"""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def validate_entries(entries):
+    """检查一批修改条目的结构（需求ID、需求或None、[时钟, 实例ID]），不合法时抛出 ValueError"""
+    if not isinstance(entries, list):
+        raise ValueError("changes 必须是列表")
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError("修改条目必须是对象")
+        stamp = entry.get("stamp")
+        if (not isinstance(entry.get("id"), str)
+                or not (entry.get("desire") is None or isinstance(entry["desire"], dict))
+                or not (isinstance(stamp, list) and len(stamp) == 2
+                        and type(stamp[0]) is int and isinstance(stamp[1], str))):
+            raise ValueError(f"无效的修改条目: {entry.get('id')!r}")
+    return entries
+
+
+class ReplicaState:
+    """
+    复制状态：每个需求的当前值与最后一次写入的时间戳 (Lamport 时钟, 实例ID)
+
+    同一需求的并发修改以时间戳较大的一方为准（时钟相同时比较实例ID），
+    删除保留为墓碑，避免较早的修改使需求复活。所有实例与集线器按同一规则合并，
+    无论消息到达顺序如何都得到相同的结果。
+    """
+
+    def __init__(self, replica_id):
+        self.replica_id = replica_id
+        self.clock = 0
+        self.records = {}
+        self.stamps = {}
+
+    def local(self, changes):
+        """为本地修改 [(需求ID, 旧值, 新值)] 分配时间戳，返回要发送的条目"""
+        entries = []
+        for desire_id, _, new in changes:
+            self.clock += 1
+            stamp = (self.clock, self.replica_id)
+            self.records[desire_id] = new
+            self.stamps[desire_id] = stamp
+            entries.append({"id": desire_id, "desire": new, "stamp": list(stamp)})
+        return entries
+
+    def accept(self, entries):
+        """合并收到的条目，返回生效的条目（时间戳比已知的更大）"""
+        accepted = []
+        for entry in entries:
+            stamp = tuple(entry["stamp"])
+            self.clock = max(self.clock, stamp[0])
+            if stamp > self.stamps.get(entry["id"], _NO_STAMP):
+                self.records[entry["id"]] = entry["desire"]
+                self.stamps[entry["id"]] = stamp
+                accepted.append(entry)
+        return accepted
+
+    def diff(self, desires):
+        """desires 相对已同步内容的变化 [(需求ID, 旧值, 新值)]（整体替换数据后使用）"""
+        live = {desire_id: desire for desire_id, desire in self.records.items() if desire is not None}
+        return [(desire_id, live.get(desire_id), desires.get(desire_id))
+                for desire_id in changed_ids(live, desires)]
+
+
+class SyncHub:
+    """
+    同步集线器
+
+    转发各实例的修改：按时间戳合并后只广播生效的条目。每个需求记录最后生效的序号，
+    新加入或重新连接的实例只补发其已知序号之后变化的需求。
+    """
+
+    def __init__(self, desires=None):
+        self.state = ReplicaState("hub")
+        self.seq = 0
+        self.seqs = {}
+        self.writers = set()
+        if desires:
+            # 初始数据的时间戳最小，任何实例的修改都优先
+            self.seq = 1
+            for desire_id, desire in desires.items():
+                self.state.records[desire_id] = desire
+                self.state.stamps[desire_id] = _SEED_STAMP
+                self.seqs[desire_id] = 1
+
+    async def start(self, address):
+        """启动监听，返回 asyncio.Server"""
+        family, target = parse_address(address)
+        if family == socket.AF_UNIX:
+            return await asyncio.start_unix_server(self._handle_connection, target, limit=MAX_MESSAGE_BYTES)
+        host, port = target
+        return await asyncio.start_server(self._handle_connection, host, port, limit=MAX_MESSAGE_BYTES)
+
+    def changes_since(self, since):
+        """序号 since 之后变化的需求（含删除）"""
+        return [{"id": desire_id, "desire": self.state.records[desire_id],
+                 "stamp": list(self.state.stamps[desire_id])}
+                for desire_id, seq in self.seqs.items() if seq > since]
+
+    def apply(self, entries):
+        """合并一批修改，返回生效的条目"""
+        accepted = self.state.accept(entries)
+        if accepted:
+            self.seq += 1
+            for entry in accepted:
+                self.seqs[entry["id"]] = self.seq
+        return accepted
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername") or "unix"
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            if not isinstance(hello, dict) or hello.get("type") != "hello":
+                return
+            writer.write(encode_message({"type": "welcome", "seq": self.seq, "clock": self.state.clock}))
+            pending = self.changes_since(hello.get("since", 0))
+            for start in range(0, len(pending), CATCH_UP_BATCH):
+                writer.write(encode_message({"type": "changes", "seq": self.seq,
+                                             "changes": pending[start:start + CATCH_UP_BATCH]}))
+            writer.write(encode_message({"type": "ready", "seq": self.seq}))
+            # 补发与加入之间没有让出事件循环，之后的广播不会遗漏
+            self.writers.add(writer)
+            await writer.drain()
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError("消息必须是对象")
+                if message.get("type") != "changes":
+                    continue
+                # 整批检查后再合并，不合法的消息不会留下部分修改
+                accepted = self.apply(validate_entries(message.get("changes")))
+                if accepted:
+                    await self._broadcast({"type": "changes", "seq": self.seq, "changes": accepted,
+                                           "origin": message.get("client")})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except (asyncio.LimitOverrunError, ValueError, KeyError, TypeError) as e:
+            logger.warning("断开发送无效消息的实例 %s: %s", peer, e)
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def _broadcast(self, message):
+        """先写入所有实例再同时等待发送，停滞的实例不会拖慢其他实例"""
+        data = encode_message(message)
+        writers = list(self.writers)
+        for writer in writers:
+            writer.write(data)
+        await asyncio.gather(*(self._drain(writer) for writer in writers))
+
+    async def _drain(self, writer):
+        try:
+            await asyncio.wait_for(writer.drain(), DRAIN_TIMEOUT)
+        except (ConnectionError, asyncio.TimeoutError):
+            if writer in self.writers:
+                logger.warning("断开停滞的实例 %s", writer.get_extra_info("peername") or "unix")
+                self.writers.discard(writer)
+                writer.transport.abort()
+
+
+class SyncClient:
+    """
+    同步客户端
+
+    publish() 发送本地修改；read() 阻塞读取下一条消息（可在后台线程中调用），
+    receive() 合并消息中的修改并返回需要应用到本地的条目。
+    read() 之外的方法应在同一线程中调用。
+    """
+
+    def __init__(self, address, client_id=None, timeout=5):
+        self.address = address
+        self.client_id = client_id or uuid.uuid4().hex[:12]
+        self.state = ReplicaState(self.client_id)
+        self.seq = 0
+        self.ready = False
+        family, target = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        self.sock.settimeout(None)
+        if family == socket.AF_INET:
+            # 每条修改立即发出，不等待合并小包
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile("rb")
+        self._send_lock = threading.Lock()
+
+    def hello(self):
+        """加入同步，之后由 read() 收到补发的修改与 ready 消息"""
+        self._send({"type": "hello", "client": self.client_id, "since": self.seq})
+        welcome = self.read()
+        if welcome is None or welcome.get("type") != "welcome":
+            raise ConnectionError("集线器没有响应")
+        self.state.clock = max(self.state.clock, welcome["clock"])
+        return welcome
+
+    def publish(self, changes):
+        """发送本地修改 [(需求ID, 旧值, 新值)]"""
+        entries = self.state.local(changes)
+        if entries:
+            self._send({"type": "changes", "client": self.client_id, "changes": entries})
+        return entries
+
+    def read(self):
+        """读取下一条消息，连接关闭时返回 None"""
+        try:
+            line = self._reader.readline()
+        except (OSError, ValueError):
+            return None
+        return json.loads(line) if line else None
+
+    def receive(self, message):
+        """合并一条消息，返回需要应用到本地的 [(需求ID, 需求或None)]"""
+        self.seq = max(self.seq, message.get("seq", 0))
+        if message["type"] == "ready":
+            self.ready = True
+            return []
+        if message["type"] != "changes":
+            return []
+        return [(entry["id"], entry["desire"]) for entry in self.state.accept(message["changes"])]
+
+    def local_only(self, desires):
+        """加入后集线器中没有的本地需求，作为新增发送以免各实例不一致"""
+        return [(desire_id, None, desire) for desire_id, desire in desires.items()
+                if desire_id not in self.state.stamps]
+
+    def _send(self, message):
+        with self._send_lock:
+            self.sock.sendall(encode_message(message))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def add_arguments(parser):
+    parser.add_argument("--listen", default=f"{DEFAULT_HOST}:{DEFAULT_SYNC_PORT}",
+                        help=f"监听地址 host:port 或 unix:路径（默认 {DEFAULT_HOST}:{DEFAULT_SYNC_PORT}）")
+    parser.add_argument("--seed", help="初始数据文件（默认由第一个加入的实例提供）")
+
+
+async def serve_hub(address, desires=None, out=sys.stdout):
+    """启动集线器并一直运行"""
+    hub = SyncHub(desires)
+    listener = await hub.start(address)
+    print(f"需求计算器同步集线器已启动: {address}（{len(hub.state.records)} 个初始需求）", file=out)
+    async with listener:
+        await listener.serve_forever()
+
+
+def run_hub(args, out=sys.stdout):
+    """阻塞运行集线器，Ctrl+C 退出"""
+    desires = load_desire_file(args.seed) if args.seed else None
+    try:
+        asyncio.run(serve_hub(args.listen, desires, out))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器同步集线器")
+    add_arguments(parser)
+    sys.exit(run_hub(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证界面性能基准
+Test script - Verify the offscreen UI performance harness
+"""
+
+import time
+
+from benchmark import (
+    DEFAULT_THRESHOLDS, StepTimer, check_result, format_codec_results, format_results, run_benchmark,
+    run_codec_benchmark, synthetic_desires
+)
+
+from PyQt5.QtWidgets import QApplication
+
+
+def test_synthetic_desires():
+    """测试合成数据"""
+    print("=== 测试合成数据 ===")
+
+    desires = synthetic_desires(500, seed=3)
+    assert len(desires) == 500
+    assert desires == synthetic_desires(500, seed=3)
+    assert all(desire['cost'] > 0 for desire in desires.values())
+    print("✅ 合成数据数量正确且可复现")
+
+    return True
+
+
+def test_scripted_steps_and_thresholds():
+    """测试脚本化操作的测量结果与阈值判断"""
+    print("\n=== 测试脚本化操作 ===")
+
+    strict = {"toggle": {"wall": 0.0}}
+    results = run_benchmark([50], strict)
+    print(format_results(results))
+
+    assert [result['step'] for result in results] == list(DEFAULT_THRESHOLDS)
+    for result in results:
+        assert result['completed']
+        assert result['wall'] >= result['stall'] >= 0
+        assert result['memory'] >= 0 and result['rss'] > 0
+    by_step = {result['step']: result for result in results}
+    assert not by_step['toggle']['passed']
+    assert by_step['toggle']['failures'][0].startswith("wall")
+    assert by_step['export']['passed']
+    print("✅ 每步都记录了耗时、卡顿与内存，超出阈值时判定失败")
+
+    return True
+
+
+def test_stall_limit_does_not_scale():
+    """测试阻塞事件循环超过上限的步骤无论数据量多大都判定失败"""
+    print("\n=== 测试卡顿阈值 ===")
+
+    app = QApplication.instance() or QApplication([])
+    limits = DEFAULT_THRESHOLDS["filter_return"]
+    result = StepTimer().measure(lambda: time.sleep(limits["stall"] + 0.2))
+    print(f"阻塞 {result['stall']:.3f}s，耗时 {result['wall']:.3f}s")
+    for count in (1000, 5000, 1_000_000):
+        failures = check_result(result, limits, count)
+        assert any(failure.startswith("stall") for failure in failures), (count, failures)
+    print("✅ 卡顿上限不随数据量放宽，5000 与 100 万条需求时同样判定失败")
+
+    assert check_result(dict(result, stall=0.0), {"wall": limits["stall"]}, 100_000) == []
+    assert check_result(dict(result, stall=0.0), {"wall": limits["stall"]}, 1000)[0].startswith("wall")
+    print("✅ 耗时上限按数据量的平方根放宽")
+    app.processEvents()
+
+    return True
+
+
+def test_codec_report():
+    """测试存储格式对比"""
+    print("\n=== 测试存储格式对比 ===")
+
+    results = run_codec_benchmark(1000)
+    print(format_codec_results(results))
+    assert [result['codec'] for result in results][:3] == ["none", "gzip", "lzma"]
+    assert all(result['roundtrip'] and result['save'] > 0 for result in results)
+    assert results[0]['ratio'] == 1 and results[1]['ratio'] < 0.2
+    print("✅ 每种格式记录了文件大小、保存与加载耗时")
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试性能基准...")
+    print("=" * 50)
+
+    tests = [
+        test_synthetic_desires,
+        test_scripted_steps_and_thresholds,
+        test_stall_limit_does_not_scale,
+        test_codec_report,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
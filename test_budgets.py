@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证分类预算监控
+Test script - Verify per-category budget monitoring
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmark import _ScriptedDialogs
+from budgets import BudgetMonitor, add_arguments, run_check
+from currency import CurrencyConverter, RateTable
+from main import DesireCalculator
+
+from PyQt5.QtWidgets import QApplication
+
+
+def _desire(cost, category="住房", priority="中", frequency="每月", enabled=True):
+    return {"name": "x", "frequency": frequency, "cost": cost,
+            "priority": priority, "category": category, "enabled": enabled}
+
+
+def test_crossing_events():
+    """测试阈值跨越事件"""
+    print("=== 测试预算状态事件 ===")
+
+    monitor = BudgetMonitor({("category", "住房"): 1000, ("priority", "高"): 500})
+    received = []
+    monitor.subscribe(received.extend)
+    monitor.reset({})
+
+    rent = _desire(850)
+    events = monitor.apply([(None, rent)])
+    assert [(e["key"], e["previous"], e["level"]) for e in events] == [("住房", "under", "warning")]
+
+    bigger = dict(rent, cost=1200)
+    events = monitor.apply([(rent, bigger)])
+    assert [(e["previous"], e["level"]) for e in events] == [("warning", "over")]
+
+    disabled = dict(bigger, enabled=False)
+    events = monitor.apply([(bigger, disabled)])
+    assert [(e["previous"], e["level"]) for e in events] == [("over", "under")]
+
+    # 不影响已设预算的变化不产生事件
+    assert monitor.apply([(None, _desire(100, category="餐饮"))]) == []
+    assert len(received) == 3
+    print("✅ under → warning → over → under 事件正确")
+
+    return True
+
+
+def test_budget_currency():
+    """测试预算连同币种保存，切换报告币种后按汇率换算"""
+    print("\n=== 测试预算币种 ===")
+
+    converter = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0}, version=1))
+    monitor = BudgetMonitor(converter=converter)
+    monitor.set_budget("category", "住房", 3000)
+    desires = {"d1": _desire(2800)}
+    monitor.reset(desires)
+    assert monitor.status("category", "住房")["level"] == "warning"
+
+    converter.set_reporting("USD")
+    events = monitor.reset(desires)
+    status = monitor.status("category", "住房")
+    assert abs(status["limit"] - 3000 / 7) < 1e-9 and abs(status["used"] - 400) < 1e-9
+    assert status["budget"] == 3000 and status["budget_currency"] == "CNY"
+    assert events == [] and status["level"] == "warning"
+    print("✅ ¥3000 的预算在美元报告币种下按 $428.57 比较")
+
+    config = json.loads(json.dumps(monitor.to_config()))
+    assert config["category"]["住房"] == {"amount": 3000.0, "currency": "CNY"}
+    assert BudgetMonitor.parse_config(config) == {("category", "住房"): (3000.0, "CNY")}
+    assert BudgetMonitor.parse_config({"total": 5000}) == {("total", None): (5000.0, "CNY")}
+    print("✅ 配置保存每个预算的币种，旧版本的纯数字按默认币种读取")
+
+    missing = BudgetMonitor({("total", None): (100, "EUR")}, converter)
+    missing.reset(desires)
+    assert missing.status("total") is None and missing.statuses() == []
+    print("✅ 缺少汇率的预算不参与比较")
+
+    app = QApplication.instance() or QApplication([])
+    with _ScriptedDialogs() as dialogs:
+        window = DesireCalculator()
+        window.store.replace({"d1": _desire(2800)})
+        window.budget_monitor.set_budget("total", None, 3000)
+        window.apply_total_budget()
+        assert window.budget_label.text() == "Budget: ¥3000.00"
+        rate = window.rates.factor("CNY", "USD")
+        window.set_reporting_currency("USD")
+        assert abs(window.budget_goal - 3000 * rate) < 1e-6
+        assert window.budget_label.text() == f"Budget: ${3000 * rate:.2f} (¥3000.00)"
+        print(f"✅ 界面切换为美元后总预算显示为 {window.budget_label.text()}")
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        assert not dialogs.errors
+
+    return True
+
+
+def test_incremental_matches_full_recompute():
+    """测试增量结果与全量计算一致"""
+    print("\n=== 测试增量与全量一致 ===")
+
+    rng = random.Random(1)
+    categories = ["住房", "餐饮", "交通", "娱乐"]
+    priorities = ["低", "中", "高", "必需"]
+    desires = {i: _desire(rng.uniform(1, 100), rng.choice(categories), rng.choice(priorities),
+                          rng.choice(["每天", "每周", "每月"]), rng.random() > 0.2)
+               for i in range(2000)}
+    budgets = {("category", c): 20000 for c in categories}
+    budgets[("total", None)] = 60000
+
+    incremental = BudgetMonitor(budgets)
+    incremental.reset(desires)
+    for _ in range(500):
+        key = rng.randrange(2000)
+        old = desires[key]
+        new = dict(old, enabled=not old["enabled"], cost=rng.uniform(1, 100))
+        desires[key] = new
+        incremental.apply([(old, new)])
+
+    full = BudgetMonitor(budgets)
+    full.reset(desires)
+    for status_a, status_b in zip(incremental.statuses(), full.statuses()):
+        assert abs(status_a["used"] - status_b["used"]) < 1e-6
+        assert status_a["level"] == status_b["level"]
+    print("✅ 500 次随机修改后与全量计算一致")
+
+    return True
+
+
+def test_single_edit_is_constant_time():
+    """测试大数据量下单次修改的耗时"""
+    print("\n=== 测试单次修改耗时 ===")
+
+    desires = {i: _desire(10, category=f"类别{i % 40}") for i in range(100000)}
+    monitor = BudgetMonitor({("category", f"类别{i}"): 30000 for i in range(40)})
+    monitor.reset(desires)
+
+    start = time.perf_counter()
+    for i in range(1000):
+        old = desires[i]
+        monitor.apply([(old, dict(old, cost=11))])
+    elapsed = (time.perf_counter() - start) / 1000
+    assert elapsed < 0.001
+    print(f"✅ 100k 需求、40 个预算，单次修改 {elapsed * 1e6:.1f}µs")
+
+    return True
+
+
+def test_headless_check():
+    """测试无界面预算检查"""
+    print("\n=== 测试无界面预算检查 ===")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"d1": _desire(3000), "d2": _desire(50, "餐饮", frequency="每天")}, f)
+    try:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        out = io.StringIO()
+        code = run_check(parser.parse_args([path, "--set", "category:住房=2500",
+                                            "--set", "total=10000"]), out)
+        assert code == 1
+        assert "类别[住房]: 正常 → 超支" in out.getvalue()
+        print(out.getvalue().strip())
+        print("✅ 存在超支时退出码为 1")
+
+        for text in ("category=3000", "priority:=3000", "total:住房=3000", "category:Spaceship=3000", "priority:x=1"):
+            try:
+                with contextlib.redirect_stderr(io.StringIO()):
+                    parser.parse_args([path, "--set", text])
+            except SystemExit:
+                pass
+            else:
+                raise AssertionError(f"应拒绝 {text}")
+        assert parser.parse_args([path, "--set", "priority:高=2000"]).overrides == [("priority", "高", 2000.0)]
+        print("✅ 类别与优先级预算缺少对象、对象无法识别、总预算指定了对象时拒绝")
+
+        args = parser.parse_args([path, "--set", "category:Housing=3000", "--set", "priority:High=2000"])
+        assert args.overrides == [("category", "住房", 3000.0), ("priority", "高", 2000.0)]
+        assert BudgetMonitor.parse_config({"category": {"Housing": 3000}}) == {("category", "住房"): (3000.0, "CNY")}
+        try:
+            BudgetMonitor.parse_config({"category": {"Spaceship": 3000}})
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("应拒绝无法识别的类别")
+        print("✅ 命令行与配置文件中的英文类别/优先级映射到规范值")
+    finally:
+        os.remove(path)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试分类预算...")
+    print("=" * 50)
+
+    tests = [
+        test_crossing_events,
+        test_budget_currency,
+        test_incremental_matches_full_recompute,
+        test_single_edit_is_constant_time,
+        test_headless_check,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
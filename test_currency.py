@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证多币种换算
+Test script - Verify multi-currency conversion
+"""
+
+import random
+import time
+
+from budgets import BudgetMonitor
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from desire_core import calculate_statistics
+
+RATES = RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}, version=1)
+
+
+def _desire(cost, currency="CNY", category="住房", priority="中", frequency="每月", enabled=True):
+    return {"name": "x", "frequency": frequency, "cost": cost, "priority": priority,
+            "category": category, "currency": currency, "enabled": enabled}
+
+
+def _random_desires(count, currencies=("CNY",), seed=1):
+    rng = random.Random(seed)
+    return {
+        str(i): _desire(round(rng.uniform(1, 500), 2), rng.choice(currencies),
+                        rng.choice(["住房", "餐饮", "交通", "娱乐"]),
+                        rng.choice(["低", "中", "高", "必需"]),
+                        rng.choice(["每天", "每周", "每月", "每季度", "每年"]),
+                        rng.random() > 0.2)
+        for i in range(count)
+    }
+
+
+def test_matches_single_currency_statistics():
+    """测试单一币种时与原有统计一致"""
+    print("=== 测试与原有统计一致 ===")
+
+    desires = _random_desires(3000)
+    stats = CurrencyConverter(RATES).statistics(DesireColumns.from_desires(desires, 1))
+    expected = calculate_statistics(desires)
+
+    assert abs(stats['monthly_total'] - expected['monthly_total']) < 1e-6
+    assert stats['priority_counts'] == expected['priority_counts']
+    assert stats['enabled_count'] == expected['enabled_count']
+    assert stats['category_totals'].keys() == expected['category_totals'].keys()
+    for category, total in expected['category_totals'].items():
+        assert abs(stats['category_totals'][category] - total) < 1e-6
+    print("✅ 向量化统计与逐条计算结果一致")
+
+    return True
+
+
+def test_conversion_and_missing_rates():
+    """测试换算结果与缺失汇率"""
+    print("\n=== 测试换算与缺失汇率 ===")
+
+    desires = {
+        "a": _desire(100, "USD"),
+        "b": _desire(10, "EUR", frequency="每天"),
+        "c": _desire(70, "CNY", category="餐饮"),
+        "d": _desire(5, "XYZ"),
+    }
+    columns = DesireColumns.from_desires(desires, 1)
+
+    stats = CurrencyConverter(RATES, "USD").statistics(columns)
+    assert abs(stats['monthly_total'] - (100 + 10 * 30 * 8 / 7 + 10)) < 1e-9
+    assert abs(stats['category_totals']['餐饮'] - 10) < 1e-9
+    assert stats['missing_rates'] == ["XYZ"]
+    assert stats['currency'] == "USD"
+    print("✅ 按币种换算，缺少汇率的币种被报告且不计入")
+
+    converter = CurrencyConverter(RATES, "EUR")
+    assert abs(converter.monthly_cost(desires["a"]) - 700 / 8) < 1e-9
+    assert converter.monthly_cost(desires["d"]) == 0
+    print("✅ 单条换算与批量换算一致")
+
+    return True
+
+
+def test_change_statistics():
+    """测试增量变化的统计与整体重算一致"""
+    print("\n=== 测试增量变化统计 ===")
+
+    old = _random_desires(500, ("CNY", "USD"))
+    new = dict(old)
+    new["1"] = dict(old["1"], cost=old["1"]["cost"] + 10, category="餐饮")
+    new["2"] = dict(old["2"], enabled=not old["2"]["enabled"])
+    del new["3"]
+    new["extra"] = _desire(42, "EUR", category="交通")
+    changes = [(desire_id, old.get(desire_id), new.get(desire_id)) for desire_id in ("1", "2", "3", "extra")]
+
+    converter = CurrencyConverter(RATES)
+    impact = converter.change_statistics(changes)
+    before = converter.statistics(DesireColumns.from_desires(old))
+    after = converter.statistics(DesireColumns.from_desires(new))
+    assert abs(before['monthly_total'] + impact['monthly_delta'] - after['monthly_total']) < 1e-6
+    assert before['enabled_count'] + impact['enabled_delta'] == after['enabled_count']
+    assert before['count'] + impact['count_delta'] == after['count'] == 500
+    for category, value in after['category_totals'].items():
+        expected = before['category_totals'].get(category, 0) + impact['category_deltas'].get(category, 0)
+        assert abs(expected - value) < 1e-6
+    print("✅ 只按变化的需求计算，结果与整体重算一致")
+
+    return True
+
+
+def test_cache_invalidation():
+    """测试按数据版本、汇率版本与报告币种缓存"""
+    print("\n=== 测试换算缓存 ===")
+
+    desires = _random_desires(200000, ("CNY", "USD", "EUR"))
+    columns = DesireColumns.from_desires(desires, 1)
+    rates = RateTable(dict(RATES.rates), version=1)
+    converter = CurrencyConverter(rates)
+
+    start = time.perf_counter()
+    first = converter.statistics(columns)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    assert converter.statistics(columns) is first
+    warm = time.perf_counter() - start
+    print(f"✅ 20万条三种币种: 首次 {cold * 1000:.1f}ms，缓存命中 {warm * 1e6:.1f}µs")
+
+    converter.set_reporting("USD")
+    in_usd = converter.statistics(columns)
+    assert abs(in_usd['monthly_total'] * 7 - first['monthly_total']) < 1e-3
+
+    rates.rates["USD"] = 6.0
+    rates.version = 2
+    changed = converter.statistics(columns)
+    assert changed is not in_usd and changed['rates_version'] == 2
+
+    # 相同版本号的另一份数据不能命中缓存
+    other = DesireColumns.from_desires({"x": _desire(1)}, 1)
+    assert converter.statistics(other)['count'] == 1
+    print("✅ 切换币种、更新汇率或更换数据后重新计算")
+
+    return True
+
+
+def test_budget_monitor_with_currency():
+    """测试预算在报告币种下的增量与全量一致"""
+    print("\n=== 测试多币种预算 ===")
+
+    desires = _random_desires(2000, ("CNY", "USD", "EUR"), seed=2)
+    budgets = {("total", None): 30000, ("category", "住房"): 8000}
+    converter = CurrencyConverter(RATES, "USD")
+
+    incremental = BudgetMonitor(budgets, converter)
+    incremental.reset(desires)
+    rng = random.Random(3)
+    for _ in range(300):
+        key = str(rng.randrange(2000))
+        old = desires[key]
+        new = dict(old, currency=rng.choice(["CNY", "USD", "EUR"]), enabled=not old["enabled"])
+        desires[key] = new
+        incremental.apply([(old, new)])
+
+    full = BudgetMonitor(budgets, CurrencyConverter(RATES, "USD"))
+    full.reset(desires)
+    for status_a, status_b in zip(incremental.statuses(), full.statuses()):
+        assert abs(status_a['used'] - status_b['used']) < 1e-6
+        assert status_a['currency'] == "USD"
+    print("✅ 修改币种后增量预算与全量计算一致")
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试多币种...")
+    print("=" * 50)
+
+    tests = [
+        test_matches_single_currency_statistics,
+        test_conversion_and_missing_rates,
+        test_change_statistics,
+        test_cache_invalidation,
+        test_budget_monitor_with_currency,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
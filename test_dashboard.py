@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证仪表板图表
+Test script - Verify the cached dashboard charts fed by the aggregated statistics
+"""
+
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from main import BarChart, DesireCalculator
+
+from PyQt5.QtWidgets import QApplication
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+# 一帧的时长（秒）
+FRAME = 1 / 60
+
+
+def test_redraw_only_on_change():
+    """测试条形图只在汇总值变化时重绘"""
+    print("=== 测试图表缓存 ===")
+
+    app = QApplication.instance() or QApplication([])
+    chart = BarChart()
+    chart.resize(400, 200)
+    chart.grab()
+    assert chart.renders == 1
+    print("✅ 没有数据时显示占位文字")
+
+    assert chart.set_bars([("Housing", 3000.004), ("Food", 900)], "¥")
+    chart.grab()
+    chart.grab()
+    assert chart.renders == 2
+    assert not chart.set_bars([("Housing", 3000.001), ("Food", 900.0)], "¥")
+    chart.grab()
+    assert chart.renders == 2
+    print("✅ 数值在显示精度内不变时不重绘，重复绘制直接使用缓存的图像")
+
+    assert chart.set_bars([("Housing", 3000), ("Food", 900)], "$")
+    chart.resize(420, 200)
+    chart.grab()
+    assert chart.renders == 3
+    print("✅ 货币符号或尺寸变化时重绘一次")
+    app.processEvents()
+
+    return True
+
+
+def test_fast_redraw_for_large_data():
+    """测试一百万条需求时切换一个需求后的重绘耗时"""
+    print("\n=== 测试大数据量重绘 ===")
+
+    app = QApplication.instance() or QApplication([])
+    desires = synthetic_desires(1_000_000, seed=81)
+    columns = DesireColumns.from_desires(desires, 1)
+    chart = BarChart()
+    chart.resize(480, 220)
+
+    def bars(stats):
+        return sorted(stats['category_totals'].items(), key=lambda item: -item[1])
+
+    chart.set_bars(bars(CONVERTER.statistics(columns)), "¥")
+    chart.grab()
+    desire_id = next(key for key, desire in desires.items() if desire['enabled'])
+    changes = [(desire_id, desires[desire_id], dict(desires[desire_id], enabled=False))]
+    stats = CONVERTER.statistics(columns.apply_changes(changes, 2))
+
+    start = time.perf_counter()
+    assert chart.set_bars(bars(stats), "¥")
+    chart.grab()
+    elapsed = time.perf_counter() - start
+    assert chart.renders == 2
+    assert elapsed < FRAME, f"重绘耗时 {elapsed * 1000:.1f}ms"
+    print(f"✅ 1,000,000 个需求中关闭一个后重绘类别图 {elapsed * 1000:.2f}ms（一帧 {FRAME * 1000:.1f}ms）")
+    app.processEvents()
+
+    return True
+
+
+def test_dashboard_in_window():
+    """测试界面中的仪表板由统计结果驱动，只重绘变化的图表"""
+    print("\n=== 测试界面仪表板 ===")
+
+    app = QApplication.instance() or QApplication([])
+    desires = synthetic_desires(5000, seed=82)
+    with _ScriptedDialogs() as dialogs:
+        window = DesireCalculator()
+        window.store.replace(desires)
+        charts = (window.category_chart, window.priority_chart, window.trend_chart)
+
+        def renders():
+            app.processEvents()
+            for chart in charts:
+                chart.grab()
+            return [chart.renders for chart in charts]
+
+        stats = window.converter.statistics(window.columns())
+        assert dict(window.category_chart.bars)["Housing"] == round(stats['category_totals']["住房"], 2)
+        assert window.priority_chart.bars == [
+            (label, stats['priority_counts'][value])
+            for label, value in (("Low", "低"), ("Medium", "中"), ("High", "高"), ("Essential", "必需"))
+        ]
+        print("✅ 类别花销与优先级分布与统计结果一致（界面英文标签）")
+
+        before = renders()
+        desire_id = next(key for key, desire in desires.items() if desire['enabled'] and desire['cost'] > 1)
+        window.toggle_desire(desire_id, False)
+        after = renders()
+        assert [b - a for a, b in zip(before, after)] == [1, 1, 0]
+        print("✅ 关闭一个需求后类别图与优先级图各重绘一次，趋势图不重绘")
+
+        before = after
+        window.category_filter.setCurrentText("Food")
+        window.category_filter.setCurrentText("All")
+        assert renders() == before
+        print("✅ 切换筛选条件不改变汇总值，图表不重绘")
+
+        window.reporting_combo.setCurrentText("USD")
+        assert renders()[:2] == [before[0] + 1, before[1]]
+        assert window.category_chart.symbol == "$"
+        print("✅ 更换报告币种只重绘金额相关的类别图")
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        assert not dialogs.errors
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试仪表板...")
+    print("=" * 50)
+
+    tests = [
+        test_redraw_only_on_change,
+        test_fast_redraw_for_large_data,
+        test_dashboard_in_window,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
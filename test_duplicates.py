@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证重复需求检测
+Test script - Verify exact and near-duplicate detection and batched merge
+"""
+
+import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from currency import CurrencyConverter, RateTable
+from desire_core import load_desire_file
+from duplicates import add_arguments, find_duplicates, normalize_name, run_duplicates
+from filecodec import write_desire_file
+from main import DesireCalculator
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QDialog, QPushButton, QTableWidget
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def _desire(name, cost, frequency="每月", category="住房", enabled=True, currency="CNY"):
+    return {"name": name, "frequency": frequency, "cost": cost, "priority": "中",
+            "category": category, "currency": currency, "enabled": enabled}
+
+
+SAMPLE = {
+    "rent": _desire("房租月租", 3000),
+    "rent_copy": _desire("房租月租", 3000),
+    "rent_spaced": _desire("房租 月租", 3100),
+    "rent_other": _desire("房租月租", 3000, category="其他"),
+    "stage_1": _desire("贷款第1期", 500),
+    "stage_2": _desire("贷款第2期", 500),
+    "gym": _desire("Gym Membership", 20, currency="USD"),
+    "gym_upper": _desire("GYM membership!", 21, currency="USD"),
+    "gym_off": _desire("gym membership", 20, currency="USD", enabled=False),
+    "coffee": _desire("咖啡", 30, frequency="每天", category="餐饮"),
+    "coffee_dear": _desire("咖啡", 60, frequency="每天", category="餐饮"),
+}
+
+
+def test_exact_and_near_groups():
+    """测试完全相同与近似重复的分组及月度影响"""
+    print("=== 测试重复分组 ===")
+
+    assert normalize_name("ＧＹＭ  Membership!") == normalize_name("gym membership") == "gymmembership"
+    result = find_duplicates(SAMPLE, CONVERTER)
+    groups = {group['keep']: group for group in result['groups']}
+    assert sorted(groups) == ["gym", "rent"]
+    assert groups['rent']['duplicates'] == ["rent_copy", "rent_spaced"]
+    assert groups['rent']['kind'] == "near"
+    assert groups['gym']['duplicates'] == ["gym_upper", "gym_off"]
+    print("✅ 名称忽略空白、标点与大小写后相近且花销相近的需求分为一组，保留最先出现的需求")
+
+    assert abs(groups['rent']['impact'] - 6100) < 1e-6
+    assert abs(groups['gym']['impact'] - 21 * 7) < 1e-6
+    assert [group['keep'] for group in result['groups']] == ["rent", "gym"]
+    assert abs(result['impact'] - 6247) < 1e-6 and result['duplicates'] == 4
+    print("✅ 月度影响只计入启用的重复项（按报告币种换算），分组按影响从大到小排列")
+
+    # 类别不同、名称中的数字不同或花销相差过大时不是重复
+    assert "rent_other" not in groups and "stage_1" not in groups and "coffee" not in groups
+    exact = find_duplicates(SAMPLE, CONVERTER, exact_only=True)
+    assert [(group['keep'], group['duplicates'], group['kind']) for group in exact['groups']] == [
+        ("rent", ["rent_copy"], "exact")]
+    assert exact['exact'] == result['exact'] == 1
+    print("✅ 类别不同、名称中的数字不同（第1期/第2期）或花销相差过大时不合并；只查找完全相同的需求")
+
+    return True
+
+
+def test_scales_to_large_data():
+    """测试大数据量下的查找时间与结果"""
+    print("\n=== 测试大数据量查找 ===")
+
+    desires = synthetic_desires(200_000, seed=61)
+    planted = {}
+    for index in range(0, 200_000, 1000):
+        original = desires[f"desire_{index}"]
+        planted[f"copy_{index}"] = dict(original)
+        planted[f"near_{index}"] = dict(original, name=original['name'] + " ", cost=original['cost'] * 1.05)
+    desires.update(planted)
+
+    start = time.perf_counter()
+    result = find_duplicates(desires, CONVERTER)
+    elapsed = time.perf_counter() - start
+    groups = {group['keep']: group for group in result['groups']}
+    for index in range(0, 200_000, 1000):
+        assert groups[f"desire_{index}"]['duplicates'] == [f"copy_{index}", f"near_{index}"]
+    assert result['exact'] == 200
+    assert elapsed < 30, f"查找耗时过长: {elapsed:.1f}s"
+    print(f"✅ 200,400 个需求中找出全部 200 组植入的重复（{len(result['groups'])} 组），耗时 {elapsed:.2f}s")
+
+    return True
+
+
+def test_headless_report_and_merge():
+    """测试无界面的重复报告与合并"""
+    print("\n=== 测试无界面重复检测 ===")
+
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, "desires.json")
+    write_desire_file(source, SAMPLE)
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    try:
+        out = io.StringIO()
+        assert run_duplicates(parser.parse_args([source]), out) == 1
+        print(out.getvalue())
+        assert out.getvalue().startswith("2 组重复，4 个重复项（其中 1 个内容完全相同）")
+
+        out = io.StringIO()
+        assert run_duplicates(parser.parse_args([source, "--csv", "--exact"]), out) == 1
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        assert rows[0][:4] == ["group", "kind", "action", "id"]
+        assert [row[2:4] for row in rows[1:]] == [["keep", "rent"], ["remove", "rent_copy"]]
+        print("✅ 文字与CSV报告，存在重复时返回 1")
+
+        merged = os.path.join(folder, "merged.json")
+        assert run_duplicates(parser.parse_args([source, "-o", merged]), io.StringIO()) == 0
+        remaining = load_desire_file(merged)
+        assert sorted(set(SAMPLE) - set(remaining)) == ["gym_off", "gym_upper", "rent_copy", "rent_spaced"]
+        assert run_duplicates(parser.parse_args([merged]), io.StringIO()) == 0
+        print("✅ 合并全部分组后写入新文件，再次检测没有重复")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_merge_in_window():
+    """测试界面中勾选分组后一键合并"""
+    print("\n=== 测试界面合并 ===")
+
+    app = QApplication.instance() or QApplication([])
+    exec_ = QDialog.exec_
+    try:
+        with _ScriptedDialogs() as dialogs:
+            window = DesireCalculator()
+            window.store.replace(SAMPLE)
+            seen = {}
+
+            def wait(done, timeout=30):
+                deadline = time.perf_counter() + timeout
+                while not done():
+                    assert time.perf_counter() < deadline, "等待超时"
+                    app.processEvents()
+
+            def run(dialog):
+                buttons = {button.text(): button for button in dialog.findChildren(QPushButton)}
+                table = dialog.findChildren(QTableWidget)[0]
+                wait(lambda: buttons["Find"].isEnabled())
+                seen['rows'] = [table.item(row, 1).text() for row in range(table.rowCount())]
+                # 只合并第一组（房租）
+                table.item(3, 0).setCheckState(Qt.Unchecked)
+                buttons["Merge Selected"].click()
+                wait(lambda: buttons["Find"].isEnabled())
+                seen['after'] = table.rowCount()
+                return 0
+
+            QDialog.exec_ = run
+            total = window.converter.statistics(window.columns())['monthly_total']
+            window.show_duplicates()
+
+            assert seen['rows'] == ["Keep", "Remove", "Remove", "Keep", "Remove", "Remove"]
+            assert "rent_copy" not in window.desires and "rent_spaced" not in window.desires
+            assert "gym_upper" in window.desires and seen['after'] == 3
+            assert abs(window.converter.statistics(window.columns())['monthly_total'] - (total - 6100)) < 1e-6
+            print("✅ 只合并勾选的分组，合并后重新查找只剩未合并的分组")
+
+            window.store.update("gym_upper", cost=25)
+            notified = []
+            window.store.subscribe(notified.append)
+            assert window.merge_duplicates(SAMPLE, find_duplicates(SAMPLE, CONVERTER)['groups']) == 1
+            assert "gym_upper" in window.desires and "gym_off" not in window.desires
+            assert [[change[0] for change in changes] for changes in notified] == [["gym_off"]]
+            print("✅ 查找后又被修改或已删除的需求不受影响；合并在一次事务中完成，只通知一次")
+
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+            assert not dialogs.errors
+    finally:
+        QDialog.exec_ = exec_
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试重复需求检测...")
+    print("=" * 50)
+
+    tests = [
+        test_exact_and_near_groups,
+        test_scales_to_large_data,
+        test_headless_report_and_merge,
+        test_merge_in_window,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
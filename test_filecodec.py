@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证压缩存储
+Test script - Verify compressed save/load
+"""
+
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from benchmark import synthetic_desires
+from desire_core import load_desire_file
+from filecodec import (
+    available_codecs, codec_for_path, detect_codec, read_desire_text, write_desire_file
+)
+from sidecar import read_sidecar, write_sidecar
+
+
+def test_roundtrip_and_detection():
+    """测试各格式读写一致，并按魔数识别格式"""
+    print("=== 测试读写与格式识别 ===")
+
+    desires = synthetic_desires(2000, seed=1)
+    folder = tempfile.mkdtemp()
+    try:
+        sizes = {}
+        for codec in available_codecs():
+            # 扩展名统一为 .json，加载时只能依靠魔数识别
+            path = os.path.join(folder, f"{codec}.json")
+            write_desire_file(path, desires, codec)
+            assert detect_codec(path) == codec
+            assert load_desire_file(path) == desires
+            sizes[codec] = os.path.getsize(path)
+        assert sizes["gzip"] < sizes[None] / 5 and sizes["lzma"] < sizes[None] / 5
+        print(f"✅ {'/'.join(str(c) for c in sizes)} 读写一致，压缩后体积: "
+              + ", ".join(f"{codec}={size // 1024}KB" for codec, size in sizes.items()))
+
+        assert codec_for_path("a.json.gz") == "gzip" and codec_for_path("a.JSON.XZ") == "lzma"
+        assert codec_for_path("a.json") is None
+        path = os.path.join(folder, "desires.json.xz")
+        write_desire_file(path, desires)
+        assert detect_codec(path) == "lzma"
+        print("✅ 保存时按扩展名选择格式")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_zstd_roundtrip():
+    """测试 zstd 格式按扩展名保存并读回（zstd 可用时）"""
+    print("\n=== 测试 zstd 读写 ===")
+
+    if "zstd" not in available_codecs():
+        print("⚠️ 未安装 zstandard 且 Python 低于 3.14，跳过")
+        return True
+
+    desires = synthetic_desires(2000, seed=2)
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "desires.json.zst")
+        write_desire_file(path, desires)
+        assert detect_codec(path) == "zstd"
+        assert load_desire_file(path) == desires
+        plain = os.path.join(folder, "desires.json")
+        write_desire_file(plain, desires)
+        assert os.path.getsize(path) < os.path.getsize(plain) / 5
+        print(f"✅ .json.zst 保存并读回一致，{os.path.getsize(path) // 1024}KB"
+              f"（未压缩 {os.path.getsize(plain) // 1024}KB）")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_streaming_write_memory():
+    """测试压缩写入不在内存中保存完整文本"""
+    print("\n=== 测试流式写入 ===")
+
+    desires = synthetic_desires(30000, seed=2)
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "desires.json.gz")
+        tracemalloc.start()
+        try:
+            write_desire_file(path, desires)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        text_size = len(read_desire_text(path).encode("utf-8"))
+        assert peak < text_size / 10
+        print(f"✅ 写入 {text_size // 1024}KB 文本的内存峰值为 {peak // 1024}KB")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_sidecar_for_compressed_file():
+    """测试压缩文件的统计缓存"""
+    print("\n=== 测试压缩文件的统计缓存 ===")
+
+    desires = synthetic_desires(100, seed=3)
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "desires.json.gz")
+        write_desire_file(path, desires)
+        write_sidecar(path, None, desires)
+        assert read_sidecar(path) is not None
+        with open(path, "rb") as f:
+            assert read_sidecar(path, f.read()) is not None
+
+        write_desire_file(path, dict(desires, extra=desires["desire_0"]))
+        assert read_sidecar(path) is None
+        print("✅ 缓存按磁盘上的压缩内容校验")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试压缩存储...")
+    print("=" * 50)
+
+    tests = [
+        test_roundtrip_and_detection,
+        test_zstd_roundtrip,
+        test_streaming_write_memory,
+        test_sidecar_for_compressed_file,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证筛选结果缓存
+Test script - Verify the LRU cache of filtered ids and statistics
+"""
+
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from desire_core import CATEGORIES, PRIORITIES, iter_filtered
+from filtercache import FilterCache
+from main import DesireCalculator
+
+from PyQt5.QtWidgets import QApplication
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def _expected(desires, category, priority):
+    """逐条筛选后重新计算的结果"""
+    matched = dict(iter_filtered(desires, category, priority))
+    return list(matched), CONVERTER.statistics(DesireColumns.from_desires(matched))
+
+
+def test_results_match_recompute():
+    """测试缓存的ID列表与统计与逐条筛选后重新计算一致"""
+    print("=== 测试筛选结果 ===")
+
+    desires = synthetic_desires(3000, seed=41)
+    columns = DesireColumns.from_desires(desires, 1)
+    cache = FilterCache()
+    for category in (None, CATEGORIES[0], CATEGORIES[3], "不存在"):
+        for priority in (None, PRIORITIES[1]):
+            entry = cache.lookup(columns, CONVERTER, category, priority)
+            ids, stats = _expected(desires, category, priority)
+            assert entry['ids'] == ids
+            assert abs(entry['stats']['monthly_total'] - stats['monthly_total']) < 1e-6
+            assert entry['stats']['enabled_count'] == stats['enabled_count']
+            assert entry['stats']['count'] == len(ids)
+    print("✅ 8种筛选组合的ID列表、月度总计与启用数与重新计算一致")
+
+    assert cache.counters() == {'hits': 0, 'misses': 8, 'entries': 8}
+    assert cache.lookup(columns, CONVERTER, CATEGORIES[0]) is cache.lookup(columns, CONVERTER, CATEGORIES[0])
+    assert cache.counters()['hits'] == 2
+    small = FilterCache(size=2)
+    for category in CATEGORIES[:3]:
+        small.lookup(columns, CONVERTER, category)
+    small.lookup(columns, CONVERTER, CATEGORIES[0])
+    assert len(small) == 2 and small.counters()['misses'] == 4
+    print("✅ 命中/未命中计数，超出容量时淘汰最久未使用的结果")
+
+    return True
+
+
+def test_precise_invalidation():
+    """测试增量修改只使受影响的筛选结果失效"""
+    print("\n=== 测试缓存失效 ===")
+
+    desires = synthetic_desires(2000, seed=42)
+    columns = DesireColumns.from_desires(desires, 1)
+    cache = FilterCache()
+    housing, food = CATEGORIES[0], CATEGORIES[1]
+    for category in (None, housing, food):
+        cache.lookup(columns, CONVERTER, category)
+
+    desire_id = next(key for key, desire in desires.items() if desire['category'] == housing)
+    old = desires[desire_id]
+    new = dict(old, cost=old['cost'] + 100)
+    changes = [(desire_id, old, new)]
+    desires = dict(desires, **{desire_id: new})
+    columns = columns.apply_changes(changes, 2)
+    cache.advance(changes, 2)
+    assert len(cache) == 1
+    hits = cache.hits
+    cache.lookup(columns, CONVERTER, food)
+    assert cache.hits == hits + 1
+    for category in (None, housing):
+        entry = cache.lookup(columns, CONVERTER, category)
+        assert abs(entry['stats']['monthly_total'] - _expected(desires, category, None)[1]['monthly_total']) < 1e-6
+    assert cache.hits == hits + 1
+    print("✅ 修改住房类需求后，全部与住房的结果重新计算，餐饮的结果仍然命中")
+
+    # 改变类别时修改前后两个类别都受影响
+    changes = [(desire_id, new, dict(new, category=food))]
+    columns = columns.apply_changes(changes, 3)
+    cache.advance(changes, 3)
+    assert len(cache) == 0
+    CONVERTER.set_reporting("USD")
+    try:
+        cache.lookup(columns, CONVERTER, food)
+        assert cache.lookup(columns, CONVERTER, food)['stats']['currency'] == "USD"
+    finally:
+        CONVERTER.set_reporting("CNY")
+    assert cache.lookup(columns, CONVERTER, food)['stats']['currency'] == "CNY"
+    print("✅ 改变类别时两个类别的结果都失效；更换报告币种时缓存清空")
+
+    return True
+
+
+def test_filters_in_window():
+    """测试界面中回到最近的筛选条件时命中缓存"""
+    print("\n=== 测试界面筛选 ===")
+
+    app = QApplication.instance() or QApplication([])
+    desires = synthetic_desires(20_000, seed=43)
+    with _ScriptedDialogs() as dialogs:
+        window = DesireCalculator()
+        window.category_filter.setCurrentText("Housing")
+        window.priority_filter.setCurrentText("High")
+        window.store.replace(desires)
+        window.category_filter.setCurrentText("Food")
+        misses = window.filter_cache.misses
+
+        start = time.perf_counter()
+        window.filter_cache.lookup(window.columns(), window.converter, "住房", "高")
+        elapsed = time.perf_counter() - start
+        window.category_filter.setCurrentText("Housing")
+        assert window.filter_cache.misses == misses
+        expected = [key for key, _ in iter_filtered(desires, "住房", "高")]
+        assert window.desire_model.ids == expected
+        assert window.filter_summary_label.text().startswith(f"筛选结果: {len(expected)} 个需求")
+        print(f"✅ 回到最近的筛选条件命中缓存（查询 {elapsed * 1e6:.0f}µs），列表与筛选结果一致")
+
+        food_id = next(key for key, desire in desires.items() if desire['category'] == "餐饮")
+        window.store.update(food_id, enabled=not desires[food_id]['enabled'])
+        assert window.filter_cache.misses == misses
+        housing_id = expected[0]
+        window.store.update(housing_id, cost=desires[housing_id]['cost'] + 1)
+        assert window.filter_cache.misses == misses + 1
+        print("✅ 修改其他类别的需求不影响当前筛选结果，修改当前结果中的需求时重新计算")
+
+        counters = window.filter_cache.counters()
+        assert counters['hits'] > 0
+        assert window.cache_status_label.text() == (
+            f"筛选缓存: 命中 {counters['hits']} / 未命中 {counters['misses']}（{counters['entries']} 条）"
+        )
+        print(f"✅ 状态栏显示 {window.cache_status_label.text()}")
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        assert not dialogs.errors
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试筛选结果缓存...")
+    print("=" * 50)
+
+    tests = [
+        test_results_match_recompute,
+        test_precise_invalidation,
+        test_filters_in_window,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
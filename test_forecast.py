@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证现金流预测
+Test script - Verify cash-flow forecasting
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from currency import CurrencyConverter, RateTable
+from forecast import add_arguments, forecast, run_forecast
+from payments import PaymentScheduler, occurrence
+
+FREQUENCIES = ["每天", "每周", "每月", "每季度", "每年"]
+CNY_ONLY = CurrencyConverter(RateTable({"CNY": 1.0}))
+
+
+def _desire(frequency, cost, start=None, end=None, category="住房", enabled=True):
+    desire = {"name": "x", "frequency": frequency, "cost": cost, "priority": "中",
+              "category": category, "enabled": enabled}
+    if start:
+        desire["start_date"] = start
+    if end:
+        desire["end_date"] = end
+    return desire
+
+
+def _random_desires(count, seed=1):
+    rng = random.Random(seed)
+    desires = {}
+    for i in range(count):
+        start = date(2023, 1, 1) + timedelta(days=rng.randrange(1500))
+        end = start + timedelta(days=rng.randrange(1500)) if rng.random() < 0.4 else None
+        desires[f"d{i}"] = _desire(rng.choice(FREQUENCIES), round(rng.uniform(1, 100), 2),
+                                   start.isoformat() if rng.random() > 0.1 else None,
+                                   end.isoformat() if end else None,
+                                   rng.choice(["住房", "餐饮", "交通"]), rng.random() > 0.1)
+    return desires
+
+
+def _expand(desires, start, days):
+    """逐笔展开付款的参考实现"""
+    outflow = np.zeros(days)
+    horizon = start + timedelta(days=days)
+    for desire in desires.values():
+        if not desire["enabled"]:
+            continue
+        first = date.fromisoformat(desire.get("start_date") or start.isoformat())
+        last = date.fromisoformat(desire["end_date"]) if desire.get("end_date") else horizon
+        index = 0
+        while (when := occurrence(first, desire["frequency"], index)) < horizon and when <= last:
+            if when >= start:
+                outflow[(when - start).days] += desire["cost"]
+            index += 1
+    return outflow
+
+
+def test_matches_expanded_payments():
+    """测试逐日支出与逐笔展开一致"""
+    print("=== 测试逐日支出 ===")
+
+    desires = _random_desires(3000)
+    start = date(2025, 1, 31)
+    result = forecast(desires, 3, start, converter=CNY_ONLY)
+    expected = _expand(desires, start, len(result["outflow"]))
+    assert np.allclose(result["outflow"], expected)
+    print(f"✅ 3000个需求3年逐日支出与逐笔展开一致（共 {expected.sum():.2f}）")
+
+    # 与付款日程的结果一致（付款日程不包含未设置开始日期的需求）
+    dated = {k: v for k, v in desires.items() if v.get("start_date")}
+    week = PaymentScheduler(dated, start).within(7, start)
+    expected_week = forecast(dated, 1, start, converter=CNY_ONLY)["outflow"][:7].sum()
+    assert abs(sum(p["cost"] for p in week) - expected_week) < 1e-6
+    print("✅ 与付款日程前7天的付款总额一致")
+
+    return True
+
+
+def test_balance_shortfall_and_inflation():
+    """测试余额、不足日期、通胀与最差月份"""
+    print("\n=== 测试余额与不足日期 ===")
+
+    desires = {
+        "rent": _desire("每月", 3000, "2025-01-05"),
+        "food": _desire("每天", 50, category="餐饮"),
+        "trip": _desire("每年", 6000, "2025-07-10", category="娱乐"),
+    }
+    result = forecast(desires, 2, date(2025, 1, 1), balance=4000, income=4500,
+                      converter=CNY_ONLY)
+    # 1月: 收入4500, 房租3000, 餐饮每天50
+    january = result["months"][0]
+    assert january["income"] == 4500 and abs(january["outflow"] - (3000 + 31 * 50)) < 1e-9
+    assert result["worst_months"][0]["month"] in ("2025-07", "2026-07")
+    assert result["shortfall_date"] == date(2025, 7, 10)
+    assert result["balance"][-1] == result["end_balance"]
+    print(f"✅ 余额首次不足于 {result['shortfall_date']}，最差月份为旅行月份")
+
+    inflated = forecast(desires, 2, date(2025, 1, 1), category_inflation={"住房": 0.10},
+                        converter=CNY_ONLY)
+    housing = inflated["category_outflow"]["住房"]
+    assert abs(inflated["category_outflow"]["餐饮"] - result["category_outflow"]["餐饮"]) < 1e-6
+    assert housing > result["category_outflow"]["住房"] * 1.05
+    print("✅ 通胀只作用于指定类别")
+
+    return True
+
+
+def test_fifty_thousand_desires_ten_years():
+    """测试5万个需求10年预测的耗时"""
+    print("\n=== 测试预测耗时 ===")
+
+    desires = _random_desires(50000, seed=2)
+    converter = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0}))
+    start = time.perf_counter()
+    result = forecast(desires, 10, date(2025, 1, 1), balance=1e6, income=5e4, inflation=0.03,
+                      converter=converter)
+    elapsed = time.perf_counter() - start
+    assert len(result["months"]) == 120
+    assert elapsed < 1.0
+    print(f"✅ 5万个需求、10年逐日预测耗时 {elapsed * 1000:.0f}ms")
+
+    return True
+
+
+def test_headless_forecast():
+    """测试无界面预测"""
+    print("\n=== 测试无界面预测 ===")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"rent": _desire("每月", 3000, "2025-01-05")}, f, ensure_ascii=False)
+    try:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        out = io.StringIO()
+        code = run_forecast(parser.parse_args([path, "--years", "1", "--balance", "5000",
+                                               "--from", "2025-01-01",
+                                               "--category-inflation", "Housing=0.05"]), out)
+        assert code == 1
+        assert "余额首次不足: 2025-02-05" in out.getvalue()
+        print(out.getvalue().splitlines()[0])
+        print("✅ 余额会不足时退出码为 1")
+    finally:
+        os.remove(path)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试现金流预测...")
+    print("=" * 50)
+
+    tests = [
+        test_matches_expanded_payments,
+        test_balance_shortfall_and_inflation,
+        test_fifty_thousand_desires_ten_years,
+        test_headless_forecast,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
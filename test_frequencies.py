@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证频率模型
+Test script - Verify the extensible frequency registry
+"""
+
+import json
+import os
+import tempfile
+from datetime import date
+
+import numpy as np
+
+from columns import DesireColumns
+from desire_core import calculate_statistics, load_desire_file, monthly_cost, parse_desire_text
+from forecast import forecast
+from frequencies import (
+    FREQUENCIES, factor_table, frequency_factor, frequency_interval, parse_frequency,
+    register_frequency
+)
+from payments import PaymentScheduler
+
+
+def _desire(frequency, cost=100):
+    return {"name": "x", "frequency": frequency, "cost": cost, "priority": "中",
+            "category": "住房", "enabled": True}
+
+
+def test_parse_arbitrary_intervals():
+    """测试任意间隔的解析与规范值"""
+    print("=== 测试频率解析 ===")
+
+    cases = {
+        "Monthly": "每月", "weekly": "每周", "Biweekly": "每2周", "every other week": "每2周",
+        "每两周": "每2周", "Every 3 weeks": "每3周", "每10天": "每10天", "every 10 days": "每10天",
+        "每两个月": "每2个月", "每3个月": "每季度", "半年": "每6个月", "every 24 months": "每2年",
+        "每2年": "每2年", "Quarterly": "每季度", "12个月": "每年",
+    }
+    for text, expected in cases.items():
+        assert parse_frequency(text) == expected, (text, parse_frequency(text))
+    for text in ("", None, "sometimes", "每0天", "every -1 days", "每周二"):
+        assert parse_frequency(text) is None
+    print(f"✅ {len(cases)} 种写法映射到规范值，无法识别的返回 None")
+
+    assert [frequency_factor(name) for name in FREQUENCIES] == [30, 4.33, 1, 1 / 3, 1 / 12]
+    assert frequency_factor("每2周") == 4.33 / 2 and frequency_factor("每10天") == 3
+    assert frequency_factor("每2年") == 1 / 24
+    assert frequency_interval("每3周") == ("day", 21) and frequency_interval("每2年") == ("month", 24)
+    print("✅ 内置频率系数不变，任意间隔按单位换算")
+
+    assert register_frequency("day", 15, ("每半月", "semimonthly")) == "每15天"
+    assert parse_frequency("每半月") == "每15天" and parse_frequency("Semimonthly") == "每15天"
+    assert register_frequency("month", 12, ("每十二个月",)) == "每年"
+    print("✅ 注册的自定义写法映射到同一间隔的规范值")
+
+    return True
+
+
+def test_single_factor_table():
+    """测试所有计算路径使用同一张系数表"""
+    print("\n=== 测试系数表 ===")
+
+    desires = {f"d{i}": _desire(freq, 10 + i)
+               for i, freq in enumerate(["每天", "每3周", "每2个月", "每10天", "每年", "每2周"])}
+    columns = DesireColumns.from_desires(desires)
+    vectorized = columns.monthly_costs()
+    scalar = np.array([monthly_cost(desire) for desire in desires.values()])
+    assert np.allclose(vectorized, scalar)
+    assert abs(calculate_statistics(desires)['monthly_total'] - vectorized.sum()) < 1e-9
+    print("✅ 向量化查找与逐条计算一致")
+
+    for bad in (["每月", "sometimes"], ["每月", None]):
+        try:
+            factor_table(bad)
+        except ValueError:
+            continue
+        raise AssertionError("未知频率应被拒绝")
+    try:
+        monthly_cost(_desire("whenever"))
+        raise AssertionError("未知频率应被拒绝")
+    except ValueError:
+        pass
+    print("✅ 未知频率抛出错误而不是按0计")
+
+    return True
+
+
+def test_schedules_for_custom_intervals():
+    """测试自定义间隔的付款日程与预测"""
+    print("\n=== 测试自定义间隔的日程 ===")
+
+    desires = {
+        "gym": dict(_desire("每3周", 60), start_date="2025-01-01"),
+        "water": dict(_desire("每2个月", 90), start_date="2025-01-31"),
+    }
+    payments = PaymentScheduler(desires, date(2025, 1, 1)).within(100, date(2025, 1, 1))
+    assert [(p['desire_id'], p['date']) for p in payments] == [
+        ("gym", date(2025, 1, 1)), ("gym", date(2025, 1, 22)), ("water", date(2025, 1, 31)),
+        ("gym", date(2025, 2, 12)), ("gym", date(2025, 3, 5)), ("gym", date(2025, 3, 26)),
+        ("water", date(2025, 3, 31)),
+    ]
+    print("✅ 每3周与每2个月（月末）的付款日期正确")
+
+    result = forecast(desires, 1, date(2025, 1, 1))
+    assert abs(result['total_outflow'] - (18 * 60 + 6 * 90)) < 1e-6
+    print("✅ 现金流预测按相同间隔计入")
+
+    return True
+
+
+def test_rejected_at_input():
+    """测试加载与解析时拒绝未知频率并规范化别名"""
+    print("\n=== 测试输入校验 ===")
+
+    desires = parse_desire_text(json.dumps({"a": _desire("Monthly"), "b": _desire("every 2 weeks")}))
+    assert desires["a"]["frequency"] == "每月" and desires["b"]["frequency"] == "每2周"
+    print("✅ 旧版本保存的英文频率在加载时规范化")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"a": _desire("每月"), "bad": _desire("偶尔")}, f, ensure_ascii=False)
+    try:
+        load_desire_file(path)
+        raise AssertionError("未知频率应被拒绝")
+    except ValueError as e:
+        assert "bad" in str(e) and "偶尔" in str(e)
+        print(f"✅ 加载时拒绝: {e}")
+    finally:
+        os.remove(path)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试频率模型...")
+    print("=" * 50)
+
+    tests = [
+        test_parse_arbitrary_intervals,
+        test_single_factor_table,
+        test_schedules_for_custom_intervals,
+        test_rejected_at_input,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
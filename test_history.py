@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证花销历史记录
+Test script - Verify the spending history store
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from history import HistoryStore, history_path
+
+
+def _stats(total, housing=None):
+    housing = total if housing is None else housing
+    return {'monthly_total': total, 'category_totals': {'住房': housing, '未知类别': total - housing}}
+
+
+def _ts(*args):
+    return int(datetime(*args).timestamp())
+
+
+def test_record_and_rollups():
+    """测试追加、去重与按天/按月汇总"""
+    print("=== 测试历史记录与汇总 ===")
+
+    folder = tempfile.mkdtemp()
+    try:
+        store = HistoryStore(history_path(os.path.join(folder, "desires.json")))
+        assert store.record(_stats(100), _ts(2025, 1, 1, 9))
+        assert not store.record(_stats(100), _ts(2025, 1, 1, 10))
+        assert store.record(_stats(300, 200), _ts(2025, 1, 1, 18))
+        assert store.record(_stats(200), _ts(2025, 1, 2, 9))
+        assert store.record(_stats(50), _ts(2025, 2, 1, 9))
+        assert len(store) == 4
+
+        daily = store.query(resolution="daily")
+        assert [point['count'] for point in daily] == [2, 1, 1]
+        assert daily[0]['mean'] == 200 and daily[0]['min'] == 100 and daily[0]['max'] == 300
+        assert daily[0]['monthly_total'] == 300
+        assert daily[0]['category_totals']['其他'] == 100
+
+        monthly = store.query(resolution="monthly")
+        assert [point['count'] for point in monthly] == [3, 1]
+        assert monthly[0]['timestamp'] == _ts(2025, 1, 1)
+
+        # 重新打开后数据仍然可用
+        reopened = HistoryStore(store.path)
+        raw = reopened.query(_ts(2025, 1, 1, 12), _ts(2025, 1, 31))
+        assert [point['monthly_total'] for point in raw] == [300, 200]
+        assert reopened.query(_ts(2025, 1, 15), resolution="monthly")[0]['count'] == 3
+        print("✅ 去重、汇总与范围查询正确")
+
+        try:
+            store.record(_stats(1), _ts(2024, 1, 1))
+        except ValueError:
+            print("✅ 拒绝乱序追加")
+        else:
+            raise AssertionError("乱序追加应报错")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_open_creates_no_files():
+    """测试打开历史不创建文件，第一次记录时才创建"""
+    print("\n=== 测试延迟创建历史文件 ===")
+
+    folder = tempfile.mkdtemp()
+    try:
+        store = HistoryStore(history_path(os.path.join(folder, "desires.json")))
+        assert os.listdir(folder) == []
+        assert len(store) == 0
+        assert all(store.query(resolution=resolution) == [] for resolution in HistoryStore.RESOLUTIONS)
+        print("✅ 只打开或查询时不创建文件，不存在的历史视为空")
+
+        assert store.record(_stats(100), _ts(2025, 1, 1, 9))
+        assert sorted(os.listdir(folder)) == ["desires.json.history", "desires.json.history.daily",
+                                              "desires.json.history.monthly"]
+        assert HistoryStore(store.path).query(resolution="daily")[0]['monthly_total'] == 100
+        print("✅ 第一次记录时创建历史文件及汇总文件")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_years_of_history_stay_small_and_fast():
+    """测试三年每小时快照的体积与查询速度"""
+    print("\n=== 测试历史体积与查询速度 ===")
+
+    folder = tempfile.mkdtemp()
+    try:
+        store = HistoryStore(os.path.join(folder, "desires.json.history"))
+        start = _ts(2022, 1, 1)
+        hours = 3 * 365 * 24
+        for hour in range(hours):
+            store.record(_stats(1000 + hour % 500), start + hour * 3600)
+
+        size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+        assert size < 60 * hours
+
+        begin = time.perf_counter()
+        points = store.query(_ts(2023, 3, 1), _ts(2023, 6, 1))
+        monthly = store.query(resolution="monthly")
+        elapsed = time.perf_counter() - begin
+        assert len(points) == (_ts(2023, 6, 1) - _ts(2023, 3, 1)) // 3600 + 1
+        assert len(monthly) == 36
+        print(f"✅ {hours} 条快照共 {size / 1024:.0f}KB，查询耗时 {elapsed * 1000:.1f}ms")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试花销历史...")
+    print("=" * 50)
+
+    tests = [
+        test_record_and_rollups,
+        test_open_creates_no_files,
+        test_years_of_history_stay_small_and_fast,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证CSV批量导入
+Test script - Verify bulk CSV import
+"""
+
+import csv
+import os
+import tempfile
+
+import importer
+from importer import ColumnMapping, import_csv
+
+
+def _write_csv(rows, encoding="utf-8"):
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+
+def test_import_standard_csv():
+    """测试标准格式导入与词汇映射"""
+    print("=== 测试标准格式导入 ===")
+
+    path = _write_csv([
+        ["name", "frequency", "cost", "priority", "category", "enabled"],
+        ["房租", "Monthly", "3000", "Essential", "Housing", "true"],
+        ["吃饭", "每天", "¥50", "必需", "餐饮", ""],
+        ["健身", "weekly", "1,00", "low", "Health", "否"],
+    ])
+    try:
+        new_desires, report = import_csv(path, {})
+    finally:
+        os.remove(path)
+
+    desires = sorted(new_desires.values(), key=lambda d: d['name'])
+    assert report.imported == 3
+    assert report.invalid == 0
+    assert desires[0] == {'name': '健身', 'frequency': '每周', 'cost': 100.0,
+                          'priority': '低', 'category': '健康', 'enabled': False}
+    assert desires[2]['frequency'] == '每月'
+    assert desires[2]['priority'] == '必需'
+    print("✅ 英文标签已映射为规范值")
+
+    return True
+
+
+def test_import_deduplicates_and_reports_errors():
+    """测试去重与错误报告"""
+    print("\n=== 测试去重与错误报告 ===")
+
+    existing = {
+        "desire_0_20250101_000000": {"name": "房租", "frequency": "每月", "cost": 3000.0,
+                                     "priority": "必需", "category": "住房", "enabled": True}
+    }
+    path = _write_csv([
+        ["名称", "频率", "花销"],
+        ["房租", "每月", "3000"],
+        ["水电", "每月", "200"],
+        ["水电", "monthly", "200.00"],
+        ["坏数据", "每月", "abc"],
+        ["", "每月", "10"],
+        ["旅游", "偶尔", "100"],
+    ])
+    try:
+        new_desires, report = import_csv(path, existing)
+    finally:
+        os.remove(path)
+
+    assert report.total_rows == 6
+    assert report.imported == 1
+    assert report.duplicates == 2
+    assert report.invalid == 3
+    assert [line for line, _ in report.errors] == [5, 6, 7]
+    assert not set(new_desires) & set(existing)
+    print(f"✅ 汇总:\n{report.summary()}")
+
+    return True
+
+
+def test_import_bank_statement_parallel():
+    """测试银行流水映射与多进程解析"""
+    print("\n=== 测试银行流水并行导入 ===")
+
+    rows = [["交易日期", "交易摘要", "交易金额"]]
+    for i in range(5000):
+        rows.append(["2025-01-01", f"商户{i}", f"-{i + 1}.50"])
+    path = _write_csv(rows)
+
+    original_chunk = importer.CHUNK_SIZE
+    importer.CHUNK_SIZE = 700
+    try:
+        parallel, report = import_csv(path, {}, ColumnMapping.preset("bank"), workers=2)
+        serial, _ = import_csv(path, {}, ColumnMapping.preset("bank"), workers=1)
+    finally:
+        importer.CHUNK_SIZE = original_chunk
+        os.remove(path)
+
+    assert report.imported == 5000
+    assert list(parallel.values()) == list(serial.values())
+    first = next(iter(parallel.values()))
+    assert first['cost'] == 1.5 and first['frequency'] == '每月'
+    print(f"✅ 并行导入 {report.imported} 条，顺序与串行一致")
+
+    return True
+
+
+def test_bank_statement_skips_income():
+    """测试银行流水只导入支出，工资、退款等收入行跳过"""
+    print("\n=== 测试银行流水收入行 ===")
+
+    signed = _write_csv([
+        ["交易日期", "交易摘要", "交易金额"],
+        ["2025-01-01", "房租", "-3000.00"],
+        ["2025-01-05", "工资", "12000.00"],
+        ["2025-01-09", "退款", "+59.90"],
+        ["2025-01-10", "话费", "(100)"],
+    ])
+    columns = _write_csv([
+        ["交易日期", "交易摘要", "支出金额", "收入金额"],
+        ["2025-01-01", "房租", "3000.00", ""],
+        ["2025-01-05", "工资", "", "12000.00"],
+        ["2025-01-09", "退款", "0.00", "59.90"],
+    ])
+    try:
+        from_signed, report = import_csv(signed, {}, ColumnMapping.preset("bank"))
+        from_columns, column_report = import_csv(columns, {}, ColumnMapping.preset("bank"))
+    finally:
+        os.remove(signed)
+        os.remove(columns)
+
+    assert sorted((d['name'], d['cost']) for d in from_signed.values()) == [("房租", 3000.0), ("话费", 100.0)]
+    assert report.credits == 2 and report.invalid == 0
+    assert "收入跳过: 2" in report.summary()
+    print("✅ 带符号的金额列：负数为支出，正数（工资、退款）跳过")
+
+    assert [(d['name'], d['cost']) for d in from_columns.values()] == [("房租", 3000.0)]
+    assert column_report.credits == 2 and column_report.invalid == 0
+    print("✅ 分列的流水：支出列为空或为0的行跳过")
+
+    legacy = ColumnMapping(ColumnMapping.preset("bank").columns, {"frequency": "每月"}, absolute_cost=True)
+    assert legacy.debits_only
+    print("✅ 旧版本映射文件的 absolute_cost 仍然有效")
+
+    return True
+
+
+def test_mapping_requires_columns():
+    """测试缺少必需列时报错"""
+    print("\n=== 测试列映射校验 ===")
+
+    try:
+        ColumnMapping.preset("desires").resolve(["name", "cost"])
+    except ValueError as e:
+        print(f"✅ 缺少频率列被拒绝: {e}")
+    else:
+        raise AssertionError("缺少频率列时应报错")
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试CSV批量导入...")
+    print("=" * 50)
+
+    tests = [
+        test_import_standard_csv,
+        test_import_deduplicates_and_reports_errors,
+        test_import_bank_statement_parallel,
+        test_bank_statement_skips_income,
+        test_mapping_requires_columns,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证需求文件比较与合并
+Test script - Verify structural diff and merge of desire files
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from currency import CurrencyConverter, RateTable
+from duplicates import record_hash
+from merge import (
+    add_diff_arguments, add_merge_arguments, changed_ids, diff_desires, merge_desires,
+    run_diff, run_merge
+)
+
+CNY_ONLY = CurrencyConverter(RateTable({"CNY": 1.0}))
+
+
+def _desire(cost, frequency="每月", category="住房", enabled=True, name="x"):
+    return {"name": name, "frequency": frequency, "cost": cost, "priority": "中",
+            "category": category, "enabled": enabled}
+
+
+def test_diff_and_impact():
+    """测试新增/删除/修改集合与总花销影响"""
+    print("=== 测试文件比较 ===")
+
+    old = {"a": _desire(100), "b": _desire(10, "每天", "餐饮"), "c": _desire(50)}
+    new = {"a": _desire(120), "c": dict(reversed(list(_desire(50).items()))),
+           "d": _desire(30, category="交通")}
+    diff = diff_desires(old, new, CNY_ONLY)
+    assert diff['added'] == ["d"] and diff['removed'] == ["b"]
+    assert diff['changed'] == {"a": ["cost"]} and diff['unchanged'] == 1
+    assert record_hash(old["c"]) == record_hash(new["c"])
+    print("✅ 字段顺序不同的相同记录视为未变")
+
+    typed = {"a": dict(_desire(100), enabled=1), "b": _desire(10.5), "c": _desire(50)}
+    retyped = {"a": _desire(100), "b": _desire(10.5), "c": _desire(50.0)}
+    assert record_hash(typed["a"]) == record_hash(retyped["a"])
+    typed_diff = diff_desires(typed, retyped, CNY_ONLY)
+    assert typed_diff['changed'] == {"a": ["enabled"], "c": ["cost"]} and typed_diff['unchanged'] == 1
+    assert changed_ids(typed, retyped) == ["a", "c"]
+    merged = merge_desires(typed, retyped, typed)
+    assert merged['desires']["a"]["enabled"] is True and sorted(c[0] for c in merged['changes']) == ["a", "c"]
+    print("✅ 哈希相同但取值类型不同（enabled 1 → True、花销 50 → 50.0）的修改不会漏掉")
+
+    impact = diff['impact']
+    assert impact['monthly_before'] == 450
+    assert abs(impact['monthly_delta'] - (20 - 300 + 30)) < 1e-9
+    assert impact['monthly_after'] == 200 and impact['yearly_delta'] == -3000
+    assert impact['by_category'] == {"住房": 20, "餐饮": -300, "交通": 30}
+    print("✅ 月度/年度总花销变化与按类别变化正确")
+
+    return True
+
+
+def test_three_way_merge():
+    """测试三方合并与冲突报告"""
+    print("\n=== 测试三方合并 ===")
+
+    base = {key: _desire(100, name=key) for key in "abcdef"}
+    ours = dict(base, a=_desire(150, name="a"), c=_desire(100, name="c", enabled=False),
+                e=_desire(1, name="e"))
+    del ours["f"]
+    theirs = dict(base, b=_desire(80, name="b"), c=_desire(100, name="c", category="交通"),
+                  e=_desire(2, name="e"), new=_desire(5, name="new"))
+    del theirs["d"]
+    del theirs["f"]
+
+    result = merge_desires(ours, theirs, base)
+    merged = result['desires']
+    assert merged["a"]["cost"] == 150 and merged["b"]["cost"] == 80
+    assert merged["c"]["enabled"] is False and merged["c"]["category"] == "交通"
+    assert "d" not in merged and "f" not in merged and "new" in merged
+    assert result['field_merged'] == ["c"]
+    print("✅ 单方修改与不同字段的修改自动合并，删除与新增生效")
+
+    assert [(c['desire_id'], c['fields']) for c in result['conflicts']] == [("e", ["cost"])]
+    assert merged["e"]["cost"] == 1
+    assert merge_desires(ours, theirs, base, prefer="theirs")['desires']["e"]["cost"] == 2
+    print("✅ 同一字段的冲突被报告并按选择保留一方")
+
+    # 相对 ours 的变化只包含需要应用的需求
+    assert sorted(change[0] for change in result['changes']) == ["b", "c", "d", "new"]
+
+    # 一方修改、一方删除
+    conflict = merge_desires({"a": _desire(1)}, {}, {"a": _desire(2)})['conflicts'][0]
+    assert conflict['fields'] is None and conflict['theirs'] is None
+    # 没有 base 时双方独有的需求都保留
+    two_way = merge_desires({"a": _desire(1)}, {"b": _desire(2)})
+    assert set(two_way['desires']) == {"a", "b"} and not two_way['conflicts']
+    print("✅ 修改/删除冲突与双方合并")
+
+    return True
+
+
+def test_large_files_are_linear():
+    """测试20万个需求的比较与合并耗时"""
+    print("\n=== 测试大文件耗时 ===")
+
+    rng = random.Random(1)
+    base = {f"d{i}": _desire(rng.randint(1, 1000), rng.choice(["每天", "每月"]), name=f"n{i}")
+            for i in range(200000)}
+    ours, theirs = dict(base), dict(base)
+    for key in rng.sample(sorted(base), 2000):
+        ours[key] = dict(base[key], cost=1)
+    for key in rng.sample(sorted(base), 2000):
+        theirs[key] = dict(base[key], enabled=False)
+
+    start = time.perf_counter()
+    diff = diff_desires(base, theirs, CNY_ONLY)
+    result = merge_desires(ours, theirs, base)
+    elapsed = time.perf_counter() - start
+    assert len(diff['changed']) == 2000
+    assert all(key not in result['desires'] or result['desires'][key]['cost'] in (1, base[key]['cost'])
+               for key in base)
+    assert elapsed < 5.0
+    print(f"✅ 20万个需求比较并三方合并耗时 {elapsed:.2f}s，冲突 {len(result['conflicts'])} 个")
+
+    return True
+
+
+def test_headless_diff_and_merge():
+    """测试无界面比较与合并"""
+    print("\n=== 测试无界面比较与合并 ===")
+
+    directory = tempfile.mkdtemp()
+    paths = {}
+    files = {
+        "base": {"a": _desire(100), "b": _desire(50)},
+        "ours": {"a": _desire(200), "b": _desire(50)},
+        "theirs": {"a": _desire(300), "b": _desire(50), "c": _desire(10)},
+    }
+    for name, desires in files.items():
+        paths[name] = os.path.join(directory, name + ".json")
+        with open(paths[name], "w", encoding="utf-8") as f:
+            json.dump(desires, f, ensure_ascii=False)
+    output = os.path.join(directory, "merged.json")
+
+    try:
+        parser = argparse.ArgumentParser()
+        add_diff_arguments(parser)
+        out = io.StringIO()
+        assert run_diff(parser.parse_args([paths["base"], paths["ours"]]), out) == 1
+        assert "~ a x: cost 100 → 200" in out.getvalue()
+        print("✅ 有差异时退出码为 1 并列出变化字段")
+
+        parser = argparse.ArgumentParser()
+        add_merge_arguments(parser)
+        out = io.StringIO()
+        code = run_merge(parser.parse_args([paths["ours"], paths["theirs"], "--base", paths["base"],
+                                            "-o", output]), out)
+        with open(output, encoding="utf-8") as f:
+            merged = json.load(f)
+        assert code == 1 and merged["a"]["cost"] == 200 and "c" in merged
+        assert "! a: cost 本方 200 / 对方 300" in out.getvalue()
+        print("✅ 冲突时退出码为 1，保留本方的值并写出合并结果")
+    finally:
+        for path in list(paths.values()) + [output]:
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(directory)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试文件比较与合并...")
+    print("=" * 50)
+
+    tests = [
+        test_diff_and_impact,
+        test_three_way_merge,
+        test_large_files_are_linear,
+        test_headless_diff_and_merge,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
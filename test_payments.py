@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证付款日程
+Test script - Verify the upcoming-payments scheduler
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from payments import PaymentScheduler, Reminders, add_arguments, occurrence, run_upcoming
+
+FREQUENCIES = ["每天", "每周", "每月", "每季度", "每年"]
+
+
+def _desire(frequency, start, cost=10, enabled=True):
+    return {"name": "x", "frequency": frequency, "cost": cost, "priority": "中",
+            "category": "住房", "enabled": enabled, "start_date": start}
+
+
+def _random_desires(count, seed=1):
+    rng = random.Random(seed)
+    return {
+        f"d{i}": _desire(rng.choice(FREQUENCIES),
+                         (date(2023, 1, 1) + timedelta(days=rng.randrange(1000))).isoformat(),
+                         enabled=rng.random() > 0.1)
+        for i in range(count)
+    }
+
+
+def _expand(desires, today, days):
+    """逐个展开日程的参考实现"""
+    end = today + timedelta(days=days)
+    payments = []
+    for desire_id, desire in desires.items():
+        if not desire['enabled']:
+            continue
+        start = date.fromisoformat(desire['start_date'])
+        index = 0
+        while (when := occurrence(start, desire['frequency'], index)) < end:
+            if when >= today:
+                payments.append((when, desire_id))
+            index += 1
+    return sorted(payments)
+
+
+def test_occurrences():
+    """测试付款日期计算"""
+    print("=== 测试付款日期 ===")
+
+    start = date(2024, 1, 31)
+    assert [occurrence(start, "每月", i) for i in range(4)] == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+    assert occurrence(start, "每季度", 1) == date(2024, 4, 30)
+    assert occurrence(date(2024, 2, 29), "每年", 1) == date(2025, 2, 28)
+    assert occurrence(start, "每周", 2) == date(2024, 2, 14)
+
+    scheduler = PaymentScheduler({"rent": _desire("每月", "2024-01-31")}, date(2024, 2, 1))
+    assert [p['date'] for p in scheduler.upcoming(2, date(2024, 2, 1))] == [
+        date(2024, 2, 29), date(2024, 3, 31)]
+    print("✅ 月末开始的需求在短月份落在当月最后一天")
+
+    ending = dict(_desire("每月", "2024-01-31"), end_date="2024-03-31")
+    scheduler = PaymentScheduler({"loan": ending}, date(2024, 2, 1))
+    assert [p['date'] for p in scheduler.upcoming(5, date(2024, 2, 1))] == [
+        date(2024, 2, 29), date(2024, 3, 31)]
+    print("✅ 结束日期之后不再安排付款")
+
+    return True
+
+
+def test_matches_full_expansion():
+    """测试查询结果与展开全部日程一致"""
+    print("\n=== 测试与完整展开一致 ===")
+
+    desires = _random_desires(2000)
+    desires["missing"] = _desire("每月", None)
+    today = date(2025, 6, 15)
+    scheduler = PaymentScheduler(desires, today)
+    assert scheduler.unscheduled == {"missing"}
+
+    expected = _expand({k: v for k, v in desires.items() if k != "missing"}, today, 40)
+    got = [(p['date'], p['desire_id']) for p in scheduler.within(40, today)]
+    assert got == expected
+    assert [(p['date'], p['desire_id']) for p in scheduler.upcoming(500, today)] == expected[:500]
+    print(f"✅ 40天内 {len(got)} 笔付款与完整展开一致")
+
+    # 增量编辑后与重建一致
+    rng = random.Random(2)
+    changes = []
+    for key in rng.sample(sorted(desires), 300):
+        old = desires[key]
+        new = dict(old, frequency=rng.choice(FREQUENCIES), enabled=rng.random() > 0.3,
+                   start_date=(today + timedelta(days=rng.randrange(-400, 30))).isoformat())
+        desires[key] = new
+        changes.append((key, old, new))
+    changes.append(("d0", desires.pop("d0"), None))
+    scheduler.apply(changes)
+
+    later = today + timedelta(days=45)
+    rebuilt = PaymentScheduler(desires, later)
+    assert scheduler.within(60, later) == rebuilt.within(60, later)
+    assert scheduler.upcoming(50, today) == PaymentScheduler(desires, today).upcoming(50, today)
+    print("✅ 增量编辑并推进日期后与重建结果一致")
+
+    return True
+
+
+def test_reminders():
+    """测试到期提醒只提醒一次"""
+    print("\n=== 测试到期提醒 ===")
+
+    scheduler = PaymentScheduler({"rent": _desire("每月", "2025-03-05")}, date(2025, 3, 1))
+    reminders = Reminders(scheduler, days=3)
+    assert reminders.check(date(2025, 3, 1)) == []
+    assert [p['date'] for p in reminders.check(date(2025, 3, 2))] == [date(2025, 3, 5)]
+    assert reminders.check(date(2025, 3, 3)) == []
+    assert [p['date'] for p in reminders.check(date(2025, 4, 2))] == [date(2025, 4, 5)]
+    print("✅ 进入提醒范围时提醒一次")
+
+    return True
+
+
+def test_large_schedule_is_fast():
+    """测试10万个周期需求的查询耗时"""
+    print("\n=== 测试查询耗时 ===")
+
+    desires = _random_desires(100000)
+    today = date(2025, 6, 15)
+    scheduler = PaymentScheduler(desires, today)
+
+    start = time.perf_counter()
+    upcoming = scheduler.upcoming(20, today)
+    week = scheduler.within(7, today, limit=200)
+    scheduler.apply([("d1", desires["d1"], dict(desires["d1"], start_date="2025-06-16"))])
+    elapsed = time.perf_counter() - start
+    assert len(upcoming) == 20 and len(week) == 200
+    assert elapsed < 0.05
+    print(f"✅ 10万个需求: 查询下20笔、7天内前200笔并编辑一次共 {elapsed * 1000:.1f}ms")
+
+    return True
+
+
+def test_headless_listing():
+    """测试无界面列出付款"""
+    print("\n=== 测试无界面列出付款 ===")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"rent": dict(_desire("每月", "2025-01-10", 3000), name="房租"),
+                   "old": _desire("每月", None)}, f, ensure_ascii=False)
+    try:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        out = io.StringIO()
+        run_upcoming(parser.parse_args([path, "--days", "40", "--from", "2025-02-01"]), out)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "2025-02-10 (9天后) 房租 ¥3000.00"
+        assert lines[1].startswith("2025-03-10")
+        assert lines[-1] == "1 个启用的需求未设置开始日期"
+        print("✅ 输出日期、名称与金额")
+    finally:
+        os.remove(path)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试付款日程...")
+    print("=" * 50)
+
+    tests = [
+        test_occurrences,
+        test_matches_full_expansion,
+        test_reminders,
+        test_large_schedule_is_fast,
+        test_headless_listing,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
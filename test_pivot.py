@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证交叉分析
+Test script - Verify the pivot / cross-tab engine
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark import synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from desire_core import CATEGORIES, FREQUENCIES, PRIORITIES
+from pivot import PivotEngine, add_arguments, crosstab, format_crosstab, run_pivot, values
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def test_matches_row_by_row_grouping():
+    """测试分组汇总与逐条累加一致"""
+    print("=== 测试交叉汇总 ===")
+
+    desires = synthetic_desires(3000, seed=7)
+    columns = DesireColumns.from_desires(desires, 1)
+    engine = PivotEngine(CONVERTER)
+    table = engine.crosstab(columns, "category", "priority")
+
+    expected = {}
+    for desire in desires.values():
+        key = (desire['category'], desire['priority'])
+        total, count = expected.get(key, (0.0, 0))
+        expected[key] = (total + CONVERTER.monthly_cost(desire), count + 1)
+    sums, counts, means = values(table, "sum"), values(table, "count"), values(table, "mean")
+    for row, category in enumerate(table['row_labels'][:-1]):
+        for column, priority in enumerate(table['column_labels'][:-1]):
+            total, count = expected.get((category, priority), (0.0, 0))
+            assert abs(sums[row, column] - total) < 1e-6 and counts[row, column] == count
+            assert abs(means[row, column] - (total / count if count else 0)) < 1e-9
+    assert counts[-1, -1] == 3000 and abs(values(table, "share")[-1, -1] - 1) < 1e-12
+    print("✅ 合计、数量、均值、占比与逐条累加一致（含合计行列）")
+
+    # 只汇总启用的需求时与统计结果一致
+    stats = CONVERTER.statistics(columns)
+    enabled = engine.crosstab(columns, "category", enabled_only=True)
+    assert enabled['column_labels'] == ["合计"]
+    for category, total in zip(enabled['row_labels'][:-1], enabled['sum'][:-1, 0]):
+        assert abs(stats['category_totals'][category] - total) < 1e-6
+    by_priority = engine.crosstab(columns, "priority", enabled_only=True)
+    assert dict(zip(by_priority['row_labels'][:-1], by_priority['count'][:-1, 0].tolist())) == {
+        label: count for label, count in stats['priority_counts'].items() if count}
+    states = engine.crosstab(columns, "enabled", "frequency")
+    assert states['row_labels'] == ["启用", "禁用", "合计"]
+    assert states['count'][0, -1] == stats['enabled_count']
+    print("✅ 按类别合计、按优先级计数与统计结果一致，启用状态可作为维度")
+
+    return True
+
+
+def test_cached_per_version():
+    """测试结果按数据版本缓存"""
+    print("\n=== 测试按版本缓存 ===")
+
+    desires = synthetic_desires(500, seed=8)
+    columns = DesireColumns.from_desires(desires, 1)
+    engine = PivotEngine(CONVERTER)
+    table = engine.crosstab(columns, "category", "frequency")
+    assert engine.crosstab(columns, "category", "frequency") is table
+    assert engine.crosstab(columns, "category", "frequency", enabled_only=True) is not table
+
+    changed = dict(desires["desire_0"], cost=desires["desire_0"]["cost"] + 100)
+    patched = columns.apply_changes([("desire_0", desires["desire_0"], changed)], 2)
+    updated = engine.crosstab(patched, "category", "frequency")
+    assert updated is not table
+    assert abs(updated['sum'][-1, -1] - table['sum'][-1, -1] - CONVERTER.monthly_cost(changed)
+               + CONVERTER.monthly_cost(desires["desire_0"])) < 1e-6
+    print("✅ 同一版本重复查询命中缓存，数据变化后重新计算")
+
+    return True
+
+
+def test_million_rows_speed():
+    """测试100万个需求的完整交叉表耗时"""
+    print("\n=== 测试100万个需求 ===")
+
+    count = 1_000_000
+    rng = np.random.default_rng(0)
+    columns = DesireColumns(
+        [f"d{i}" for i in range(count)], rng.uniform(1, 3000, count), rng.random(count) > 0.1,
+        rng.integers(0, len(FREQUENCIES), count).astype(np.int32), list(FREQUENCIES),
+        rng.integers(0, len(CATEGORIES), count).astype(np.int32), list(CATEGORIES),
+        rng.integers(0, len(PRIORITIES), count).astype(np.int32), list(PRIORITIES),
+        rng.integers(0, 2, count).astype(np.int32), ["CNY", "USD"], 1,
+    )
+    amounts = CONVERTER.monthly_amounts(columns)
+    start = time.perf_counter()
+    table = crosstab(columns, amounts, "category", "frequency")
+    elapsed = time.perf_counter() - start
+    assert table['count'][-1, -1] == count
+    assert abs(table['sum'][-1, -1] - amounts.sum()) < 1e-6 * amounts.sum()
+    assert elapsed < 0.2
+    print(f"✅ 100万个需求的类别 × 频率交叉表耗时 {elapsed * 1000:.0f}ms")
+
+    return True
+
+
+def test_headless_pivot():
+    """测试无界面交叉分析"""
+    print("\n=== 测试无界面交叉分析 ===")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({
+            "a": {"name": "rent", "frequency": "每月", "cost": 3000, "priority": "必需",
+                  "category": "住房", "enabled": True},
+            "b": {"name": "coffee", "frequency": "每天", "cost": 20, "priority": "低",
+                  "category": "餐饮", "enabled": True},
+            "c": {"name": "gym", "frequency": "每月", "cost": 200, "priority": "低",
+                  "category": "健康", "enabled": False},
+        }, f, ensure_ascii=False)
+    try:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        out = io.StringIO()
+        assert run_pivot(parser.parse_args([path, "--cols", "priority"]), out) == 0
+        text = out.getvalue()
+        assert "category × priority" in text and "¥3600.00" in text and "健康" not in text
+        print(text)
+
+        out = io.StringIO()
+        run_pivot(parser.parse_args([path, "--rows", "enabled", "--measure", "count", "--all", "--csv"]), out)
+        assert out.getvalue().splitlines() == ["enabled,合计", "启用,2", "禁用,1", "合计,3"]
+        print("✅ 文字表格与CSV输出，默认只汇总启用的需求")
+    finally:
+        os.remove(path)
+
+    table = PivotEngine(CONVERTER).crosstab(DesireColumns.from_desires(synthetic_desires(50)), "currency")
+    assert format_crosstab(table, "share").splitlines()[-1].endswith("100.0%")
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试交叉分析...")
+    print("=" * 50)
+
+    tests = [
+        test_matches_row_by_row_grouping,
+        test_cached_per_version,
+        test_million_rows_speed,
+        test_headless_pivot,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
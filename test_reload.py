@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证外部修改后的增量重新加载
+Test script - Verify incremental reload of externally modified files
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from filecodec import write_desire_file
+from forecast import forecast
+from main import DesireCalculator
+from merge import changed_ids
+
+from PyQt5.QtWidgets import QApplication
+
+CNY_ONLY = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def _wait(app, done, timeout=30):
+    """处理事件直到条件成立"""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        assert time.perf_counter() < deadline, "等待超时"
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_column_patches_match_rebuild():
+    """测试增量更新的列与重新构建的列结果一致"""
+    print("=== 测试列的增量更新 ===")
+
+    desires = synthetic_desires(1000, seed=4)
+    columns = DesireColumns.from_desires(desires, 1)
+    new = dict(desires)
+    new["desire_3"] = dict(desires["desire_3"], cost=1, category="宠物", currency="JPY")
+    new["desire_8"] = dict(desires["desire_8"], enabled=not desires["desire_8"]["enabled"])
+    del new["desire_5"]
+    new["extra"] = dict(desires["desire_1"], frequency="每3周")
+    changes = [(desire_id, desires.get(desire_id), new.get(desire_id))
+               for desire_id in changed_ids(desires, new)]
+    assert sorted(change[0] for change in changes) == ["desire_3", "desire_5", "desire_8", "extra"]
+
+    patched = columns.apply_changes(changes, 2)
+    rebuilt = DesireColumns.from_desires(new, 2)
+    assert sorted(patched.ids) == sorted(rebuilt.ids) and patched.version == 2
+    assert len(columns) == 1000 and columns.version == 1
+    patched_stats = CNY_ONLY.statistics(patched)
+    rebuilt_stats = CNY_ONLY.statistics(rebuilt)
+    assert abs(patched_stats.pop('monthly_total') - rebuilt_stats.pop('monthly_total')) < 1e-6
+    assert abs(patched_stats.pop('yearly_total') - rebuilt_stats.pop('yearly_total')) < 1e-6
+    for key, value in rebuilt_stats['category_totals'].items():
+        assert abs(patched_stats['category_totals'][key] - value) < 1e-6
+    assert patched_stats['missing_rates'] == rebuilt_stats['missing_rates'] == ["JPY"]
+    assert patched_stats['priority_counts'] == rebuilt_stats['priority_counts']
+    assert patched_stats['count'] == rebuilt_stats['count'] == 1000
+    print("✅ 修改、新增、删除与新类别/币种的统计与重新构建一致")
+
+    # 行顺序不同时按 ids 对齐
+    dated = {key: dict(value, start_date="2025-03-10") for key, value in new.items()}
+    dated["desire_2"]["start_date"] = "2025-06-01"
+    expected = forecast(dated, 1, date(2025, 1, 1), converter=CNY_ONLY)
+    actual = forecast(dated, 1, date(2025, 1, 1), converter=CNY_ONLY, columns=patched)
+    assert abs(expected['total_outflow'] - actual['total_outflow']) < 1e-6
+    print("✅ 现金流预测按需求ID对齐日期")
+
+    return True
+
+
+def test_external_edit_updates_changed_rows():
+    """测试外部修改只更新变化的需求，保留未保存的本地修改"""
+    print("\n=== 测试外部修改的增量重新加载 ===")
+
+    app = QApplication.instance() or QApplication([])
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.json")
+    desires = synthetic_desires(500, seed=5)
+    write_desire_file(path, desires)
+    try:
+        with _ScriptedDialogs() as dialogs:
+            window = DesireCalculator()
+            dialogs.open_path = path
+            window.load_desires()
+            _wait(app, lambda: window.loader is None)
+            assert window.desire_model.rowCount() == 500
+
+            # 本地未保存的修改
+            window.store.update("desire_0", name="本地修改")
+            redrawn = []
+            resets = []
+            window.desire_model.dataChanged.connect(
+                lambda first, last, *_: redrawn.extend(range(first.row(), last.row() + 1)))
+            window.desire_model.modelReset.connect(lambda: resets.append(True))
+
+            edited = dict(desires)
+            edited["desire_1"] = dict(desires["desire_1"], cost=12.5)
+            edited["desire_0"] = dict(desires["desire_0"], enabled=not desires["desire_0"]["enabled"])
+            del edited["desire_2"]
+            edited["new"] = dict(desires["desire_3"], name="外部新增")
+            write_desire_file(path, edited)
+
+            version = window.store.version
+            window.reload_current_file()
+            _wait(app, lambda: window.reloader is None)
+
+            assert window.store.version == version + 1
+            assert window.desires["desire_1"]["cost"] == 12.5 and "desire_2" not in window.desires
+            assert window.desires["desire_0"]["name"] == "本地修改"
+            assert window.desires["desire_0"]["enabled"] != desires["desire_0"]["enabled"]
+            assert window.desire_model.rowCount() == 500
+            print("✅ 文件中的修改、删除、新增已应用，本地未保存的修改被保留")
+
+            # 只有修改的第0、1行与末尾新增的一行重绘，第2行被删除，列表没有重置
+            assert sorted(set(redrawn)) == [0, 1, 499] and not resets
+            assert window.desire_model.ids == [key for key in desires if key != "desire_2"] + ["new"]
+            stats = CurrencyConverter(window.rates).statistics(DesireColumns.from_desires(window.desires))
+            assert abs(window.converter.statistics(window.columns())['monthly_total']
+                       - stats['monthly_total']) < 1e-6
+            print("✅ 只重绘变化的行，统计与完整重新计算一致")
+
+            # 自己保存引起的文件变化不重新加载
+            dialogs.save_path = path
+            window.save_desires()
+            _wait(app, lambda: window.saver is None)
+            window.reload_current_file()
+            assert window.reloader is None
+            print("✅ 自己保存的文件变化被忽略")
+
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试外部修改的重新加载...")
+    print("=" * 50)
+
+    tests = [
+        test_column_patches_match_rebuild,
+        test_external_edit_updates_changed_rows,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
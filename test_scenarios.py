@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证情景
+Test script - Verify named scenario overlays and side-by-side comparison
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from desire_core import load_desire_file
+from filecodec import write_desire_file
+from main import DesireCalculator
+from scenarios import (
+    Scenario, ScenarioSet, add_arguments, compare, load_scenarios, run_scenarios, save_scenarios,
+    scenarios_path
+)
+
+from PyQt5.QtWidgets import QApplication, QComboBox, QDialog, QInputDialog, QPushButton, QTableWidget
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def _random_scenario(name, desires, rng, size):
+    """随机切换、调价、删除与新增需求的情景"""
+    scenario = Scenario(name)
+    for desire_id in rng.sample(sorted(desires), size):
+        action = rng.random()
+        if action < 0.4:
+            scenario.set(desire_id, enabled=not desires[desire_id]['enabled'])
+        elif action < 0.8:
+            scenario.set(desire_id, cost=round(rng.uniform(1, 500), 2), category="教育")
+        else:
+            scenario.remove(desire_id)
+    for index in range(size // 10):
+        scenario.add(f"{name}_new_{index}", dict(desires["desire_0"], enabled=True, currency="USD"))
+    return scenario
+
+
+def test_overlay_totals_match_full_recompute():
+    """测试基准统计加覆盖变化与完整重新计算一致"""
+    print("=== 测试情景统计 ===")
+
+    desires = synthetic_desires(3000, seed=21)
+    stats = CONVERTER.statistics(DesireColumns.from_desires(desires, 1))
+    rng = random.Random(21)
+    scenarios = [_random_scenario(f"s{i}", desires, rng, 200) for i in range(5)]
+    for row, scenario in zip(compare(scenarios, desires, stats, CONVERTER)[1:], scenarios):
+        resolved = scenario.resolve(desires)
+        expected = CONVERTER.statistics(DesireColumns.from_desires(resolved))
+        assert abs(row['monthly_total'] - expected['monthly_total']) < 1e-6
+        assert row['enabled_count'] == expected['enabled_count'] and row['count'] == expected['count']
+        for category, value in expected['category_totals'].items():
+            assert abs(row['category_totals'].get(category, 0) - value) < 1e-6
+    print("✅ 5个情景的总计、启用数、各类别合计与完整重新计算一致")
+
+    assert len(desires) == 3000 and "s0_new_0" not in desires
+    untouched = next(desire_id for desire_id in desires if desire_id not in scenarios[0].touched())
+    assert scenarios[0].resolve(desires)[untouched] is desires[untouched]
+    print("✅ 基准数据不被修改，未覆盖的需求与基准共享同一记录")
+
+    # 覆盖按字段记录：基准之后修改的其他字段在情景中同样可见
+    scenario = Scenario.from_diff("cheap", desires, dict(desires, desire_1=dict(desires["desire_1"], cost=1)))
+    assert scenario.overrides == {"desire_1": {"cost": 1}} and not scenario.added and not scenario.removed
+    renamed = dict(desires, desire_1=dict(desires["desire_1"], name="改名"))
+    assert scenario.get(renamed, "desire_1") == dict(desires["desire_1"], name="改名", cost=1)
+    print("✅ 从修改创建的情景只记录变化的字段")
+
+    return True
+
+
+def test_many_scenarios_are_cheap():
+    """测试大文件上多个情景的比较耗时与占用"""
+    print("\n=== 测试多个情景 ===")
+
+    desires = synthetic_desires(200_000, seed=22)
+    stats = CONVERTER.statistics(DesireColumns.from_desires(desires, 1))
+    rng = random.Random(22)
+    scenarios = ScenarioSet(_random_scenario(f"s{i}", desires, rng, 100) for i in range(50))
+    start = time.perf_counter()
+    rows = compare(scenarios, desires, stats, CONVERTER)
+    elapsed = time.perf_counter() - start
+    assert len(rows) == 51
+    assert elapsed < 0.2
+    size = len(json.dumps(scenarios.to_config(), ensure_ascii=False))
+    assert size < 1_000_000
+    print(f"✅ 20万个需求上50个情景比较耗时 {elapsed * 1000:.0f}ms，全部情景序列化后 {size // 1024}KB")
+
+    return True
+
+
+def test_saved_and_headless():
+    """测试情景文件与无界面比较"""
+    print("\n=== 测试无界面情景比较 ===")
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.json")
+    desires = {
+        "a": {"name": "rent", "frequency": "每月", "cost": 3000, "priority": "必需",
+              "category": "住房", "enabled": True},
+        "b": {"name": "coffee", "frequency": "每天", "cost": 20, "priority": "低",
+              "category": "餐饮", "enabled": True},
+    }
+    write_desire_file(path, desires)
+    scenarios = ScenarioSet()
+    frugal = Scenario("节俭")
+    frugal.set("b", enabled=False)
+    scenarios.add(frugal)
+    move = Scenario("搬家")
+    move.set("a", cost=2500)
+    move.add("c", {"name": "bus", "frequency": "每月", "cost": 100, "priority": "中",
+                   "category": "交通", "enabled": True})
+    scenarios.add(move)
+    save_scenarios(scenarios_path(path), scenarios)
+    try:
+        loaded = load_scenarios(scenarios_path(path))
+        assert [scenario.name for scenario in loaded] == ["节俭", "搬家"]
+        assert loaded.get("搬家").resolve(desires) == move.resolve(desires)
+
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        out = io.StringIO()
+        assert run_scenarios(parser.parse_args([path]), out) == 0
+        text = out.getvalue()
+        print(text)
+        lines = text.splitlines()
+        assert lines[0].split() == ["基准", "节俭", "搬家"]
+        assert lines[1].split() == ["月度总花销", "¥3600.00", "¥3000.00", "¥3200.00"]
+        assert lines[3].split() == ["相对基准", "+0.00", "-600.00", "-400.00"]
+
+        out = io.StringIO()
+        run_scenarios(parser.parse_args([path, "--only", "搬家", "--csv"]), out)
+        assert out.getvalue().splitlines()[1] == "月度总花销,3600.00,3200.00"
+
+        output = os.path.join(folder, "moved.json")
+        assert run_scenarios(parser.parse_args([path, "--apply", "搬家", "-o", output]), io.StringIO()) == 0
+        assert load_desire_file(output)["a"]["cost"] == 2500
+        assert run_scenarios(parser.parse_args([path, "--only", "度假"]), io.StringIO()) == 2
+        print("✅ 情景文件读写、并排比较、CSV与应用情景")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_capture_and_apply_in_window():
+    """测试界面中把未保存的修改存为情景并重新应用"""
+    print("\n=== 测试界面中的情景 ===")
+
+    app = QApplication.instance() or QApplication([])
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.json")
+    desires = synthetic_desires(300, seed=23)
+    write_desire_file(path, desires)
+    exec_, get_text = QDialog.exec_, QInputDialog.getText
+    try:
+        with _ScriptedDialogs() as dialogs:
+            window = DesireCalculator()
+            dialogs.open_path = path
+            window.load_desires()
+            deadline = time.perf_counter() + 30
+            while window.loader is not None:
+                assert time.perf_counter() < deadline
+                app.processEvents()
+            total = window.converter.statistics(window.columns())['monthly_total']
+
+            window.store.update_many(["desire_0", "desire_1"], enabled=False)
+            window.store.remove("desire_2")
+            changed = window.converter.statistics(window.columns())['monthly_total']
+            seen = {}
+
+            def run(dialog):
+                buttons = {button.text(): button for button in dialog.findChildren(QPushButton)}
+                buttons["Save Changes as Scenario"].click()
+                table = dialog.findChildren(QTableWidget)[0]
+                seen['columns'] = [table.horizontalHeaderItem(i).text() for i in range(table.columnCount())]
+                seen['monthly'] = [table.item(0, i).text() for i in range(table.columnCount())]
+                seen['restored'] = dict(window.desires) == desires
+                dialog.findChildren(QComboBox)[0].setCurrentText("关掉两个")
+                buttons["Apply"].click()
+                return 0
+
+            QDialog.exec_ = run
+            QInputDialog.getText = staticmethod(lambda *a, **k: ("关掉两个", True))
+            window.show_scenarios()
+
+            assert seen['restored'] and seen['columns'] == ["基准", "关掉两个"]
+            assert seen['monthly'] == [f"¥{total:.2f}", f"¥{changed:.2f}"]
+            print("✅ 未保存的修改存为情景后数据恢复为文件内容，比较表与修改后的统计一致")
+            assert "desire_2" not in window.desires and not window.desires["desire_0"]["enabled"]
+            print("✅ 应用情景后其内容成为未保存的修改")
+            assert load_scenarios(scenarios_path(path)).get("关掉两个").removed == {"desire_2"}
+            print("✅ 情景写入数据文件对应的情景文件")
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+    finally:
+        QDialog.exec_, QInputDialog.getText = exec_, get_text
+        shutil.rmtree(folder)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试情景...")
+    print("=" * 50)
+
+    tests = [
+        test_overlay_totals_match_full_recompute,
+        test_many_scenarios_are_cheap,
+        test_saved_and_headless,
+        test_capture_and_apply_in_window,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证敏感性分析
+Test script - Verify parallel parameter sweeps
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import sensitivity
+from benchmark import synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from sensitivity import add_arguments, heatmap, parse_axis, run_sweep, sweep
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def test_parse_axes():
+    """测试参数轴的解析"""
+    print("=== 测试参数轴解析 ===")
+
+    axis = parse_axis("category:Housing=1:1.2:3")
+    assert axis['kind'] == "category" and axis['target'] == "住房"
+    assert np.allclose(axis['values'], [1, 1.1, 1.2])
+    assert parse_axis("inflation=0,0.03")['values'] == [0, 0.03]
+    axis = parse_axis("frequency:daily=每天,every 2 days,Weekly")
+    assert axis['target'] == "每天" and axis['values'] == ["每天", "每2天", "每周"]
+    print("✅ 列表与 起点:终点:个数 两种取值，类别与频率可用英文")
+
+    for bad in ("category=1,2", "budget:住房=1", "inflation=a,b", "frequency:每天=偶尔", "inflation"):
+        try:
+            parse_axis(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"应拒绝: {bad}")
+    print("✅ 无效的参数轴被拒绝")
+
+    return True
+
+
+def test_matches_recomputed_statistics():
+    """测试每个网格点与修改需求后重新计算的结果一致"""
+    print("\n=== 测试网格点结果 ===")
+
+    desires = synthetic_desires(2000, seed=11)
+    columns = DesireColumns.from_desires(desires, 1)
+    axes = [parse_axis("category:住房=0.5,1,1.5"), parse_axis("frequency:每天=每天,每周,每2周"),
+            parse_axis("inflation=0,0.05")]
+    result = sweep(columns, axes, CONVERTER, years=3)
+    assert len(result['monthly']) == 18 and result['unmatched'] == []
+    assert abs(result['baseline'] - CONVERTER.statistics(columns)['monthly_total']) < 1e-6
+
+    for row, point in enumerate(result['points']):
+        multiplier, frequency, rate = (axis['values'][index] for axis, index in zip(axes, point))
+        changed = {}
+        for key, desire in desires.items():
+            desire = dict(desire)
+            if desire['category'] == "住房":
+                desire['cost'] *= multiplier
+            if desire['frequency'] == "每天":
+                desire['frequency'] = frequency
+            changed[key] = desire
+        expected = CONVERTER.statistics(DesireColumns.from_desires(changed))['monthly_total'] * (1 + rate) ** 3
+        assert abs(result['monthly'][row] - expected) < 1e-6 * expected
+    print("✅ 类别倍数、频率替换、通胀复利与逐点修改需求后重新计算一致")
+
+    rows, cols, grid = heatmap(result, relative=True)
+    assert grid.shape == (3, 3) and cols == ["每天", "每周", "每2周"]
+    assert abs(grid[1, 0] - ((1.05 ** 3) - 1)) < 1e-9
+    print("✅ 热力图对其余参数取最坏情况")
+
+    return True
+
+
+def test_process_pool_matches_in_process():
+    """测试进程池分批计算与当前进程计算一致"""
+    print("\n=== 测试并行计算 ===")
+
+    columns = DesireColumns.from_desires(synthetic_desires(500, seed=12), 1)
+    axes = [parse_axis("category:餐饮=0.8:1.2:30"), parse_axis("inflation=0:0.1:20")]
+    serial = sweep(columns, axes, CONVERTER, 2, workers=1)
+    chunk, executor = sensitivity.POINTS_PER_CHUNK, sensitivity.ProcessPoolExecutor
+    contexts = []
+
+    def recording_executor(*args, **kwargs):
+        contexts.append(kwargs.get("mp_context"))
+        return executor(*args, **kwargs)
+
+    sensitivity.POINTS_PER_CHUNK = 100
+    sensitivity.ProcessPoolExecutor = recording_executor
+    try:
+        parallel = sweep(columns, axes, CONVERTER, 2, workers=2)
+    finally:
+        sensitivity.POINTS_PER_CHUNK, sensitivity.ProcessPoolExecutor = chunk, executor
+    assert np.allclose(serial['monthly'], parallel['monthly'])
+    print("✅ 6批网格点在2个进程中计算，结果与当前进程一致")
+
+    assert [context.get_start_method() for context in contexts] == ["spawn"]
+    print("✅ 工作进程以 spawn 方式启动，不继承界面进程的线程锁")
+
+    return True
+
+
+def test_sweep_speed():
+    """测试10万个需求上1万个网格点的耗时"""
+    print("\n=== 测试敏感性分析速度 ===")
+
+    columns = DesireColumns.from_desires(synthetic_desires(100_000, seed=13), 1)
+    axes = [parse_axis("category:住房=0.8:1.2:100"), parse_axis("inflation=0:0.1:100")]
+    start = time.perf_counter()
+    result = sweep(columns, axes, CONVERTER, 5)
+    elapsed = time.perf_counter() - start
+    assert len(result['monthly']) == 10_000
+    assert elapsed < 1.0
+    print(f"✅ 10万个需求、1万个网格点耗时 {elapsed * 1000:.0f}ms")
+
+    return True
+
+
+def test_headless_sensitivity():
+    """测试无界面敏感性分析"""
+    print("\n=== 测试无界面敏感性分析 ===")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({
+            "a": {"name": "rent", "frequency": "每月", "cost": 3000, "priority": "必需",
+                  "category": "住房", "enabled": True},
+            "b": {"name": "coffee", "frequency": "每天", "cost": 20, "priority": "低",
+                  "category": "餐饮", "enabled": True},
+        }, f, ensure_ascii=False)
+    try:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        out = io.StringIO()
+        args = parser.parse_args([path, "category:Housing=1,1.1", "frequency:每天=每天,每周"])
+        assert run_sweep(args, out) == 0
+        text = out.getvalue()
+        assert "基准月度花销: ¥3600.00" in text and "¥3900.00 (+8.3%)" in text
+        print(text)
+
+        out = io.StringIO()
+        run_sweep(parser.parse_args([path, "inflation=0,0.1", "--years", "2", "--csv"]), out)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "inflation,monthly,yearly,change"
+        assert lines[2] == "0.1,4356.0,52272.0,0.21"
+        print("✅ 文字摘要与每个网格点的CSV输出")
+
+        out = io.StringIO()
+        run_sweep(parser.parse_args([path, "category:交通=1,2"]), out)
+        assert "数据中没有对应的需求: category:交通" in out.getvalue()
+    finally:
+        os.remove(path)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试敏感性分析...")
+    print("=" * 50)
+
+    tests = [
+        test_parse_axes,
+        test_matches_recomputed_statistics,
+        test_process_pool_matches_in_process,
+        test_sweep_speed,
+        test_headless_sensitivity,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
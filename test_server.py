@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证本地JSON接口服务
+Test script - Verify the local JSON API server
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import server
+from server import DesireServer
+
+DESIRES = {
+    "desire_1": {"name": "房租", "frequency": "每月", "cost": 3000, "priority": "必需", "category": "住房", "enabled": True,
+                 "start_date": "2025-01-31"},
+    "desire_2": {"name": "吃饭", "frequency": "每天", "cost": 50, "priority": "必需", "category": "餐饮", "enabled": True},
+    "desire_3": {"name": "交通", "frequency": "每周", "cost": 100, "priority": "中", "category": "交通", "enabled": True},
+    "desire_4": {"name": "娱乐", "frequency": "每月", "cost": 500, "priority": "低", "category": "娱乐", "enabled": False},
+}
+
+
+class _RunningServer:
+    """在后台线程的事件循环中运行服务"""
+
+    def __init__(self, paths):
+        self.server = DesireServer(paths)
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        async def start():
+            self.listener = await self.server.start("127.0.0.1", 0)
+            self.port = self.listener.sockets[0].getsockname()[1]
+            ready.set()
+
+        self.thread = threading.Thread(
+            target=lambda: (self.loop.run_until_complete(start()), self.loop.run_forever()),
+            daemon=True,
+        )
+        self.thread.start()
+        ready.wait(5)
+
+    def close(self):
+        async def stop():
+            self.listener.close()
+            # 客户端已断开，等待连接处理自然结束
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if tasks:
+                await asyncio.wait(tasks, timeout=2)
+
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+def _write_json(data):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path
+
+
+def _get(conn, target):
+    conn.request("GET", target)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_totals_and_filters():
+    """测试总计、筛选和预算接口"""
+    print("=== 测试接口计算结果 ===")
+
+    path = _write_json(DESIRES)
+    running = _RunningServer([path])
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", running.port)
+        status, totals = _get(conn, "/totals")
+        assert status == 200
+        assert abs(totals["monthly_total"] - (3000 + 50 * 30 + 100 * 4.33)) < 1e-6
+        assert totals["category_totals"]["住房"] == 3000
+        assert totals["priority_counts"]["必需"] == 2
+
+        status, filtered = _get(conn, f"/desires?file={name}&category=Housing")
+        assert status == 200 and list(filtered["desires"]) == ["desire_1"]
+
+        status, disabled = _get(conn, "/desires?enabled=false")
+        assert list(disabled["desires"]) == ["desire_4"]
+
+        status, budget = _get(conn, "/budget?goal=4000")
+        assert budget["level"] == "over"
+
+        status, upcoming = _get(conn, "/upcoming?from=2025-02-01&count=2")
+        assert [p["date"] for p in upcoming["payments"]] == ["2025-02-28", "2025-03-31"]
+        assert upcoming["unscheduled"] == 2
+
+        status, error = _get(conn, "/budget?goal=abc")
+        assert status == 400 and "error" in error
+
+        status, _ = _get(conn, "/desires?file=missing")
+        assert status == 404
+        conn.close()
+        print("✅ 所有接口返回预期结果（同一连接 keep-alive）")
+    finally:
+        running.close()
+        os.remove(path)
+
+    return True
+
+
+def test_cache_invalidated_by_file_change():
+    """测试响应缓存随数据版本失效"""
+    print("\n=== 测试缓存与数据版本 ===")
+
+    path = _write_json(DESIRES)
+    running = _RunningServer([path])
+    original_interval = server.RELOAD_CHECK_INTERVAL
+    server.RELOAD_CHECK_INTERVAL = 0
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", running.port)
+        _, first = _get(conn, "/totals")
+        _, second = _get(conn, "/totals")
+        assert first == second
+        assert running.server.cache_hits >= 1
+
+        changed = dict(DESIRES)
+        changed["desire_5"] = {"name": "网费", "frequency": "每月", "cost": 100,
+                               "priority": "中", "category": "住房", "enabled": True}
+        time.sleep(0.01)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(changed, f, ensure_ascii=False)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        _, third = _get(conn, "/totals")
+        assert third["version"] == first["version"] + 1
+        assert abs(third["monthly_total"] - first["monthly_total"] - 100) < 1e-6
+        conn.close()
+        print("✅ 文件修改后版本递增，缓存自动失效")
+    finally:
+        server.RELOAD_CHECK_INTERVAL = original_interval
+        running.close()
+        os.remove(path)
+
+    return True
+
+
+def _raw(port, data):
+    """发送原始请求，返回状态码（服务端随后关闭连接）"""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(data)
+        received = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+    return int(received.split(b" ", 2)[1])
+
+
+def test_rejects_bad_requests():
+    """测试过大的请求头、请求体，无效的 Content-Length 与 days 参数"""
+    print("\n=== 测试无效请求 ===")
+
+    path = _write_json(DESIRES)
+    running = _RunningServer([path])
+    try:
+        padding = b"X-Padding: " + b"a" * server.MAX_HEADER_BYTES + b"\r\n"
+        assert _raw(running.port, b"GET /totals HTTP/1.1\r\n" + padding + b"\r\n") == 431
+        print("✅ 请求头超过上限时返回 431")
+
+        for length in (b"-5", b"abc"):
+            head = b"GET /totals HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n"
+            assert _raw(running.port, head) == 400
+        assert _raw(running.port, b"GET /totals HTTP/1.1\r\nConnection: close\r\n\r\n") == 200
+        print("✅ 负数或无法解析的 Content-Length 返回 400，服务继续正常响应")
+
+        length = str(server.MAX_BODY_BYTES + 1).encode()
+        assert _raw(running.port, b"GET /totals HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n") == 413
+        print("✅ 请求体超过上限时返回 413，不读取请求体")
+
+        for days in (10 ** 9, server.MAX_UPCOMING_DAYS + 1):
+            assert _raw(running.port, f"GET /upcoming?days={days} HTTP/1.1\r\nConnection: close\r\n\r\n".encode()) == 400
+        assert _raw(running.port, b"GET /upcoming?days=30&from=9999-12-30 HTTP/1.1\r\nConnection: close\r\n\r\n") == 400
+        print("✅ 过大的 days 或超出日期范围时返回 400")
+    finally:
+        running.close()
+        os.remove(path)
+
+    return True
+
+
+def test_throughput():
+    """测试单连接吞吐（缓存命中）"""
+    print("\n=== 测试吞吐 ===")
+
+    path = _write_json(DESIRES)
+    running = _RunningServer([path])
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", running.port)
+        requests = 2000
+        start = time.perf_counter()
+        for _ in range(requests):
+            _get(conn, "/totals")
+        elapsed = time.perf_counter() - start
+        conn.close()
+        print(f"✅ {requests / elapsed:.0f} 请求/秒")
+    finally:
+        running.close()
+        os.remove(path)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试本地接口服务...")
+    print("=" * 50)
+
+    tests = [
+        test_totals_and_filters,
+        test_cache_invalidated_by_file_change,
+        test_rejects_bad_requests,
+        test_throughput,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
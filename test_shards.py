@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证分片存储
+Test script - Verify the category-sharded directory layout and partial loading
+"""
+
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from columns import DesireColumns
+from currency import CurrencyConverter, RateTable
+from desire_core import load_desire_file
+from filecodec import write_desire_file
+from main import DesireCalculator
+from shards import MANIFEST_NAME, ShardSet, add_arguments, is_sharded, run_shards, save_shards
+
+from PyQt5.QtWidgets import QApplication
+
+CONVERTER = CurrencyConverter(RateTable({"CNY": 1.0, "USD": 7.0, "EUR": 8.0}))
+
+
+def _mtimes(path):
+    """分片目录中各文件的修改时间"""
+    return {name: os.stat(os.path.join(path, name)).st_mtime_ns for name in os.listdir(path)}
+
+
+def _shard_of(shards, category):
+    return shards.manifest['shards'][category]['file']
+
+
+def test_manifest_matches_full_statistics():
+    """测试由清单得到的统计与读取全部需求后计算的一致"""
+    print("=== 测试分片清单 ===")
+
+    desires = synthetic_desires(5000, seed=51)
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.shards")
+    try:
+        written = save_shards(path, desires)
+        shards = ShardSet(path)
+        assert is_sharded(path) and sorted(written) == sorted(shards.categories())
+        assert len(os.listdir(path)) == len(written) + 1
+        assert shards.read(shards.categories()) == desires
+        print(f"✅ {len(written)} 个类别各写为一个分片，读回的数据与原数据一致")
+
+        expected = CONVERTER.statistics(DesireColumns.from_desires(desires))
+        stats = shards.statistics(CONVERTER)
+        assert abs(stats['monthly_total'] - expected['monthly_total']) < 1e-6
+        assert stats['count'] == expected['count'] and stats['enabled_count'] == expected['enabled_count']
+        assert stats['priority_counts'] == expected['priority_counts']
+        for category, value in expected['category_totals'].items():
+            assert abs(stats['category_totals'][category] - value) < 1e-6
+        usd = CurrencyConverter(CONVERTER.rates, "USD")
+        assert abs(shards.statistics(usd)['monthly_total'] - usd.statistics(
+            DesireColumns.from_desires(desires))['monthly_total']) < 1e-6
+        print("✅ 清单中的总计、各类别合计与优先级分布与完整计算一致，可换算为任意报告币种")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_saves_rewrite_only_changed_shards():
+    """测试保存只重写变化的分片"""
+    print("\n=== 测试分片保存 ===")
+
+    desires = synthetic_desires(3000, seed=52)
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.shards")
+    try:
+        save_shards(path, desires)
+        before = _mtimes(path)
+        time.sleep(0.01)
+        housing_id = next(key for key, desire in desires.items() if desire['category'] == "住房")
+        edited = dict(desires, **{housing_id: dict(desires[housing_id], cost=1)})
+        assert save_shards(path, edited, base=desires) == ["住房"]
+        after = _mtimes(path)
+        shards = ShardSet(path)
+        changed = {name for name in after if after[name] != before[name]}
+        assert changed == {_shard_of(shards, "住房"), MANIFEST_NAME}
+        print("✅ 修改一个需求只重写所在类别的分片与清单")
+
+        moved = dict(edited, **{housing_id: dict(edited[housing_id], category="餐饮")})
+        assert sorted(save_shards(path, moved, base=edited)) == ["住房", "餐饮"]
+        only_health = {key: desire for key, desire in moved.items() if desire['category'] == "健康"}
+        remaining = dict(moved)
+        for key in only_health:
+            del remaining[key]
+        save_shards(path, remaining, base=moved)
+        assert "健康" not in ShardSet(path).manifest['shards']
+        assert len(os.listdir(path)) == len(ShardSet(path).categories()) + 1
+        print("✅ 改变类别时重写两个分片；类别中的需求全部删除后分片文件随之删除")
+
+        # 只读入了部分类别：其余分片保持不变，另存到新目录时复制过去
+        housing = {key: desire for key, desire in remaining.items() if desire['category'] == "住房"}
+        partial = dict(housing, extra=dict(housing[next(iter(housing))], name="新增"))
+        copy = os.path.join(folder, "copy.shards")
+        save_shards(copy, partial, loaded={"住房"}, source=path)
+        assert ShardSet(copy).read(ShardSet(copy).categories()) == dict(remaining, extra=partial["extra"])
+        before = _mtimes(path)
+        save_shards(path, housing, loaded={"住房"}, base=housing)
+        assert _mtimes(path) == dict(before, **{MANIFEST_NAME: _mtimes(path)[MANIFEST_NAME]})
+        print("✅ 部分读入时未读入的类别原样保留，另存为新目录时一并复制")
+
+        # 只读入住房类时把需求移到未读入的餐饮类：餐饮分片中原有的需求不能丢失
+        food = ShardSet(path).read(["餐饮"])
+        moved_ids = list(housing)[:2]
+        moved = dict(housing, **{key: dict(housing[key], category="餐饮") for key in moved_ids})
+        assert sorted(save_shards(path, moved, loaded={"住房"}, base=housing)) == ["住房", "餐饮"]
+        shards = ShardSet(path)
+        assert shards.read(["餐饮"]) == dict(food, **{key: moved[key] for key in moved_ids})
+        assert shards.manifest['shards']["餐饮"]['count'] == len(food) + 2
+        deleted = dict(moved)
+        del deleted[moved_ids[0]]
+        save_shards(path, deleted, loaded={"住房"}, base=moved)
+        assert ShardSet(path).read(["餐饮"]) == dict(food, **{moved_ids[1]: moved[moved_ids[1]]})
+        print(f"✅ 需求移入未读入的类别时与原分片合并（餐饮 {len(food)} + 2 个），之后删除的需求不会复活")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_headless_conversion():
+    """测试无界面的分片转换与清单统计"""
+    print("\n=== 测试无界面分片转换 ===")
+
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, "desires.json")
+    desires = synthetic_desires(300, seed=53)
+    write_desire_file(source, desires)
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    try:
+        target = os.path.join(folder, "desires.shards")
+        out = io.StringIO()
+        assert run_shards(parser.parse_args([source, "-o", target]), out) == 0
+        out = io.StringIO()
+        assert run_shards(parser.parse_args([os.path.join(target, MANIFEST_NAME)]), out) == 0
+        lines = out.getvalue().splitlines()
+        print(out.getvalue())
+        assert lines[0].split() == ["类别", "需求数", "启用", "月度花销"]
+        assert lines[-1].split()[:2] == ["合计", "300"]
+
+        back = os.path.join(folder, "back.json")
+        assert run_shards(parser.parse_args([target, "-o", back]), io.StringIO()) == 0
+        assert load_desire_file(back) == desires
+        housing = os.path.join(folder, "housing.json")
+        assert run_shards(parser.parse_args([target, "--only", "住房", "-o", housing]), io.StringIO()) == 0
+        assert {desire['category'] for desire in load_desire_file(housing).values()} == {"住房"}
+        assert run_shards(parser.parse_args([source]), io.StringIO()) == 2
+        assert run_shards(parser.parse_args([target, "--only", "度假", "-o", housing]), io.StringIO()) == 2
+        print("✅ 单个文件与分片目录互相转换，只导出指定类别，清单统计表")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_partial_loading_in_window():
+    """测试界面只读入当前筛选需要的分片"""
+    print("\n=== 测试界面分片读取 ===")
+
+    app = QApplication.instance() or QApplication([])
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.shards")
+    desires = synthetic_desires(2000, seed=54)
+    save_shards(path, desires)
+
+    def wait(done, timeout=30):
+        deadline = time.perf_counter() + timeout
+        while not done():
+            assert time.perf_counter() < deadline, "等待超时"
+            app.processEvents()
+
+    try:
+        with _ScriptedDialogs() as dialogs:
+            window = DesireCalculator()
+            window.category_filter.setCurrentText("Housing")
+            dialogs.open_path = os.path.join(path, MANIFEST_NAME)
+            window.load_desires()
+            wait(lambda: window.loader is None)
+            assert {desire['category'] for desire in window.desires.values()} == {"住房"}
+            total = window.converter.statistics(DesireColumns.from_desires(desires))['monthly_total']
+            assert window.monthly_label.text() == f"月度总花销: ¥{total:.2f}"
+            print("✅ 只读入住房类的分片，总计来自清单中的全部类别")
+
+            window.category_filter.setCurrentText("Food")
+            wait(lambda: window.loader is None and window.shards.loaded == {"住房", "餐饮"})
+            assert window.desire_model.rowCount() == sum(1 for d in desires.values() if d['category'] == "餐饮")
+            assert window.monthly_label.text() == f"月度总花销: ¥{total:.2f}"
+            print("✅ 切换到餐饮时在后台读入对应的分片并显示")
+
+            food_id = next(key for key, desire in desires.items() if desire['category'] == "餐饮")
+            window.store.update(food_id, cost=desires[food_id]['cost'] + 10)
+            before = _mtimes(path)
+            time.sleep(0.01)
+            dialogs.save_path = path
+            window.save_desires()
+            wait(lambda: window.saver is None)
+            after = _mtimes(path)
+            shards = ShardSet(path)
+            assert {name for name in after if after[name] != before[name]} == {_shard_of(shards, "餐饮"), MANIFEST_NAME}
+            assert shards.read(["餐饮"])[food_id]['cost'] == desires[food_id]['cost'] + 10
+            assert len(shards.read(shards.categories())) == 2000
+            print("✅ 保存只重写修改过的餐饮分片，未读入的类别保持不变")
+
+            housing_id = next(key for key, desire in window.desires.items() if desire['category'] == "住房")
+            window.store.update(housing_id, category="交通")
+            window.save_desires()
+            wait(lambda: window.saver is None)
+            transport = sum(1 for desire in desires.values() if desire['category'] == "交通")
+            assert "交通" in window.shards.loaded
+            assert sum(1 for desire in window.desires.values() if desire['category'] == "交通") == transport + 1
+            shards = ShardSet(path)
+            saved = shards.read(shards.categories())
+            assert len(saved) == 2000 and saved[housing_id]['category'] == "交通"
+            window.update_statistics()
+            total = window.converter.statistics(DesireColumns.from_desires(saved))['monthly_total']
+            assert window.monthly_label.text() == f"月度总花销: ¥{total:.2f}"
+            print("✅ 需求移入未读入的类别后保存：先读入该类别，分片与统计都不重复、不丢失")
+
+            dialogs.save_path = os.path.join(folder, "single.json")
+            window.save_desires()
+            assert dialogs.errors and not os.path.exists(dialogs.save_path)
+            del dialogs.errors[:]
+            window.category_filter.setCurrentText("All")
+            wait(lambda: window.loader is None and not window.shards.unloaded())
+            assert len(window.desires) == 2000
+            print("✅ 部分读入时不能另存为单个文件；选择 All 后读入全部分片")
+
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+            assert not dialogs.errors
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试分片存储...")
+    print("=" * 50)
+
+    tests = [
+        test_manifest_matches_full_statistics,
+        test_saves_rewrite_only_changed_shards,
+        test_headless_conversion,
+        test_partial_loading_in_window,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
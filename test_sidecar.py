@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证统计缓存文件与增量解析
+Test script - Verify the aggregate sidecar and incremental parsing
+"""
+
+import json
+import os
+import tempfile
+
+from desire_core import calculate_statistics, parse_desire_text
+from sidecar import read_sidecar, sidecar_path, write_sidecar
+
+DESIRES = {
+    "desire_1": {"name": "房租", "frequency": "每月", "cost": 3000, "priority": "必需", "category": "住房", "enabled": True},
+    "desire_2": {"name": "吃饭", "frequency": "每天", "cost": 50, "priority": "必需", "category": "餐饮", "enabled": True},
+    "desire_3": {"name": "娱乐", "frequency": "每月", "cost": 500, "priority": "低", "category": "娱乐", "enabled": False},
+}
+
+
+def _save(desires):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    data = json.dumps(desires, ensure_ascii=False, indent=2).encode("utf-8")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    write_sidecar(path, data, desires)
+    return path, data
+
+
+def _cleanup(path):
+    for target in (path, sidecar_path(path)):
+        if os.path.exists(target):
+            os.remove(target)
+
+
+def test_sidecar_round_trip():
+    """测试缓存写入与读取"""
+    print("=== 测试统计缓存读写 ===")
+
+    path, data = _save(DESIRES)
+    try:
+        aggregates = read_sidecar(path, data)
+        assert aggregates is not None
+        assert aggregates["stats"] == json.loads(json.dumps(calculate_statistics(DESIRES)))
+        assert set(aggregates) == {"stats"}
+        print("✅ 缓存包含总计、类别统计与优先级分布")
+    finally:
+        _cleanup(path)
+
+    return True
+
+
+def test_sidecar_hash_mismatch():
+    """测试内容变化后缓存失效"""
+    print("\n=== 测试缓存失效 ===")
+
+    path, data = _save(DESIRES)
+    try:
+        changed = data.replace(b"3000", b"3100")
+        assert read_sidecar(path, changed) is None
+        with open(sidecar_path(path), "w") as f:
+            f.write("{broken")
+        assert read_sidecar(path, data) is None
+        print("✅ 哈希不一致或缓存损坏时返回 None")
+    finally:
+        _cleanup(path)
+
+    return True
+
+
+def test_incremental_parse():
+    """测试逐条解析与 json.loads 结果一致"""
+    print("\n=== 测试逐条解析 ===")
+
+    legacy = {"desire_1": {"name": "房租", "frequency": "每月", "cost": 3000.0, "enabled": True}}
+    for text in (json.dumps(DESIRES, ensure_ascii=False, indent=2),
+                 json.dumps(DESIRES, separators=(",", ":")),
+                 " { } ",
+                 json.dumps(legacy)):
+        expected = json.loads(text)
+        for desire in expected.values():
+            desire.setdefault("priority", "中")
+            desire.setdefault("category", "其他")
+        assert parse_desire_text(text) == expected
+
+    for bad in ("[]", '{"a": 1', '{"a" 1}', '{"a": 1,}'):
+        try:
+            parse_desire_text(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"应拒绝无效JSON: {bad}")
+    print("✅ 解析结果一致，无效JSON被拒绝")
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试统计缓存...")
+    print("=" * 50)
+
+    tests = [
+        test_sidecar_round_trip,
+        test_sidecar_hash_mismatch,
+        test_incremental_parse,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
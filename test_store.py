@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证需求存储与批量事务
+Test script - Verify the desire store and transactional batch edits
+"""
+
+import threading
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from budgets import BudgetMonitor
+from main import DesireCalculator
+from store import DesireStore
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+
+def _desire(cost, category="住房", priority="中", enabled=True):
+    return {"name": "x", "frequency": "每月", "cost": cost,
+            "priority": priority, "category": category, "enabled": enabled}
+
+
+def _store(count):
+    store = DesireStore({f"d{i}": _desire(10) for i in range(count)})
+    notifications = []
+    store.subscribe(notifications.append)
+    return store, notifications
+
+
+def test_batch_is_one_notification():
+    """测试批量操作只通知一次"""
+    print("=== 测试批量操作合并通知 ===")
+
+    store, notifications = _store(10000)
+    ids = list(store.desires)
+
+    store.update_many(ids, enabled=False)
+    assert len(notifications) == 1 and len(notifications[0]) == 10000
+    assert not any(desire['enabled'] for desire in store.desires.values())
+    print("✅ 禁用 10000 个需求只产生一次通知")
+
+    # 值未变化的需求不产生变化
+    store.update_many(ids[:10], enabled=False)
+    assert len(notifications) == 1
+
+    store.scale_cost(ids[:3], 1.5)
+    store.update_many(ids[:3], category="餐饮", priority="高")
+    store.remove_many(ids[5:8])
+    assert [len(changes) for changes in notifications] == [10000, 3, 3, 3]
+    assert store['d0']['cost'] == 15 and store['d0']['category'] == "餐饮"
+    assert len(store) == 9997
+    print("✅ 调整花销、修改类别/优先级、批量删除各一次通知")
+
+    return True
+
+
+def test_batch_edits_in_window():
+    """测试界面批量修改只更新有变化的条目，批量删除一次完成"""
+    print("\n=== 测试界面批量修改 ===")
+
+    app = QApplication.instance() or QApplication([])
+    with _ScriptedDialogs() as dialogs:
+        window = DesireCalculator()
+        window.store.replace(synthetic_desires(2000, seed=9))
+        app.processEvents()
+
+        def rows():
+            return list(window.desire_model.ids)
+
+        changed = []
+        resets = []
+        window.desire_model.dataChanged.connect(lambda first, last, *_: changed.append((first.row(), last.row())))
+        window.desire_model.modelReset.connect(lambda: resets.append(True))
+
+        enabled_rows = [row for row, desire in enumerate(window.desires.values()) if desire['enabled']]
+        window.desire_list.selectAll()
+        start = time.perf_counter()
+        window.batch_set_enabled(False)
+        app.processEvents()
+        elapsed = time.perf_counter() - start
+        assert [row for first, last in changed for row in range(first, last + 1)] == enabled_rows
+        assert len(changed) < len(enabled_rows) and not resets
+        assert not any(desire['enabled'] for desire in window.desires.values())
+        print(f"✅ 批量禁用 2000 个需求只重绘原来启用的行（连续的行合并通知），没有重建列表（{elapsed:.2f}s）")
+
+        ids = list(window.desires)
+        window.desire_list.clearSelection()
+        window.select_ids(ids[1:30:3])
+        window.store.remove_many(ids[::3])
+        assert rows() == list(window.desires)
+        assert window.selected_ids() == ids[1:30:3]
+        window.store.remove_many(list(window.desires)[:-10])
+        assert rows() == list(window.desires) and len(rows()) == 10
+        print("✅ 批量删除分散的条目与大部分条目后列表与数据一致，其余条目保持选中")
+
+        window.category_filter.setCurrentText("Food")
+        food = rows()
+        window.desire_list.selectAll()
+        window.store.update_many(window.selected_ids(), category="住房")
+        assert rows() == [] and all(window.desires[key]['category'] == "住房" for key in food)
+        print("✅ 修改类别后不再符合筛选条件的条目被移出列表")
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        assert not dialogs.errors
+
+    return True
+
+
+def test_list_clicks():
+    """测试列表卡片的复选框与删除按钮"""
+    print("\n=== 测试列表卡片点击 ===")
+
+    app = QApplication.instance() or QApplication([])
+    with _ScriptedDialogs() as dialogs:
+        window = DesireCalculator()
+        window.resize(900, 700)
+        window.show()
+        window.store.replace(synthetic_desires(50, seed=4))
+        app.processEvents()
+        assert not window.desire_list.grab().isNull()
+
+        def click(row, target):
+            rect = window.desire_list.visualRect(window.desire_model.index(row))
+            checkbox, delete = window.desire_delegate.hit_rects(rect)
+            pos = (checkbox if target == "checkbox" else delete).center()
+            QTest.mouseClick(window.desire_list.viewport(), Qt.LeftButton, pos=pos)
+            app.processEvents()
+
+        first, second = window.desire_model.ids[:2]
+        enabled = window.desires[first]['enabled']
+        click(0, "checkbox")
+        assert window.desires[first]['enabled'] != enabled and window.selected_ids() == []
+        print("✅ 点击复选框切换启用状态，不改变选择")
+
+        click(0, "delete")
+        assert first not in window.desires and window.desire_model.ids[0] == second
+        print("✅ 点击 ✕ 确认后删除需求")
+
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        assert not dialogs.errors
+
+    return True
+
+
+def test_transaction_coalesces_and_rolls_back():
+    """测试事务合并同一需求的修改并在出错时回滚"""
+    print("\n=== 测试事务合并与回滚 ===")
+
+    store, notifications = _store(3)
+    original = store['d0']
+
+    with store.transaction():
+        store.update('d0', cost=20)
+        store.update('d0', cost=30)
+        store.add('new', _desire(5))
+        store.remove('new')
+    assert len(notifications) == 1
+    assert notifications[0] == [('d0', original, store['d0'])]
+    assert original['cost'] == 10
+    print("✅ 同一需求多次修改合并为 (最初旧值, 最终新值)，增删抵消")
+
+    before = dict(store.desires)
+    try:
+        with store.transaction():
+            store.update('d1', enabled=False)
+            store.remove('d2')
+            store.remove('missing')
+    except KeyError:
+        pass
+    assert store.desires == before and len(notifications) == 1
+    print("✅ 事务出错时撤销全部修改且不通知")
+
+    with store.transaction():
+        store.update('d1', cost=1)
+        try:
+            with store.transaction():
+                store.update('d2', cost=2)
+                raise ValueError
+        except ValueError:
+            pass
+    assert store['d1']['cost'] == 1 and store['d2']['cost'] == 10
+    assert len(notifications) == 2 and len(notifications[1]) == 1
+    print("✅ 内层事务回滚不影响外层修改")
+
+    return True
+
+
+def test_changes_drive_budget_monitor():
+    """测试通知内容可直接用于增量预算"""
+    print("\n=== 测试通知驱动预算 ===")
+
+    store = DesireStore({f"d{i}": _desire(100) for i in range(100)})
+    monitor = BudgetMonitor({("category", "住房"): 20000})
+    monitor.reset(store.desires)
+    store.subscribe(lambda changes: monitor.apply([(old, new) for _, old, new in changes]))
+
+    ids = list(store.desires)
+    store.update_many(ids[:50], enabled=False)
+    store.update_many(ids[50:60], category="餐饮")
+    store.scale_cost(ids[60:], 2)
+
+    full = BudgetMonitor({("category", "住房"): 20000})
+    full.reset(store.desires)
+    assert abs(monitor.status("category", "住房")['used'] - full.status("category", "住房")['used']) < 1e-6
+    assert full.status("category", "住房")['used'] == 8000
+    print("✅ 批量修改后预算与全量计算一致")
+
+    return True
+
+
+def test_snapshots_are_isolated():
+    """测试快照不受之后修改的影响，且只在快照后的第一次写入时复制"""
+    print("\n=== 测试写时复制快照 ===")
+
+    store, notifications = _store(1000)
+    snapshot = store.snapshot()
+    assert snapshot.version == store.version and snapshot.desires is store.desires
+    print("✅ 取快照不复制数据")
+
+    store.update('d0', cost=99)
+    live = store.desires
+    store.remove('d1')
+    with store.transaction():
+        store.add('new', _desire(1))
+    assert store.desires is live
+    assert snapshot.desires['d0']['cost'] == 10 and 'd1' in snapshot.desires and 'new' not in snapshot.desires
+    assert len(snapshot) == 1000 and snapshot.columns().cost.sum() == 10000
+    assert store.snapshot().version == snapshot.version + 3
+    print("✅ 之后的修改只复制一次字典，快照内容与版本保持不变")
+
+    # 回滚同样不影响快照
+    second = store.snapshot()
+    try:
+        with store.transaction():
+            store.update('d0', cost=1)
+            raise ValueError("rollback")
+    except ValueError:
+        pass
+    assert second.desires['d0']['cost'] == 99 and store['d0']['cost'] == 99
+    print("✅ 回滚不修改已取得的快照")
+
+    return True
+
+
+def test_concurrent_writers_and_readers():
+    """测试多线程写入串行化，读取线程看到的快照始终一致"""
+    print("\n=== 测试并发读写 ===")
+
+    store, notifications = _store(200)
+    ids = list(store.desires)
+    errors = []
+
+    def writer(offset):
+        for step in range(50):
+            # 每个事务把全部需求调整为同一花销，快照中的花销应始终一致
+            with store.transaction():
+                for desire_id in ids:
+                    store.update(desire_id, cost=offset * 1000 + step)
+
+    def reader():
+        for _ in range(200):
+            snapshot = store.snapshot()
+            if len({desire['cost'] for desire in snapshot.desires.values()}) != 1:
+                errors.append(snapshot.version)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(3)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(notifications) == 150 and store.version == 150
+    assert all(len(changes) == 200 for changes in notifications)
+    print("✅ 3个线程共150次事务互不交错，读取线程从未看到写了一半的数据")
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试需求存储...")
+    print("=" * 50)
+
+    tests = [
+        test_batch_is_one_notification,
+        test_batch_edits_in_window,
+        test_list_clicks,
+        test_transaction_coalesces_and_rolls_back,
+        test_changes_drive_budget_monitor,
+        test_snapshots_are_isolated,
+        test_concurrent_writers_and_readers,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证多实例同步
+Test script - Verify delta replication through the local sync hub
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from main import DesireCalculator
+import sync
+from sync import ReplicaState, SyncClient, SyncHub, encode_message, parse_address
+
+from PyQt5.QtWidgets import QApplication
+
+
+class _RunningHub:
+    """在后台线程的事件循环中运行集线器"""
+
+    def __init__(self, address="127.0.0.1:0", desires=None):
+        self.hub = SyncHub(desires)
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        async def start():
+            self.listener = await self.hub.start(address)
+            name = self.listener.sockets[0].getsockname()
+            self.address = f"unix:{name}" if isinstance(name, str) else f"127.0.0.1:{name[1]}"
+            ready.set()
+
+        self.thread = threading.Thread(
+            target=lambda: (self.loop.run_until_complete(start()), self.loop.run_forever()),
+            daemon=True,
+        )
+        self.thread.start()
+        ready.wait(5)
+
+    def close(self):
+        async def stop():
+            self.listener.close()
+            for writer in list(self.hub.writers):
+                writer.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if tasks:
+                await asyncio.wait(tasks, timeout=2)
+
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+def _join(address, desires):
+    """加入同步并接收补发的数据，返回 (客户端, 本地数据)"""
+    client = SyncClient(address)
+    client.hello()
+    local = dict(desires)
+    while not client.ready:
+        _apply(local, client.receive(client.read()))
+    client.publish(client.local_only(local))
+    return client, local
+
+
+def _apply(local, remote):
+    for desire_id, desire in remote:
+        if desire is None:
+            local.pop(desire_id, None)
+        else:
+            local[desire_id] = desire
+
+
+def _edit(client, local, desire_id, new):
+    """本地修改并发送"""
+    client.publish([(desire_id, local.get(desire_id), new)])
+    _apply(local, [(desire_id, new)])
+
+
+def _receive_until(client, local, done, timeout=5):
+    """读取消息直到条件成立"""
+    client.sock.settimeout(timeout)
+    while not done():
+        _apply(local, client.receive(client.read()))
+
+
+def _raw_join(address):
+    """用原始套接字加入同步并读到 ready，返回 (套接字, 读取文件)"""
+    family, target = parse_address(address)
+    raw = socket.socket(family, socket.SOCK_STREAM)
+    raw.settimeout(5)
+    raw.connect(target)
+    raw.sendall(encode_message({"type": "hello", "client": "raw", "since": 0}))
+    lines = raw.makefile("rb")
+    while b'"ready"' not in lines.readline():
+        pass
+    return raw, lines
+
+
+class _Warnings(logging.Handler):
+    """收集同步模块的警告日志"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_concurrent_edits_converge():
+    """测试并发修改按时间戳合并，与消息到达顺序无关"""
+    print("=== 测试并发修改的合并 ===")
+
+    base = {"a": {"cost": 1}, "b": {"cost": 2}}
+    results = set()
+    for order in itertools.permutations(range(3)):
+        replicas = [ReplicaState(name) for name in ("x", "y", "z")]
+        outgoing = [
+            replicas[0].local([("a", base["a"], {"cost": 10})]),
+            replicas[1].local([("a", base["a"], {"cost": 20}), ("b", base["b"], None)]),
+            replicas[2].local([("b", base["b"], {"cost": 30})]),
+        ]
+        hub = ReplicaState("hub")
+        broadcast = [hub.accept(outgoing[index]) for index in order]
+        for replica in replicas:
+            for entries in broadcast:
+                replica.accept(entries)
+        states = {repr(sorted(replica.records.items())) for replica in replicas + [hub]}
+        assert len(states) == 1
+        results |= states
+    assert len(results) == 1
+    # a 的时钟相同，实例ID较大的一方生效；b 的删除时钟更大，保留为墓碑
+    assert hub.records == {"a": {"cost": 20}, "b": None}
+    print("✅ 6种到达顺序下所有实例与集线器的结果相同")
+
+    # 看到对方修改之后的修改时钟更大，总是生效
+    x, y = ReplicaState("x"), ReplicaState("y")
+    y.accept(x.local([("a", None, {"cost": 1})]))
+    later = y.local([("a", {"cost": 1}, {"cost": 2})])
+    x.local([("a", {"cost": 1}, {"cost": 3})])
+    assert x.accept(later) and x.records["a"] == {"cost": 2}
+    print("✅ 因果上更晚的修改总是生效")
+
+    return True
+
+
+def test_hub_propagates_deltas():
+    """测试集线器转发修改、补发数据与墓碑"""
+    print("\n=== 测试集线器 ===")
+
+    running = _RunningHub()
+    try:
+        a, local_a = _join(running.address, {"x": {"cost": 1}, "y": {"cost": 2}})
+        b, local_b = _join(running.address, {"y": {"cost": 99}, "z": {"cost": 3}})
+        _receive_until(a, local_a, lambda: "z" in local_a)
+        assert local_a == local_b == {"x": {"cost": 1}, "y": {"cost": 2}, "z": {"cost": 3}}
+        print("✅ 第一个实例提供初始数据，之后加入的实例采用集线器中的值并补充本地独有的需求")
+
+        _edit(a, local_a, "x", {"cost": 5})
+        _edit(b, local_b, "y", None)
+        _receive_until(b, local_b, lambda: local_b.get("x") == {"cost": 5})
+        _receive_until(a, local_a, lambda: "y" not in local_a)
+        assert local_a == local_b
+        print("✅ 修改与删除只以增量转发")
+
+        c, local_c = _join(running.address, {"y": {"cost": 2}})
+        assert local_c == local_a
+        c.close()
+        print("✅ 新加入的实例收到删除的墓碑，不会复活已删除的需求")
+        a.close()
+        b.close()
+    finally:
+        running.close()
+
+    return True
+
+
+def test_propagation_independent_of_size():
+    """测试大数据量下单个修改的传播延迟"""
+    print("\n=== 测试传播延迟 ===")
+
+    desires = synthetic_desires(100_000, seed=31)
+    folder = tempfile.mkdtemp()
+    for address in ("127.0.0.1:0", f"unix:{os.path.join(folder, 'hub.sock')}"):
+        running = _RunningHub(address, desires)
+        try:
+            a, local_a = _join(running.address, desires)
+            b, local_b = _join(running.address, desires)
+            assert len(local_a) == len(local_b) == 100_000
+            delays = []
+            for index in range(20):
+                desire_id = f"desire_{index}"
+                new = dict(local_a[desire_id], cost=index + 0.5)
+                start = time.perf_counter()
+                _edit(a, local_a, desire_id, new)
+                _receive_until(b, local_b, lambda: local_b[desire_id] == new)
+                delays.append(time.perf_counter() - start)
+            delays.sort()
+            assert delays[len(delays) // 2] < 0.1
+            kind = "Unix套接字" if address.startswith("unix:") else "TCP"
+            print(f"✅ {kind}: 10万个需求时单个修改传播的中位延迟 {delays[len(delays) // 2] * 1000:.1f}ms")
+            a.close()
+            b.close()
+        finally:
+            running.close()
+    shutil.rmtree(folder)
+
+    return True
+
+
+def test_hub_rejects_invalid_messages():
+    """测试结构不合法的消息：断开发送方、不留下部分修改并记录日志"""
+    print("\n=== 测试无效消息 ===")
+
+    warnings = _Warnings()
+    logging.getLogger("sync").addHandler(warnings)
+    running = _RunningHub()
+    try:
+        a, local_a = _join(running.address, {"x": {"cost": 1}})
+        bad_messages = [
+            {"type": "changes", "changes": [{"id": "ok", "desire": {"cost": 2}, "stamp": [1, "raw"]},
+                                            {"id": "bad"}]},
+            {"type": "changes", "changes": [1, 2]},
+            {"type": "changes", "changes": {"id": "x"}},
+            {"type": "changes", "changes": [{"id": "x", "desire": {"cost": 3}, "stamp": ["1", "raw"]}]},
+            [1, 2],
+        ]
+        for message in bad_messages:
+            raw, lines = _raw_join(running.address)
+            raw.sendall(encode_message(message))
+            assert lines.readline() == b""
+            raw.close()
+        assert "ok" not in running.hub.state.records and running.hub.state.records["x"] == {"cost": 1}
+        assert len(warnings.messages) == len(bad_messages)
+        print(f"✅ {len(bad_messages)} 条无效消息均断开连接且不修改数据，记录了 {len(warnings.messages)} 条警告")
+
+        _edit(a, local_a, "x", {"cost": 5})
+        _raw, lines = _raw_join(running.address)
+        assert running.hub.state.records["x"] == {"cost": 5}
+        _raw.close()
+        a.close()
+        print("✅ 集线器继续为其他实例服务")
+    finally:
+        running.close()
+        logging.getLogger("sync").removeHandler(warnings)
+
+    return True
+
+
+def test_hub_drops_stalled_peers():
+    """测试不读取消息的实例不会阻塞其他实例"""
+    print("\n=== 测试停滞的实例 ===")
+
+    timeout, sync.DRAIN_TIMEOUT = sync.DRAIN_TIMEOUT, 0.5
+    running = _RunningHub()
+    try:
+        stalled, _ = _raw_join(running.address)
+        a, local_a = _join(running.address, {})
+        b, local_b = _join(running.address, {})
+        # a 持续读取（丢弃）集线器回传的消息
+        threading.Thread(target=lambda: all(iter(a.read, None)), daemon=True).start()
+        deadline = time.perf_counter() + 5
+        while len(running.hub.writers) < 3:
+            assert time.perf_counter() < deadline, "等待超时"
+            time.sleep(0.001)
+
+        start = time.perf_counter()
+        payload = "x" * (512 * 1024)
+        for index in range(40):
+            _edit(a, local_a, f"d{index}", {"name": payload, "cost": index})
+        _receive_until(b, local_b, lambda: len(local_b) == 40, timeout=10)
+        elapsed = time.perf_counter() - start
+        assert local_b == local_a and len(running.hub.writers) == 2
+        print(f"✅ 停滞的实例被断开，另一个实例 {elapsed:.2f}s 内收到全部 20MB 修改")
+        stalled.close()
+        a.close()
+        b.close()
+    finally:
+        running.close()
+        sync.DRAIN_TIMEOUT = timeout
+
+    return True
+
+
+def test_windows_stay_in_sync():
+    """测试两个窗口通过集线器同步修改"""
+    print("\n=== 测试窗口同步 ===")
+
+    app = QApplication.instance() or QApplication([])
+    running = _RunningHub()
+    desires = synthetic_desires(500, seed=32)
+
+    def wait(done, timeout=5):
+        deadline = time.perf_counter() + timeout
+        while not done():
+            assert time.perf_counter() < deadline, "等待超时"
+            app.processEvents()
+            time.sleep(0.001)
+
+    try:
+        with _ScriptedDialogs() as dialogs:
+            first, second = DesireCalculator(), DesireCalculator()
+            first.store.replace(desires)
+            assert first.start_sync(running.address)
+            wait(lambda: first.sync.ready and len(running.hub.state.records) == 500)
+            assert second.start_sync(running.address)
+            wait(lambda: len(second.desires) == 500)
+            assert dict(second.desires) == desires and second.desire_model.rowCount() == 500
+            print("✅ 后加入的窗口收到全部数据")
+
+            version = second.store.version
+            start = time.perf_counter()
+            first.store.update("desire_7", enabled=not desires["desire_7"]["enabled"])
+            wait(lambda: second.store.version > version)
+            elapsed = time.perf_counter() - start
+            assert second.desires["desire_7"]["enabled"] != desires["desire_7"]["enabled"]
+            assert second.store.version == version + 1
+            print(f"✅ 切换启用状态 {elapsed * 1000:.1f}ms 后出现在另一个窗口，作为一次增量更新应用")
+
+            second.store.remove("desire_8")
+            second.store.add("extra", dict(desires["desire_1"], name="新增"))
+            wait(lambda: "extra" in first.desires and "desire_8" not in first.desires)
+            first.store.replace({})
+            wait(lambda: len(second.desires) == 0)
+            assert first.converter.statistics(first.columns())['count'] == 0
+            print("✅ 删除、新增与清空双向同步，且不会回传形成循环")
+
+            for window in (first, second):
+                window.close()
+                window.deleteLater()
+            app.processEvents()
+            assert not dialogs.errors
+    finally:
+        running.close()
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试多实例同步...")
+    print("=" * 50)
+
+    tests = [
+        test_concurrent_edits_converge,
+        test_hub_propagates_deltas,
+        test_propagation_independent_of_size,
+        test_hub_rejects_invalid_messages,
+        test_hub_drops_stalled_peers,
+        test_windows_stay_in_sync,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
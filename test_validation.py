@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证数据校验与修复
+Test script - Verify column-wise validation, safe repairs and the structured report
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmark import _ScriptedDialogs, synthetic_desires
+from desire_core import load_desire_file, parse_desire_text
+from main import DesireCalculator
+from validation import ValidationError, add_arguments, report_counts, run_validate, validate_desires
+
+from PyQt5.QtWidgets import QApplication
+
+
+def _desire(**fields):
+    desire = {"name": "房租", "frequency": "每月", "cost": 3000, "priority": "高",
+              "category": "住房", "currency": "CNY", "enabled": True}
+    desire.update(fields)
+    return {key: value for key, value in desire.items() if value is not ...}
+
+
+DIRTY = {
+    "clean": _desire(),
+    "english": _desire(frequency="Monthly", category="Food", priority="High"),
+    "missing": _desire(priority=..., category=..., enabled=..., currency=...),
+    "text": _desire(cost=" 12.5 ", enabled="false", name=2024, currency="usd"),
+    "flag": _desire(enabled=0),
+    "custom": _desire(category="宠物", cost=-20, priority="Urgent"),
+}
+
+
+def _issue(report, field, problem):
+    return next(issue for issue in report['issues'] if issue['field'] == field and issue['problem'] == problem)
+
+
+def test_repairs_and_report():
+    """测试可以安全修复的问题被修复，报告按问题归并"""
+    print("=== 测试校验与修复 ===")
+
+    desires, report = validate_desires(json.loads(json.dumps(DIRTY)))
+    assert desires["english"] == _desire(category="餐饮")
+    assert desires["missing"] == dict(_desire(currency=...), priority="中", category="其他")
+    assert desires["text"] == _desire(cost=12.5, enabled=False, name="2024", currency="USD")
+    assert desires["flag"]["enabled"] is False
+    assert desires["custom"] == DIRTY["custom"]
+    print("✅ 英文标签与别名转为规范值，缺失字段补为默认值，文本形式的数字与布尔值转换类型")
+
+    counts = report_counts(report)
+    assert counts == {'error': 0, 'warning': 3, 'repaired': 11}
+    assert _issue(report, 'frequency', 'alias')['fixed'] == "每月"
+    assert [(issue['value'], issue['fixed']) for issue in report['issues']
+            if issue['field'] == 'enabled' and issue['problem'] == 'type'] == [("false", False), (0, False)]
+    assert {issue['problem'] for issue in report['issues'] if issue['level'] == "warning"} == {"unknown", "negative"}
+    assert _issue(report, 'cost', 'negative')['ids'] == ["custom"]
+    print("✅ 报告按 (级别, 字段, 问题, 取值) 归并，词汇表外的类别、优先级与负数花销保留并警告")
+
+    _, again = validate_desires(desires)
+    assert report_counts(again) == {'error': 0, 'warning': 3, 'repaired': 0}
+    print("✅ 修复后的数据再次校验只剩警告")
+
+    bad = dict(DIRTY, nan=_desire(cost=float("nan")), words=_desire(cost="很贵"), odd=_desire(frequency="偶尔"))
+    try:
+        parse_desire_text(json.dumps(bad))
+        raise AssertionError("无法修复的问题应被拒绝")
+    except ValidationError as e:
+        assert report_counts(e.report)['error'] == 3
+        assert "偶尔" in str(e) and "很贵" in str(e)
+        print(f"✅ 无效花销与无法识别的频率无法修复，加载时拒绝: {e}")
+
+    return True
+
+
+def test_fast_on_large_files():
+    """测试校验耗时远小于解析耗时"""
+    print("\n=== 测试校验速度 ===")
+
+    desires = synthetic_desires(300_000, seed=71)
+    text = json.dumps(desires, ensure_ascii=False)
+    start = time.perf_counter()
+    data = json.loads(text)
+    parse = time.perf_counter() - start
+    start = time.perf_counter()
+    _, report = validate_desires(data)
+    elapsed = time.perf_counter() - start
+    assert report['issues'] == [] and data == desires
+    assert elapsed < parse * 0.6, f"校验 {elapsed:.2f}s，解析 {parse:.2f}s"
+    print(f"✅ 300,000 个需求校验 {elapsed:.2f}s（JSON解析 {parse:.2f}s）")
+
+    for index, desire in enumerate(data.values()):
+        if index % 7 == 0:
+            desire['frequency'] = "Monthly"
+        if index % 11 == 0:
+            desire['enabled'] = 1
+    start = time.perf_counter()
+    _, report = validate_desires(data)
+    dirty = time.perf_counter() - start
+    assert report_counts(report) == {'error': 0, 'warning': 0, 'repaired': 300_000 // 7 + 1 + 300_000 // 11 + 1}
+    assert validate_desires(data)[1]['issues'] == []
+    print(f"✅ 含大量旧版本写法的数据逐行修复 {dirty:.2f}s，修复后重新校验没有问题")
+
+    return True
+
+
+def test_headless_validate():
+    """测试无界面校验、JSON报告与写入修复后的文件"""
+    print("\n=== 测试无界面校验 ===")
+
+    folder = tempfile.mkdtemp()
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    try:
+        source = os.path.join(folder, "desires.json")
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write('{"a": %s, "b": %s, "a": %s}' % (
+                json.dumps(_desire()), json.dumps(_desire(frequency="weekly")), json.dumps(_desire(cost=10))))
+        out = io.StringIO()
+        assert run_validate(parser.parse_args([source]), out) == 1
+        print(out.getvalue())
+        assert out.getvalue().startswith("2 个需求：0 处错误，0 处警告，2 处已修复")
+
+        out = io.StringIO()
+        assert run_validate(parser.parse_args([source, "--json"]), out) == 1
+        report = json.loads(out.getvalue())
+        assert _issue(report, 'id', 'duplicate')['ids'] == ["a"]
+        assert _issue(report, 'frequency', 'alias')['fixed'] == "每周"
+        print("✅ 文字与JSON报告，重复的ID保留最后一条")
+
+        fixed = os.path.join(folder, "fixed.json")
+        assert run_validate(parser.parse_args([source, "-o", fixed]), io.StringIO()) == 1
+        assert load_desire_file(fixed) == {"a": _desire(cost=10), "b": _desire(frequency="每周")}
+        assert run_validate(parser.parse_args([fixed]), io.StringIO()) == 0
+
+        broken = os.path.join(folder, "broken.json")
+        with open(broken, 'w', encoding='utf-8') as f:
+            json.dump({"a": _desire(cost=None)}, f)
+        assert run_validate(parser.parse_args([broken, "-o", fixed]), io.StringIO()) == 2
+        assert load_desire_file(fixed)["a"]["cost"] == 10
+        print("✅ 修复后写入新文件再次校验没有问题；有错误时返回 2 且不写入")
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def test_load_report_in_window():
+    """测试界面加载时修复数据并保留校验报告"""
+    print("\n=== 测试界面加载校验 ===")
+
+    app = QApplication.instance() or QApplication([])
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "desires.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(DIRTY, f, ensure_ascii=False)
+
+    def wait(window):
+        deadline = time.perf_counter() + 30
+        while window.loader is not None:
+            assert time.perf_counter() < deadline, "等待超时"
+            app.processEvents()
+
+    try:
+        with _ScriptedDialogs() as dialogs:
+            window = DesireCalculator()
+            dialogs.open_path = path
+            window.load_desires()
+            wait(window)
+            assert window.desires["english"]["category"] == "餐饮"
+            assert report_counts(window.validation_report)['repaired'] == 11
+            expected = window.converter.statistics(window.columns())['monthly_total']
+            assert window.monthly_label.text() == f"月度总花销: ¥{expected:.2f}"
+            assert not dialogs.errors
+            print("✅ 加载时自动修复，统计按修复后的数据计算")
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"a": _desire(frequency="偶尔")}, f, ensure_ascii=False)
+            window.load_desires()
+            wait(window)
+            assert len(dialogs.errors) == 1 and "偶尔" in str(dialogs.errors[0])
+            assert "english" in window.desires
+            print("✅ 有无法修复的问题时提示错误，当前数据保持不变")
+
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+    finally:
+        shutil.rmtree(folder)
+
+    return True
+
+
+def main():
+    """运行所有测试"""
+    print("🧪 开始测试数据校验...")
+    print("=" * 50)
+
+    tests = [
+        test_repairs_and_report,
+        test_fast_on_large_files,
+        test_headless_validate,
+        test_load_report_in_window,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"❌ 测试失败: {e}")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"🎉 测试结果: {passed} 通过, {failed} 失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+需求计算器 - 数据校验与修复
+Column-wise validation and safe repair of loaded desires with a structured report
+"""
+
+import argparse
+import json
+import math
+import sys
+from itertools import repeat
+
+import numpy as np
+
+from desire_core import (
+    CATEGORIES, DEFAULT_CATEGORY, DEFAULT_PRIORITY, PRIORITIES, iter_json_items,
+    normalize_category, normalize_priority,
+)
+from filecodec import read_desire_text, write_desire_file
+from frequencies import FREQUENCY_FACTORS, parse_frequency
+
+# 问题级别：repaired 已自动修复；warning 保留原值但可能影响统计；error 无法修复
+LEVELS = ("error", "warning", "repaired")
+
+FIELD_NAMES = {
+    'id': "ID",
+    'record': "需求",
+    'name': "名称",
+    'cost': "花销",
+    'frequency': "频率",
+    'category': "类别",
+    'priority': "优先级",
+    'enabled': "启用",
+    'currency': "币种",
+}
+
+PROBLEMS = {
+    'missing': "缺失",
+    'alias': "非规范写法",
+    'type': "类型错误",
+    'invalid': "无效",
+    'unknown': "无法识别",
+    'negative': "为负数",
+    'duplicate': "重复",
+    'empty': "为空",
+}
+
+# 可以安全转换为布尔值的写法
+_BOOLEANS = {
+    "true": True, "yes": True, "1": True, "on": True, "是": True,
+    "false": False, "no": False, "0": False, "off": False, "否": False,
+}
+
+_MISSING = object()
+
+
+class ValidationError(ValueError):
+    """数据中有无法修复的问题，report 为完整的校验报告"""
+
+    def __init__(self, report):
+        self.report = report
+        errors = [issue for issue in report['issues'] if issue['level'] == "error"]
+        details = [_describe(issue, issue['ids'][0]) for issue in errors[:3]]
+        total = sum(issue['count'] for issue in errors)
+        message = "; ".join(details)
+        if total > len(details):
+            message += f" 等 {total} 处错误"
+        super().__init__(message)
+
+
+def _describe(issue, desire_id):
+    """单个问题的描述，如：需求 a 的频率无法识别: '偶尔'"""
+    text = f"需求 {desire_id} 的{FIELD_NAMES[issue['field']]}{PROBLEMS[issue['problem']]}"
+    if issue['value'] is not None:
+        text += f": {issue['value']!r}"
+    return text
+
+
+class _Issues:
+    """
+    按 (级别, 字段, 问题, 原值, 修复值) 归并问题
+
+    by_value 为 False 时不按取值区分（名称、花销等取值各不相同的列），value 为第一个例子；
+    错误总是按取值区分，便于逐个修正。
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, level, field, problem, desire_id, value=None, fixed=None, by_value=True):
+        if not by_value and level != "error":
+            key = (level, field, problem)
+        else:
+            try:
+                key = (level, field, problem, value, fixed)
+                hash(key)
+            except TypeError:
+                key = (level, field, problem, repr(value), repr(fixed))
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {
+                'level': level, 'field': field, 'problem': problem,
+                'value': value, 'fixed': fixed, 'ids': [],
+            }
+        group['ids'].append(desire_id)
+
+    def issues(self):
+        order = {level: index for index, level in enumerate(LEVELS)}
+        issues = [dict(group, count=len(group['ids'])) for group in self.groups.values()]
+        issues.sort(key=lambda issue: (order[issue['level']], -issue['count']))
+        return issues
+
+
+# 相等但类型不同的数字（如 1 与 True）在集合中会合并，出现多种时需要逐行判断
+_NUMERIC = {bool, int, float}
+
+
+def _values(records, field):
+    """逐个需求取出字段值的迭代器（缺失为 _MISSING）"""
+    return map(dict.get, records, repeat(field), repeat(_MISSING))
+
+
+def _all_valid(records, field, classify, types):
+    """
+    不取出整列，快速判断某列是否全部有效
+
+    types 不为空时只检查取值类型（如名称全部为字符串即有效）；否则按不同取值逐个判断。
+    有不可哈希或混合了数字类型的取值时返回 False，改为逐行判断。
+    """
+    if types:
+        return set(map(type, _values(records, field))) <= types
+    try:
+        distinct = set(_values(records, field))
+    except TypeError:
+        return False
+    if set(map(type, distinct)) & _NUMERIC and len(set(map(type, _values(records, field))) & _NUMERIC) > 1:
+        return False
+    return all(classify(value) is None for value in distinct)
+
+
+def _classify_column(ids, records, field, classify, issues, types=None, by_value=True):
+    """
+    检查一列：相同的取值只判断一次
+
+    classify(value) 返回 None（无问题）或 (级别, 问题, 修复值)；返回需要修改的 {行号: 修复值}。
+    全部为字符串时按不同取值判断，其余情况逐行判断（避免 1 与 True 被当作同一个值）。
+    """
+    if _all_valid(records, field, classify, types):
+        return {}
+    values = list(_values(records, field))
+    if set(map(type, values)) <= {str}:
+        verdicts = {value: classify(value) for value in set(values)}
+        bad = {value: verdict for value, verdict in verdicts.items() if verdict is not None}
+        rows = [row for row, value in enumerate(values) if value in bad]
+        lookup = bad.__getitem__
+    else:
+        cache = {}
+
+        def lookup(value):
+            try:
+                key = (type(value), value)
+                if key not in cache:
+                    cache[key] = classify(value)
+                return cache[key]
+            except TypeError:
+                return classify(value)
+
+        rows = [row for row, value in enumerate(values) if lookup(value) is not None]
+
+    fixes = {}
+    for row in rows:
+        value = values[row]
+        level, problem, fixed = lookup(value)
+        shown = None if value is _MISSING else value
+        reported = None if fixed is _MISSING or not by_value else fixed
+        issues.add(level, field, problem, ids[row], shown, reported, by_value)
+        if level == "repaired":
+            fixes[row] = fixed
+    return fixes
+
+
+def _frequency(value):
+    if value is _MISSING:
+        return "error", "missing", None
+    if not isinstance(value, str):
+        return "error", "type", None
+    if value in FREQUENCY_FACTORS:
+        return None
+    canonical = parse_frequency(value)
+    if canonical is None:
+        return "error", "unknown", None
+    if canonical != value:
+        return "repaired", "alias", canonical
+    return None
+
+
+def _vocabulary(vocabulary, normalize, default):
+    def classify(value):
+        if value is _MISSING:
+            return "repaired", "missing", default
+        if value is None or value == "":
+            return "repaired", "empty", default
+        if not isinstance(value, str):
+            return "error", "type", None
+        if value in vocabulary:
+            return None
+        canonical = normalize(value)
+        if canonical is None:
+            # 词汇表外的值保留（统计按原值分组）
+            return "warning", "unknown", None
+        return "repaired", "alias", canonical
+    return classify
+
+
+def _enabled(value):
+    if value is True or value is False:
+        return None
+    if value is _MISSING:
+        return "repaired", "missing", True
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return "repaired", "type", bool(value)
+    if isinstance(value, str) and value.strip().lower() in _BOOLEANS:
+        return "repaired", "type", _BOOLEANS[value.strip().lower()]
+    return "error", "invalid", None
+
+
+def _currency(value):
+    if value is _MISSING:
+        return None
+    if value is None or value == "":
+        # 删除该字段，按基准币种计算
+        return "repaired", "empty", _MISSING
+    if not isinstance(value, str):
+        return "error", "type", None
+    code = value.strip().upper()
+    if code != value:
+        return ("repaired", "alias", code) if code else ("repaired", "empty", _MISSING)
+    return None
+
+
+def _name(value):
+    if isinstance(value, str):
+        return None
+    if value is _MISSING or value is None:
+        return "error", "missing", None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "repaired", "type", str(value)
+    return "error", "type", None
+
+
+def _cost(value):
+    """逐个检查花销（仅用于不全是数字的列）"""
+    if isinstance(value, bool):
+        return "error", "type", None
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            return "error", "invalid", None
+        return ("warning", "negative", None) if value < 0 else None
+    if value is _MISSING or value is None:
+        return "error", "missing", None
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return "error", "invalid", None
+        if not math.isfinite(number):
+            return "error", "invalid", None
+        return "repaired", "type", number
+    return "error", "type", None
+
+
+def _check_costs(ids, records, issues):
+    """花销列：全部为数字时整列检查有限性与符号，否则逐个检查"""
+    values = list(_values(records, 'cost'))
+    if set(map(type, values)) <= {int, float}:
+        try:
+            costs = np.array(values, dtype=np.float64)
+        except OverflowError:
+            costs = None
+        if costs is not None:
+            bad = np.flatnonzero(~np.isfinite(costs) | (costs < 0))
+            for row in bad.tolist():
+                level, problem, _ = _cost(values[row])
+                issues.add(level, 'cost', problem, ids[row], values[row], by_value=False)
+            return {}
+    fixes = {}
+    for row, value in enumerate(values):
+        verdict = _cost(value)
+        if verdict is None:
+            continue
+        level, problem, fixed = verdict
+        issues.add(level, 'cost', problem, ids[row], None if value is _MISSING else value, by_value=False)
+        if level == "repaired":
+            fixes[row] = fixed
+    return fixes
+
+
+# 字段 -> (检查函数, 只需检查类型时的有效类型)
+COLUMN_CHECKS = {
+    'name': (_name, {str}),
+    'frequency': (_frequency, None),
+    'category': (_vocabulary(set(CATEGORIES), normalize_category, DEFAULT_CATEGORY), None),
+    'priority': (_vocabulary(set(PRIORITIES), normalize_priority, DEFAULT_PRIORITY), None),
+    'enabled': (_enabled, {bool}),
+    'currency': (_currency, None),
+}
+
+
+def validate_desires(data, duplicate_ids=()):
+    """
+    逐列校验需求数据并原地修复可以安全修复的问题，返回 (需求, 报告)
+
+    每列先只按不同取值（或取值类型）快速判断，有问题时才逐行检查；花销整列用 numpy 检查。
+    报告 {'count', 'issues': [...]} 中每个问题为
+    {'level', 'field', 'problem', 'value', 'fixed', 'ids', 'count'}，相同的问题归并为一条。
+    duplicate_ids 为文件中重复出现的ID（保留最后一条）。
+    """
+    if not isinstance(data, dict):
+        raise ValueError("需求文件必须是JSON对象")
+    issues = _Issues()
+    for desire_id in duplicate_ids:
+        issues.add("repaired", 'id', 'duplicate', desire_id)
+    if "" in data:
+        issues.add("warning", 'id', 'empty', "")
+
+    ids = list(data)
+    records = list(data.values())
+    if not set(map(type, records)) <= {dict}:
+        for desire_id, desire in zip(ids, records):
+            if not isinstance(desire, dict):
+                issues.add("error", 'record', 'type', desire_id, type(desire).__name__)
+        ids = [desire_id for desire_id, desire in zip(ids, records) if isinstance(desire, dict)]
+        records = [desire for desire in records if isinstance(desire, dict)]
+
+    fixes = {'cost': _check_costs(ids, records, issues)}
+    for field, (classify, types) in COLUMN_CHECKS.items():
+        fixes[field] = _classify_column(ids, records, field, classify, issues, types, by_value=field != 'name')
+    for field, rows in fixes.items():
+        for row, value in rows.items():
+            if value is _MISSING:
+                records[row].pop(field, None)
+            else:
+                records[row][field] = value
+    return data, {'count': len(data), 'issues': issues.issues()}
+
+
+def validate_items(items):
+    """校验 (ID, 需求) 序列（如 iter_json_items 的结果），同时检查ID是否重复"""
+    data = {}
+    duplicates = []
+    for desire_id, desire in items:
+        if desire_id in data:
+            duplicates.append(desire_id)
+        data[desire_id] = desire
+    return validate_desires(data, duplicates)
+
+
+def check_report(report):
+    """有无法修复的问题时抛出 ValidationError"""
+    if any(issue['level'] == "error" for issue in report['issues']):
+        raise ValidationError(report)
+    return report
+
+
+def report_counts(report):
+    """各级别的问题数（按需求计）"""
+    counts = {level: 0 for level in LEVELS}
+    for issue in report['issues']:
+        counts[issue['level']] += issue['count']
+    return counts
+
+
+def format_report(report, limit=20):
+    """校验报告的文字描述"""
+    counts = report_counts(report)
+    lines = [f"{report['count']} 个需求：{counts['error']} 处错误，{counts['warning']} 处警告，"
+             f"{counts['repaired']} 处已修复"]
+    marks = {"error": "❌", "warning": "⚠️", "repaired": "🔧"}
+    shown = report['issues'] if limit is None else report['issues'][:limit]
+    for issue in shown:
+        text = f"{FIELD_NAMES[issue['field']]}{PROBLEMS[issue['problem']]}"
+        if issue['value'] is not None:
+            text += f" {issue['value']!r}"
+        if issue['fixed'] is not None:
+            text += f" → {issue['fixed']!r}"
+        examples = ", ".join(str(desire_id) for desire_id in issue['ids'][:3])
+        more = f" 等 {issue['count']} 个" if issue['count'] > 3 else ""
+        lines.append(f"{marks[issue['level']]} {text}（{examples}{more}）")
+    if len(shown) < len(report['issues']):
+        lines.append(f"... 另有 {len(report['issues']) - len(shown)} 类问题")
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("file", help="需求JSON文件")
+    parser.add_argument("--json", action="store_true", help="以JSON输出报告")
+    parser.add_argument("--limit", type=int, default=20, help="最多列出的问题类别数")
+    parser.add_argument("-o", "--output", help="写入修复后的数据（有错误时不写入）")
+
+
+def run_validate(args, out=sys.stdout):
+    """无界面校验需求文件：无问题返回 0，只有修复或警告返回 1，有错误返回 2"""
+    desires, report = validate_items(iter_json_items(read_desire_text(args.file)))
+    if args.json:
+        json.dump(report, out, ensure_ascii=False, indent=2)
+        print(file=out)
+    else:
+        print(format_report(report, args.limit), file=out)
+    counts = report_counts(report)
+    if counts['error']:
+        return 2
+    if args.output:
+        write_desire_file(args.output, desires)
+        if not args.json:
+            print(f"已写入修复后的 {len(desires)} 个需求到 {args.output}", file=out)
+    return 1 if report['issues'] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求计算器数据校验")
+    add_arguments(parser)
+    sys.exit(run_validate(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()